@@ -0,0 +1,81 @@
+"""Shared fixtures for the backend tests."""
+
+import os
+import sqlite3
+import sys
+from contextlib import ExitStack
+from datetime import timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+import pytest
+from unittest.mock import patch
+
+import export_weather
+
+
+@pytest.fixture(scope="module")
+def export_data_dir(tmp_path_factory):
+    """Point the committed data paths export() writes to at a temp dir.
+
+    export() converts public station CSVs, exports the validation history and
+    records its publish state under data/; patched here so a test run leaves
+    the working tree alone. weather.db (DB_PATH) is still read from data/.
+    """
+    data_dir = tmp_path_factory.mktemp("data")
+    paths = {
+        "DATA_DIR": data_dir,
+        "PUBLIC_STATIONS_DIR": data_dir / "public-stations",
+        "STATION_ARCHIVE_DIR": data_dir / "public-stations-archive",
+        "VALIDATION_DIR": data_dir / "validation",
+        "VALIDATION_STATE_JSON": data_dir / "validation" / ".state.json",
+        "FRONTEND_SHARDS_JSON": data_dir / "frontend-shards.json",
+        "EXPORT_STATE_JSON": data_dir / "export-state.json",
+        "EXPORT_DICTIONARY_PATH": data_dir / "export.zdict",
+    }
+    with ExitStack() as stack:
+        for name, path in paths.items():
+            stack.enter_context(patch(f'export_weather.{name}', str(path)))
+        yield data_dir
+
+
+class SourceDB:
+    """A weather.db with the four tables the frontend DB and its shards are built from."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("CREATE TABLE readings (timestamp INTEGER PRIMARY KEY, date TEXT, hour INTEGER, temp_indoor REAL)")
+        self.conn.execute(export_weather.PREDICTIONS_TABLE_SQL)
+        self.conn.execute(export_weather.PREDICTION_HISTORY_TABLE_SQL)
+        self.conn.execute("CREATE TABLE public_stations (id INTEGER PRIMARY KEY, fetched_at TEXT, station_id TEXT, temperature REAL)")
+        self.conn.commit()
+
+    @staticmethod
+    def ts(dt):
+        return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def add_hour(self, dt):
+        """One row per table for the hour starting at dt."""
+        ts = self.ts
+        self.conn.execute("INSERT INTO readings VALUES (?, ?, ?, 20.0)",
+                          (int(dt.timestamp()), dt.strftime("%Y-%m-%d"), dt.hour))
+        self.conn.execute(
+            """INSERT INTO predictions (generated_at, model_type, model_version, for_hour,
+               temp_indoor_predicted, temp_outdoor_predicted) VALUES (?, '3hrRaw', 1, ?, 20, 5)""",
+            (ts(dt), ts(dt + timedelta(hours=1))))
+        self.conn.execute(
+            """INSERT INTO prediction_history (predicted_at, for_hour, model_type, model_version,
+               predicted_indoor, predicted_outdoor, actual_indoor, actual_outdoor, error_indoor, error_outdoor)
+               VALUES (?, ?, '3hrRaw', 1, 20, 5, 20, 5, 0, 0)""", (ts(dt), ts(dt)))
+        self.conn.execute("INSERT INTO public_stations (fetched_at, station_id, temperature) VALUES (?, 'a', 4.0)",
+                          (ts(dt),))
+        self.conn.commit()
+
+
+@pytest.fixture
+def source_db(tmp_path):
+    """An empty SourceDB at tmp_path/weather.db."""
+    db = SourceDB(tmp_path / "weather.db")
+    yield db
+    db.conn.close()
@@ -0,0 +1,44 @@
+"""Tests for the shared temp-file-and-replace writer (atomic_file.py)."""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+import pytest
+
+import atomic_file
+
+
+def test_write_json_creates_directory_and_replaces(tmp_path):
+    path = str(tmp_path / "nested" / "state.json")
+    atomic_file.write_json(path, {"b": 1, "a": 2}, indent=1, sort_keys=True)
+    atomic_file.write_json(path, {"a": 3})
+
+    with open(path) as f:
+        text = f.read()
+    assert text.endswith("\n") and json.loads(text) == {"a": 3}
+    assert os.listdir(tmp_path / "nested") == ["state.json"]
+
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = str(tmp_path / "state.json")
+    atomic_file.write_json(path, {"ok": True})
+
+    with pytest.raises(TypeError):
+        atomic_file.write_json(path, {"bad": object()})
+
+    with open(path) as f:
+        assert json.load(f) == {"ok": True}
+    assert os.listdir(tmp_path) == ["state.json"]
+
+
+def test_stage_json_leaves_the_target_until_replaced(tmp_path):
+    path = str(tmp_path / "prediction.json")
+    tmp_path_staged = atomic_file.stage_json(path, [1, 2], indent=2)
+
+    assert not os.path.exists(path)
+    os.replace(tmp_path_staged, path)
+    with open(path) as f:
+        assert json.load(f) == [1, 2]
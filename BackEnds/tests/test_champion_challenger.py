@@ -0,0 +1,238 @@
+"""Tests for champion/challenger shadow scoring (registry, predict, validate, export)."""
+
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+import export_weather
+import model_registry
+import predict
+import train_model
+import validate_prediction
+
+
+class ConstantModel:
+    """Picklable stand-in model that always predicts the same temperatures."""
+
+    def __init__(self, indoor, outdoor):
+        self.value = [indoor, outdoor]
+
+    def predict(self, X):
+        return np.array([self.value] * len(X))
+
+
+def _history_db(db_path, rows):
+    """prediction_history rows: (model_type, for_hour, version, err_in, err_out)."""
+    conn = sqlite3.connect(db_path)
+    conn.execute(validate_prediction.PREDICTION_HISTORY_TABLE_SQL)
+    for model_type, for_hour, version, err_in, err_out in rows:
+        conn.execute(
+            """INSERT INTO prediction_history
+            (predicted_at, for_hour, model_type, model_version,
+             predicted_indoor, predicted_outdoor, actual_indoor, actual_outdoor,
+             error_indoor, error_outdoor)
+            VALUES (?, ?, ?, ?, 20, 5, 20, 5, ?, ?)""",
+            (for_hour, for_hour, model_type, version, err_in, err_out))
+    conn.commit()
+    return conn
+
+
+def _shadow_entry(for_hour, version, err_in, err_out, model_type="3hrRaw"):
+    return {"for_hour": for_hour, "model_type": model_type, "model_version": version,
+            "error": {"temp_indoor": err_in, "temp_outdoor": err_out}}
+
+
+def test_publish_as_challenger_keeps_champion_serving(tmp_path):
+    artifact = str(tmp_path / "temp_predictor.joblib")
+
+    # First model has no champion to compete with, so it serves right away
+    model_registry.publish({"v": 1}, artifact, 1, as_challenger=True)
+    assert model_registry.challenger(artifact) is None
+
+    model_registry.publish({"v": 2}, artifact, 2, as_challenger=True)
+    assert model_registry.read_index(artifact)["current"] == 1
+    assert model_registry.challenger(artifact) == 2
+    assert joblib.load(artifact) == {"v": 1}
+
+    model_registry.promote(artifact, 2)
+    assert model_registry.challenger(artifact) is None
+    assert joblib.load(artifact) == {"v": 2}
+
+
+def test_challenger_survives_retention(tmp_path):
+    artifact = str(tmp_path / "temp_predictor.joblib")
+    model_registry.publish({"v": 1}, artifact, 1)
+    model_registry.publish({"v": 2}, artifact, 2, as_challenger=True)
+    model_registry.publish({"v": 3}, artifact, 3, keep=1)
+    model_registry.publish({"v": 4}, artifact, 4, keep=1, as_challenger=True)
+
+    index = model_registry.read_index(artifact)
+    assert index["current"] == 3 and index["challenger"] == 4
+    assert [e["version"] for e in index["versions"]] == [3, 4]
+
+
+def test_run_challenger_reuses_feature_vector(tmp_path):
+    artifact = str(tmp_path / "temp_predictor_simple.joblib")
+    model_registry.publish(ConstantModel(20.0, 5.0), artifact, 1)
+    model_registry.publish(ConstantModel(21.0, 6.0), artifact, 2, as_challenger=True)
+    last_row = pd.Series({"timestamp": 1772366400, "temp_indoor": 20.0, "temp_outdoor": 5.0})
+
+    predict.SHADOW_OUTPUTS.clear()
+    with patch('predict._tree_interval', return_value=None):
+        predict._run_challenger(artifact, "3hrRaw", np.zeros((1, 4)), last_row)
+
+    prediction, version, row, interval = predict.SHADOW_OUTPUTS.pop("3hrRaw")
+    assert list(prediction) == [21.0, 6.0]
+    assert version == 2 and row is last_row
+
+    # Pinned runs skip the shadow
+    with patch.dict(predict.MODEL_PINS, {"3hrRaw": 1}):
+        predict._run_challenger(artifact, "3hrRaw", np.zeros((1, 4)), last_row)
+    assert predict.SHADOW_OUTPUTS == {}
+
+
+def test_shadow_prediction_is_db_only(tmp_path):
+    db_path = str(tmp_path / "weather.db")
+    result = {
+        "generated_at": "2026-03-01T12:00:00Z", "model_type": "3hrRaw", "model_version": 2,
+        "prediction": {"prediction_for": "2026-03-01T13:00:00Z", "temp_indoor": 21.0, "temp_outdoor": 4.0},
+        "last_reading": {"timestamp": 1772366400, "temp_indoor": 20.5, "temp_outdoor": 3.5},
+    }
+    batch = predict._new_prediction_batch()
+    with patch('predict.DB_PATH', db_path):
+        predict._write_prediction(result, str(tmp_path / "p"), "3hrRaw", batch)
+        predict._write_prediction(result, str(tmp_path / "p"), "3hrRaw", batch, shadow=True)
+        predict._flush_predictions(batch)
+
+    conn = sqlite3.connect(db_path)
+    flags = [r[0] for r in conn.execute("SELECT is_shadow FROM predictions ORDER BY id")]
+    conn.close()
+    assert flags == [0, 1]
+    date_dir = tmp_path / "p" / batch["run_at"].strftime("%Y-%m-%d")
+    # Champion file + 3hrRaw compat file only
+    assert len(os.listdir(date_dir)) == 2
+
+
+def test_challenger_promoted_after_enough_better_hours(tmp_path):
+    models_dir = tmp_path / "models"
+    models_dir.mkdir()
+    artifact = str(models_dir / "temp_predictor_simple.joblib")
+    model_registry.publish({"v": 1}, artifact, 1)
+    model_registry.publish({"v": 2}, artifact, 2, as_challenger=True)
+
+    hours = [f"2026-03-01T{h:02d}:00:00Z" for h in range(4)]
+    conn = _history_db(str(tmp_path / "weather.db"), [("3hrRaw", h, 1, 0.5, 0.5) for h in hours])
+
+    with patch('validate_prediction.MODEL_DIR', str(models_dir)):
+        validate_prediction._store_challenger_scores(conn, [_shadow_entry(h, 2, 0.1, 0.2) for h in hours[:3]])
+        assert validate_prediction.promote_challengers(conn, promotion_hours=4) == []
+
+        validate_prediction._store_challenger_scores(conn, [_shadow_entry(hours[3], 2, 0.1, 0.2)])
+        assert validate_prediction.promote_challengers(conn, promotion_hours=4) == [("3hrRaw", 2)]
+
+    assert model_registry.read_index(artifact)["current"] == 2
+    assert joblib.load(artifact) == {"v": 2}
+    conn.close()
+
+
+def test_worse_challenger_is_not_promoted(tmp_path):
+    models_dir = tmp_path / "models"
+    models_dir.mkdir()
+    artifact = str(models_dir / "temp_predictor_simple.joblib")
+    model_registry.publish({"v": 1}, artifact, 1)
+    model_registry.publish({"v": 2}, artifact, 2, as_challenger=True)
+
+    hours = [f"2026-03-01T{h:02d}:00:00Z" for h in range(3)]
+    conn = _history_db(str(tmp_path / "weather.db"), [("3hrRaw", h, 1, 0.2, 0.2) for h in hours])
+
+    with patch('validate_prediction.MODEL_DIR', str(models_dir)):
+        validate_prediction._store_challenger_scores(conn, [_shadow_entry(h, 2, 0.9, 0.9) for h in hours])
+        assert validate_prediction.promote_challengers(conn, promotion_hours=3) == []
+
+    # Rejected: the champion keeps serving and the slot is free for the next retrain
+    assert model_registry.challenger(artifact) is None
+    assert model_registry.read_index(artifact)["current"] == 1
+    conn.close()
+
+
+def test_in_flight_challenger_is_not_replaced(tmp_path):
+    artifact = str(tmp_path / "temp_predictor.joblib")
+    model_registry.publish({"v": 1}, artifact, 1)
+    model_registry.publish({"v": 2}, artifact, 2, as_challenger=True)
+    with pytest.raises(ValueError):
+        model_registry.publish({"v": 3}, artifact, 3, as_challenger=True)
+    assert model_registry.challenger(artifact) == 2
+
+    # Retraining is skipped while it is scored, and resumes after a rejection
+    with patch('train_model.MODEL_PATH', artifact):
+        assert train_model._challenger_pending(artifact, "24hrRaw")
+        model_registry.reject(artifact, 2)
+        assert not train_model._challenger_pending(artifact, "24hrRaw")
+        assert train_model._next_version({"version": 1}, artifact) == 3
+
+
+def test_challenger_meta_is_written_on_promotion(tmp_path):
+    models_dir = tmp_path / "models"
+    models_dir.mkdir()
+    artifact = str(models_dir / "temp_predictor_simple.joblib")
+    meta_path = str(models_dir / "simple_meta.json")
+
+    assert train_model._publish_challenger({"v": 1}, artifact, meta_path, {"version": 1})
+    assert not train_model._publish_challenger({"v": 2}, artifact, meta_path, {"version": 2, "mae_indoor": 0.1})
+    with open(meta_path) as f:
+        assert json.load(f)["version"] == 1
+
+    hours = [f"2026-03-01T{h:02d}:00:00Z" for h in range(2)]
+    conn = _history_db(str(tmp_path / "weather.db"), [("3hrRaw", h, 1, 0.5, 0.5) for h in hours])
+    with patch('validate_prediction.MODEL_DIR', str(models_dir)):
+        validate_prediction._store_challenger_scores(conn, [_shadow_entry(h, 2, 0.1, 0.1) for h in hours])
+        assert validate_prediction.promote_challengers(conn, promotion_hours=2) == [("3hrRaw", 2)]
+    conn.close()
+    with open(meta_path) as f:
+        assert json.load(f) == {"version": 2, "mae_indoor": 0.1}
+
+
+def test_stalled_challenger_expires(tmp_path):
+    models_dir = tmp_path / "models"
+    models_dir.mkdir()
+    artifact = str(models_dir / "temp_predictor_simple.joblib")
+    model_registry.publish({"v": 1}, artifact, 1)
+    model_registry.publish({"v": 2}, artifact, 2, as_challenger=True)
+    conn = _history_db(str(tmp_path / "weather.db"), [])
+    later = datetime.now(timezone.utc) + timedelta(hours=validate_prediction.CHALLENGER_MAX_HOURS)
+
+    with patch('validate_prediction.MODEL_DIR', str(models_dir)):
+        validate_prediction.promote_challengers(conn, promotion_hours=4)
+        assert model_registry.challenger(artifact) == 2
+        validate_prediction.promote_challengers(conn, promotion_hours=4, now=later)
+    assert model_registry.challenger(artifact) is None
+    conn.close()
+
+
+def test_shadow_rows_never_exported(tmp_path):
+    db_path = str(tmp_path / "weather.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(predict.PREDICTIONS_TABLE_SQL)
+    for is_shadow, indoor in ((0, 20.0), (1, 99.0)):
+        conn.execute(
+            """INSERT INTO predictions (generated_at, model_type, model_version, for_hour,
+               temp_indoor_predicted, temp_outdoor_predicted, is_shadow)
+               VALUES ('2026-03-01T12:00:05Z', '3hrRaw', 1, '2026-03-01T13:00:05Z', ?, 5, ?)""",
+            (indoor, is_shadow))
+    conn.commit()
+    conn.close()
+
+    with patch('export_weather.DB_PATH', db_path):
+        found = export_weather._find_predictions_for_hour_from_db("2026-03-01", 12)
+
+    assert [p["prediction"]["temp_indoor"] for p in found] == [20.0]
@@ -0,0 +1,112 @@
+"""Tests for the export compression codecs (compression.py, benchmark_compression.py)."""
+
+import json
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+from unittest.mock import patch
+
+import benchmark_compression
+import compression
+import export_weather
+
+
+def _samples(n=40):
+    return [json.dumps({"date": f"2026-01-{i % 28 + 1:02d}", "model_type": "3hrRaw",
+                        "entries": [{"for_hour": f"2026-01-01T{h:02d}:00:00Z", "error": i * h / 7}
+                                    for h in range(24)]}).encode() for i in range(n)]
+
+
+def test_gzip_round_trip_is_deterministic():
+    data = b"fish tank " * 500
+    first = compression.compress("gzip", data)
+    assert first == compression.compress("gzip", data)
+    assert compression.decompress("gzip", first) == data
+
+
+@pytest.mark.parametrize("codec", ["zstd", "br"])
+def test_optional_codec_round_trip(codec):
+    if not compression.available(codec):
+        pytest.skip(f"{codec} is not installed")
+    data = b"fish tank " * 500
+    assert compression.decompress(codec, compression.compress(codec, data)) == data
+
+
+def test_dictionary_shrinks_small_json():
+    pytest.importorskip("zstandard")
+    samples = _samples()
+    dictionary = compression.train_dictionary(samples[:30])
+    assert dictionary is not None
+    payload = samples[-1]
+    with_dict = compression.compress("zstd", payload, dictionary=dictionary)
+    assert len(with_dict) < len(compression.compress("zstd", payload))
+    assert compression.decompress("zstd", with_dict, dictionary) == payload
+    # Too few samples to train on
+    assert compression.train_dictionary(samples[:3]) is None
+
+
+def test_frontend_db_variants_are_recorded(tmp_path):
+    work_db = tmp_path / "frontend.db"
+    conn = sqlite3.connect(work_db)
+    conn.execute("CREATE TABLE readings (timestamp INTEGER PRIMARY KEY, temp_indoor REAL)")
+    conn.executemany("INSERT INTO readings VALUES (?, 20.5)", [(i,) for i in range(500)])
+    conn.commit()
+    conn.close()
+    export_weather._gzip_file(str(work_db), str(tmp_path / "frontend.db.gz"))
+    codecs = ["gzip"] + [c for c in ("zstd", "br") if compression.available(c)]
+
+    entries = export_weather._frontend_db_variants(str(tmp_path), codecs)
+
+    assert [e["codec"] for e in entries] == codecs
+    assert entries[0]["name"] == "frontend.db.gz"
+    for entry in entries:
+        path = tmp_path / entry["name"]
+        assert entry["bytes"] == os.path.getsize(path)
+        assert entry["sha256"] == export_weather._file_sha256(str(path))
+        assert compression.decompress(entry["codec"], path.read_bytes()) == work_db.read_bytes()
+
+
+def test_export_dictionary_is_retrained_when_stale(tmp_path):
+    pytest.importorskip("zstandard")
+    deltas = tmp_path / "out" / "deltas"
+    deltas.mkdir(parents=True)
+    for i, sample in enumerate(_samples()):
+        (deltas / f"delta-{i}.json").write_bytes(sample)
+    dict_path = tmp_path / "export.zdict"
+    state = {"artifacts": {}, "delta_version": 0, "deltas": []}
+
+    with patch('export_weather.EXPORT_DICTIONARY_PATH', str(dict_path)), \
+            patch('export_weather.VALIDATION_DIR', str(tmp_path / "none")):
+        dictionary = export_weather.load_export_dictionary(str(tmp_path / "out"), state)
+        assert dictionary == dict_path.read_bytes()
+        trained_at = state["dictionary_trained_at"]
+        # Fresh: reused as is
+        assert export_weather.load_export_dictionary(str(tmp_path / "out"), state) == dictionary
+        assert state["dictionary_trained_at"] == trained_at
+
+
+def test_benchmark_reports_every_available_codec():
+    results = benchmark_compression.benchmark([b"fish tank " * 200], repeat=1)
+    codecs = {r["codec"] for r in results}
+    assert "gzip" in codecs
+    assert all(r["ratio"] > 1 and r["compress_ms"] >= 0 for r in results)
+
+
+def test_delta_is_compressed_with_the_export_dictionary(tmp_path):
+    pytest.importorskip("zstandard")
+    samples = _samples()
+    dictionary = compression.train_dictionary(samples)
+    delta_path = tmp_path / "delta-3.json"
+    delta_path.write_bytes(samples[0])
+
+    zst_path, key, encodings = export_weather._compress_delta(str(delta_path), dictionary)
+
+    assert key == f"dicts/export-{compression.dictionary_id(dictionary)}.zdict"
+    assert encodings == {"zstd": {"name": "delta-3.json.zst", "dictionary": key}}
+    with open(zst_path, "rb") as f:
+        assert compression.decompress("zstd", f.read(), dictionary) == samples[0]
@@ -0,0 +1,124 @@
+"""Tests for delta exports: content-hash skips and frontend.db deltas."""
+
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+from unittest.mock import patch
+
+import export_weather
+
+
+def _state():
+    return {"artifacts": {}, "delta_version": 0, "deltas": []}
+
+
+def _build(out, source, state):
+    with patch('export_weather.DB_PATH', source):
+        return export_weather.build_frontend_db(str(out), state=state)
+
+
+def test_incremental_run_writes_a_delta(tmp_path, source_db):
+    source = source_db.path
+    base = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(hours=5)
+    source_db.add_hour(base)
+    out = tmp_path / "out"
+    out.mkdir()
+    state = _state()
+
+    assert _build(out, source, state) is None
+    assert state["delta_version"] == 1
+
+    source_db.add_hour(base + timedelta(hours=1))
+    delta_path = _build(out, source, state)
+    assert os.path.basename(delta_path) == "delta-2.json"
+    with open(delta_path) as f:
+        delta = json.load(f)
+    assert delta["version"] == 2 and delta["previous_version"] == 1
+    assert {t: len(rows) for t, rows in delta["tables"].items()} == {
+        "readings": 1, "predictions": 1, "prediction_history": 1, "public_stations": 1}
+    assert delta["tables"]["readings"][0]["timestamp"] == int((base + timedelta(hours=1)).timestamp())
+    assert [d["version"] for d in state["deltas"]] == [2]
+
+
+def test_unchanged_source_leaves_files_alone(tmp_path, source_db):
+    source = source_db.path
+    source_db.add_hour(datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0))
+    out = tmp_path / "out"
+    out.mkdir()
+    state = _state()
+    _build(out, source, state)
+    mtime = os.stat(out / "frontend.db.gz").st_mtime_ns
+
+    assert _build(out, source, state) is None
+    assert state["delta_version"] == 1
+    assert os.stat(out / "frontend.db.gz").st_mtime_ns == mtime
+
+
+def test_version_mismatch_forces_full_rebuild(tmp_path, source_db, capsys):
+    source = source_db.path
+    source_db.add_hour(datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0))
+    out = tmp_path / "out"
+    out.mkdir()
+    _build(out, source, _state())
+    capsys.readouterr()
+
+    # A kept frontend.db that does not match the published delta chain
+    state = {"artifacts": {}, "delta_version": 5, "deltas": [{"version": 5}]}
+    _build(out, source, state)
+    assert "full rebuild" in capsys.readouterr().out
+    assert state["delta_version"] == 6 and state["deltas"] == []
+
+
+def test_failed_delta_upload_holds_back_the_index(tmp_path):
+    deltas_dir = tmp_path / "deltas"
+    deltas_dir.mkdir()
+    (deltas_dir / "delta-2.json").write_text("{}")
+    state = {"artifacts": {}, "delta_version": 2, "deltas": [{"version": 2, "name": "delta-2.json"}],
+             "unpublished_deltas": ["delta-2.json"]}
+    uploads = []
+
+    def upload(path, key, cache_control=None):
+        uploads.append(key)
+        return key != "deltas/delta-2.json" or len(uploads) > 1
+
+    with patch('export_weather.upload_to_r2', side_effect=upload):
+        export_weather.publish_delta_index(str(tmp_path), state)
+        # The local index is written, but not uploaded ahead of its delta
+        assert uploads == ["deltas/delta-2.json"]
+        assert state["unpublished_deltas"] == ["delta-2.json"]
+        assert json.loads((deltas_dir / "index.json").read_text())["version"] == 2
+
+        # The next run retries the delta, then uploads the unchanged index
+        export_weather.publish_delta_index(str(tmp_path), state)
+        assert uploads == ["deltas/delta-2.json", "deltas/delta-2.json", "deltas/index.json"]
+        assert state["unpublished_deltas"] == []
+        assert "deltas/index.json" in state["artifacts"]
+
+        export_weather.publish_delta_index(str(tmp_path), state)
+        assert len(uploads) == 3
+
+
+def test_failed_index_upload_is_retried(tmp_path):
+    state = {"artifacts": {}, "delta_version": 1, "deltas": [], "unpublished_deltas": []}
+
+    with patch('export_weather.upload_to_r2', return_value=False) as upload:
+        export_weather.publish_delta_index(str(tmp_path), state)
+    assert upload.call_count == 1 and "deltas/index.json" not in state["artifacts"]
+
+    with patch('export_weather.upload_to_r2', return_value=True) as upload:
+        export_weather.publish_delta_index(str(tmp_path), state)
+    upload.assert_called_once()
+    assert "deltas/index.json" in state["artifacts"]
+
+
+def test_content_hash_ignores_timestamps(tmp_path):
+    path = tmp_path / "weather.json"
+    path.write_text(json.dumps({"generated_at": "2026-01-01T00:00:00Z", "current": {"t": 1}}))
+
+    assert export_weather._json_unchanged(str(path), {"generated_at": "2026-01-02T00:00:00Z", "current": {"t": 1}})
+    assert not export_weather._json_unchanged(str(path), {"generated_at": "2026-01-01T00:00:00Z", "current": {"t": 2}})
+    assert not export_weather._json_unchanged(str(tmp_path / "missing.json"), {"current": {"t": 1}})
@@ -0,0 +1,160 @@
+"""Tests for the ensemble blending model (ensemble.py + predict/export wiring)."""
+
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+import pandas as pd
+from unittest.mock import patch
+
+import ensemble
+import predict
+
+HISTORY_SQL = """CREATE TABLE prediction_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    predicted_at TEXT NOT NULL,
+    for_hour TEXT NOT NULL,
+    model_type TEXT NOT NULL,
+    model_version INTEGER,
+    predicted_indoor REAL,
+    predicted_outdoor REAL,
+    actual_indoor REAL,
+    actual_outdoor REAL,
+    error_indoor REAL,
+    error_outdoor REAL,
+    UNIQUE(model_type, for_hour)
+)"""
+
+
+def _make_history(db_path, hours=12, errors=None):
+    """Seed prediction_history with per-model constant errors (indoor, outdoor)."""
+    errors = errors or {"3hrRaw": (0.1, 1.0), "24hrRaw": (1.0, 0.1)}
+    conn = sqlite3.connect(db_path)
+    conn.execute(HISTORY_SQL)
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    for h in range(1, hours + 1):
+        for_hour = now - timedelta(hours=h)
+        for model_type, (e_in, e_out) in errors.items():
+            # Seconds differ per model, like real runs
+            fh = (for_hour + timedelta(seconds=len(model_type))).strftime("%Y-%m-%dT%H:%M:%SZ")
+            conn.execute(
+                """INSERT INTO prediction_history
+                (predicted_at, for_hour, model_type, model_version,
+                 predicted_indoor, predicted_outdoor, actual_indoor, actual_outdoor,
+                 error_indoor, error_outdoor)
+                VALUES (?, ?, ?, 1, ?, ?, 20.0, 5.0, ?, ?)""",
+                (fh, fh, model_type, 20.0 + e_in, 5.0 + e_out, e_in, e_out))
+    conn.commit()
+    conn.close()
+
+
+def test_fit_weights_returns_none_without_history(tmp_path):
+    db_path = str(tmp_path / "weather.db")
+    sqlite3.connect(db_path).close()
+    assert ensemble.fit_weights(db_path) is None
+
+
+def test_fit_weights_favors_lower_error_per_target(tmp_path):
+    db_path = str(tmp_path / "weather.db")
+    _make_history(db_path)
+
+    weights = ensemble.fit_weights(db_path)
+
+    indoor = weights["global"]["temp_indoor"]
+    outdoor = weights["global"]["temp_outdoor"]
+    assert indoor["3hrRaw"] > indoor["24hrRaw"]
+    assert outdoor["24hrRaw"] > outdoor["3hrRaw"]
+    assert abs(sum(indoor.values()) - 1.0) < 1e-4
+    assert weights["sample_count"] == 24
+
+
+def test_by_hour_buckets_need_min_samples(tmp_path):
+    db_path = str(tmp_path / "weather.db")
+    _make_history(db_path, hours=2)
+
+    weights = ensemble.fit_weights(db_path)
+    assert weights["by_hour"] == {}
+
+    flat = ensemble.fit_weights(db_path, by_hour=False)
+    assert flat["by_hour"] == {}
+
+
+def test_blend_renormalizes_over_available_models():
+    weights = {"global": {
+        "temp_indoor": {"3hrRaw": 0.75, "24hrRaw": 0.25},
+        "temp_outdoor": {"3hrRaw": 0.5, "24hrRaw": 0.5},
+    }, "by_hour": {}}
+
+    both = ensemble.blend({"3hrRaw": (20.0, 4.0), "24hrRaw": (22.0, 6.0)}, weights, 5)
+    assert both == (20.5, 5.0)
+
+    only_one = ensemble.blend({"24hrRaw": (22.0, 6.0)}, weights, 5)
+    assert only_one == (22.0, 6.0)
+
+    assert ensemble.blend({"6hrRC": (1.0, 1.0)}, weights, 5) is None
+
+
+def test_blend_uses_hour_of_day_weights():
+    weights = {
+        "global": {"temp_indoor": {"a": 0.5, "b": 0.5}, "temp_outdoor": {"a": 0.5, "b": 0.5}},
+        "by_hour": {"7": {"temp_indoor": {"a": 1.0}}},
+    }
+    preds = {"a": (10.0, 10.0), "b": (20.0, 20.0)}
+    assert ensemble.blend(preds, weights, 7) == (10.0, 15.0)
+    assert ensemble.blend(preds, weights, 8) == (15.0, 15.0)
+
+
+def test_score_weights_groups_models_by_hour(tmp_path):
+    db_path = str(tmp_path / "weather.db")
+    _make_history(db_path, hours=4)
+    weights = ensemble.fit_weights(db_path)
+
+    mae_in, mae_out, hour_count = ensemble.score_weights(db_path, weights)
+
+    assert hour_count == 4
+    assert mae_in < 1.0 and mae_out < 1.0
+
+
+def test_run_ensemble_model_blends_base_outputs(tmp_path):
+    weights_path = tmp_path / "ensemble_weights.json"
+    weights_path.write_text(json.dumps({"global": {
+        "temp_indoor": {"3hrRaw": 0.5, "24hrRaw": 0.5},
+        "temp_outdoor": {"3hrRaw": 0.5, "24hrRaw": 0.5},
+    }, "by_hour": {}}))
+    last_row = pd.Series({"timestamp": 1771700000, "temp_indoor": 20.0, "temp_outdoor": 5.0})
+    base_outputs = {
+        "3hrRaw": ([20.0, 4.0], 3, last_row, ((19.0, 21.0), (3.0, 5.0))),
+        "24hrRaw": ([21.0, 6.0], 7, last_row, None),
+    }
+
+    with patch('predict.ENSEMBLE_WEIGHTS_PATH', str(weights_path)), \
+            patch('predict.ENSEMBLE_META_PATH', str(tmp_path / "missing_meta.json")):
+        prediction, version, row, interval = predict._run_ensemble_model(base_outputs)
+
+    assert prediction == (20.5, 5.0)
+    assert version == 0
+    assert row is last_row
+    # 24hrRaw has no interval: bounds blended over 3hrRaw alone need not contain 20.5
+    assert interval is None
+
+    base_outputs["24hrRaw"] = ([21.0, 6.0], 7, last_row, ((20.0, 22.0), (5.0, 7.0)))
+    with patch('predict.ENSEMBLE_WEIGHTS_PATH', str(weights_path)), \
+            patch('predict.ENSEMBLE_META_PATH', str(tmp_path / "missing_meta.json")):
+        interval = predict._run_ensemble_model(base_outputs)[3]
+    assert interval == ((19.5, 21.5), (4.0, 6.0))
+
+
+def test_run_ensemble_model_skips_without_weights(tmp_path):
+    with patch('predict.ENSEMBLE_WEIGHTS_PATH', str(tmp_path / "nope.json")):
+        assert predict._run_ensemble_model({"3hrRaw": ([1.0, 2.0], 1, None, None)}) is None
+
+
+def test_ensemble_runs_last_in_all_models():
+    import inspect
+    source = inspect.getsource(predict.predict)
+    assert 'ENSEMBLE_MODEL_TYPE]' in source
+    assert '_run_ensemble_model(base_outputs)' in source
@@ -0,0 +1,130 @@
+"""Tests for the DB-backed export window and per-hour prediction lookup in export_weather.py."""
+
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+from unittest.mock import patch
+
+import export_weather
+
+NOW = datetime(2026, 3, 10, 14, 20, tzinfo=timezone.utc)
+
+
+def _ts(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _db(tmp_path):
+    db_path = str(tmp_path / "weather.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("""CREATE TABLE readings (timestamp INTEGER PRIMARY KEY, date TEXT, hour INTEGER,
+                    temp_indoor REAL, temp_outdoor REAL)""")
+    conn.execute(export_weather.PREDICTIONS_TABLE_SQL)
+    return db_path, conn
+
+
+def _reading(conn, dt, indoor, outdoor=5.0):
+    conn.execute("INSERT INTO readings VALUES (?, ?, ?, ?, ?)",
+                 (int(dt.timestamp()), dt.strftime("%Y-%m-%d"), dt.hour, indoor, outdoor))
+
+
+def _prediction(conn, generated, model_type, indoor, is_shadow=0):
+    conn.execute(
+        """INSERT INTO predictions (generated_at, model_type, model_version, for_hour,
+           temp_indoor_predicted, temp_outdoor_predicted, is_shadow) VALUES (?, ?, 1, ?, ?, 5.0, ?)""",
+        (_ts(generated), model_type, _ts(generated + timedelta(hours=1)), indoor, is_shadow))
+
+
+def _load(db_path, hours):
+    with patch('export_weather.DB_PATH', db_path):
+        return export_weather._load_window_from_db(NOW, hours)
+
+
+def test_latest_reading_per_hour_within_window(tmp_path):
+    db_path, conn = _db(tmp_path)
+    _reading(conn, NOW.replace(minute=5), 20.0)
+    _reading(conn, NOW.replace(minute=15), 21.0)
+    _reading(conn, NOW - timedelta(hours=1), 19.0, outdoor=None)
+    _reading(conn, NOW - timedelta(hours=2), 18.0)
+    _reading(conn, NOW - timedelta(hours=5), 15.0)
+    conn.commit()
+
+    readings, _ = _load(db_path, 3)
+
+    assert readings[("2026-03-10", 14)][:2] == (21.0, 5.0)
+    # No outdoor temperature: skipped like extract_temps() does
+    assert ("2026-03-10", 13) not in readings
+    assert ("2026-03-10", 12) in readings
+    assert ("2026-03-10", 9) not in readings
+
+
+def test_prediction_per_generated_hour_prefers_ensemble(tmp_path):
+    db_path, conn = _db(tmp_path)
+    _reading(conn, NOW, 20.0)
+    gen = NOW - timedelta(hours=1, minutes=15)
+    _prediction(conn, gen, "3hrRaw", 19.0)
+    _prediction(conn, gen + timedelta(seconds=5), "24hrRaw", 19.5)
+    _prediction(conn, gen, export_weather.ENSEMBLE_MODEL_TYPE, 19.2)
+    _prediction(conn, gen + timedelta(minutes=1), export_weather.ENSEMBLE_MODEL_TYPE, 30.0, is_shadow=1)
+    _prediction(conn, gen - timedelta(hours=1), "3hrRaw", 18.0)
+    conn.commit()
+
+    _, predictions = _load(db_path, 2)
+
+    assert predictions["2026-03-10T13"]["model_type"] == export_weather.ENSEMBLE_MODEL_TYPE
+    assert predictions["2026-03-10T13"]["prediction"]["temp_indoor"] == 19.2
+    assert predictions["2026-03-10T12"]["prediction"]["temp_indoor"] == 18.0
+
+
+def test_falls_back_without_db_readings(tmp_path):
+    assert _load(str(tmp_path / "missing.db"), 24) is None
+    db_path, conn = _db(tmp_path)
+    _reading(conn, NOW - timedelta(days=3), 20.0)
+    conn.commit()
+    assert _load(db_path, 24) is None
+
+
+def test_latest_prediction_per_model_for_generated_hour(tmp_path):
+    import predict
+
+    db_path, conn = _db(tmp_path)
+    predict._migrate_predictions_table(conn)
+    gen = datetime(2026, 3, 10, 13, 0, 5, tzinfo=timezone.utc)
+    _prediction(conn, gen, "3hrRaw", 19.0)
+    _prediction(conn, gen + timedelta(minutes=20), "3hrRaw", 19.4)
+    _prediction(conn, gen + timedelta(minutes=25), "3hrRaw", 25.0, is_shadow=1)
+    _prediction(conn, gen, "24hrRaw", 18.0)
+    _prediction(conn, gen + timedelta(hours=1), "24hrRaw", 30.0)
+    conn.commit()
+
+    plan = " ".join(row[3] for row in conn.execute(
+        """EXPLAIN QUERY PLAN SELECT id, ROW_NUMBER() OVER (
+               PARTITION BY model_type ORDER BY generated_at DESC) AS rn
+           FROM predictions WHERE generated_hour = ? AND is_shadow = 0""", ("2026-03-10T13",)))
+    assert "USING INDEX idx_predictions_generated_hour" in plan
+    assert "TEMP B-TREE" not in plan
+
+    with patch('export_weather.DB_PATH', db_path):
+        results = export_weather._find_predictions_for_hour_from_db("2026-03-10", 13)
+    assert [(r["model_type"], r["prediction"]["temp_indoor"]) for r in results] == [
+        ("24hrRaw", 18.0), ("3hrRaw", 19.4)]
+
+
+def test_prediction_lookup_on_unmigrated_table(tmp_path):
+    db_path = str(tmp_path / "weather.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("""CREATE TABLE predictions (id INTEGER PRIMARY KEY, generated_at TEXT, model_type TEXT,
+                    model_version INTEGER, for_hour TEXT, temp_indoor_predicted REAL,
+                    temp_outdoor_predicted REAL)""")
+    conn.execute("INSERT INTO predictions VALUES (1, '2026-03-10T13:00:05Z', '3hrRaw', 1, 'x', 19.0, 5.0)")
+    conn.execute("INSERT INTO predictions VALUES (2, '2026-03-10T13:40:05Z', '3hrRaw', 1, 'x', 19.5, 5.0)")
+    conn.commit()
+    conn.close()
+
+    with patch('export_weather.DB_PATH', db_path):
+        results = export_weather._find_predictions_for_hour_from_db("2026-03-10", 13)
+    assert [r["prediction"]["temp_indoor"] for r in results] == [19.5]
@@ -0,0 +1,140 @@
+"""Tests for the cached, conditional and paginated run fetch in export_workflow.py."""
+
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+from unittest.mock import patch
+
+import pytest
+
+import export_workflow
+import http_client
+
+REPO = "owner/fish-tank"
+PATH = f"/repos/{REPO}/actions/workflows/netatmo.yml/runs"
+
+
+def _iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _run(run_id, age_minutes, status="completed"):
+    created = datetime.now(timezone.utc) - timedelta(minutes=age_minutes)
+    return {"id": run_id, "status": status, "conclusion": "success" if status == "completed" else None,
+            "event": "workflow_dispatch", "created_at": _iso(created),
+            "updated_at": _iso(created + timedelta(minutes=2)),
+            "html_url": f"https://github.com/{REPO}/actions/runs/{run_id}", "run_attempt": 1}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, self.headers.get("If-None-Match")))
+        page = int(parse_qs(urlsplit(self.path).query).get("page", ["1"])[0])
+        etag = f'"{server.version}"'
+        if page == 1 and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        start = (page - 1) * server.per_page
+        body = json.dumps({"workflow_runs": server.runs[start:start + server.per_page]}).encode()
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        if start + server.per_page < len(server.runs):
+            base = f"http://127.0.0.1:{server.server_address[1]}"
+            self.send_header("Link", f'<{base}{PATH}?per_page=100&page={page + 1}>; rel="next"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def api(tmp_path):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    # Newest first, one run every 20 minutes
+    srv.runs = [_run(1000 - i, 20 * i + 5) for i in range(30)]
+    srv.requests, srv.per_page, srv.version = [], 10, 1
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    http_client.close_all()
+    with patch('export_workflow.GITHUB_API', f"http://127.0.0.1:{srv.server_address[1]}"), \
+            patch('export_workflow.CACHE_KEEP_HOURS', 4):
+        yield srv, str(tmp_path / "workflow-runs.json")
+    http_client.close_all()
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_pages_are_followed_back_to_the_window(api):
+    srv, cache_path = api
+    runs = export_workflow.fetch_runs(REPO, "token", hours=4, cache_path=cache_path)["workflow_runs"]
+    # Runs 0..11 are within 4h; the page holding run 12 is the last one needed
+    assert len(srv.requests) == 2
+    assert [r["id"] for r in runs] == [1000 - i for i in range(12)]
+    assert set(runs[0]) == set(export_workflow.RUN_FIELDS)
+    with open(cache_path) as f:
+        cache = json.load(f)
+    assert cache["etag"] == '"1"' and cache["covered_since"] is not None
+
+
+def test_unchanged_runs_cost_one_conditional_request(api):
+    srv, cache_path = api
+    first = export_workflow.fetch_runs(REPO, "token", hours=4, cache_path=cache_path)
+    srv.requests.clear()
+    assert export_workflow.fetch_runs(REPO, "token", hours=4, cache_path=cache_path) == first
+    assert srv.requests == [(f"{PATH}?per_page=100", '"1"')]
+
+
+def test_new_runs_stop_at_the_cached_ones(api):
+    srv, cache_path = api
+    export_workflow.fetch_runs(REPO, "token", hours=4, cache_path=cache_path)
+    srv.runs[0] = dict(srv.runs[0], status="completed", conclusion="failure")
+    srv.runs.insert(0, _run(1001, 1, status="in_progress"))
+    srv.version = 2
+    srv.requests.clear()
+
+    runs = export_workflow.fetch_runs(REPO, "token", hours=4, cache_path=cache_path)["workflow_runs"]
+    assert len(srv.requests) == 1
+    assert [r["id"] for r in runs[:2]] == [1001, 1000]
+    assert runs[1]["conclusion"] == "failure"
+
+
+def test_longer_window_walks_back_once(api):
+    srv, cache_path = api
+    export_workflow.fetch_runs(REPO, "token", hours=4, cache_path=cache_path)
+    srv.requests.clear()
+    runs = export_workflow.fetch_runs(REPO, "token", hours=24, cache_path=cache_path)["workflow_runs"]
+    # Not covered yet: no conditional request, every page up to the last one
+    assert srv.requests[0][1] is None and len(srv.requests) == 3
+    assert len(runs) == 30
+
+    srv.requests.clear()
+    export_workflow.fetch_runs(REPO, "token", hours=24, cache_path=cache_path)
+    assert srv.requests == [(f"{PATH}?per_page=100", '"1"')]
+
+
+def test_export_uses_the_cache(api, tmp_path, monkeypatch):
+    srv, cache_path = api
+    monkeypatch.setenv("GH_TOKEN", "token")
+    monkeypatch.setenv("GITHUB_REPOSITORY", REPO)
+    output = str(tmp_path / "workflow.json")
+    export_workflow.export(output, 2, cache_path)
+    export_workflow.export(output, 2, cache_path)
+    with open(output) as f:
+        result = json.load(f)
+    assert result["stats"]["total_runs"] == 6
+    assert [etag for _, etag in srv.requests] == [None, None, '"1"']
@@ -0,0 +1,160 @@
+"""Tests for the concurrent, tiled station + public data fetch in fetch_weather.py."""
+
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+from unittest.mock import patch
+
+import pytest
+
+import fetch_weather
+
+DELAY = 0.4
+BOX = {"NETATMO_PUBLIC_LAT_NE": "52.6", "NETATMO_PUBLIC_LON_NE": "13.5",
+       "NETATMO_PUBLIC_LAT_SW": "52.4", "NETATMO_PUBLIC_LON_SW": "13.3"}
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for key, value in dict(BOX, NETATMO_CLIENT_ID="id", NETATMO_CLIENT_SECRET="secret",
+                           NETATMO_REFRESH_TOKEN="refresh").items():
+        monkeypatch.setenv(key, value)
+    data_dir = str(tmp_path / "data")
+    with patch('fetch_weather.DATA_DIR', data_dir), \
+            patch('fetch_weather.RAW_DIR', os.path.join(data_dir, "raw")), \
+            patch('fetch_weather.refresh_access_token', return_value=("access", "refresh2")):
+        yield data_dir
+
+
+def _readings(data_dir):
+    """The loose reading files written under data_dir/YYYY-MM-DD/."""
+    if not os.path.isdir(data_dir):
+        return []
+    return [name for day in os.listdir(data_dir) if day.startswith("20")
+            for name in os.listdir(os.path.join(data_dir, day))]
+
+
+def test_calls_overlap_and_results_are_written_after_both(env):
+    written_before_public_returned = []
+
+    def stations(token):
+        time.sleep(DELAY)
+        return {"body": {"devices": []}}
+
+    def public(token, *box):
+        time.sleep(DELAY)
+        written_before_public_returned.extend(_readings(env))
+        return {"body": []}
+
+    with patch('fetch_weather.get_stations_data', side_effect=stations), \
+            patch('fetch_weather.get_public_data', side_effect=public), \
+            patch('fetch_weather.store_public_stations') as store:
+        start = time.monotonic()
+        fetch_weather.main()
+        elapsed = time.monotonic() - start
+
+    assert elapsed < 2 * DELAY
+    assert written_before_public_returned == []
+    assert len(_readings(env)) == 1
+    store.assert_called_once()
+    assert store.call_args.args[0]["body"] == []
+
+
+def test_public_failure_still_saves_the_station_reading(env, capsys):
+    with patch('fetch_weather.get_stations_data', return_value={"body": {"devices": []}}), \
+            patch('fetch_weather.get_public_data', side_effect=OSError("timed out")), \
+            patch('fetch_weather.store_public_stations') as store:
+        fetch_weather.main()
+    assert len(_readings(env)) == 1
+    store.assert_not_called()
+    assert "public station fetch failed: timed out" in capsys.readouterr().out
+
+
+def test_public_fetch_is_skipped_without_a_bounding_box(env, monkeypatch):
+    monkeypatch.delenv("NETATMO_PUBLIC_LAT_NE")
+    with patch('fetch_weather.get_stations_data', return_value={"body": {"devices": []}}), \
+            patch('fetch_weather.get_public_data') as public:
+        fetch_weather.main()
+    public.assert_not_called()
+    assert len(_readings(env)) == 1
+
+
+def _station(station_id, temp):
+    return {"_id": station_id, "place": {"location": [13.4, 52.5]},
+            "measures": {"m1": {"type": ["temperature", "humidity"], "res": {"1": [temp, 80]}}}}
+
+
+def test_tiles_cover_the_box():
+    tiles = fetch_weather.public_tiles("52.6", "13.6", "52.4", "13.3", rows=2, cols=3)
+    assert len(tiles) == 6
+    assert tiles[0] == (52.5, 13.4, 52.4, 13.3)
+    assert tiles[-1] == (52.6, 13.6, 52.5, 13.5)
+    assert fetch_weather.public_tiles(52.6, 13.6, 52.4, 13.3) == [(52.6, 13.6, 52.4, 13.3)]
+
+
+def test_grid_setting():
+    assert fetch_weather.parse_grid(None) == (1, 1)
+    assert fetch_weather.parse_grid("3") == (3, 3)
+    assert fetch_weather.parse_grid("2x4") == (2, 4)
+    assert fetch_weather.parse_grid("9x9") == (1, 1)
+    assert fetch_weather.parse_grid("big") == (1, 1)
+
+
+def test_tiles_are_fetched_concurrently_and_merged(env, monkeypatch):
+    monkeypatch.setenv("NETATMO_PUBLIC_GRID", "2x2")
+    boxes = []
+
+    def public(token, *box):
+        boxes.append(box)
+        time.sleep(DELAY)
+        # Every tile also returns the station on the shared corner
+        return {"body": [_station(f"st{box}", 10.0), _station("corner", 5.0)]}
+
+    with patch('fetch_weather.get_stations_data', return_value={"body": {"devices": []}}), \
+            patch('fetch_weather.get_public_data', side_effect=public), \
+            patch('fetch_weather.store_public_stations') as store:
+        start = time.monotonic()
+        fetch_weather.main()
+        elapsed = time.monotonic() - start
+
+    assert len(boxes) == 4 and elapsed < 2 * DELAY
+    ids = [s["_id"] for s in store.call_args.args[0]["body"]]
+    assert len(ids) == 5 and ids.count("corner") == 1
+
+
+def test_failed_tiles_are_skipped(env, monkeypatch):
+    monkeypatch.setenv("NETATMO_PUBLIC_GRID", "1x2")
+    responses = [{"body": [_station("a", 1.0)]}, OSError("timed out")]
+    with patch('fetch_weather.get_stations_data', return_value={"body": {"devices": []}}), \
+            patch('fetch_weather.get_public_data', side_effect=responses), \
+            patch('fetch_weather.store_public_stations') as store:
+        fetch_weather.main()
+    assert [s["_id"] for s in store.call_args.args[0]["body"]] == ["a"]
+
+
+def test_tile_requests_are_rate_limited():
+    starts = []
+    with patch('fetch_weather.PUBLIC_TILE_RATE', 20.0), \
+            patch('fetch_weather.http_client.request_json', side_effect=lambda *a, **k: starts.append(time.monotonic())):
+        for _ in range(4):
+            fetch_weather.get_public_data("token", 52.6, 13.6, 52.4, 13.3)
+    assert starts[-1] - starts[0] >= 3 / 20.0 - 0.01
+
+
+def test_merged_stations_are_stored_in_one_batch(tmp_path):
+    data = fetch_weather.merge_public_data([{"body": [_station("a", 1.0)]},
+                                            {"body": [_station("a", 1.0), _station("b", 2.0)]}])
+    with patch('fetch_weather.DATA_DIR', str(tmp_path)), \
+            patch('fetch_weather.ARCHIVE_DIR', str(tmp_path / "archive")):
+        fetch_weather.store_public_stations(data, str(tmp_path / "weather.db"),
+                                            datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"))
+    conn = sqlite3.connect(str(tmp_path / "weather.db"))
+    rows = conn.execute("SELECT station_id, temperature FROM public_stations ORDER BY station_id").fetchall()
+    conn.close()
+    assert rows == [("a", 1.0), ("b", 2.0)]
@@ -0,0 +1,154 @@
+"""Tests for incremental frontend.db builds (export_weather.build_frontend_db)."""
+
+import gzip
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+from unittest.mock import patch
+
+import export_weather
+
+
+def _counts(db_path):
+    conn = sqlite3.connect(db_path)
+    counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+              for t in ("readings", "predictions", "prediction_history", "public_stations")}
+    return counts
+
+
+def _build(tmp_path, source, **kwargs):
+    out = tmp_path / "out"
+    out.mkdir(exist_ok=True)
+    with patch('export_weather.DB_PATH', source):
+        export_weather.build_frontend_db(str(out), **kwargs)
+    return out
+
+
+def test_second_run_applies_only_new_rows(tmp_path, source_db, capsys):
+    source = source_db.path
+    base = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(hours=5)
+    for h in range(3):
+        source_db.add_hour(base + timedelta(hours=h))
+
+    out = _build(tmp_path, source)
+    assert "full rebuild" in capsys.readouterr().out
+
+    source_db.add_hour(base + timedelta(hours=3))
+    out = _build(tmp_path, source)
+    assert "incremental update (1 readings, 1 predictions, 1 prediction_history, 1 public_stations" \
+        in capsys.readouterr().out
+    assert _counts(out / "frontend.db") == {
+        "readings": 4, "predictions": 4, "prediction_history": 4, "public_stations": 4}
+
+    # The gzip holds the same database
+    with gzip.open(out / "frontend.db.gz") as f:
+        assert f.read() == (out / "frontend.db").read_bytes()
+
+
+def test_late_validation_is_picked_up(tmp_path, source_db):
+    source, conn = source_db.path, source_db.conn
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    source_db.add_hour(now - timedelta(hours=1))
+    _build(tmp_path, source)
+
+    # A missed cycle validated later has an older for_hour than the high-water mark
+    conn.execute(
+        """INSERT INTO prediction_history (predicted_at, for_hour, model_type, predicted_indoor,
+           predicted_outdoor, actual_indoor, actual_outdoor) VALUES (?, ?, '24hrRaw', 20, 5, 20, 5)""",
+        (source_db.ts(now - timedelta(hours=6)), source_db.ts(now - timedelta(hours=5))))
+    conn.commit()
+    out = _build(tmp_path, source)
+
+    assert _counts(out / "frontend.db")["prediction_history"] == 2
+
+
+def test_full_rebuild_on_schedule_or_request(tmp_path, source_db, capsys):
+    source = source_db.path
+    source_db.add_hour(datetime.now(timezone.utc) - timedelta(hours=1))
+    out = _build(tmp_path, source)
+
+    _build(tmp_path, source, full_rebuild=True)
+    assert capsys.readouterr().out.count("full rebuild") == 2
+
+    stale = source_db.ts(datetime.now(timezone.utc) - timedelta(days=export_weather.FRONTEND_DB_FULL_REBUILD_DAYS + 1))
+    db = sqlite3.connect(out / "frontend.db")
+    db.execute("UPDATE _metadata SET value = ? WHERE key = 'full_rebuild_at'", (stale,))
+    db.commit()
+    db.close()
+    _build(tmp_path, source)
+    assert "full rebuild" in capsys.readouterr().out
+
+    db = sqlite3.connect(out / "frontend.db")
+    indexes = [r[0] for r in db.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name NOT LIKE 'sqlite_%'")]
+    db.close()
+    assert len(indexes) == 5
+    assert sorted(os.listdir(out)) == ["frontend.db", "frontend.db.gz"]
+
+
+def test_source_ids_restarting_after_a_rebuild(tmp_path, source_db, capsys):
+    source, conn = source_db.path, source_db.conn
+    base = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(hours=5)
+    for h in range(3):
+        source_db.add_hour(base + timedelta(hours=h))
+    _build(tmp_path, source)
+
+    # build_dataset.py drops and refills public_stations from the CSVs still kept:
+    # ids start at 1 again, so the next new row reuses an id already exported
+    rows = conn.execute("SELECT fetched_at, station_id, temperature FROM public_stations ORDER BY id").fetchall()
+    conn.execute("DELETE FROM public_stations")
+    conn.executemany("INSERT INTO public_stations (fetched_at, station_id, temperature) VALUES (?, ?, ?)", rows[1:])
+    conn.commit()
+    source_db.add_hour(base + timedelta(hours=3))
+    assert conn.execute("SELECT MAX(id) FROM public_stations").fetchone()[0] == 3
+
+    out = _build(tmp_path, source)
+    assert "incremental update" in capsys.readouterr().out
+    db = sqlite3.connect(out / "frontend.db")
+    assert [r[0] for r in db.execute("SELECT fetched_at FROM public_stations ORDER BY fetched_at")] == \
+        [source_db.ts(base + timedelta(hours=h)) for h in range(1, 4)]
+    db.close()
+
+
+def test_retention_deletions_are_applied(tmp_path, source_db, capsys):
+    source, conn = source_db.path, source_db.conn
+    base = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(hours=5)
+    for h in range(3):
+        source_db.add_hour(base + timedelta(hours=h))
+    state = {"artifacts": {}, "delta_version": 0, "deltas": []}
+    _build(tmp_path, source, state=state)
+
+    conn.execute("DELETE FROM public_stations WHERE fetched_at < ?", (source_db.ts(base + timedelta(hours=2)),))
+    conn.commit()
+    out = tmp_path / "out"
+    with patch('export_weather.DB_PATH', source):
+        delta_path = export_weather.build_frontend_db(str(out), state=state)
+
+    assert "2 public_stations pruned" in capsys.readouterr().out
+    assert _counts(out / "frontend.db")["public_stations"] == 1
+    with open(delta_path) as f:
+        assert json.load(f)["pruned"] == {"public_stations": {"fetched_at_before": source_db.ts(base + timedelta(hours=2))}}
+    assert state["delta_version"] == 2
+
+
+def test_failed_incremental_update_falls_back_to_full_rebuild(tmp_path, source_db, capsys):
+    source = source_db.path
+    source_db.add_hour(datetime.now(timezone.utc) - timedelta(hours=2))
+    state = {"artifacts": {}, "delta_version": 0, "deltas": []}
+    _build(tmp_path, source, state=state)
+
+    source_db.add_hour(datetime.now(timezone.utc) - timedelta(hours=1))
+    out = tmp_path / "out"
+    with patch('export_weather.DB_PATH', source), \
+            patch('export_weather._update_frontend_db', side_effect=sqlite3.OperationalError("disk I/O error")):
+        assert export_weather.build_frontend_db(str(out), state=state) is None
+
+    output = capsys.readouterr().out
+    assert "incremental frontend DB update failed" in output and "full rebuild" in output
+    assert _counts(out / "frontend.db")["readings"] == 2
+    assert state["delta_version"] == 2 and state["deltas"] == []
@@ -0,0 +1,135 @@
+"""Tests for the monthly frontend DB shards (export_weather.build_frontend_shards)."""
+
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+from unittest.mock import patch
+
+import export_weather
+import station_archive
+
+
+def _shard_counts(path):
+    with gzip.open(path) as f:
+        data = f.read()
+    db_path = str(path) + ".db"
+    with open(db_path, "wb") as f:
+        f.write(data)
+    conn = sqlite3.connect(db_path)
+    counts = (conn.execute("SELECT COUNT(*) FROM readings").fetchone()[0],
+              conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0])
+    conn.close()
+    os.unlink(db_path)
+    return counts
+
+
+def _run(tmp_path, uploads, upload_result=None):
+    def fake_upload(path, key, cache_control=None):
+        uploads.append((key, cache_control))
+        return upload_result
+
+    with patch('export_weather.DB_PATH', str(tmp_path / "weather.db")), \
+            patch('export_weather.FRONTEND_SHARDS_JSON', str(tmp_path / "frontend-shards.json")), \
+            patch('export_weather.STATION_ARCHIVE_DIR', str(tmp_path / "archive")), \
+            patch('export_weather.upload_to_r2', side_effect=fake_upload):
+        return export_weather.build_frontend_shards(str(tmp_path / "out"))
+
+
+def test_sealed_months_and_current_shard(tmp_path, source_db):
+    now = datetime.now(timezone.utc)
+    old = [datetime(2025, 1, 10, 12, tzinfo=timezone.utc), datetime(2025, 1, 31, 23, tzinfo=timezone.utc),
+           datetime(2025, 3, 1, 0, tzinfo=timezone.utc)]
+    for dt in old + [now - timedelta(hours=2)]:
+        source_db.add_hour(dt)
+    uploads = []
+
+    manifest = _run(tmp_path, uploads)
+
+    shards = manifest["shards"]
+    # February 2025 has no rows and gets no shard
+    assert [s["name"] for s in shards] == [
+        "frontend-2025-01.db.gz", "frontend-2025-03.db.gz", "frontend-current.db.gz"]
+    assert shards[0]["start"] == "2025-01-01" and shards[0]["end"] == "2025-02-01"
+    assert shards[0]["rows"]["readings"] == 2 and shards[0]["sealed"] is True
+    assert shards[-1]["sealed"] is False and shards[-1]["end"] is None
+
+    shards_dir = tmp_path / "out" / "shards"
+    assert _shard_counts(shards_dir / "frontend-2025-01.db.gz") == (2, 2)
+    assert _shard_counts(shards_dir / "frontend-current.db.gz") == (1, 1)
+    with open(shards_dir / "frontend-2025-03.db.gz", "rb") as f:
+        assert hashlib.sha256(f.read()).hexdigest() == shards[1]["sha256"]
+
+    assert ("shards/frontend-2025-01.db.gz", export_weather.FRONTEND_SHARD_CACHE_CONTROL) in uploads
+    assert ("frontend-shards.json", None) in uploads
+    with open(tmp_path / "frontend-shards.json") as f:
+        assert json.load(f) == manifest
+
+
+def test_sealed_shards_are_built_once(tmp_path, source_db):
+    source_db.add_hour(datetime(2025, 1, 10, tzinfo=timezone.utc))
+    _run(tmp_path, [])
+
+    uploads = []
+    manifest = _run(tmp_path, uploads)
+
+    assert [k for k, _ in uploads] == ["shards/frontend-current.db.gz", "frontend-shards.json"]
+    assert manifest["shards"][0]["name"] == "frontend-2025-01.db.gz"
+
+
+def test_failed_upload_is_retried(tmp_path, source_db):
+    source_db.add_hour(datetime(2025, 1, 10, tzinfo=timezone.utc))
+
+    manifest = _run(tmp_path, [], upload_result=False)
+    # Until it is sealed, the month is served from the current shard
+    assert [s["name"] for s in manifest["shards"]] == ["frontend-current.db.gz"]
+    assert manifest["shards"][0]["start"] == "2025-01-01"
+    assert _shard_counts(tmp_path / "out" / "shards" / "frontend-current.db.gz") == (1, 1)
+
+    manifest = _run(tmp_path, [], upload_result=True)
+    assert manifest["shards"][0]["name"] == "frontend-2025-01.db.gz"
+    assert manifest["shards"][-1]["start"] > "2025-01-01"
+
+
+def test_no_database(tmp_path):
+    assert _run(tmp_path, []) is None
+
+
+def test_month_is_not_sealed_from_a_source_that_lost_rows(tmp_path, source_db):
+    source_db.add_hour(datetime(2025, 1, 10, tzinfo=timezone.utc))
+    source_db.add_hour(datetime(2025, 2, 1, tzinfo=timezone.utc))
+    manifest = _run(tmp_path, [], upload_result=False)
+    assert manifest["first_seen"]["predictions"] == "2025-01-10T00:00:00Z"
+
+    # weather.db came back without its older predictions (e.g. a cache miss)
+    source_db.conn.execute("DELETE FROM predictions WHERE generated_at < '2025-02-01'")
+    source_db.conn.commit()
+    uploads = []
+    manifest = _run(tmp_path, uploads, upload_result=True)
+
+    # Rows from 2025-01-10 up to the oldest one left (2025-02-01) are gone, so
+    # January's remaining rows go out in an unsealed, mutable shard
+    assert [(s["name"], s["sealed"]) for s in manifest["shards"]] == [
+        ("frontend-2025-01.db.gz", False), ("frontend-2025-02.db.gz", True), ("frontend-current.db.gz", False)]
+    assert manifest["incomplete"] == ["2025-01"]
+    assert manifest["first_seen"]["predictions"] == "2025-01-10T00:00:00Z"
+    assert ("shards/frontend-2025-01.db.gz", None) in uploads
+    assert ("shards/frontend-2025-01.db.gz", export_weather.FRONTEND_SHARD_CACHE_CONTROL) not in uploads
+
+
+def test_public_stations_come_from_the_archive(tmp_path, source_db):
+    source_db.add_hour(datetime(2025, 1, 10, tzinfo=timezone.utc))
+    # Older than the 30 days weather.db keeps, so only the archive has it
+    station_archive.append(str(tmp_path / "archive"), [
+        ("2025-01-12T10:00:00Z", "70:ee:50:00:00:01", 52.1, 4.3, 3.5) + (None,) * 8])
+
+    manifest = _run(tmp_path, [], upload_result=True)
+
+    assert manifest["shards"][0]["rows"]["public_stations"] == 1
+    assert manifest["first_seen"]["public_stations"] == "2025-01-12T00:00:00Z"
@@ -0,0 +1,155 @@
+"""Tests for the append-only prediction history log (history_log.py)."""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+from unittest.mock import patch
+
+import export_weather
+import history_log
+import validate_prediction
+
+
+def _entry(for_hour, model_type="3hrRaw", error=0.5):
+    return {"predicted_at": for_hour, "for_hour": for_hour, "model_type": model_type,
+            "predicted": {"temp_indoor": 20.0, "temp_outdoor": 5.0},
+            "actual": {"temp_indoor": 20.5, "temp_outdoor": 5.5},
+            "error": {"temp_indoor": error, "temp_outdoor": error}}
+
+
+def test_append_writes_one_line_per_entry_per_day(tmp_path):
+    history_path = str(tmp_path / "prediction-history.json")
+
+    dates = history_log.append(history_path, [
+        _entry("2026-03-01T10:00:00Z"), _entry("2026-03-01T11:00:00Z"), _entry("2026-03-02T00:00:00Z")])
+
+    assert dates == ["2026-03-01", "2026-03-02"]
+    segment = tmp_path / "prediction-history" / "2026-03-01.jsonl"
+    assert len(segment.read_text().splitlines()) == 2
+    assert not os.path.exists(history_path)
+
+
+def test_read_history_merges_snapshot_and_segments(tmp_path):
+    history_path = str(tmp_path / "prediction-history.json")
+    with open(history_path, "w") as f:
+        json.dump([_entry("2026-03-01T10:00:00Z")], f)
+    history_log.append(history_path, [_entry("2026-03-01T10:00:00Z", error=9.9),
+                                      _entry("2026-03-02T10:00:00Z")])
+
+    history = history_log.read_history(history_path)
+
+    assert [e["for_hour"] for e in history] == ["2026-03-02T10:00:00Z", "2026-03-01T10:00:00Z"]
+    # The snapshot copy wins over a duplicate append
+    assert history[1]["error"]["temp_indoor"] == 0.5
+
+
+def test_torn_line_is_skipped(tmp_path):
+    history_path = str(tmp_path / "prediction-history.json")
+    history_log.append(history_path, [_entry("2026-03-01T10:00:00Z")])
+    with open(tmp_path / "prediction-history" / "2026-03-01.jsonl", "a") as f:
+        f.write('{"for_hour": "2026-03-01T11:')
+
+    assert len(history_log.read_history(history_path)) == 1
+
+
+def test_compact_folds_only_finished_days(tmp_path):
+    history_path = str(tmp_path / "prediction-history.json")
+    history_log.append(history_path, [_entry("2026-03-01T10:00:00Z"), _entry("2026-03-02T10:00:00Z")])
+
+    assert history_log.compact(history_path, validate_prediction.trim_history, before_date="2026-03-02") == 1
+
+    with open(history_path) as f:
+        assert [e["for_hour"] for e in json.load(f)] == ["2026-03-01T10:00:00Z"]
+    assert [p.name for p in (tmp_path / "prediction-history").glob("*.jsonl")] == ["2026-03-02.jsonl"]
+    assert len(history_log.read_history(history_path)) == 2
+    # Nothing left to fold: the snapshot is not rewritten
+    assert history_log.compact(history_path, validate_prediction.trim_history, before_date="2026-03-02") == 0
+
+
+def test_compact_applies_retention(tmp_path):
+    history_path = str(tmp_path / "prediction-history.json")
+    history_log.append(history_path, [_entry(f"2026-03-01T{h:02d}:00:00Z") for h in range(5)])
+
+    with patch('validate_prediction.MAX_HISTORY_PER_MODEL', 3):
+        history_log.compact(history_path, validate_prediction.trim_history)
+
+    with open(history_path) as f:
+        assert [e["for_hour"][11:13] for e in json.load(f)] == ["04", "03", "02"]
+
+
+def test_export_rewrites_only_changed_dates(tmp_path):
+    history_path = str(tmp_path / "prediction-history.json")
+    validation_dir = str(tmp_path / "validation")
+    history_log.append(history_path, [_entry("2026-03-01T10:00:00Z"), _entry("2026-03-02T10:00:00Z")])
+
+    with patch('export_weather.HISTORY_JSON', history_path), \
+            patch('export_weather.VALIDATION_DIR', validation_dir), \
+            patch('export_weather.VALIDATION_STATE_JSON', os.path.join(validation_dir, ".state.json")):
+        assert export_weather.export_validation_history() == 2
+        assert export_weather.export_validation_history() == 0
+
+        history_log.append(history_path, [_entry("2026-03-02T11:00:00Z")])
+        assert export_weather.export_validation_history() == 1
+
+    with open(os.path.join(validation_dir, "2026-03-02.json")) as f:
+        assert json.load(f)["entry_count"] == 2
+
+
+def test_append_and_trim_record_pending_dates(tmp_path):
+    history_path = str(tmp_path / "prediction-history.json")
+    history_log.append(history_path, [_entry(f"2026-03-0{d}T10:00:00Z") for d in (1, 2, 3)])
+    assert history_log.pending(history_path) == ({"2026-03-01", "2026-03-02", "2026-03-03"}, set())
+
+    history_log.clear_pending(history_path, {"2026-03-01", "2026-03-02", "2026-03-03"})
+    with patch('validate_prediction.MAX_HISTORY_PER_MODEL', 2):
+        history_log.compact(history_path, validate_prediction.trim_history)
+
+    assert history_log.pending(history_path) == ({"2026-03-01"}, {"2026-03-01"})
+    history_log.clear_pending(history_path, {"2026-03-01"})
+    assert not os.path.exists(tmp_path / "prediction-history" / history_log.PENDING_NAME)
+
+
+def test_export_reads_only_pending_dates(tmp_path):
+    history_path = str(tmp_path / "prediction-history.json")
+    validation_dir = str(tmp_path / "validation")
+    history_log.append(history_path, [_entry("2026-03-01T10:00:00Z"), _entry("2026-03-02T10:00:00Z")])
+
+    with patch('export_weather.HISTORY_JSON', history_path), \
+            patch('export_weather.VALIDATION_DIR', validation_dir), \
+            patch('export_weather.VALIDATION_STATE_JSON', os.path.join(validation_dir, ".state.json")):
+        assert export_weather.export_validation_history() == 2
+        history_log.compact(history_path, validate_prediction.trim_history)
+
+        # Segments fold into the snapshot: nothing pending, nothing is read
+        with patch('history_log.read_segments') as read_segments:
+            assert export_weather.export_validation_history() == 0
+        read_segments.assert_not_called()
+
+        history_log.append(history_path, [_entry("2026-03-02T11:00:00Z", model_type="gb")])
+        with patch('export_weather.read_json', wraps=export_weather.read_json) as read_json:
+            assert export_weather.export_validation_history() == 1
+        assert history_path not in [c.args[0] for c in read_json.call_args_list]
+
+    with open(os.path.join(validation_dir, "2026-03-02.json")) as f:
+        day = json.load(f)
+    assert day["entry_count"] == 2 and day["models"] == ["3hrRaw", "gb"]
+
+
+def test_export_rebuilds_trimmed_dates_from_snapshot(tmp_path):
+    history_path = str(tmp_path / "prediction-history.json")
+    validation_dir = str(tmp_path / "validation")
+    history_log.append(history_path, [_entry(f"2026-03-01T{h:02d}:00:00Z") for h in range(4)])
+
+    with patch('export_weather.HISTORY_JSON', history_path), \
+            patch('export_weather.VALIDATION_DIR', validation_dir), \
+            patch('export_weather.VALIDATION_STATE_JSON', os.path.join(validation_dir, ".state.json")):
+        assert export_weather.export_validation_history() == 1
+        with patch('validate_prediction.MAX_HISTORY_PER_MODEL', 2):
+            history_log.compact(history_path, validate_prediction.trim_history)
+        assert export_weather.export_validation_history() == 1
+
+    with open(os.path.join(validation_dir, "2026-03-01.json")) as f:
+        assert [e["for_hour"][11:13] for e in json.load(f)["entries"]] == ["03", "02"]
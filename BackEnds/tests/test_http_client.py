@@ -0,0 +1,137 @@
+"""Tests for the shared HTTP client, against a local stub server."""
+
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+from unittest.mock import patch
+
+import pytest
+
+import http_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body, headers=()):
+        self.send_response(status)
+        for key, value in headers:
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client timed out first
+
+    def _handle(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        server.requests.append((self.command, self.path, self.client_address[1], body))
+        script = server.script.get(self.path, [])
+        action = script.pop(0) if len(script) > 1 else (script[0] if script else 200)
+        if action == "slow":
+            time.sleep(0.5)
+            action = 200
+        if action == "gzip":
+            payload = gzip.compress(json.dumps({"path": self.path}).encode())
+            self._reply(200, payload, [("Content-Encoding", "gzip")])
+            return
+        self._reply(action, json.dumps({"path": self.path}).encode())
+
+    do_GET = _handle
+    do_POST = _handle
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.requests, srv.script = [], {}
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    http_client.close_all()
+    http_client.reset_metrics()
+    with patch('http_client.BACKOFF_BASE', 0.001):
+        yield srv, f"http://127.0.0.1:{srv.server_address[1]}"
+    http_client.close_all()
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_connections_are_kept_alive(server):
+    srv, base = server
+    for _ in range(3):
+        assert http_client.request_json("GET", f"{base}/api/getstationsdata") == {"path": "/api/getstationsdata"}
+    assert len({port for _, _, port, _ in srv.requests}) == 1
+
+
+def test_transient_errors_are_retried(server):
+    srv, base = server
+    srv.script["/flaky"] = [503, 500, 200]
+    assert http_client.request_json("GET", f"{base}/flaky", name="flaky") == {"path": "/flaky"}
+    m = http_client.metrics()["flaky"]
+    assert (m["requests"], m["attempts"], m["failures"]) == (1, 3, 0)
+    assert m["max_ms"] > 0
+
+
+def test_gives_up_after_the_retries(server):
+    srv, base = server
+    srv.script["/down"] = [503]
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        http_client.request("GET", f"{base}/down", retries=2)
+    assert exc.value.code == 503
+    assert len(srv.requests) == 3
+    srv.script["/missing"] = [404]
+    with pytest.raises(urllib.error.HTTPError):
+        http_client.request("GET", f"{base}/missing")
+    assert len(srv.requests) == 4
+
+
+def test_post_is_only_resent_when_the_server_did_not_act(server):
+    srv, base = server
+    srv.script["/oauth2/token"] = [500]
+    with pytest.raises(urllib.error.HTTPError):
+        http_client.request_json("POST", f"{base}/oauth2/token", {"grant_type": "refresh_token"})
+    assert len(srv.requests) == 1
+    assert srv.requests[0][3] == b"grant_type=refresh_token"
+
+    srv.script["/oauth2/token"] = [503, 200]
+    assert http_client.request_json("POST", f"{base}/oauth2/token", {"grant_type": "refresh_token"})
+    assert len(srv.requests) == 3
+
+
+def test_timeout_is_retried_then_raised(server):
+    srv, base = server
+    srv.script["/slow"] = ["slow"]
+    with pytest.raises(TimeoutError):
+        http_client.request("GET", f"{base}/slow", timeout=0.1, retries=1)
+    assert len(srv.requests) == 2
+    assert http_client.metrics()["/slow"]["failures"] == 1
+
+
+def test_gzip_responses_are_decoded(server):
+    srv, base = server
+    srv.script["/gz"] = ["gzip"]
+    assert http_client.request_json("GET", f"{base}/gz") == {"path": "/gz"}
+
+
+def test_stale_pooled_connection_is_replaced(server):
+    srv, base = server
+    http_client.request("GET", f"{base}/a")
+    # The server drops the idle connection; the next request must not fail or count a retry
+    for conn in http_client._pools[("http", "127.0.0.1", srv.server_address[1])]:
+        conn.sock.shutdown(2)
+    assert http_client.request_json("GET", f"{base}/b", name="b") == {"path": "/b"}
+    assert http_client.metrics()["b"]["attempts"] == 1
@@ -0,0 +1,188 @@
+"""Tests for the persisted manifest state behind data-index.json."""
+
+import json
+import os
+import re
+import shutil
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+import pytest
+from unittest.mock import patch
+
+import export_weather
+import manifest_state
+
+
+def _touch(path, data=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data or {}, f)
+
+
+def _data_dir(tmp_path):
+    data = tmp_path / "data"
+    _touch(str(data / "2026-01-01" / "100000.json"))
+    _touch(str(data / "2026-01-02" / "090000.json"))
+    _touch(str(data / "predictions" / "2026-01-02" / "090000_3hrRaw.json"))
+    _touch(str(data / "predictions" / "2026-01-02" / "090000.json"), {"model_type": "3hrRaw"})
+    _touch(str(data / "predictions" / "2026-01-02" / "090000_ensemble.json"))
+    _touch(str(data / "public-stations" / "2026-01-02" / "090000.json"))
+    _touch(str(data / "validation" / "2026-01-01.json"))
+    return str(data)
+
+
+def _manifest(data_dir, out, repair=False):
+    with patch('export_weather.DATA_DIR', data_dir):
+        export_weather.generate_manifest(str(out), repair=repair)
+    with open(os.path.join(str(out), "data-index.json")) as f:
+        return json.load(f)
+
+
+def test_scan_lists_every_category(tmp_path):
+    state = manifest_state.scan(_data_dir(tmp_path))
+    assert state["readings"] == {"2026-01-01": ["100000"], "2026-01-02": ["090000"]}
+    assert state["predictions"] == {"2026-01-02": {"090000": ["3hrRaw", "ensemble"]}}
+    assert state["public_stations"] == {"2026-01-02": ["090000"]}
+    assert state["validation"] == ["2026-01-01"]
+
+
+def test_recorded_files_reach_the_manifest_without_a_rescan(tmp_path):
+    data_dir = _data_dir(tmp_path)
+    first = _manifest(data_dir, tmp_path)
+    assert list(first["readings"]) == ["2026-01-02", "2026-01-01"]
+    assert first["predictions"]["models"] == ["3hrRaw", "ensemble"]
+
+    # Recorded by the writer: listed even though scan() is not called again
+    _touch(os.path.join(data_dir, "2026-01-02", "110000.json"))
+    _touch(os.path.join(data_dir, "predictions", "2026-01-02", "110000_lgbm.json"))
+    manifest_state.record(data_dir, [("readings", "2026-01-02", "110000", None),
+                                     ("predictions", "2026-01-02", "110000", "lgbm")])
+    with patch('manifest_state.scan', side_effect=AssertionError("rescanned")):
+        second = _manifest(data_dir, tmp_path)
+    assert second["readings"]["2026-01-02"] == ["090000", "110000"]
+    assert second["predictions"]["dates"]["2026-01-02"]["110000"] == ["lgbm"]
+    assert second["predictions"]["models"] == ["3hrRaw", "ensemble", "lgbm"]
+
+
+def test_record_without_state_waits_for_the_repair_scan(tmp_path):
+    data_dir = _data_dir(tmp_path)
+    manifest_state.record(data_dir, [("readings", "2026-01-03", "000000", None)])
+    assert manifest_state.load(data_dir) is None
+
+
+def test_deleted_dates_and_cleaned_up_files_are_dropped(tmp_path):
+    data_dir = _data_dir(tmp_path)
+    _manifest(data_dir, tmp_path)
+
+    # Whole date removed, and a file removed from the oldest date
+    shutil.rmtree(os.path.join(data_dir, "public-stations", "2026-01-02"))
+    _touch(os.path.join(data_dir, "2026-01-01", "110000.json"))
+    manifest_state.record(data_dir, [("readings", "2026-01-01", "110000", None)])
+    os.remove(os.path.join(data_dir, "2026-01-01", "100000.json"))
+
+    manifest = _manifest(data_dir, tmp_path)
+    assert manifest["public_stations"] == {}
+    assert manifest["readings"]["2026-01-01"] == ["110000"]
+
+
+def test_stale_state_is_repaired(tmp_path):
+    data_dir = _data_dir(tmp_path)
+    _manifest(data_dir, tmp_path)
+    state = manifest_state.load(data_dir)
+    assert not manifest_state.needs_repair(state)
+
+    later = datetime.now(timezone.utc) + timedelta(hours=manifest_state.REPAIR_HOURS + 1)
+    assert manifest_state.needs_repair(state, now=later)
+
+    # A file nobody recorded only shows up after a repair
+    _touch(os.path.join(data_dir, "2026-01-02", "120000.json"))
+    assert "120000" not in _manifest(data_dir, tmp_path)["readings"]["2026-01-02"]
+    assert "120000" in _manifest(data_dir, tmp_path, repair=True)["readings"]["2026-01-02"]
+
+
+def test_interrupted_manifest_write_keeps_the_old_file(tmp_path):
+    data_dir = _data_dir(tmp_path)
+    out = tmp_path / "out"
+    first = _manifest(data_dir, out)
+    _touch(os.path.join(data_dir, "2026-01-03", "080000.json"))
+
+    with patch('export_weather.DATA_DIR', data_dir), \
+            patch('atomic_file.os.replace', side_effect=OSError("disk full")), \
+            pytest.raises(OSError):
+        export_weather.generate_manifest(str(out), repair=True)
+
+    with open(out / "data-index.json") as f:
+        assert json.load(f) == first
+    assert not [name for name in os.listdir(out) if name.endswith(".tmp")]
+
+
+def test_manifest_is_split_into_a_root_and_month_files(tmp_path):
+    data_dir = _data_dir(tmp_path)
+    _touch(os.path.join(data_dir, "2025-12-31", "230000.json"))
+    full = _manifest(data_dir, tmp_path)
+
+    with open(tmp_path / "data-index" / "index.json") as f:
+        root = json.load(f)
+    assert root["readings"] == {"files": 3, "first": "2025-12-31", "last": "2026-01-02",
+                                "dates": {"2026-01-02": 1, "2026-01-01": 1, "2025-12-31": 1}}
+    assert root["predictions"]["dates"] == {"2026-01-02": 2}
+    assert root["predictions"]["models"] == ["3hrRaw", "ensemble"]
+    assert list(root["months"]) == ["2026-01", "2025-12"]
+    assert root["months"]["2025-12"]["path"] == "data-index/2025-12.json"
+
+    with open(tmp_path / "data-index" / "2026-01.json") as f:
+        january = json.load(f)
+    assert january["readings"] == {"2026-01-02": ["090000"], "2026-01-01": ["100000"]}
+    assert january["predictions"] == full["predictions"]["dates"]
+    assert january["validation"] == ["2026-01-01"]
+
+
+def test_month_files_are_kept_until_their_month_changes(tmp_path):
+    data_dir = _data_dir(tmp_path)
+    _touch(os.path.join(data_dir, "2025-12-31", "230000.json"))
+    _manifest(data_dir, tmp_path)
+    january = tmp_path / "data-index" / "2026-01.json"
+    december = tmp_path / "data-index" / "2025-12.json"
+    os.utime(january, (0, 0))
+    sha_before = json.load(open(tmp_path / "data-index" / "index.json"))["months"]["2026-01"]["sha256"]
+
+    # December's data is cleaned up; January changes
+    shutil.rmtree(os.path.join(data_dir, "2025-12-31"))
+    _touch(os.path.join(data_dir, "2026-01-02", "100000.json"))
+    manifest_state.record(data_dir, [("readings", "2026-01-02", "100000", None)])
+    _manifest(data_dir, tmp_path)
+    root = json.load(open(tmp_path / "data-index" / "index.json"))
+    assert not december.exists() and list(root["months"]) == ["2026-01"]
+    assert os.path.getmtime(january) > 0
+    assert root["months"]["2026-01"]["sha256"] != sha_before
+
+    # Nothing changed: the month file is left alone
+    os.utime(january, (0, 0))
+    _manifest(data_dir, tmp_path)
+    assert os.path.getmtime(january) == 0
+
+
+def test_manifest_files_are_published_where_the_frontend_reads_them(tmp_path):
+    repo_root = os.path.join(os.path.dirname(__file__), '..', '..')
+    with open(os.path.join(repo_root, 'FrontEnds', 'the-fish-tank', 'js', 'weather.js')) as f:
+        script = f.read()
+    base_url = re.search(r"MANIFEST_BASE_URL = '([^']+)'", script).group(1)
+    root_path = re.search(r"MANIFEST_ROOT_PATH = '([^']+)'", script).group(1)
+    # raw.githubusercontent.com/<owner>/<repo>/main/<path in the repo>
+    published_dir = base_url.split('/main/', 1)[1]
+    with open(os.path.join(repo_root, '.github', 'workflows', 'netatmo.yml')) as f:
+        workflow = f.read()
+    committed = re.search(r'git add (.+)', workflow).group(1).split()
+    export_step = re.search(r'export_weather\.py --output (\S+)', workflow).group(1)
+    assert os.path.dirname(export_step) + '/' == published_dir
+
+    _manifest(_data_dir(tmp_path), tmp_path)
+
+    with open(tmp_path / root_path) as f:
+        root = json.load(f)
+    for path in [root_path, "data-index.json"] + [m["path"] for m in root["months"].values()]:
+        assert (tmp_path / path).exists()
+        assert any((published_dir + path).startswith(added) for added in committed), path
@@ -0,0 +1,127 @@
+"""Tests for the model_accuracy aggregate table (model_accuracy.py + validate/ensemble/export wiring)."""
+
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+import pytest
+from unittest.mock import patch
+
+import ensemble
+import export_weather
+import model_accuracy
+import validate_prediction
+
+
+def _insert(conn, for_hour, model_type, predicted_indoor, actual_indoor, version=1):
+    conn.execute(
+        """INSERT INTO prediction_history
+        (predicted_at, for_hour, model_type, model_version,
+         predicted_indoor, predicted_outdoor, actual_indoor, actual_outdoor,
+         error_indoor, error_outdoor)
+        VALUES (?, ?, ?, ?, ?, 5.0, ?, 5.5, ?, 0.5)""",
+        (for_hour, for_hour, model_type, version, predicted_indoor, actual_indoor,
+         abs(predicted_indoor - actual_indoor)))
+
+
+def _db(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "weather.db"))
+    conn.execute(validate_prediction.PREDICTION_HISTORY_TABLE_SQL)
+    return conn
+
+
+def test_accumulate_keeps_running_sums(tmp_path):
+    conn = _db(tmp_path)
+    _insert(conn, "2026-03-01T10:00:05Z", "3hrRaw", 21.0, 20.0)
+    model_accuracy.accumulate(conn, 0)
+    _insert(conn, "2026-03-02T10:00:05Z", "3hrRaw", 19.0, 20.0)
+    _insert(conn, "2026-03-01T10:00:09Z", "3hrRaw", 23.0, 20.0)
+    model_accuracy.accumulate(conn, 1)
+
+    rows = conn.execute(
+        "SELECT day, hour_of_day, n, sum_error_indoor, sumsq_error_indoor FROM model_accuracy ORDER BY day").fetchall()
+    assert rows == [("2026-03-01", 10, 2, 4.0, 10.0), ("2026-03-02", 10, 1, -1.0, 1.0)]
+
+    [summary] = model_accuracy.summarize(conn, "2026-03-01")
+    assert summary["n"] == 3
+    assert summary["temp_indoor"]["mae"] == pytest.approx(5.0 / 3)
+    assert summary["temp_indoor"]["bias"] == pytest.approx(1.0)
+    assert summary["temp_indoor"]["rmse"] == pytest.approx((11.0 / 3) ** 0.5)
+    assert summary["temp_outdoor"]["bias"] == pytest.approx(-0.5)
+    conn.close()
+
+
+def test_new_table_is_backfilled(tmp_path):
+    conn = _db(tmp_path)
+    for h in range(3):
+        _insert(conn, f"2026-03-01T{h:02d}:00:00Z", "6hrRC", 20.5, 20.0)
+
+    model_accuracy.accumulate(conn, 3)
+
+    assert conn.execute("SELECT SUM(n) FROM model_accuracy").fetchone()[0] == 3
+    conn.close()
+
+
+def test_summarize_without_table_buckets_history(tmp_path):
+    conn = _db(tmp_path)
+    _insert(conn, "2026-03-01T10:00:00Z", "3hrRaw", 21.0, 20.0, version=1)
+    _insert(conn, "2026-03-01T11:00:00Z", "3hrRaw", 20.0, 20.0, version=2)
+
+    by_version = model_accuracy.summarize(conn, "2026-03-01", ("model_type", "model_version"))
+
+    assert [(r["model_version"], r["temp_indoor"]["mae"]) for r in by_version] == [(1, 1.0), (2, 0.0)]
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'model_accuracy'").fetchone() is None
+    with pytest.raises(ValueError):
+        model_accuracy.summarize(conn, "2026-03-01", ("for_hour",))
+    conn.close()
+
+
+def test_validate_updates_aggregates(tmp_path):
+    db_path = str(tmp_path / "weather.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE readings (timestamp INTEGER PRIMARY KEY, temp_indoor REAL, temp_outdoor REAL)")
+    generated = datetime.now(timezone.utc) - timedelta(minutes=60)
+    conn.execute("INSERT INTO readings VALUES (?, 21.0, 5.0)", (int(datetime.now(timezone.utc).timestamp()),))
+    conn.commit()
+    conn.close()
+    prediction = {
+        "generated_at": generated.strftime("%Y-%m-%dT%H:%M:%SZ"), "model_type": "24hrRaw", "model_version": 3,
+        "prediction": {"temp_indoor": 20.0, "temp_outdoor": 5.0},
+    }
+
+    with patch('validate_prediction.DB_PATH', db_path), \
+            patch('validate_prediction.MODEL_DIR', str(tmp_path)):
+        validate_prediction.validate([prediction], str(tmp_path / "history.json"))
+
+    conn = sqlite3.connect(db_path)
+    row = conn.execute("SELECT model_type, model_version, n, sum_abs_error_indoor FROM model_accuracy").fetchone()
+    conn.close()
+    assert row == ("24hrRaw", 3, 1, 1.0)
+
+
+def test_ensemble_and_export_read_aggregates(tmp_path):
+    conn = _db(tmp_path)
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    for h in range(1, 7):
+        for_hour = (now - timedelta(hours=h)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        _insert(conn, for_hour, "3hrRaw", 20.1, 20.0)
+        _insert(conn, for_hour.replace(":00Z", ":07Z"), "24hrRaw", 21.0, 20.0)
+    model_accuracy.accumulate(conn, 0)
+    # Rows added after the last accumulate are not counted
+    _insert(conn, now.strftime("%Y-%m-%dT%H:%M:%SZ"), "3hrRaw", 30.0, 20.0)
+    conn.commit()
+    conn.close()
+    db_path = str(tmp_path / "weather.db")
+
+    weights = ensemble.fit_weights(db_path)
+    assert weights["sample_count"] == 12
+    assert weights["global"]["temp_indoor"]["3hrRaw"] > 0.9
+
+    with patch('export_weather.DB_PATH', db_path):
+        accuracy = export_weather.load_model_accuracy()
+    assert accuracy["24hrRaw"]["sample_count"] == 6
+    assert accuracy["24hrRaw"]["temp_indoor"] == {"mae": 1.0, "rmse": 1.0, "bias": 1.0}
+    assert len(accuracy["3hrRaw"]["by_hour"]) == 6
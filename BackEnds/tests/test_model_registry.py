@@ -0,0 +1,112 @@
+"""Tests for the versioned model registry (model_registry.py + predict pin/rollback)."""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+import joblib
+import pytest
+from unittest.mock import patch
+
+import model_registry
+import predict
+
+
+def test_publish_writes_object_pointer_and_fixed_path(tmp_path):
+    artifact = str(tmp_path / "temp_predictor.joblib")
+
+    sha = model_registry.publish({"weights": [1, 2]}, artifact, 1)
+
+    object_path = tmp_path / "registry" / "temp_predictor" / "objects" / f"{sha}.joblib"
+    assert object_path.exists()
+    assert joblib.load(artifact) == {"weights": [1, 2]}
+    # Fixed path is a hard link to the content-addressed object
+    assert os.path.samefile(artifact, object_path)
+
+    index = model_registry.read_index(artifact)
+    assert index["current"] == 1
+    assert [e["sha256"] for e in index["versions"]] == [sha]
+
+
+def test_resolve_without_registry_uses_fixed_path(tmp_path):
+    artifact = str(tmp_path / "temp_predictor.joblib")
+    assert model_registry.resolve(artifact) == (artifact, None)
+    with pytest.raises(ValueError):
+        model_registry.resolve(artifact, 3)
+
+
+def test_rollback_and_promote_move_pointer(tmp_path):
+    artifact = str(tmp_path / "temp_predictor_simple.joblib")
+    for version in (1, 2, 3):
+        model_registry.publish({"v": version}, artifact, version)
+
+    assert model_registry.rollback(artifact) == 2
+    path, version = model_registry.resolve(artifact)
+    assert version == 2 and joblib.load(path) == {"v": 2}
+    assert joblib.load(artifact) == {"v": 2}
+
+    model_registry.promote(artifact, 3)
+    assert model_registry.read_index(artifact)["current"] == 3
+
+    model_registry.promote(artifact, 1)
+    assert model_registry.rollback(artifact) is None
+
+
+def test_retention_prunes_old_versions_and_objects(tmp_path):
+    artifact = str(tmp_path / "temp_predictor.joblib")
+    for version in range(1, 6):
+        model_registry.publish({"v": version}, artifact, version, keep=3)
+
+    index = model_registry.read_index(artifact)
+    assert [e["version"] for e in index["versions"]] == [3, 4, 5]
+    objects = os.listdir(tmp_path / "registry" / "temp_predictor" / "objects")
+    assert len(objects) == 3
+
+
+def test_identical_models_share_one_object(tmp_path):
+    artifact = str(tmp_path / "temp_predictor.joblib")
+    sha1 = model_registry.publish({"same": True}, artifact, 1)
+    sha2 = model_registry.publish({"same": True}, artifact, 2)
+
+    assert sha1 == sha2
+    assert len(os.listdir(tmp_path / "registry" / "temp_predictor" / "objects")) == 1
+
+
+def test_predict_resolves_pinned_version(tmp_path):
+    artifact = str(tmp_path / "temp_predictor.joblib")
+    for version in (4, 5):
+        model_registry.publish({"v": version}, artifact, version)
+
+    with patch('predict.MODEL_PATH', artifact):
+        assert predict._resolve_artifact(artifact, "24hrRaw", 5)[1] == 5
+        with patch.dict(predict.MODEL_PINS, {"24hrRaw": 4}):
+            path, version = predict._resolve_artifact(artifact, "24hrRaw", 5)
+    assert version == 4
+    assert joblib.load(path) == {"v": 4}
+
+
+def test_rollback_model_moves_gb_quantiles_together(tmp_path):
+    gb = str(tmp_path / "temp_predictor_gb.joblib")
+    quantiles = str(tmp_path / "temp_predictor_gb_quantiles.joblib")
+    for version in (1, 2):
+        model_registry.publish({"gb": version}, gb, version)
+        model_registry.publish({"q": version}, quantiles, version)
+
+    with patch('predict.GB_MODEL_PATH', gb), patch('predict.GB_QUANTILE_MODEL_PATH', quantiles):
+        assert predict.rollback_model("24hr_pubRA_RC3_GB") == 1
+
+    assert model_registry.read_index(gb)["current"] == 1
+    assert model_registry.read_index(quantiles)["current"] == 1
+    assert predict.rollback_model("ensemble") is None
+
+
+def test_index_is_written_atomically(tmp_path):
+    artifact = str(tmp_path / "temp_predictor.joblib")
+    model_registry.publish({"v": 1}, artifact, 1)
+
+    registry = tmp_path / "registry" / "temp_predictor"
+    assert sorted(os.listdir(registry)) == ["index.json", "objects"]
+    with open(registry / "index.json") as f:
+        assert json.load(f)["current"] == 1
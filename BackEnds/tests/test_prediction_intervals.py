@@ -0,0 +1,194 @@
+"""Tests for prediction intervals (RF tree spread, GB quantile boosters, storage and export)."""
+
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.multioutput import MultiOutputRegressor
+from unittest.mock import patch
+
+import export_weather
+import predict
+
+OLD_PREDICTIONS_SQL = """CREATE TABLE predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    generated_at TEXT NOT NULL,
+    model_type TEXT NOT NULL,
+    model_version INTEGER,
+    for_hour TEXT NOT NULL,
+    temp_indoor_predicted REAL,
+    temp_outdoor_predicted REAL,
+    last_reading_ts INTEGER,
+    last_reading_temp_indoor REAL,
+    last_reading_temp_outdoor REAL
+)"""
+
+
+def _training_data(n=60, features=12):
+    rng = np.random.default_rng(0)
+    X = rng.random((n, features))
+    y = np.column_stack([20 + X[:, 0] * 2, 5 + X[:, 1] * 4])
+    return X, y
+
+
+def test_tree_interval_brackets_forest_spread():
+    X, y = _training_data()
+    model = MultiOutputRegressor(RandomForestRegressor(n_estimators=50, random_state=42)).fit(X, y)
+    x = X[:1]
+
+    interval = predict._tree_interval(model, x)
+    point = model.predict(x)[0]
+
+    assert len(interval) == 2
+    for (low, high), p in zip(interval, point):
+        assert low <= p <= high
+
+
+def test_tree_interval_matches_per_tree_predictions():
+    X, y = _training_data()
+    model = MultiOutputRegressor(RandomForestRegressor(n_estimators=30, random_state=1)).fit(X, y)
+    x = X[3:4]
+
+    interval = predict._tree_interval(model, x)
+
+    for (low, high), forest in zip(interval, model.estimators_):
+        per_tree = [tree.predict(x)[0] for tree in forest.estimators_]
+        expected = np.quantile(per_tree, predict.INTERVAL_QUANTILES)
+        assert np.allclose((low, high), expected)
+
+
+def test_tree_interval_is_fast():
+    X, y = _training_data(features=200)
+    model = MultiOutputRegressor(RandomForestRegressor(n_estimators=100, random_state=42)).fit(X, y)
+    x = X[:1]
+    predict._tree_interval(model, x)
+
+    start = time.perf_counter()
+    for _ in range(10):
+        predict._tree_interval(model, x)
+    elapsed_ms = (time.perf_counter() - start) / 10 * 1000
+    assert elapsed_ms < 20, f"tree interval took {elapsed_ms:.1f} ms"
+
+
+def test_tree_interval_returns_none_for_non_forest():
+    assert predict._tree_interval(object(), np.zeros((1, 3))) is None
+
+
+class FixedModel:
+    """Stand-in quantile model returning a fixed prediction."""
+
+    def __init__(self, values):
+        self.values = values
+
+    def predict(self, X):
+        return np.array([self.values])
+
+
+def test_quantile_interval_orders_crossed_bounds(tmp_path):
+    path = str(tmp_path / "q.joblib")
+    joblib.dump({0.1: FixedModel([21.0, 4.0]), 0.9: FixedModel([20.0, 6.0])}, path)
+
+    interval = predict._quantile_interval(path, np.zeros((1, 3)))
+    assert interval == ((20.0, 21.0), (4.0, 6.0))
+
+
+def test_quantile_bundle_is_loaded_once_per_run(tmp_path):
+    path = str(tmp_path / "q.joblib")
+    joblib.dump({0.1: FixedModel([20.0, 4.0]), 0.9: FixedModel([21.0, 6.0])}, path)
+    predict.QUANTILE_MODELS.clear()
+    with patch('predict.joblib.load', wraps=joblib.load) as load:
+        for _ in range(3):
+            assert predict._quantile_interval(path, np.zeros((1, 3))) == ((20.0, 21.0), (4.0, 6.0))
+    assert load.call_count == 1
+    predict.QUANTILE_MODELS.clear()
+
+
+def test_quantile_interval_missing_file(tmp_path):
+    assert predict._quantile_interval(str(tmp_path / "nope.joblib"), np.zeros((1, 3))) is None
+
+
+def test_train_gb_quantiles_fits_each_quantile():
+    import train_model
+    X, y = _training_data(n=40)
+    models = train_model._train_gb_quantiles(X, y)
+    assert set(models) == set(train_model.INTERVAL_QUANTILES)
+    low = models[0.1].predict(X[:5])
+    high = models[0.9].predict(X[:5])
+    assert (low <= high + 1e-6).mean() > 0.8
+
+
+def test_build_result_includes_interval():
+    row = pd.Series({"timestamp": 1771700000, "temp_indoor": 20.04, "temp_outdoor": 5.0})
+    result = predict._build_result([20.0, 5.0], 3, "3hrRaw", row, ((19.44, 20.56), (4.0, 6.0)))
+    assert result["prediction"]["interval"] == {
+        "temp_indoor": [19.4, 20.6],
+        "temp_outdoor": [4.0, 6.0],
+    }
+
+    no_interval = predict._build_result([20.0, 5.0], 3, "3hrRaw", row)
+    assert "interval" not in no_interval["prediction"]
+
+
+def test_write_prediction_migrates_and_stores_interval(tmp_path):
+    db_path = str(tmp_path / "weather.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(OLD_PREDICTIONS_SQL)
+    conn.commit()
+    conn.close()
+
+    row = pd.Series({"timestamp": 1771700000, "temp_indoor": 20.0, "temp_outdoor": 5.0})
+    result = predict._build_result([20.0, 5.0], 3, "3hrRaw", row, ((19.5, 20.5), (4.0, 6.0)))
+    with patch('predict.DB_PATH', db_path):
+        predict._write_prediction(result, str(tmp_path / "predictions"), "3hrRaw")
+
+    conn = sqlite3.connect(db_path)
+    stored = conn.execute(
+        "SELECT temp_indoor_low, temp_indoor_high, temp_outdoor_low, temp_outdoor_high FROM predictions"
+    ).fetchone()
+    conn.close()
+    assert stored == (19.5, 20.5, 4.0, 6.0)
+
+
+def test_frontend_copy_tolerates_old_source_schema(tmp_path):
+    source = str(tmp_path / "source.db")
+    conn = sqlite3.connect(source)
+    conn.execute(OLD_PREDICTIONS_SQL)
+    conn.execute("INSERT INTO predictions (generated_at, model_type, for_hour) VALUES ('a', 'b', 'c')")
+    conn.commit()
+    conn.close()
+
+    conn = sqlite3.connect(str(tmp_path / "dest.db"))
+    conn.execute(export_weather.PREDICTIONS_TABLE_SQL)
+    conn.execute("ATTACH DATABASE ? AS source", (source,))
+    export_weather._copy_source_table(conn, "predictions")
+    row = conn.execute("SELECT model_type, temp_indoor_low FROM main.predictions").fetchone()
+    conn.close()
+    assert row == ("b", None)
+
+
+def test_export_reads_interval_from_db(tmp_path):
+    db_path = str(tmp_path / "weather.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(export_weather.PREDICTIONS_TABLE_SQL)
+    conn.execute(
+        """INSERT INTO predictions (generated_at, model_type, model_version, for_hour,
+           temp_indoor_predicted, temp_outdoor_predicted,
+           temp_indoor_low, temp_indoor_high, temp_outdoor_low, temp_outdoor_high)
+           VALUES ('2026-02-21T10:01:00Z', '3hrRaw', 1, '2026-02-21T11:00:00Z',
+                   20.0, 5.0, 19.5, 20.5, 4.0, 6.0)""")
+    conn.commit()
+    conn.close()
+
+    with patch('export_weather.DB_PATH', db_path):
+        preds = export_weather._find_predictions_for_hour_from_db("2026-02-21", 10)
+    assert preds[0]["prediction"]["interval"] == {
+        "temp_indoor": [19.5, 20.5],
+        "temp_outdoor": [4.0, 6.0],
+    }
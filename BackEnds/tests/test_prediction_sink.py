@@ -0,0 +1,158 @@
+"""Tests for the batched, atomic prediction sink in predict.py."""
+
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+import pytest
+from unittest.mock import patch
+
+import predict
+
+OLD_PREDICTIONS_SQL = """CREATE TABLE predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    generated_at TEXT NOT NULL,
+    model_type TEXT NOT NULL,
+    model_version INTEGER,
+    for_hour TEXT NOT NULL,
+    temp_indoor_predicted REAL,
+    temp_outdoor_predicted REAL,
+    last_reading_ts INTEGER,
+    last_reading_temp_indoor REAL,
+    last_reading_temp_outdoor REAL
+)"""
+
+
+def _result(model_type, generated_at="2026-03-01 12:00:00 UTC", indoor=21.0):
+    return {
+        "generated_at": generated_at,
+        "model_type": model_type,
+        "model_version": 2,
+        "prediction": {
+            "prediction_for": "2026-03-01 13:00:00 UTC",
+            "temp_indoor": indoor,
+            "temp_outdoor": 4.0,
+        },
+        "last_reading": {"timestamp": 1772366400, "temp_indoor": 20.5, "temp_outdoor": 3.5},
+    }
+
+
+def _rows(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT model_type, temp_indoor_predicted FROM predictions ORDER BY id").fetchall()
+    conn.close()
+    return rows
+
+
+def test_batch_stages_files_until_flush(tmp_path):
+    db_path = str(tmp_path / "weather.db")
+    pred_dir = str(tmp_path / "predictions")
+    batch = predict._new_prediction_batch()
+
+    with patch('predict.DB_PATH', db_path):
+        predict._write_prediction(_result("3hrRaw"), pred_dir, "3hrRaw", batch)
+        predict._write_prediction(_result("24hrRaw"), pred_dir, "24hrRaw", batch)
+
+        date_dir = os.path.join(pred_dir, batch["run_at"].strftime("%Y-%m-%d"))
+        # Only temp files so far, no published predictions and no DB rows
+        assert all(not name.endswith(("_3hrRaw.json", "_24hrRaw.json"))
+                   for name in os.listdir(date_dir))
+        assert not os.path.exists(db_path)
+
+        predict._flush_predictions(batch)
+
+    timestamp = batch["run_at"].strftime("%H%M%S")
+    assert sorted(os.listdir(date_dir)) == sorted([
+        f"{timestamp}.json", f"{timestamp}_3hrRaw.json", f"{timestamp}_24hrRaw.json"])
+    assert _rows(db_path) == [("3hrRaw", 21.0), ("24hrRaw", 21.0)]
+
+
+def test_flush_is_idempotent(tmp_path):
+    db_path = str(tmp_path / "weather.db")
+    with patch('predict.DB_PATH', db_path):
+        for _ in range(2):
+            batch = predict._new_prediction_batch()
+            predict._write_prediction(_result("3hrRaw"), str(tmp_path), "3hrRaw", batch)
+            predict._flush_predictions(batch)
+
+    assert _rows(db_path) == [("3hrRaw", 21.0)]
+
+
+def test_flush_uses_one_transaction(tmp_path):
+    db_path = str(tmp_path / "weather.db")
+    batch = predict._new_prediction_batch()
+    with patch('predict.DB_PATH', db_path):
+        for model_type in ("3hrRaw", "24hrRaw", "6hrRC"):
+            predict._write_prediction(_result(model_type), str(tmp_path), model_type, batch)
+        # A row that violates NOT NULL rolls back the whole batch
+        batch["rows"][-1] = (None,) + batch["rows"][-1][1:]
+        predict._flush_predictions(batch)
+
+    assert _rows(db_path) == []
+    # JSON files are still published when the DB write fails
+    assert batch["files"] == []
+    date_dir = os.path.join(str(tmp_path), batch["run_at"].strftime("%Y-%m-%d"))
+    timestamp = batch["run_at"].strftime("%H%M%S")
+    for model_type in ("3hrRaw", "24hrRaw", "6hrRC"):
+        with open(os.path.join(date_dir, f"{timestamp}_{model_type}.json")) as f:
+            assert json.load(f)["model_type"] == model_type
+    # No staged temp files left behind
+    assert len(os.listdir(date_dir)) == 4
+
+
+def test_failed_staging_leaves_no_temp_file(tmp_path):
+    with pytest.raises(TypeError):
+        predict._stage_json(str(tmp_path / "out.json"), {"bad": object()})
+    assert os.listdir(tmp_path) == []
+
+
+def test_unique_index_migration_dedupes_old_rows(tmp_path):
+    db_path = str(tmp_path / "weather.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(OLD_PREDICTIONS_SQL)
+    for _ in range(3):
+        conn.execute(
+            """INSERT INTO predictions (generated_at, model_type, model_version, for_hour,
+                                       last_reading_ts, temp_indoor_predicted)
+            VALUES ('2026-03-01 12:00:00 UTC', '3hrRaw', 2, '2026-03-01 13:00:00 UTC',
+                    1772366400, 21.0)""")
+    conn.commit()
+    conn.close()
+
+    with patch('predict.DB_PATH', db_path):
+        predict._write_prediction(_result("3hrRaw"), str(tmp_path), "3hrRaw")
+
+    assert _rows(db_path) == [("3hrRaw", 21.0)]
+    conn = sqlite3.connect(db_path)
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(predictions)")}
+    conn.close()
+    assert "idx_predictions_run" in indexes
+
+
+def test_rerun_on_same_data_adds_no_rows(tmp_path):
+    db_path = str(tmp_path / "weather.db")
+    sqlite3.connect(db_path).close()
+    last_row = {"timestamp": 1772366400, "temp_indoor": 20.5, "temp_outdoor": 3.5}
+    clock = iter([datetime(2026, 3, 1, 12, 5, tzinfo=timezone.utc) + timedelta(minutes=m)
+                  for m in range(0, 60, 5)])
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return next(clock)
+
+    with patch('predict.DB_PATH', db_path), patch('predict.datetime', Clock), \
+            patch('predict._run_simple_model', return_value=([21.0, 4.0], 2, last_row, None)):
+        for _ in range(2):
+            predict.predict(predictions_dir=str(tmp_path / "predictions"), model_type_filter="3hrRaw")
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT generated_at FROM predictions").fetchall()
+    conn.close()
+    # Each run reads the clock for its batch, then for its result (12:10 and
+    # 12:20); the second run is on the same reading, so the first row is kept
+    assert rows == [("2026-03-01T12:10:00Z",)]
@@ -0,0 +1,98 @@
+"""Tests for the ledger-driven public station CSV -> JSON conversion."""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+from unittest.mock import patch
+
+import export_weather
+
+HEADER = ("fetched_at,station_id,lat,lon,temperature,humidity,pressure,rain_60min,"
+          "rain_24h,wind_strength,wind_angle,gust_strength,gust_angle\n")
+HOME = {"lat": 52.5, "lon": 13.4}
+
+
+def _write_csv(directory, date_str, hour, count=3):
+    os.makedirs(os.path.join(directory, date_str), exist_ok=True)
+    with open(os.path.join(directory, date_str, f"{hour}.csv"), "w") as f:
+        f.write(HEADER)
+        for i in range(count):
+            f.write(f"{date_str}T12:00:00Z,st{i},{52.5 + i * 0.01},{13.4 + i * 0.02},{10 + i},80,,,,,,,\n")
+
+
+def _export(directory, tmp_path, **kwargs):
+    with patch('export_weather.PUBLIC_STATIONS_DIR', str(directory)), \
+            patch('export_weather.DATA_DIR', str(tmp_path / "data")), \
+            patch('export_weather.get_home_location', return_value=HOME):
+        return export_weather.export_public_stations(**kwargs)
+
+
+def test_vectorized_distance_matches_scalar():
+    lats, lons = [52.0, 48.85, -33.9], [13.0, 2.35, 151.2]
+    dist = export_weather.haversine_km_array(HOME["lat"], HOME["lon"], lats, lons)
+    for d, lat, lon in zip(dist, lats, lons):
+        assert abs(d - export_weather.haversine_km(HOME["lat"], HOME["lon"], lat, lon)) < 1e-6
+
+
+def test_converts_pending_files_once(tmp_path):
+    stations = tmp_path / "public-stations"
+    _write_csv(stations, "2026-01-01", "120000")
+    assert _export(stations, tmp_path) == 1
+
+    with open(stations / "2026-01-01" / "120000.json") as f:
+        raw = f.read()
+    data = json.loads(raw)
+    assert "\n" not in raw.strip(), "JSON should be compact"
+    assert data["station_count"] == 3 and data["home_location"] == HOME
+    assert [s["station_id"] for s in data["stations"]] == ["st0", "st1", "st2"]
+    assert data["stations"][0]["distance_km"] == 0.0 and data["stations"][0]["pressure"] is None
+
+    # Already in the ledger: not converted again, only the new CSV is
+    _write_csv(stations, "2026-01-01", "130000")
+    assert _export(stations, tmp_path) == 1
+    assert _export(stations, tmp_path) == 0
+
+
+def test_removed_dates_are_dropped_from_the_ledger(tmp_path):
+    stations = tmp_path / "public-stations"
+    _write_csv(stations, "2026-01-01", "120000")
+    _write_csv(stations, "2026-01-02", "120000")
+    assert _export(stations, tmp_path) == 2
+
+    # fetch_weather's 30-day cleanup removed a date; nothing new to convert
+    for name in os.listdir(stations / "2026-01-01"):
+        os.unlink(stations / "2026-01-01" / name)
+    os.rmdir(stations / "2026-01-01")
+    assert _export(stations, tmp_path) == 0
+
+    with open(stations / export_weather.PUBLIC_STATIONS_LEDGER) as f:
+        assert list(json.load(f)["converted"]) == ["2026-01-02"]
+
+
+def test_version_change_converts_everything_again(tmp_path):
+    stations = tmp_path / "public-stations"
+    _write_csv(stations, "2026-01-01", "120000")
+    _write_csv(stations, "2026-01-02", "120000")
+    assert _export(stations, tmp_path) == 2
+    with patch('export_weather.PUBLIC_STATIONS_JSON_VERSION', 99):
+        assert _export(stations, tmp_path) == 2
+
+
+def test_process_pool_matches_serial_conversion(tmp_path):
+    serial, pooled = tmp_path / "serial", tmp_path / "pooled"
+    for directory in (serial, pooled):
+        for i in range(4):
+            _write_csv(directory, "2026-01-01", f"12{i:02d}00", count=20)
+
+    assert _export(serial, tmp_path, workers=1) == 4
+    with patch('export_weather.PUBLIC_STATIONS_POOL_MIN', 2), \
+            patch('export_weather.ProcessPoolExecutor', wraps=export_weather.ProcessPoolExecutor) as pool:
+        assert _export(pooled, tmp_path, workers=2) == 4
+    # Spawned, not forked: export() starts this while R2 upload threads run
+    assert pool.call_args.kwargs["mp_context"].get_start_method() == "spawn"
+    for name in os.listdir(serial / "2026-01-01"):
+        with open(serial / "2026-01-01" / name) as a, open(pooled / "2026-01-01" / name) as b:
+            assert a.read() == b.read()
@@ -93,11 +93,12 @@ def test_store_public_stations_handles_api_format():
     assert 'CREATE INDEX IF NOT EXISTS' in source, \
         "Missing index creation on fetched_at"
 
-    # Check for 30-day cleanup
-    assert "DELETE FROM public_stations" in source, \
+    # Check for 30-day cleanup (batched and hourly, in retention.py)
+    import retention
+    assert "retention.run(" in source, "Missing cleanup of old data"
+    assert "DELETE FROM public_stations" in inspect.getsource(retention.prune_public_stations), \
         "Missing cleanup of old data"
-    assert "'-30 days'" in source or '"-30 days"' in source, \
-        "Missing 30-day retention period"
+    assert retention.KEEP_DAYS == 30, "Missing 30-day retention period"
 
     # Check for commit and close
     assert 'commit()' in source, "Missing commit"
@@ -181,6 +182,21 @@ def test_workflow_env_vars():
         "Missing NETATMO_PUBLIC_LON_SW in workflow"
 
 
+def test_workflow_installs_numpy_before_the_fetch():
+    """fetch_weather.py imports station_archive and retention, which need numpy."""
+    workflow_path = os.path.join(
+        os.path.dirname(__file__),
+        '../../.github/workflows/netatmo.yml'
+    )
+
+    with open(workflow_path) as f:
+        workflow = f.read()
+
+    install = workflow.index('pip install numpy')
+    assert install < workflow.index('run: python BackEnds/the-snake-tank/fetch_weather.py'), \
+        "numpy must be installed before the fetch step runs"
+
+
 def test_db_path_points_to_data_dir():
     """Verify DB_PATH points to data/weather.db."""
     assert 'data/weather.db' in DB_PATH or 'data\\weather.db' in DB_PATH, \
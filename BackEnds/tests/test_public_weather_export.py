@@ -13,13 +13,16 @@ import os
 import sys
 import tempfile
 
+import pytest
+
 SCRIPT_DIR = os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank')
 sys.path.insert(0, os.path.abspath(SCRIPT_DIR))
 
 import export_weather
 
 
-def _run_export():
+@pytest.fixture(scope="module")
+def public(export_data_dir):
     """Run export() into a temp dir and return the parsed weather-public.json."""
     with tempfile.TemporaryDirectory() as tmpdir:
         output_path = os.path.join(tmpdir, 'weather.json')
@@ -34,58 +37,55 @@ def _run_export():
             return json.load(f)
 
 
-_PUBLIC = _run_export()
-
-
-def test_schema_version():
+def test_schema_version(public):
     """schema_version equals 2."""
-    assert _PUBLIC is not None, "weather-public.json was not generated by export()"
-    assert _PUBLIC.get('schema_version') == 2, \
-        f"Expected schema_version 2, got {_PUBLIC.get('schema_version')}"
+    assert public is not None, "weather-public.json was not generated by export()"
+    assert public.get('schema_version') == 2, \
+        f"Expected schema_version 2, got {public.get('schema_version')}"
 
 
-def test_property_meta_structure():
+def test_property_meta_structure(public):
     """property_meta is a dict with temp_indoor and temp_outdoor keys."""
-    assert _PUBLIC is not None, "weather-public.json was not generated"
-    meta = _PUBLIC.get('property_meta')
+    assert public is not None, "weather-public.json was not generated"
+    meta = public.get('property_meta')
     assert isinstance(meta, dict), f"property_meta is not a dict: {type(meta)}"
     assert 'temp_indoor' in meta, f"property_meta missing temp_indoor: {list(meta.keys())}"
     assert 'temp_outdoor' in meta, f"property_meta missing temp_outdoor: {list(meta.keys())}"
 
 
-def test_predictions_is_list():
+def test_predictions_is_list(public):
     """predictions is a list."""
-    assert _PUBLIC is not None, "weather-public.json was not generated"
-    preds = _PUBLIC.get('predictions')
+    assert public is not None, "weather-public.json was not generated"
+    preds = public.get('predictions')
     assert isinstance(preds, list), f"predictions is not a list: {type(preds)}"
 
 
-def test_next_prediction_is_dict_or_none():
+def test_next_prediction_is_dict_or_none(public):
     """next_prediction is a dict or None."""
-    assert _PUBLIC is not None, "weather-public.json was not generated"
-    np = _PUBLIC.get('next_prediction')
+    assert public is not None, "weather-public.json was not generated"
+    np = public.get('next_prediction')
     assert np is None or isinstance(np, dict), \
         f"next_prediction is neither dict nor None: {type(np)}"
 
 
-def test_current_has_readings():
+def test_current_has_readings(public):
     """current has a readings dict."""
-    assert _PUBLIC is not None, "weather-public.json was not generated"
-    current = _PUBLIC.get('current')
+    assert public is not None, "weather-public.json was not generated"
+    current = public.get('current')
     assert isinstance(current, dict), f"current is not a dict: {type(current)}"
     readings = current.get('readings')
     assert isinstance(readings, dict), f"current.readings is not a dict: {type(readings)}"
 
 
-def test_history_absent():
+def test_history_absent(public):
     """history key is absent from weather-public.json."""
-    assert _PUBLIC is not None, "weather-public.json was not generated"
-    assert 'history' not in _PUBLIC, \
+    assert public is not None, "weather-public.json was not generated"
+    assert 'history' not in public, \
         f"history should not be in weather-public.json, but found it"
 
 
-def test_feature_rankings_absent():
+def test_feature_rankings_absent(public):
     """feature_rankings key is absent from weather-public.json."""
-    assert _PUBLIC is not None, "weather-public.json was not generated"
-    assert 'feature_rankings' not in _PUBLIC, \
+    assert public is not None, "weather-public.json was not generated"
+    assert 'feature_rankings' not in public, \
         f"feature_rankings should not be in weather-public.json, but found it"
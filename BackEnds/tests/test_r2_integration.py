@@ -70,22 +70,22 @@ def test_upload_after_write():
     upload_calls = _find_upload_calls(func_node)
     assert len(upload_calls) >= 2, f"Expected at least 2 upload_to_r2 calls, found {len(upload_calls)}"
 
-    # Find the os.replace calls (atomic write pattern) in the export function
+    # Find the atomic_file.write_json calls (atomic write pattern) in the export function
     replace_lines = []
     for node in ast.walk(func_node):
         if isinstance(node, ast.Call):
             func = node.func
-            if (isinstance(func, ast.Attribute) and func.attr == 'replace'
-                    and isinstance(func.value, ast.Name) and func.value.id == 'os'):
+            if (isinstance(func, ast.Attribute) and func.attr == 'write_json'
+                    and isinstance(func.value, ast.Name) and func.value.id == 'atomic_file'):
                 replace_lines.append(node.lineno)
 
-    assert replace_lines, "No os.replace() calls found in export() — atomic write not detected"
+    assert replace_lines, "No atomic_file.write_json() calls found in export() — atomic write not detected"
 
-    # Every upload call should come after at least one os.replace
+    # Every upload call should come after at least one atomic write
     last_replace = max(replace_lines)
     for lineno, args in upload_calls:
         assert lineno > last_replace or len(replace_lines) > 1, \
-            f"upload_to_r2 call at line {lineno} may be before file write (last os.replace at {last_replace})"
+            f"upload_to_r2 call at line {lineno} may be before file write (last atomic write at {last_replace})"
 
     # More precise check: weather.json upload should come after the first os.replace
     weather_upload_lines = [lineno for lineno, args in upload_calls
@@ -0,0 +1,121 @@
+"""Tests for the compressed raw response archive and the readers built on it."""
+
+import json
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+from unittest.mock import patch
+
+import pytest
+
+import build_dataset
+import export_weather
+import raw_archive
+
+
+def _response(time_utc, indoor=21.0, outdoor=-3.5):
+    return {"body": {"devices": [{
+        "dashboard_data": {"time_utc": time_utc, "Temperature": indoor, "CO2": 500},
+        "modules": [{"type": "NAModule1", "dashboard_data": {"Temperature": outdoor, "Humidity": 80}}],
+    }]}, "status": "ok"}
+
+
+def _write_loose(data_dir, day, hhmmss, data):
+    os.makedirs(os.path.join(data_dir, day), exist_ok=True)
+    with open(os.path.join(data_dir, day, f"{hhmmss}.json"), "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def test_append_round_trips_and_skips_archived_fetches(tmp_path):
+    raw = str(tmp_path / "raw")
+    assert raw_archive.append(raw, "2026-02-16", "100000", _response(1771236000))
+    assert raw_archive.append(raw, "2026-02-16", "080000", _response(1771228800))
+    assert not raw_archive.append(raw, "2026-02-16", "100000", _response(0))
+
+    assert raw_archive.times(raw, "2026-02-16") == ["080000", "100000"]
+    assert [t for t, _ in raw_archive.iter_day(raw, "2026-02-16")] == ["080000", "100000"]
+    assert raw_archive.latest_for_hour(raw, "2026-02-16", 10) == _response(1771236000)
+    assert raw_archive.latest_for_hour(raw, "2026-02-16", 9) is None
+
+
+def test_interrupted_append_is_cut_off(tmp_path):
+    raw = str(tmp_path / "raw")
+    raw_archive.append(raw, "2026-02-16", "100000", _response(1771236000))
+    container = raw_archive._container_path(raw, "2026-02-16", raw_archive.index(raw, "2026-02-16")["codec"])
+    with open(container, "ab") as f:
+        f.write(b"half a frame")
+
+    raw_archive.append(raw, "2026-02-16", "102000", _response(1771237200))
+    assert [t for t, _ in raw_archive.iter_day(raw, "2026-02-16")] == ["100000", "102000"]
+    _, offset, length = raw_archive.index(raw, "2026-02-16")["records"][-1]
+    assert os.path.getsize(container) == offset + length
+
+
+def test_later_days_share_the_trained_dictionary(tmp_path):
+    pytest.importorskip("zstandard")
+    raw = str(tmp_path / "raw")
+    records = [(f"{i:02d}0000", _response(1771200000 + i * 3600, 20 + i / 10, -i / 10)) for i in range(24)]
+    assert raw_archive._append_many(raw, "2026-02-16", records) == 24
+    raw_archive.append(raw, "2026-02-17", "000000", _response(1771286400))
+
+    first, second = raw_archive.index(raw, "2026-02-16"), raw_archive.index(raw, "2026-02-17")
+    assert first["codec"] == "zstd" and first["dictionary"]
+    assert second["dictionary"] == first["dictionary"]
+    assert os.path.exists(os.path.join(raw, f"{first['dictionary']}.dict"))
+    assert next(raw_archive.iter_day(raw, "2026-02-17"))[1] == _response(1771286400)
+
+
+def test_sync_from_files_only_reads_new_fetches(tmp_path):
+    raw, data_dir = str(tmp_path / "raw"), str(tmp_path / "data")
+    _write_loose(data_dir, "2026-02-16", "100000", _response(1771236000))
+    _write_loose(data_dir, "2026-02-16", "110000", _response(1771239600))
+    with open(os.path.join(data_dir, "2026-02-16", "120000.json"), "w") as f:
+        f.write("{not json")
+    raw_archive.append(raw, "2026-02-16", "100000", _response(1771236000))
+
+    with patch('builtins.open', wraps=open) as opened:
+        assert raw_archive.sync_from_files(raw, data_dir) == 1
+    assert not any(str(c.args[0]).endswith("100000.json") for c in opened.call_args_list)
+    assert raw_archive.times(raw, "2026-02-16") == ["100000", "110000"]
+    assert raw_archive.sync_from_files(raw, data_dir) == 0
+
+
+def test_build_database_keeps_readings_whose_files_were_cleaned_up(tmp_path):
+    data_dir = str(tmp_path / "data")
+    raw = os.path.join(data_dir, "raw")
+    raw_archive.append(raw, "2026-02-15", "100000", _response(1771149600, outdoor=-8.0))
+    _write_loose(data_dir, "2026-02-16", "100000", _response(1771236000))
+
+    with patch('build_dataset.DATA_DIR', data_dir), patch('build_dataset.RAW_DIR', raw), \
+            patch('build_dataset.DB_PATH', os.path.join(data_dir, "weather.db")), \
+            patch('build_dataset.ARCHIVE_DIR', str(tmp_path / "stations")):
+        build_dataset.build_database()
+    conn = sqlite3.connect(os.path.join(data_dir, "weather.db"))
+    rows = conn.execute("SELECT date, hour, temp_outdoor FROM readings ORDER BY timestamp").fetchall()
+    conn.close()
+    assert rows == [("2026-02-15", 10, -8.0), ("2026-02-16", 10, -3.5)]
+
+
+def test_export_falls_back_to_the_archive(tmp_path):
+    data_dir = str(tmp_path / "data")
+    raw = os.path.join(data_dir, "raw")
+    raw_archive.append(raw, "2026-02-15", "101500", _response(1771150500))
+    with patch('export_weather.DATA_DIR', data_dir), patch('export_weather.RAW_DIR', raw):
+        assert export_weather._read_raw_for_hour("2026-02-15", 10) == _response(1771150500)
+        _write_loose(data_dir, "2026-02-15", "104000", _response(1771152000, indoor=22.0))
+        assert export_weather._read_raw_for_hour("2026-02-15", 10) == _response(1771152000, indoor=22.0)
+
+
+def test_zstandard_is_installed_wherever_the_archive_is_read():
+    """A zstd day must be readable by build_dataset.py in CI, not only where it was written."""
+    root = os.path.join(os.path.dirname(__file__), '..', '..')
+    with open(os.path.join(root, 'BackEnds', 'the-snake-tank', 'requirements.txt')) as f:
+        assert 'zstandard' in f.read().split()
+    with open(os.path.join(root, '.github', 'workflows', 'netatmo.yml')) as f:
+        workflow = f.read()
+    install = workflow.index('pip install numpy')
+    assert 'zstandard' in workflow[install:workflow.index('\n', install)]
+    assert install < workflow.index('run: python BackEnds/the-snake-tank/fetch_weather.py')
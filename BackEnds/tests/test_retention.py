@@ -0,0 +1,79 @@
+"""Tests for the hourly, chunked retention of public station data."""
+
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+import fetch_weather
+import manifest_state
+import retention
+
+NOW = datetime(2026, 3, 20, 12, 0, tzinfo=timezone.utc)
+
+
+def _db(path, fetched_ats, old_schema=False):
+    conn = sqlite3.connect(path)
+    schema = fetch_weather.PUBLIC_STATIONS_TABLE_SQL
+    if old_schema:
+        schema = schema.replace(",\n    fetched_epoch INTEGER GENERATED ALWAYS AS "
+                                "(CAST(strftime('%s', fetched_at) AS INTEGER)) VIRTUAL", "")
+    conn.execute(schema)
+    conn.executemany("INSERT INTO public_stations (fetched_at, station_id) VALUES (?, ?)",
+                     [(t, f"st{i}") for i, t in enumerate(fetched_ats)])
+    conn.commit()
+    return conn
+
+
+def _iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def test_rows_are_deleted_by_epoch_in_chunks(tmp_path):
+    cutoff = NOW - timedelta(days=retention.KEEP_DAYS)
+    old = [_iso(cutoff - timedelta(minutes=20 * i)) for i in range(1, 8)]
+    kept = [_iso(cutoff), _iso(NOW)]
+    conn = _db(str(tmp_path / "weather.db"), old + kept, old_schema=True)
+
+    statements = []
+    conn.set_trace_callback(statements.append)
+    assert retention.prune_public_stations(conn, int(cutoff.timestamp()), chunk=3) == 7
+    assert sum(s.lstrip().startswith("DELETE") for s in statements) == 3
+    assert sorted(r[0] for r in conn.execute("SELECT fetched_at FROM public_stations")) == kept
+
+    plan = " ".join(str(r) for r in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM public_stations WHERE fetched_epoch < 0"))
+    assert "idx_public_stations_epoch" in plan
+    conn.close()
+
+
+def test_directories_are_pruned_in_one_pass(tmp_path):
+    public_dir = tmp_path / "public-stations"
+    for day in ("2026-02-10", "2026-02-25", "2026-03-19"):
+        (public_dir / day).mkdir(parents=True)
+        (public_dir / day / "120000.csv").write_text("")
+        (public_dir / day / "120000.json").write_text("{}")
+    (public_dir / ".ledger.json").write_text("{}")
+    assert retention.prune_directories(str(public_dir), "2026-02-18") == ["2026-02-10"]
+    assert sorted(os.listdir(public_dir)) == [".ledger.json", "2026-02-25", "2026-03-19"]
+
+
+def test_run_is_at_most_hourly(tmp_path):
+    data_dir = str(tmp_path / "data")
+    os.makedirs(os.path.join(data_dir, "public-stations", "2026-01-01"))
+    manifest_state.save(data_dir, manifest_state.scan(data_dir))
+    db_path = str(tmp_path / "weather.db")
+    _db(db_path, [_iso(NOW - timedelta(days=40)), _iso(NOW)]).close()
+
+    summary = retention.run(db_path, data_dir, now=NOW)
+    assert summary["rows"] == 1 and summary["dates"] == ["2026-01-01"]
+    assert manifest_state.load(data_dir)["public_stations"] == {}
+    with open(os.path.join(data_dir, retention.STATE_FILE)) as f:
+        assert json.load(f) == {"last_run": "2026-03-20T12:00:00Z"}
+
+    assert retention.run(db_path, data_dir, now=NOW + timedelta(minutes=40)) is None
+    assert retention.run(db_path, data_dir, now=NOW + timedelta(minutes=40), force=True) is not None
+    assert retention.run(db_path, data_dir, now=NOW + timedelta(minutes=101)) is not None
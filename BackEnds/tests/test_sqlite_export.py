@@ -79,7 +79,7 @@ def test_db_fallback_returns_none_for_nonexistent_data():
     assert result is None or result == [], f"Expected None or [], got {result}"
 
 
-def test_export_output_format():
+def test_export_output_format(export_data_dir):
     """Verify that export() produces schema_version 2 with correct structure."""
     with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as tmp:
         tmp_path = tmp.name
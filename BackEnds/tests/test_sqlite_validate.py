@@ -3,10 +3,9 @@
 
 Verifies that:
 1. prediction_history table schema is correct
-2. DB-first prediction lookup works
-3. validate() handles both file paths and data dicts
-4. Dual-write: both JSON and DB receive validation results
-5. INSERT OR IGNORE prevents duplicate (model_type, for_hour) pairs
+2. validate() handles both file paths and data dicts
+3. Dual-write: both JSON and DB receive validation results
+4. INSERT OR IGNORE prevents duplicate (model_type, for_hour) pairs
 """
 
 import json
@@ -31,12 +30,6 @@ def test_table_schema_constants_exist():
     assert 'CREATE TABLE' in validate_prediction.PREDICTIONS_TABLE_SQL
 
 
-def test_db_first_prediction_lookup_function_exists():
-    """Verify _find_best_predictions_from_db() function exists."""
-    assert hasattr(validate_prediction, '_find_best_predictions_from_db')
-    assert callable(validate_prediction._find_best_predictions_from_db)
-
-
 def test_validate_handles_both_str_and_dict():
     """Verify validate() handles both file paths (str) and data dicts."""
     # This is a code inspection test - verify the isinstance check exists
@@ -209,26 +202,12 @@ def test_insert_or_ignore_prevents_duplicates():
         print("✓ INSERT OR IGNORE prevents duplicates")
 
 
-def test_db_first_fallback_to_file_scanning():
-    """Verify find_best_predictions() tries DB first, falls back to files."""
-    # This is a code inspection test
-    import inspect
-    source = inspect.getsource(validate_prediction.find_best_predictions)
-    assert '_find_best_predictions_from_db()' in source
-    assert 'db_results' in source
-    assert 'if db_results:' in source or 'if db_results' in source
-    assert 'return db_results' in source
-    print("✓ DB-first with file fallback verified in code")
-
-
 if __name__ == '__main__':
     # Run tests
     test_table_schema_constants_exist()
-    test_db_first_prediction_lookup_function_exists()
     test_validate_handles_both_str_and_dict()
     test_prediction_history_table_schema()
     test_dual_write_json_and_db()
     test_insert_or_ignore_prevents_duplicates()
-    test_db_first_fallback_to_file_scanning()
 
     print("\n✅ All tests passed!")
@@ -0,0 +1,103 @@
+"""Tests for the columnar public station archive and the readers built on it."""
+
+import os
+import sqlite3
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+import public_features
+import station_archive
+
+
+def _rows(fetched_at, count=3):
+    return [(fetched_at, f"st{i}", 44.7 + i * 0.01, -73.0, 5.3 + i, 48 + i, 1016.8,
+             0.303 if i else None, None, 4, 196, 13, 231) for i in range(count)]
+
+
+def _epoch(text):
+    return int(datetime.strptime(text, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp())
+
+
+def test_append_round_trips_and_skips_archived_fetches(tmp_path):
+    archive = str(tmp_path / "archive")
+    rows = _rows("2026-02-16T10:00:00Z") + _rows("2026-02-17T09:00:00Z")
+    assert station_archive.append(archive, rows) == 6
+    assert station_archive.append(archive, rows[:3]) == 0
+    assert station_archive.days(archive) == ["2026-02-16", "2026-02-17"]
+
+    back = station_archive.rows(archive)
+    assert back == [tuple(r) for r in rows]
+    assert back[0][7] is None and back[1][7] == 0.303
+
+
+def test_scan_prunes_days_and_columns(tmp_path):
+    archive = str(tmp_path / "archive")
+    station_archive.append(archive, _rows("2026-02-16T10:00:00Z") + _rows("2026-02-17T09:00:00Z")
+                           + _rows("2026-02-18T09:00:00Z"))
+    with patch('station_archive._read_day', wraps=station_archive._read_day) as read_day:
+        data = station_archive.scan(archive, ("fetched_at", "temperature"),
+                                    start=_epoch("2026-02-17T00:00:00Z"), end=_epoch("2026-02-17T23:00:00Z"))
+    assert [c.args[1] for c in read_day.call_args_list] == ["2026-02-17"]
+    assert set(read_day.call_args.args[2]) == {"fetched_at", "temperature"}
+    assert list(data) == ["fetched_at", "temperature"]
+    assert data["temperature"].tolist() == [5.3, 6.3, 7.3]
+    assert station_archive.scan(archive, ("temperature",), start=_epoch("2026-03-01T00:00:00Z")) is None
+
+
+def test_sync_from_csv_only_reads_new_fetches(tmp_path):
+    archive, csv_dir = str(tmp_path / "archive"), tmp_path / "csv"
+    (csv_dir / "2026-02-16").mkdir(parents=True)
+    header = ",".join(station_archive.ROW_COLUMNS) + "\n"
+    for hhmmss, fetched_at in (("100000", "2026-02-16T10:00:00Z"), ("110000", "2026-02-16T11:00:00Z")):
+        with open(csv_dir / "2026-02-16" / f"{hhmmss}.csv", "w") as f:
+            f.write(header + f"{fetched_at},st0,44.7,-73.0,5.3,48,1016.8,,,,,,\n")
+    station_archive.append(archive, _rows("2026-02-16T10:00:00Z", count=1))
+
+    with patch('builtins.open', wraps=open) as opened:
+        assert station_archive.sync_from_csv(archive, str(csv_dir)) == 1
+    assert not any(str(c.args[0]).endswith("100000.csv") for c in opened.call_args_list)
+    assert station_archive.sync_from_csv(archive, str(csv_dir)) == 0
+
+
+def test_prune_keeps_recent_days(tmp_path):
+    archive = str(tmp_path / "archive")
+    station_archive.append(archive, _rows("2025-01-01T10:00:00Z") + _rows("2026-02-16T10:00:00Z"))
+    now = datetime(2026, 2, 20, tzinfo=timezone.utc)
+    assert station_archive.prune(archive, keep_days=365, now=now) == ["2025-01-01"]
+    assert station_archive.days(archive) == ["2026-02-16"]
+
+
+def test_archive_features_match_the_table_query(tmp_path):
+    archive = str(tmp_path / "public-stations-archive")
+    rows = (_rows("2026-02-16T10:00:00Z") + _rows("2026-02-16T10:20:00Z", count=2)
+            + _rows("2026-02-16T12:00:00Z", count=1))
+    station_archive.append(archive, rows)
+
+    db_path = str(tmp_path / "weather.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("""CREATE TABLE public_stations (fetched_at TEXT, station_id TEXT, lat REAL, lon REAL,
+                    temperature REAL, humidity INTEGER, pressure REAL, rain_60min REAL, rain_24h REAL,
+                    wind_strength INTEGER, wind_angle INTEGER, gust_strength INTEGER, gust_angle INTEGER)""")
+    conn.executemany("INSERT INTO public_stations VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)", rows)
+    conn.commit()
+    conn.close()
+
+    df = pd.DataFrame({
+        "timestamp": [_epoch("2026-02-16T10:10:00Z"), _epoch("2026-02-16T11:45:00Z"),
+                      _epoch("2026-02-16T15:00:00Z")],
+        "temp_outdoor": [2.0, 0.0, 1.0],
+    })
+    from_archive = public_features.add_spatial_columns(db_path, df.copy())
+    assert from_archive["regional_station_count"].tolist() == [5.0, 1.0, 0.0]
+
+    with patch('station_archive.scan', return_value=None):
+        from_table = public_features.add_spatial_columns(db_path, df.copy())
+    for col in public_features.SPATIAL_COLS_ENRICHED:
+        np.testing.assert_allclose(from_archive[col], from_table[col], atol=1e-9, err_msg=col)
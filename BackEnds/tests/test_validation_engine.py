@@ -0,0 +1,161 @@
+"""Tests for the set-based validation engine in validate_prediction.py."""
+
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'the-snake-tank'))
+
+from unittest.mock import patch
+
+import history_log
+import predict
+import validate_prediction
+
+READINGS_SQL = """CREATE TABLE readings (
+    timestamp INTEGER PRIMARY KEY,
+    temp_indoor REAL,
+    temp_outdoor REAL
+)"""
+
+
+def _ts(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _setup(tmp_path, hours=4, reading_offset_min=58):
+    """Readings every hour plus one prediction file per hour, generated hours ago.
+
+    Returns (db_path, predictions_dir, history_path, generated times).
+    """
+    db_path = str(tmp_path / "weather.db")
+    pred_dir = tmp_path / "predictions"
+    base = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours + 1)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute(READINGS_SQL)
+    generated = []
+    for h in range(hours):
+        gen = base + timedelta(hours=h, seconds=5)
+        generated.append(gen)
+        reading = gen + timedelta(minutes=reading_offset_min)
+        conn.execute("INSERT INTO readings VALUES (?, ?, ?)",
+                     (int(reading.timestamp()), 21.04 + h, 5.0))
+        day_dir = pred_dir / gen.strftime("%Y-%m-%d")
+        day_dir.mkdir(parents=True, exist_ok=True)
+        (day_dir / f"{gen.strftime('%H%M%S')}_3hrRaw.json").write_text(json.dumps({
+            "generated_at": _ts(gen), "model_type": "3hrRaw", "model_version": 7,
+            "prediction": {"prediction_for": _ts(gen + timedelta(hours=1)),
+                           "temp_indoor": 20.0 + h, "temp_outdoor": 4.5},
+        }))
+    conn.commit()
+    conn.close()
+    return db_path, str(pred_dir), str(tmp_path / "history.json"), generated
+
+
+def _run(db_path, pred_dir, history_path, models_dir):
+    with patch('validate_prediction.DB_PATH', db_path), \
+            patch('validate_prediction.MODEL_DIR', models_dir):
+        validate_prediction.validate_all(pred_dir, history_path)
+
+
+def test_validates_every_missed_cycle(tmp_path):
+    db_path, pred_dir, history_path, generated = _setup(tmp_path)
+
+    _run(db_path, pred_dir, history_path, str(tmp_path))
+
+    history = history_log.read_history(history_path)
+    assert len(history) == 4
+    newest = history[0]
+    assert newest["for_hour"] == _ts(generated[-1] + timedelta(hours=1))
+    assert newest["model_version"] == 7
+    assert newest["actual"] == {"temp_indoor": 24.0, "temp_outdoor": 5.0}
+    assert newest["error"] == {"temp_indoor": 1.0, "temp_outdoor": 0.5}
+
+
+def test_rerun_adds_nothing(tmp_path):
+    db_path, pred_dir, history_path, _ = _setup(tmp_path)
+    _run(db_path, pred_dir, history_path, str(tmp_path))
+    _run(db_path, pred_dir, history_path, str(tmp_path))
+
+    assert len(history_log.read_history(history_path)) == 4
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM prediction_history").fetchone()[0] == 4
+    conn.close()
+
+
+def test_json_history_seeds_a_fresh_db(tmp_path):
+    db_path, pred_dir, history_path, _ = _setup(tmp_path)
+    _run(db_path, pred_dir, history_path, str(tmp_path))
+
+    # CI rebuilds weather.db every run; only the JSON history survives
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE prediction_history")
+    conn.commit()
+    conn.close()
+    _run(db_path, pred_dir, history_path, str(tmp_path))
+
+    assert len(history_log.read_history(history_path)) == 4
+
+
+def test_json_history_is_only_read_into_an_empty_table(tmp_path):
+    db_path, pred_dir, history_path, _ = _setup(tmp_path)
+    _run(db_path, pred_dir, history_path, str(tmp_path))
+
+    with patch('validate_prediction.load_history', wraps=validate_prediction.load_history) as load:
+        _run(db_path, pred_dir, history_path, str(tmp_path))
+    load.assert_not_called()
+
+
+def test_reading_outside_tolerance_is_skipped(tmp_path):
+    db_path, pred_dir, history_path, _ = _setup(tmp_path, hours=1, reading_offset_min=100)
+
+    _run(db_path, pred_dir, history_path, str(tmp_path))
+
+    assert history_log.read_history(history_path) == []
+
+
+def test_compat_copy_is_not_double_counted(tmp_path):
+    db_path, pred_dir, history_path, generated = _setup(tmp_path, hours=1)
+    day_dir = os.path.join(pred_dir, generated[0].strftime("%Y-%m-%d"))
+    src = os.path.join(day_dir, f"{generated[0].strftime('%H%M%S')}_3hrRaw.json")
+    with open(src) as f:
+        data = f.read()
+    with open(os.path.join(day_dir, f"{generated[0].strftime('%H%M%S')}.json"), "w") as f:
+        f.write(data)
+
+    _run(db_path, pred_dir, history_path, str(tmp_path))
+
+    assert len(history_log.read_history(history_path)) == 1
+
+
+def test_shadow_rows_scored_against_champion(tmp_path):
+    db_path, pred_dir, history_path, generated = _setup(tmp_path, hours=1)
+    conn = sqlite3.connect(db_path)
+    conn.execute(predict.PREDICTIONS_TABLE_SQL)
+    conn.execute(
+        """INSERT INTO predictions (generated_at, model_type, model_version, for_hour,
+           temp_indoor_predicted, temp_outdoor_predicted, is_shadow)
+           VALUES (?, '3hrRaw', 8, ?, 21.0, 5.0, 1)""",
+        (_ts(generated[0]), _ts(generated[0] + timedelta(hours=1))))
+    conn.commit()
+    conn.close()
+
+    _run(db_path, pred_dir, history_path, str(tmp_path))
+
+    conn = sqlite3.connect(db_path)
+    row = conn.execute(
+        """SELECT challenger_version, champion_version, challenger_error_indoor, champion_error_indoor
+           FROM challenger_scores""").fetchone()
+    conn.close()
+    assert row == (8, 7, 0.0, 1.0)
+    # The shadow prediction never reaches the published history
+    assert len(history_log.read_history(history_path)) == 1
+
+
+def test_cli_reports_no_database(tmp_path, capsys):
+    with patch('validate_prediction.DB_PATH', str(tmp_path / "missing.db")):
+        validate_prediction.validate_all(str(tmp_path), str(tmp_path / "history.json"))
+    assert "No suitable predictions found" in capsys.readouterr().out
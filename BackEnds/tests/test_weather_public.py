@@ -95,8 +95,8 @@ def test_no_private_keys_in_public():
 
 
 def test_atomic_write():
-    """weather-public.json is written using tempfile.mkstemp() + os.replace() pattern."""
+    """weather-public.json is written with atomic_file.write_json (mkstemp + os.replace)."""
     func_src = _get_function_source(_read_source(), 'export')
     assert func_src is not None, "export() function not found"
-    assert 'mkstemp' in func_src, "weather-public.json not written with tempfile.mkstemp()"
-    assert 'os.replace' in func_src, "weather-public.json not written with os.replace()"
+    assert 'atomic_file.write_json(public_path' in func_src, \
+        "weather-public.json not written with atomic_file.write_json()"
@@ -197,63 +197,3 @@ def test_workflow_graceful_failure():
     for i, line in enumerate(lines):
         if "validate_prediction.py" in line:
             assert "|| true" in line, "Validation step should have || true"
-
-
-# --- Test 7: find_best_prediction edge cases ---
-
-def test_find_best_predictions_nonexistent_dir():
-    """find_best_predictions should return empty list for nonexistent directory."""
-    sys.path.insert(0, SCRIPT_DIR)
-    try:
-        from validate_prediction import find_best_predictions
-        assert find_best_predictions("/nonexistent/dir") == []
-    finally:
-        sys.path.pop(0)
-
-
-def test_find_best_predictions_empty_dir():
-    """find_best_predictions should return empty list for empty directory."""
-    sys.path.insert(0, SCRIPT_DIR)
-    try:
-        from validate_prediction import find_best_predictions
-        with tempfile.TemporaryDirectory() as tmpdir:
-            assert find_best_predictions(tmpdir) == []
-    finally:
-        sys.path.pop(0)
-
-
-def test_find_best_predictions_picks_closest_to_60_min():
-    """find_best_predictions should pick the prediction closest to 60 min old per model."""
-    from datetime import datetime, timezone, timedelta
-    sys.path.insert(0, SCRIPT_DIR)
-    try:
-        from validate_prediction import find_best_predictions
-        with tempfile.TemporaryDirectory() as tmpdir:
-            now = datetime.now(timezone.utc)
-            date_str = now.strftime("%Y-%m-%d")
-            date_dir = os.path.join(tmpdir, date_str)
-            os.makedirs(date_dir)
-
-            # Prediction made 55 min ago (closest to 60 min ideal)
-            good_time = now - timedelta(minutes=55)
-            with open(os.path.join(date_dir, "good.json"), "w") as f:
-                json.dump({"generated_at": good_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                           "model_type": "3hrRaw"}, f)
-
-            # Prediction made 35 min ago (within window but farther from ideal)
-            ok_time = now - timedelta(minutes=35)
-            with open(os.path.join(date_dir, "ok.json"), "w") as f:
-                json.dump({"generated_at": ok_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                           "model_type": "3hrRaw"}, f)
-
-            # Prediction made 10 min ago (outside window)
-            bad_time = now - timedelta(minutes=10)
-            with open(os.path.join(date_dir, "bad.json"), "w") as f:
-                json.dump({"generated_at": bad_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                           "model_type": "3hrRaw"}, f)
-
-            results = find_best_predictions(tmpdir)
-            assert len(results) == 1
-            assert results[0] == os.path.join(date_dir, "good.json")
-    finally:
-        sys.path.pop(0)
@@ -0,0 +1,62 @@
+"""Atomic file writes: a temp file in the target's directory, then os.replace.
+
+Readers (the frontend, a concurrent predict.py, the next workflow step) see
+either the old file or the new one, never a partial write. On an error the
+temp file is removed and the target is left as it was.
+"""
+
+import contextlib
+import json
+import os
+import tempfile
+
+TEMP_SUFFIX = ".tmp"
+
+
+def _open_temp(path, mode):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=TEMP_SUFFIX)
+    return tmp_path, os.fdopen(tmp_fd, mode)
+
+
+@contextlib.contextmanager
+def replace_on_close(path, mode="w"):
+    """Open a temp file beside path; it replaces path when the block exits cleanly."""
+    tmp_path, f = _open_temp(path, mode)
+    try:
+        with f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def write_json(path, data, **dump_kwargs):
+    """json.dump data to path (dump_kwargs go to json.dump), newline terminated."""
+    with replace_on_close(path) as f:
+        json.dump(data, f, **dump_kwargs)
+        f.write("\n")
+
+
+def write_bytes(path, data):
+    with replace_on_close(path, "wb") as f:
+        f.write(data)
+
+
+def stage_json(path, data, **dump_kwargs):
+    """Write JSON to a temp file beside path without replacing path yet.
+
+    Returns the temp path; the caller moves it into place with os.replace.
+    """
+    tmp_path, f = _open_temp(path, "w")
+    try:
+        with f:
+            json.dump(data, f, **dump_kwargs)
+            f.write("\n")
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Benchmark the export compression codecs on real data.
+
+Reports compression ratio, compression time and decompression time for each
+available codec (see compression.py) at a few levels, on weather.db and on
+the per-date validation JSON files. For the JSON files zstd is also measured
+with a dictionary trained on the older half of them and applied to the
+newer half.
+
+Usage:
+    python benchmark_compression.py
+    python benchmark_compression.py --db path/to/weather.db --repeat 5
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import compression
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(SCRIPT_DIR, "data", "weather.db")
+VALIDATION_DIR = os.path.join(SCRIPT_DIR, "data", "validation")
+
+LEVELS = {
+    "gzip": [1, 6, 9],
+    "zstd": [3, 9, 19],
+    "br": [5, 9, 11],
+}
+
+
+def _best_time(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def measure(codec, level, payloads, repeat, dictionary=None):
+    """Compress and decompress every payload; returns one result dict."""
+    raw = sum(len(p) for p in payloads)
+    comp_time, compressed = _best_time(
+        lambda: [compression.compress(codec, p, level, dictionary) for p in payloads], repeat)
+    decomp_time, restored = _best_time(
+        lambda: [compression.decompress(codec, c, dictionary) for c in compressed], repeat)
+    assert restored == payloads, f"{codec} level {level} did not round-trip"
+    size = sum(len(c) for c in compressed)
+    return {
+        "codec": codec + ("+dict" if dictionary else ""),
+        "level": level,
+        "raw_bytes": raw,
+        "bytes": size,
+        "ratio": raw / size if size else 0.0,
+        "compress_ms": comp_time * 1000,
+        "decompress_ms": decomp_time * 1000,
+    }
+
+
+def benchmark(payloads, repeat, dictionary_samples=None):
+    """Results for every available codec and level in LEVELS."""
+    results = []
+    for codec, levels in LEVELS.items():
+        if not compression.available(codec):
+            print(f"  {codec}: not installed, skipped")
+            continue
+        for level in levels:
+            results.append(measure(codec, level, payloads, repeat))
+    if dictionary_samples:
+        dictionary = compression.train_dictionary(dictionary_samples)
+        if dictionary:
+            for level in LEVELS["zstd"]:
+                results.append(measure("zstd", level, payloads, repeat, dictionary))
+    return results
+
+
+def print_results(title, results):
+    print(f"\n{title}")
+    print(f"  {'codec':<10} {'level':>5} {'bytes':>12} {'ratio':>7} {'comp ms':>9} {'decomp ms':>10}")
+    for r in results:
+        print(f"  {r['codec']:<10} {r['level']:>5} {r['bytes']:>12} {r['ratio']:>7.2f} "
+              f"{r['compress_ms']:>9.1f} {r['decompress_ms']:>10.1f}")
+
+
+def main(db_path, validation_dir, repeat):
+    if os.path.exists(db_path):
+        with open(db_path, "rb") as f:
+            db = f.read()
+        print_results(f"{db_path} ({len(db)} bytes)", benchmark([db], repeat))
+    else:
+        print(f"No database at {db_path}")
+
+    paths = sorted(glob.glob(os.path.join(validation_dir, "*.json")))
+    if len(paths) >= 2 * compression.MIN_DICTIONARY_SAMPLES:
+        files = []
+        for path in paths:
+            with open(path, "rb") as f:
+                files.append(f.read())
+        half = len(files) // 2
+        print_results(f"{len(files) - half} validation files (dictionary trained on {half} older ones)",
+                      benchmark(files[half:], repeat, files[:half]))
+    else:
+        print(f"Too few validation files in {validation_dir} for a JSON benchmark")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark export compression codecs")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database to compress (default: data/weather.db)")
+    parser.add_argument("--validation-dir", default=VALIDATION_DIR,
+                        help="Directory of per-date validation JSON files")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the fastest is reported")
+    args = parser.parse_args()
+    main(args.db, args.validation_dir, args.repeat)
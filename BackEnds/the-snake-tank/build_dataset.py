@@ -1,23 +1,30 @@
 #!/usr/bin/env python3
 """Build a SQLite database from raw Netatmo JSON weather data files.
 
-Scans data/{YYYY-MM-DD}/{HHMMSS}.json files, extracts sensor readings,
-and writes them to data/weather.db for ML training.
+Archives new data/{YYYY-MM-DD}/{HHMMSS}.json files into the compressed raw
+archive (data/raw/, see raw_archive.py), streams every archived response,
+extracts sensor readings, and writes them to data/weather.db for ML training.
 
 Usage:
     python build_dataset.py
 """
 
-import csv
 import glob
 import json
 import os
 import sqlite3
 import sys
+from datetime import datetime, timedelta, timezone
+
+import raw_archive
+import station_archive
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(SCRIPT_DIR, "data")
 DB_PATH = os.path.join(DATA_DIR, "weather.db")
+ARCHIVE_DIR = os.path.join(DATA_DIR, "public-stations-archive")
+RAW_DIR = os.path.join(DATA_DIR, "raw")
+PUBLIC_STATIONS_DB_DAYS = 30
 
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS readings (
@@ -64,7 +71,8 @@ PUBLIC_STATIONS_SCHEMA = """CREATE TABLE IF NOT EXISTS public_stations (
     wind_strength INTEGER,
     wind_angle INTEGER,
     gust_strength INTEGER,
-    gust_angle INTEGER
+    gust_angle INTEGER,
+    fetched_epoch INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', fetched_at) AS INTEGER)) VIRTUAL
 )"""
 
 
@@ -85,6 +93,15 @@ def parse_json_file(filepath):
     with open(filepath) as f:
         raw = json.load(f)
 
+    # Derive date and hour from the file path: data/YYYY-MM-DD/HH00.json
+    parts = filepath.replace("\\", "/").split("/")
+    date_str = parts[-2]  # YYYY-MM-DD
+    hour = int(parts[-1][:2])  # HH from HH00.json
+    return parse_response(raw, date_str, hour)
+
+
+def parse_response(raw, date_str, hour):
+    """Extract a flat reading dict from a parsed Netatmo API response."""
     devices = raw.get("body", {}).get("devices", [])
     if not devices:
         return None
@@ -101,11 +118,6 @@ def parse_json_file(filepath):
             outdoor_meta = module
             break
 
-    # Derive date and hour from the file path: data/YYYY-MM-DD/HH00.json
-    parts = filepath.replace("\\", "/").split("/")
-    date_str = parts[-2]  # YYYY-MM-DD
-    hour = int(parts[-1][:2])  # HH from HH00.json
-
     return {
         "timestamp": indoor.get("time_utc"),
         "date": date_str,
@@ -137,14 +149,18 @@ def parse_json_file(filepath):
 
 
 def build_database():
-    """Scan all JSON files and build the SQLite database."""
+    """Archive new JSON files and build the SQLite database from the raw archive."""
     json_files = sorted(glob.glob(os.path.join(DATA_DIR, "*", "*.json")))
 
-    if not json_files:
+    if not json_files and not raw_archive.days(RAW_DIR):
         print("No JSON data files found in", DATA_DIR)
         sys.exit(1)
 
-    print(f"Found {len(json_files)} data files")
+    # Loose files the archive does not have yet (fetches made before it
+    # existed, or committed by hand) are folded in first; the readings then
+    # come from the archive, which outlives the 7-day loose files
+    archived = raw_archive.sync_from_files(RAW_DIR, DATA_DIR, json_files)
+    print(f"Found {len(json_files)} data files ({archived} newly archived)")
 
     conn = sqlite3.connect(DB_PATH)
     conn.execute("DROP TABLE IF EXISTS readings")
@@ -153,11 +169,12 @@ def build_database():
     inserted = 0
     skipped = 0
 
-    for filepath in json_files:
+    for date_str, hhmmss, raw in raw_archive.iter_records(RAW_DIR):
+        source = f"{date_str}/{hhmmss}"
         try:
-            row = parse_json_file(filepath)
+            row = parse_response(raw, date_str, int(hhmmss[:2]))
             if row is None or row["timestamp"] is None:
-                print(f"  SKIP (no data): {filepath}")
+                print(f"  SKIP (no data): {source}")
                 skipped += 1
                 continue
 
@@ -186,8 +203,8 @@ def build_database():
                 ),
             )
             inserted += 1
-        except (json.JSONDecodeError, KeyError, ValueError) as e:
-            print(f"  SKIP (error): {filepath} — {e}")
+        except (AttributeError, KeyError, ValueError) as e:
+            print(f"  SKIP (error): {source} — {e}")
             skipped += 1
 
     conn.commit()
@@ -196,27 +213,31 @@ def build_database():
     conn.execute("DROP TABLE IF EXISTS public_stations")
     conn.execute(PUBLIC_STATIONS_SCHEMA)
     conn.execute("CREATE INDEX IF NOT EXISTS idx_public_stations_time ON public_stations(fetched_at)")
-
-    public_csvs = sorted(glob.glob(os.path.join(DATA_DIR, "public-stations", "*", "*.csv")))
-    ps_count = 0
-    for csv_path in public_csvs:
-        with open(csv_path, "r") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                conn.execute(
-                    """INSERT INTO public_stations
-                    (fetched_at, station_id, lat, lon, temperature, humidity, pressure,
-                     rain_60min, rain_24h, wind_strength, wind_angle, gust_strength, gust_angle)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                    (row["fetched_at"], row["station_id"],
-                     _num(row["lat"]), _num(row["lon"]),
-                     _num(row["temperature"]), _int(row["humidity"]), _num(row["pressure"]),
-                     _num(row["rain_60min"]), _num(row["rain_24h"]),
-                     _int(row["wind_strength"]), _int(row["wind_angle"]),
-                     _int(row["gust_strength"]), _int(row["gust_angle"])))
-                ps_count += 1
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_public_stations_epoch ON public_stations(fetched_epoch)")
+
+    # The CSVs are folded into the columnar archive first, so fetches made
+    # before the archive existed are not lost; the table then gets the last
+    # PUBLIC_STATIONS_DB_DAYS days of the archive, up to its newest day
+    synced = station_archive.sync_from_csv(ARCHIVE_DIR, os.path.join(DATA_DIR, "public-stations"))
+    archived_days = station_archive.days(ARCHIVE_DIR)
+    ps_rows = []
+    if archived_days:
+        newest = datetime.strptime(archived_days[-1], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        start = newest - timedelta(days=PUBLIC_STATIONS_DB_DAYS)
+        ps_rows = station_archive.rows(ARCHIVE_DIR, start=int(start.timestamp()))
+    conn.executemany(
+        """INSERT INTO public_stations
+        (fetched_at, station_id, lat, lon, temperature, humidity, pressure,
+         rain_60min, rain_24h, wind_strength, wind_angle, gust_strength, gust_angle)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        ((fetched_at, station_id, _num(lat), _num(lon),
+          _num(temp), _int(humidity), _num(pressure), _num(rain_60), _num(rain_24),
+          _int(wind), _int(wind_angle), _int(gust), _int(gust_angle))
+         for (fetched_at, station_id, lat, lon, temp, humidity, pressure, rain_60, rain_24,
+              wind, wind_angle, gust, gust_angle) in ps_rows))
     conn.commit()
-    print(f"Public stations: {ps_count} readings from {len(public_csvs)} files")
+    print(f"Public stations: {len(ps_rows)} readings from {len(archived_days)} archived day(s)"
+          f" ({synced} row(s) newly archived from CSV)")
 
     conn.close()
 
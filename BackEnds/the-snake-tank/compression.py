@@ -0,0 +1,108 @@
+"""Compression codecs for exported artifacts.
+
+Each codec in CODECS names its file suffix, its Content-Type for R2 and a
+default level chosen for the 20-minute export cadence (see
+benchmark_compression.py to re-measure on the current weather.db):
+
+    gzip   stdlib, what every client can read        level 6
+    zstd   zstandard package, optional dictionary    level 19
+    br     brotli package                            quality 9
+
+zstd and brotli are imported when first used; zstandard is in
+requirements.txt for raw_archive.py, brotli is optional. available() tells
+whether a codec can run here. A zstd dictionary trained on
+past exports (train_dictionary) mostly helps the small JSON artifacts,
+where there is too little data for the codec to learn the structure.
+"""
+
+import gzip
+import hashlib
+import io
+import os
+
+import atomic_file
+
+CODECS = {
+    "gzip": {"suffix": ".gz", "content_type": "application/gzip", "level": 6},
+    "zstd": {"suffix": ".zst", "content_type": "application/zstd", "level": 19},
+    "br": {"suffix": ".br", "content_type": "application/x-brotli", "level": 9},
+}
+
+DICTIONARY_SIZE = 16 * 1024
+MIN_DICTIONARY_SAMPLES = 8
+
+
+def available(codec):
+    """True when codec is known and its module can be imported."""
+    if codec not in CODECS:
+        return False
+    try:
+        if codec == "zstd":
+            import zstandard  # noqa: F401
+        elif codec == "br":
+            import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def compress(codec, data, level=None, dictionary=None):
+    """Compress bytes. dictionary (raw zstd dictionary bytes) is zstd only."""
+    level = CODECS[codec]["level"] if level is None else level
+    if codec == "gzip":
+        # mtime=0 keeps the bytes (and hash) a function of the content
+        out = io.BytesIO()
+        with gzip.GzipFile(fileobj=out, mode="wb", mtime=0, compresslevel=level) as f:
+            f.write(data)
+        return out.getvalue()
+    if codec == "zstd":
+        import zstandard
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdCompressor(level=level, dict_data=dict_data).compress(data)
+    if codec == "br":
+        import brotli
+        return brotli.compress(data, quality=level)
+    raise ValueError(f"unknown codec {codec!r}")
+
+
+def decompress(codec, data, dictionary=None):
+    """Inverse of compress()."""
+    if codec == "gzip":
+        return gzip.decompress(data)
+    if codec == "zstd":
+        import zstandard
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(data)
+    if codec == "br":
+        import brotli
+        return brotli.decompress(data)
+    raise ValueError(f"unknown codec {codec!r}")
+
+
+def compress_file(codec, src_path, dest_path, level=None, dictionary=None):
+    """Compress src_path to dest_path atomically. Returns the compressed size."""
+    with open(src_path, "rb") as f:
+        data = compress(codec, f.read(), level, dictionary)
+    atomic_file.write_bytes(dest_path, data)
+    return len(data)
+
+
+def train_dictionary(samples, size=DICTIONARY_SIZE):
+    """Train a zstd dictionary on a list of sample byte strings.
+
+    Returns the raw dictionary bytes, or None when there are fewer than
+    MIN_DICTIONARY_SAMPLES samples or zstd is not installed.
+    """
+    if len(samples) < MIN_DICTIONARY_SAMPLES or not available("zstd"):
+        return None
+    import zstandard
+    try:
+        return zstandard.train_dictionary(size, samples).as_bytes()
+    except zstandard.ZstdError:
+        # Samples too small or too uniform to train on
+        return None
+
+
+def dictionary_id(dictionary):
+    """Short content id of a dictionary, used in its published file name."""
+    return hashlib.sha256(dictionary).hexdigest()[:16]
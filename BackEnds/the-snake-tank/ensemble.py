@@ -0,0 +1,148 @@
+"""Ensemble blending of the base model predictions.
+
+Learns per-target blending weights from the model_accuracy aggregates
+(see model_accuracy.py) and combines the predictions already produced by the
+base models into a single ensemble prediction. Weights are inverse mean
+squared errors over a recent window of days, optionally learned separately
+for each hour of day. Used by train_model.py (to fit the weights) and
+predict.py (to apply them).
+"""
+
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import model_accuracy
+
+ENSEMBLE_MODEL_TYPE = "ensemble"
+BASE_MODEL_TYPES = ["3hrRaw", "24hrRaw", "6hrRC", "24hr_pubRA_RC3_GB"]
+TARGETS = ["temp_indoor", "temp_outdoor"]
+
+WINDOW_HOURS = 168  # 1 week of validated history
+MIN_HOUR_SAMPLES = 3  # per model, before an hour-of-day bucket is trusted
+MSE_FLOOR = 1e-4  # keeps a perfect streak from taking the whole weight
+
+
+def _load_errors(db_path, window_hours):
+    """Load validated base model rows from prediction_history.
+
+    Returns list of dicts with for_hour, model_type, predicted and actual values.
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=window_hours)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    placeholders = ",".join("?" for _ in BASE_MODEL_TYPES)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute(
+            f"""SELECT for_hour, model_type,
+                       predicted_indoor, predicted_outdoor,
+                       actual_indoor, actual_outdoor
+                FROM prediction_history
+                WHERE for_hour > ? AND model_type IN ({placeholders})""",
+            [cutoff] + BASE_MODEL_TYPES).fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def _inverse_mse_weights(mse_by_model):
+    """Turn {model_type: mean squared error} into normalized inverse-MSE weights."""
+    raw = {m: 1.0 / max(mse, MSE_FLOOR) for m, mse in mse_by_model.items()}
+    total = sum(raw.values())
+    if total == 0:
+        return {}
+    return {m: round(w / total, 6) for m, w in raw.items()}
+
+
+def fit_weights(db_path, window_hours=WINDOW_HOURS, by_hour=True):
+    """Learn blending weights per target from the model_accuracy aggregates.
+
+    The window is rounded out to whole days, the bucket size of the table.
+    Returns a dict with "global" weights ({target: {model_type: weight}}),
+    "by_hour" weights keyed by hour of day ("0".."23") when by_hour is set,
+    and "sample_count" (number of validated rows used). Returns None when
+    there is no validated history yet.
+    """
+    since_day = (datetime.now(timezone.utc) - timedelta(hours=window_hours)).strftime("%Y-%m-%d")
+    conn = sqlite3.connect(db_path)
+    try:
+        totals = model_accuracy.summarize(conn, since_day, ("model_type",), BASE_MODEL_TYPES)
+        hourly = model_accuracy.summarize(
+            conn, since_day, ("hour_of_day", "model_type"), BASE_MODEL_TYPES) if by_hour else []
+    except sqlite3.OperationalError:
+        totals, hourly = [], []
+    finally:
+        conn.close()
+    if not totals:
+        return None
+
+    weights = {
+        "global": {t: _inverse_mse_weights({r["model_type"]: r[t]["mse"] for r in totals})
+                   for t in TARGETS},
+        "by_hour": {},
+        "sample_count": sum(r["n"] for r in totals),
+    }
+
+    trusted_by_hour = {}
+    for row in hourly:
+        if row["n"] >= MIN_HOUR_SAMPLES:
+            trusted_by_hour.setdefault(str(row["hour_of_day"]), []).append(row)
+    for hour, rows in trusted_by_hour.items():
+        weights["by_hour"][hour] = {
+            t: _inverse_mse_weights({r["model_type"]: r[t]["mse"] for r in rows}) for t in TARGETS}
+
+    return weights
+
+
+def blend(predictions, weights, hour=None):
+    """Blend base model predictions with learned weights.
+
+    Args:
+        predictions: dict model_type -> (temp_indoor, temp_outdoor)
+        weights: dict as returned by fit_weights()
+        hour: hour of day being predicted, selects the hour-of-day weights
+
+    Returns (temp_indoor, temp_outdoor) or None if no prediction has a weight.
+    """
+    blended = []
+    for i, target in enumerate(TARGETS):
+        target_weights = weights.get("by_hour", {}).get(str(hour), {}).get(target)
+        if not target_weights or not any(m in predictions for m in target_weights):
+            target_weights = weights.get("global", {}).get(target, {})
+
+        usable = {m: w for m, w in target_weights.items() if m in predictions and w > 0}
+        total = sum(usable.values())
+        if total == 0:
+            return None
+        blended.append(sum(predictions[m][i] * w for m, w in usable.items()) / total)
+    return tuple(blended)
+
+
+def score_weights(db_path, weights, window_hours=WINDOW_HOURS):
+    """In-sample MAE of the blend over the validated window.
+
+    Returns (mae_indoor, mae_outdoor, hour_count) or None if nothing could be blended.
+    """
+    # for_hour carries the generation seconds of each model, so group on the hour
+    by_for_hour = {}
+    for row in _load_errors(db_path, window_hours):
+        entry = by_for_hour.setdefault(row["for_hour"][:13], {"preds": {}, "actual": None})
+        if None in (row["predicted_indoor"], row["predicted_outdoor"],
+                    row["actual_indoor"], row["actual_outdoor"]):
+            continue
+        entry["preds"][row["model_type"]] = (row["predicted_indoor"], row["predicted_outdoor"])
+        entry["actual"] = (row["actual_indoor"], row["actual_outdoor"])
+
+    err_in, err_out = [], []
+    for for_hour, entry in by_for_hour.items():
+        if entry["actual"] is None:
+            continue
+        out = blend(entry["preds"], weights, int(for_hour[11:13]))
+        if out is None:
+            continue
+        err_in.append(abs(entry["actual"][0] - out[0]))
+        err_out.append(abs(entry["actual"][1] - out[1]))
+
+    if not err_in:
+        return None
+    return sum(err_in) / len(err_in), sum(err_out) / len(err_out), len(err_in)
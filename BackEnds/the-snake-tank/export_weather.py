@@ -7,24 +7,76 @@ single JSON file for the frontend to fetch and render.
 Usage:
     python export_weather.py --output ../FrontEnds/the-fish-tank/data/weather.json
     python export_weather.py --output path/to/weather.json --hours 48
+    python export_weather.py --output path/to/weather.json --full-rebuild
 """
 
 import argparse
+import csv
 import glob
 import gzip
+import hashlib
 import json
 import math
+import multiprocessing
 import os
 import re
 import shutil
 import sqlite3
 import sys
-import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
-def upload_to_r2(file_path, object_key):
-    """Upload a file to Cloudflare R2 via S3-compatible API."""
+import numpy as np
+
+import atomic_file
+import compression
+import history_log
+import manifest_state
+import model_accuracy
+import raw_archive
+import station_archive
+from ensemble import ENSEMBLE_MODEL_TYPE
+
+
+R2_UPLOAD_WORKERS = 4
+R2_MULTIPART_CHUNK = 8 * 1024 * 1024  # multipart threshold and part size
+
+# One S3 client per set of credentials, shared by every upload of the run
+_r2_clients = {}
+_r2_clients_lock = threading.Lock()
+
+
+def _s3_etag(file_path, chunk_size=R2_MULTIPART_CHUNK):
+    """The ETag S3/R2 reports for file_path when uploaded with chunk_size parts.
+
+    Plain MD5 below the multipart threshold; above it, the MD5 of the
+    concatenated part digests followed by "-<parts>".
+    """
+    digests = []
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digests.append(hashlib.md5(chunk).digest())
+    if os.path.getsize(file_path) < chunk_size:
+        return (digests[0] if digests else hashlib.md5(b"").digest()).hex()
+    return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
+
+
+def upload_to_r2(file_path, object_key, cache_control=None):
+    """Upload a file to Cloudflare R2 via S3-compatible API.
+
+    Safe to call from several threads: the boto3 client is created once and
+    its connection pool shared. The upload is skipped when the remote
+    object's ETag and headers already match the local file. Files of
+    R2_MULTIPART_CHUNK bytes or more are sent as multipart uploads.
+
+    Returns True once uploaded (or already current), False if the upload
+    failed and None when R2 is not configured.
+    """
     import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
 
     endpoint_url = os.environ.get('R2_ENDPOINT_URL')
     access_key = os.environ.get('R2_ACCESS_KEY_ID')
@@ -35,28 +87,60 @@ def upload_to_r2(file_path, object_key):
         print("R2 credentials not configured, skipping upload")
         return
 
-    s3 = boto3.client(
-        's3',
-        endpoint_url=endpoint_url,
-        aws_access_key_id=access_key,
-        aws_secret_access_key=secret_key
-    )
-
-    content_type = 'application/json' if file_path.endswith('.json') else 'application/gzip'
+    with _r2_clients_lock:
+        s3 = _r2_clients.get((endpoint_url, access_key))
+        if s3 is None:
+            s3 = boto3.client(
+                's3',
+                endpoint_url=endpoint_url,
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key,
+                config=Config(max_pool_connections=R2_UPLOAD_WORKERS * 4),
+            )
+            _r2_clients[(endpoint_url, access_key)] = s3
+
+    suffix_types = {c["suffix"]: c["content_type"] for c in compression.CODECS.values()}
+    content_type = 'application/json' if file_path.endswith('.json') else \
+        suffix_types.get(os.path.splitext(file_path)[1], 'application/gzip')
+    extra_args = {'ContentType': content_type}
+    if cache_control:
+        extra_args['CacheControl'] = cache_control
+    transfer_config = TransferConfig(multipart_threshold=R2_MULTIPART_CHUNK,
+                                     multipart_chunksize=R2_MULTIPART_CHUNK,
+                                     max_concurrency=R2_UPLOAD_WORKERS)
 
     try:
-        s3.upload_file(file_path, bucket_name, object_key, ExtraArgs={'ContentType': content_type})
+        try:
+            remote = s3.head_object(Bucket=bucket_name, Key=object_key)
+        except ClientError:
+            remote = None
+        if (remote is not None
+                and remote.get('ETag', '').strip('"') == _s3_etag(file_path, R2_MULTIPART_CHUNK)
+                and remote.get('ContentType') == content_type
+                and remote.get('CacheControl') == cache_control):
+            print(f"R2 object {object_key} is unchanged, skipping upload")
+            return True
+        s3.upload_file(file_path, bucket_name, object_key, ExtraArgs=extra_args, Config=transfer_config)
         print(f"Uploaded {object_key} to R2")
+        return True
     except Exception as e:
         print(f"WARNING: R2 upload failed for {object_key}: {e}")
+        return False
 
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(SCRIPT_DIR, "data")
 PREDICTIONS_DIR = os.path.join(DATA_DIR, "predictions")
+RAW_DIR = os.path.join(DATA_DIR, "raw")
 PUBLIC_STATIONS_DIR = os.path.join(DATA_DIR, "public-stations")
+STATION_ARCHIVE_DIR = os.path.join(DATA_DIR, "public-stations-archive")
 VALIDATION_DIR = os.path.join(DATA_DIR, "validation")
+VALIDATION_STATE_JSON = os.path.join(VALIDATION_DIR, ".state.json")
 HISTORY_JSON = os.path.join(DATA_DIR, "prediction-history.json")
+FRONTEND_SHARDS_JSON = os.path.join(DATA_DIR, "frontend-shards.json")
+EXPORT_STATE_JSON = os.path.join(DATA_DIR, "export-state.json")
+EXPORT_DICTIONARY_PATH = os.path.join(DATA_DIR, "export.zdict")
+ACCURACY_WINDOW_DAYS = 7
 DB_PATH = os.path.join(SCRIPT_DIR, "data", "weather.db")
 
 PREDICTIONS_TABLE_SQL = """CREATE TABLE IF NOT EXISTS predictions (
@@ -69,7 +153,13 @@ PREDICTIONS_TABLE_SQL = """CREATE TABLE IF NOT EXISTS predictions (
     temp_outdoor_predicted REAL,
     last_reading_ts INTEGER,
     last_reading_temp_indoor REAL,
-    last_reading_temp_outdoor REAL
+    last_reading_temp_outdoor REAL,
+    temp_indoor_low REAL,
+    temp_indoor_high REAL,
+    temp_outdoor_low REAL,
+    temp_outdoor_high REAL,
+    is_shadow INTEGER NOT NULL DEFAULT 0,
+    generated_hour TEXT GENERATED ALWAYS AS (substr(generated_at, 1, 13)) VIRTUAL
 )"""
 
 PREDICTION_HISTORY_TABLE_SQL = """CREATE TABLE IF NOT EXISTS prediction_history (
@@ -87,6 +177,153 @@ PREDICTION_HISTORY_TABLE_SQL = """CREATE TABLE IF NOT EXISTS prediction_history
     UNIQUE(model_type, for_hour)
 )"""
 
+FRONTEND_DB_SCHEMA_SQL = """
+CREATE TABLE readings (
+    timestamp INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    temp_indoor REAL,
+    co2 INTEGER,
+    humidity_indoor INTEGER,
+    noise INTEGER,
+    pressure REAL,
+    pressure_absolute REAL,
+    temp_indoor_min REAL,
+    temp_indoor_max REAL,
+    date_min_temp_indoor INTEGER,
+    date_max_temp_indoor INTEGER,
+    temp_trend TEXT,
+    pressure_trend TEXT,
+    wifi_status INTEGER,
+    temp_outdoor REAL,
+    humidity_outdoor INTEGER,
+    temp_outdoor_min REAL,
+    temp_outdoor_max REAL,
+    date_min_temp_outdoor INTEGER,
+    date_max_temp_outdoor INTEGER,
+    temp_outdoor_trend TEXT,
+    battery_percent INTEGER,
+    rf_status INTEGER,
+    battery_vp INTEGER
+);
+
+CREATE TABLE predictions (
+    id INTEGER PRIMARY KEY,
+    generated_at TEXT NOT NULL,
+    model_type TEXT NOT NULL,
+    model_version INTEGER,
+    for_hour TEXT NOT NULL,
+    temp_indoor_predicted REAL,
+    temp_outdoor_predicted REAL,
+    last_reading_ts INTEGER,
+    last_reading_temp_indoor REAL,
+    last_reading_temp_outdoor REAL,
+    temp_indoor_low REAL,
+    temp_indoor_high REAL,
+    temp_outdoor_low REAL,
+    temp_outdoor_high REAL
+);
+
+CREATE TABLE prediction_history (
+    id INTEGER PRIMARY KEY,
+    predicted_at TEXT NOT NULL,
+    for_hour TEXT NOT NULL,
+    model_type TEXT NOT NULL,
+    model_version INTEGER,
+    predicted_indoor REAL,
+    predicted_outdoor REAL,
+    actual_indoor REAL,
+    actual_outdoor REAL,
+    error_indoor REAL,
+    error_outdoor REAL
+);
+
+CREATE TABLE public_stations (
+    id INTEGER PRIMARY KEY,
+    fetched_at TEXT NOT NULL,
+    station_id TEXT NOT NULL,
+    lat REAL,
+    lon REAL,
+    temperature REAL,
+    humidity INTEGER,
+    pressure REAL,
+    rain_60min REAL,
+    rain_24h REAL,
+    wind_strength INTEGER,
+    wind_angle INTEGER,
+    gust_strength INTEGER,
+    gust_angle INTEGER
+);
+
+CREATE TABLE _metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+FRONTEND_DB_INDEXES_SQL = """
+CREATE INDEX idx_readings_timestamp ON readings(timestamp);
+CREATE INDEX idx_readings_date ON readings(date);
+CREATE INDEX idx_predictions_model_ts ON predictions(model_type, for_hour);
+CREATE INDEX idx_pred_hist_hour_model ON prediction_history(for_hour, model_type);
+CREATE INDEX idx_pub_stations_fetched ON public_stations(fetched_at, station_id);
+"""
+
+# Incremental copy per table: (high-water mark column, filter on the source rows).
+# Validation fills in missed cycles up to a week back, so prediction_history
+# re-checks that window against the rows already exported.
+FRONTEND_DB_INCREMENTAL = {
+    "readings": ("timestamp", "s.timestamp > CAST(? AS INTEGER)"),
+    "predictions": ("generated_at", "s.generated_at > ?"),
+    "prediction_history": (
+        "for_hour",
+        "s.for_hour > strftime('%Y-%m-%dT%H:%M:%SZ', ?, '-168 hours') AND NOT EXISTS ("
+        "SELECT 1 FROM main.prediction_history d "
+        "WHERE d.for_hour = s.for_hour AND d.model_type = s.model_type)"),
+    "public_stations": ("fetched_at", "s.fetched_at > ?"),
+}
+FRONTEND_DB_FULL_REBUILD_DAYS = 7
+FRONTEND_DB_GZIP_LEVEL = 6
+FRONTEND_DELTA_KEEP = 72  # 24 hours of 20-minute runs
+
+# Codecs for frontend.db and the deltas; gzip is always written, --codecs
+# adds zstd/br variants (see compression.py)
+EXPORT_CODECS = ("gzip",)
+EXPORT_DICTIONARY_MAX_AGE_DAYS = 30
+EXPORT_DICTIONARY_SAMPLES = 200
+
+# Keys that change on every run and do not count as a content change
+VOLATILE_EXPORT_KEYS = ("generated_at", "db_generated_at")
+
+# The browse UI's manifest: a root index with per-category summaries and one
+# detail file per month (data-index/index.json, data-index/YYYY-MM.json).
+# data-index.json keeps the full listing for older clients.
+MANIFEST_SHARD_DIR = "data-index"
+MANIFEST_SCHEMA_VERSION = 1
+MANIFEST_SHARD_RE = re.compile(r"^\d{4}-\d{2}\.json$")
+
+# Public station CSV -> JSON conversion (export_public_stations). The ledger
+# lists converted CSVs; bumping the version converts every CSV again.
+PUBLIC_STATIONS_LEDGER = ".ledger.json"
+PUBLIC_STATIONS_JSON_VERSION = 2  # 2: compact JSON
+PUBLIC_STATIONS_POOL_MIN = 16  # pending files before a process pool pays off
+PUBLIC_STATION_NUMERIC_FIELDS = ("temperature", "humidity", "pressure", "rain_60min",
+                                 "rain_24h", "wind_strength", "wind_angle",
+                                 "gust_strength", "gust_angle")
+
+# Monthly shards of the frontend DB: the time column each table is split on.
+# A month is sealed (immutable) once FRONTEND_SHARD_SEAL_DAYS have passed
+# since its end, so late validations of its last week still land in it,
+# and only while every table's source still covers it (_shard_coverage).
+FRONTEND_SHARD_COLUMNS = {
+    "readings": "timestamp",
+    "predictions": "generated_at",
+    "prediction_history": "for_hour",
+    "public_stations": "fetched_at",
+}
+FRONTEND_SHARD_SEAL_DAYS = 7
+FRONTEND_SHARD_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
 PROPERTY_META = {
     "temp_indoor": {"label": "Indoor Temp", "unit": "°C", "format": "temperature"},
     "temp_outdoor": {"label": "Outdoor Temp", "unit": "°C", "format": "temperature"},
@@ -123,26 +360,130 @@ def _find_latest_for_hour(directory, hour):
     return read_json(path) if path else None
 
 
+def _read_raw_for_hour(date_str, hour):
+    """The latest raw station response of an hour.
+
+    The loose files cover the last 7 days; older hours come from the raw archive.
+    """
+    data = _find_latest_for_hour(os.path.join(DATA_DIR, date_str), hour)
+    if data is None:
+        data = raw_archive.latest_for_hour(RAW_DIR, date_str, hour)
+    return data
+
+
+def _predictions_columns(conn):
+    """Column names of weather.db's predictions table, generated columns included."""
+    return {row[1] for row in conn.execute("PRAGMA table_xinfo(predictions)")}
+
+
+def _generated_hour_sql(columns):
+    """The indexed generated_hour column, or the same expression on DBs predict.py has not migrated."""
+    return "generated_hour" if "generated_hour" in columns else "substr(generated_at, 1, 13)"
+
+
+def _load_window_from_db(now, hours):
+    """Readings and the predictions targeting them for the last `hours` hours, from weather.db.
+
+    Two queries, one over readings (timestamp index) and one over
+    predictions (generated_hour), replace the per-hour file walk in export().
+    Returns (readings, predictions):
+
+        readings     {(date, hour): (indoor, outdoor, time_utc)}, the latest
+                     reading of each hour bucket, as the file walk picks the
+                     latest file of the hour
+        predictions  {generated hour "YYYY-MM-DDTHH": prediction dict shaped
+                     like a prediction file}, the ensemble's when present,
+                     else the newest; a prediction FOR hour H was generated
+                     at hour H-1
+
+    Returns None when the DB is missing or holds no readings for the window,
+    so the caller falls back to the raw JSON files.
+    """
+    if not os.path.exists(DB_PATH):
+        return None
+    window_start = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+    # Netatmo's time_utc can trail the fetch that filed it under an hour
+    since_ts = int(window_start.timestamp()) - 3600
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            reading_rows = conn.execute(
+                """SELECT date, hour, timestamp, temp_indoor, temp_outdoor
+                   FROM (SELECT date, hour, timestamp, temp_indoor, temp_outdoor,
+                                ROW_NUMBER() OVER (PARTITION BY date, hour ORDER BY timestamp DESC) AS rn
+                         FROM readings
+                         WHERE timestamp >= ?)
+                   WHERE rn = 1""",
+                (since_ts,)).fetchall()
+
+            columns = _predictions_columns(conn)
+            prediction_rows = []
+            if columns:
+                shadow_filter = "AND is_shadow = 0" if "is_shadow" in columns else ""
+                hour = _generated_hour_sql(columns)
+                conn.row_factory = sqlite3.Row
+                prediction_rows = conn.execute(
+                    f"""SELECT * FROM (
+                           SELECT *, ROW_NUMBER() OVER (
+                               PARTITION BY {hour}
+                               ORDER BY model_type = ? DESC, generated_at DESC) AS rn
+                           FROM predictions
+                           WHERE {hour} >= ? {shadow_filter})
+                       WHERE rn = 1""",
+                    (ENSEMBLE_MODEL_TYPE, (window_start - timedelta(hours=1)).strftime("%Y-%m-%dT%H"))).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+
+    readings = {}
+    for date_str, hour, time_utc, indoor, outdoor in reading_rows:
+        if indoor is not None and outdoor is not None:
+            readings[(date_str, hour)] = (indoor, outdoor, time_utc)
+    if not readings:
+        return None
+
+    predictions = {}
+    for row in prediction_rows:
+        predictions[row["generated_at"][:13]] = {
+            "model_type": row["model_type"],
+            "model_version": row["model_version"],
+            "generated_at": row["generated_at"],
+            "prediction": {
+                "prediction_for": row["for_hour"],
+                "temp_indoor": row["temp_indoor_predicted"],
+                "temp_outdoor": row["temp_outdoor_predicted"],
+            },
+        }
+    return readings, predictions
+
+
 def _find_predictions_for_hour_from_db(date_str, target_hour):
     """Try to find predictions from DB for a given date and hour.
     Returns list of prediction dicts, or None if unavailable."""
     if not os.path.exists(DB_PATH):
         return None
     try:
-        # Build the hour pattern: predictions generated at this hour predict for hour+1
-        hour_prefix = f"{date_str}T{target_hour:02d}"
+        # Predictions generated at this hour predict for hour+1
+        generated_hour = f"{date_str}T{target_hour:02d}"
 
         conn = sqlite3.connect(DB_PATH)
         conn.row_factory = sqlite3.Row
+        columns = _predictions_columns(conn)
+        # Challenger rows run in shadow and are never published
+        shadow_filter = "AND is_shadow = 0" if "is_shadow" in columns else ""
+        # The newest row per model; ranking only ids keeps the inner query on
+        # idx_predictions_generated_hour, and the join fetches just the winners
         rows = conn.execute(
-            """SELECT model_type, model_version, for_hour,
-                      temp_indoor_predicted, temp_outdoor_predicted,
-                      generated_at
-               FROM predictions
-               WHERE generated_at LIKE ?
-               GROUP BY model_type
-               HAVING MAX(generated_at)""",
-            (f"{hour_prefix}%",)).fetchall()
+            f"""SELECT p.*
+               FROM (SELECT id, ROW_NUMBER() OVER (
+                            PARTITION BY model_type ORDER BY generated_at DESC) AS rn
+                     FROM predictions
+                     WHERE {_generated_hour_sql(columns)} = ? {shadow_filter}) latest
+               JOIN predictions p ON p.id = latest.id
+               WHERE latest.rn = 1
+               ORDER BY p.model_type""",
+            (generated_hour,)).fetchall()
         conn.close()
 
         if not rows:
@@ -151,15 +492,22 @@ def _find_predictions_for_hour_from_db(date_str, target_hour):
         results = []
         for row in rows:
             row = dict(row)
+            prediction = {
+                "prediction_for": row["for_hour"],
+                "temp_indoor": row["temp_indoor_predicted"],
+                "temp_outdoor": row["temp_outdoor_predicted"],
+            }
+            # Interval columns are absent on DBs written before they were added
+            if row.get("temp_indoor_low") is not None and row.get("temp_outdoor_low") is not None:
+                prediction["interval"] = {
+                    "temp_indoor": [row["temp_indoor_low"], row["temp_indoor_high"]],
+                    "temp_outdoor": [row["temp_outdoor_low"], row["temp_outdoor_high"]],
+                }
             results.append({
                 "model_type": row["model_type"],
                 "model_version": row["model_version"],
                 "generated_at": row["generated_at"],
-                "prediction": {
-                    "prediction_for": row["for_hour"],
-                    "temp_indoor": row["temp_indoor_predicted"],
-                    "temp_outdoor": row["temp_outdoor_predicted"],
-                },
+                "prediction": prediction,
             })
         return results
     except Exception:
@@ -328,8 +676,10 @@ def _load_validated_history_from_db(hours):
 
 def load_validated_history(history_path, hours):
     """Load prediction history from validated prediction-history.json."""
-    # Try JSON file first (committed, persistent source of truth)
-    data = read_json(history_path)
+    # Try the JSON history log first (committed, persistent source of truth)
+    snapshot = read_json(history_path)
+    data = history_log.merge(snapshot if isinstance(snapshot, list) else [],
+                             history_log.read_segments(history_path))
     if data:
         cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
         history = []
@@ -383,6 +733,16 @@ def haversine_km(lat1, lon1, lat2, lon2):
     return R * 2 * math.asin(math.sqrt(a))
 
 
+def haversine_km_array(lat1, lon1, lats, lons):
+    """haversine_km from one point to arrays of points, as a NumPy array."""
+    lats = np.radians(np.asarray(lats, dtype=float))
+    lons = np.radians(np.asarray(lons, dtype=float))
+    lat1, lon1 = math.radians(lat1), math.radians(lon1)
+    a = (np.sin((lats - lat1) / 2) ** 2 +
+         math.cos(lat1) * np.cos(lats) * np.sin((lons - lon1) / 2) ** 2)
+    return 6371 * 2 * np.arcsin(np.sqrt(a))
+
+
 def get_home_location():
     """Compute home location as center of public station bounding box."""
     try:
@@ -402,113 +762,195 @@ def get_home_location():
 
 def filter_nearest_stations(stations, home, count=10):
     """Add distance fields and return the nearest `count` stations."""
-    for s in stations:
-        dist = haversine_km(home["lat"], home["lon"], s["lat"], s["lon"])
-        s["distance_km"] = round(dist, 1)
-        s["distance_mi"] = round(dist * 0.621371, 1)
-    stations.sort(key=lambda s: s["distance_km"])
-    return stations[:count]
+    if not stations:
+        return stations
+    dist = haversine_km_array(home["lat"], home["lon"],
+                              [s["lat"] for s in stations], [s["lon"] for s in stations])
+    nearest = []
+    for i in np.argsort(dist, kind="stable")[:count]:
+        s = stations[i]
+        s["distance_km"] = round(float(dist[i]), 1)
+        s["distance_mi"] = round(float(dist[i]) * 0.621371, 1)
+        nearest.append(s)
+    return nearest
+
+
+def _convert_station_csv(csv_path, json_path, home):
+    """Convert one public station CSV to compact JSON. Returns the station count.
+
+    Module-level so export_public_stations() can run it in worker processes.
+    """
+    stations = []
+    fetched_at = None
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            columns = {}
+        else:
+            columns = {name: i for i, name in enumerate(header)}
+        numeric = [(field, columns.get(field)) for field in PUBLIC_STATION_NUMERIC_FIELDS]
+        for row in reader:
+            try:
+                station = {"station_id": row[columns["station_id"]],
+                           "lat": float(row[columns["lat"]]),
+                           "lon": float(row[columns["lon"]])}
+                for field, i in numeric:
+                    val = row[i] if i is not None and i < len(row) else ""
+                    station[field] = float(val) if val != "" else None
+                stations.append(station)
+                if fetched_at is None and "fetched_at" in columns:
+                    fetched_at = row[columns["fetched_at"]]
+            except (ValueError, KeyError, IndexError) as e:
+                print(f"  Warning: skipping malformed row in {csv_path}: {e}")
+                continue
 
+    if home and stations:
+        stations = filter_nearest_stations(stations, home)
 
-def export_public_stations():
-    """Convert public station CSV files to JSON for frontend consumption."""
-    import csv as csv_mod
+    output = {
+        "fetched_at": fetched_at,
+        "station_count": len(stations),
+        "stations": stations,
+    }
+    if home:
+        output["home_location"] = home
+
+    atomic_file.write_json(json_path, output, separators=(",", ":"))
+    return len(stations)
+
+
+def export_public_stations(workers=None):
+    """Convert public station CSV files to JSON for frontend consumption.
+
+    A ledger in PUBLIC_STATIONS_DIR (PUBLIC_STATIONS_LEDGER) lists the CSVs
+    already converted, so finding the pending ones takes one directory
+    listing per date and no per-file stats. The ledger is reset, and every
+    CSV converted again, when PUBLIC_STATIONS_JSON_VERSION or the home
+    location changes. From PUBLIC_STATIONS_POOL_MIN pending files on, the
+    conversion runs in a process pool of `workers` processes (default: one
+    per CPU). Workers are spawned, not forked: export() runs this while the
+    R2 upload threads are busy, and a forked child could inherit a lock one
+    of them holds.
+    """
     date_re = re.compile(r"^\d{4}-\d{2}-\d{2}$")
     hour_re = re.compile(r"^(\d{6})\.csv$")
-    numeric_fields = ("temperature", "humidity", "pressure", "rain_60min",
-                      "rain_24h", "wind_strength", "wind_angle",
-                      "gust_strength", "gust_angle")
     converted = 0
+    written = []
     home = get_home_location()
 
     if not os.path.isdir(PUBLIC_STATIONS_DIR):
         return converted
 
-    for date_dir in sorted(os.listdir(PUBLIC_STATIONS_DIR)):
+    ledger_path = os.path.join(PUBLIC_STATIONS_DIR, PUBLIC_STATIONS_LEDGER)
+    ledger = read_json(ledger_path)
+    if (not isinstance(ledger, dict) or ledger.get("version") != PUBLIC_STATIONS_JSON_VERSION
+            or ledger.get("home") != home):
+        ledger = {"version": PUBLIC_STATIONS_JSON_VERSION, "home": home, "converted": {}}
+    done = ledger["converted"]
+
+    pending = []
+    date_dirs = [d for d in os.listdir(PUBLIC_STATIONS_DIR) if date_re.match(d)]
+    for date_dir in sorted(date_dirs):
         full_date = os.path.join(PUBLIC_STATIONS_DIR, date_dir)
-        if not os.path.isdir(full_date) or not date_re.match(date_dir):
+        if not os.path.isdir(full_date):
             continue
+        seen = set(done.get(date_dir, ()))
         for fname in sorted(os.listdir(full_date)):
             m = hour_re.match(fname)
-            if not m:
-                continue
-            csv_path = os.path.join(full_date, fname)
-            json_path = os.path.join(full_date, m.group(1) + ".json")
-
-            # Skip if JSON exists and is newer than CSV
-            if os.path.exists(json_path):
-                if os.path.getmtime(json_path) > os.path.getmtime(csv_path):
-                    continue
-
-            stations = []
-            fetched_at = None
-            with open(csv_path, newline="") as f:
-                reader = csv_mod.DictReader(f)
-                for row in reader:
-                    try:
-                        station = {"station_id": row["station_id"],
-                                   "lat": float(row["lat"]),
-                                   "lon": float(row["lon"])}
-                        for field in numeric_fields:
-                            val = row.get(field, "")
-                            station[field] = float(val) if val != "" else None
-                        stations.append(station)
-                        if fetched_at is None:
-                            fetched_at = row.get("fetched_at")
-                    except (ValueError, KeyError) as e:
-                        print(f"  Warning: skipping malformed row in {csv_path}: {e}")
-                        continue
-
-            if home and stations:
-                stations = filter_nearest_stations(stations, home)
-
-            output = {
-                "fetched_at": fetched_at,
-                "station_count": len(stations),
-                "stations": stations,
-            }
-            if home:
-                output["home_location"] = home
-
-            # Write atomically
-            tmp_fd, tmp_path = tempfile.mkstemp(
-                dir=full_date, suffix=".json")
-            try:
-                with os.fdopen(tmp_fd, "w") as f:
-                    json.dump(output, f, indent=2)
-                    f.write("\n")
-                os.replace(tmp_path, json_path)
-                converted += 1
-            except Exception:
-                os.unlink(tmp_path)
-                raise
-
+            if m and m.group(1) not in seen:
+                pending.append((date_dir, m.group(1)))
+    # Dates removed by fetch_weather's 30-day cleanup
+    removed = set(done) - set(date_dirs)
+    for date_dir in removed:
+        del done[date_dir]
+
+    def paths(date_dir, hour):
+        full_date = os.path.join(PUBLIC_STATIONS_DIR, date_dir)
+        return os.path.join(full_date, hour + ".csv"), os.path.join(full_date, hour + ".json")
+
+    workers = workers or os.cpu_count() or 1
+    if len(pending) >= PUBLIC_STATIONS_POOL_MIN and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(_convert_station_csv, *paths(d, h), home) for d, h in pending]
+            for (date_dir, hour), future in zip(pending, futures):
+                future.result()
+                written.append((date_dir, hour))
+    else:
+        for date_dir, hour in pending:
+            _convert_station_csv(*paths(date_dir, hour), home)
+            written.append((date_dir, hour))
+
+    for date_dir, hour in written:
+        done.setdefault(date_dir, []).append(hour)
+        converted += 1
+    if written or removed or not os.path.exists(ledger_path):
+        for hours in done.values():
+            hours.sort()
+        atomic_file.write_json(ledger_path, ledger, indent=2)
+
+    manifest_state.record(DATA_DIR, [("public_stations", d, h, None) for d, h in written])
     print(f"  Public stations: converted {converted} CSV file(s) to JSON")
     return converted
 
 
 def export_validation_history():
-    """Split prediction-history.json into per-date validation files."""
-    data = read_json(HISTORY_JSON)
-    if not data:
-        return 0
-
-    os.makedirs(VALIDATION_DIR, exist_ok=True)
+    """Split the prediction history log into per-date validation files.
+
+    Only the dates history_log recorded as pending (appended to or trimmed
+    since the last export) are rebuilt: from their current validation file
+    plus that day's segment, or from the snapshot for trimmed dates and
+    missing files. The first export, without VALIDATION_STATE_JSON, splits
+    the whole history. A date is written only when its content hash in the
+    state changed.
+    """
+    state = read_json(VALIDATION_STATE_JSON)
+    if not isinstance(state, dict):
+        state = {}
+    touched, trimmed = history_log.pending(HISTORY_JSON)
 
-    # Group entries by date
     by_date = {}
-    for entry in data:
-        for_hour = entry.get("for_hour", "")
-        date_str = for_hour[:10] if len(for_hour) >= 10 else None
-        if not date_str:
-            continue
-        by_date.setdefault(date_str, []).append(entry)
+    if state:
+        snapshot = None
+        for date_str in sorted(touched):
+            existing = read_json(os.path.join(VALIDATION_DIR, f"{date_str}.json"))
+            if date_str in trimmed or not isinstance(existing, dict):
+                if snapshot is None:
+                    snapshot = read_json(HISTORY_JSON)
+                    snapshot = snapshot if isinstance(snapshot, list) else []
+                base = [e for e in snapshot if e.get("for_hour", "")[:10] == date_str]
+            else:
+                base = existing.get("entries", [])
+            entries = history_log.merge(base, history_log.read_segments(HISTORY_JSON, {date_str}))
+            if entries:
+                by_date[date_str] = entries
+    else:
+        snapshot = read_json(HISTORY_JSON)
+        data = history_log.merge(snapshot if isinstance(snapshot, list) else [],
+                                 history_log.read_segments(HISTORY_JSON))
+        if not data:
+            return 0
+        # Group entries by date
+        for entry in data:
+            for_hour = entry.get("for_hour", "")
+            date_str = for_hour[:10] if len(for_hour) >= 10 else None
+            if not date_str:
+                continue
+            by_date.setdefault(date_str, []).append(entry)
+
+    os.makedirs(VALIDATION_DIR, exist_ok=True)
 
     written = 0
+    written_dates = []
     for date_str, entries in by_date.items():
         # Sort entries by for_hour descending
         entries.sort(key=lambda e: e.get("for_hour", ""), reverse=True)
 
+        out_path = os.path.join(VALIDATION_DIR, f"{date_str}.json")
+        digest = hashlib.sha1(json.dumps(entries, sort_keys=True).encode()).hexdigest()
+        if state.get(date_str) == digest and os.path.exists(out_path):
+            continue
+
         # Collect unique model types
         models = sorted(set(e.get("model_type", "unknown") for e in entries))
 
@@ -519,111 +961,60 @@ def export_validation_history():
             "entries": entries,
         }
 
-        out_path = os.path.join(VALIDATION_DIR, f"{date_str}.json")
-        tmp_fd, tmp_path = tempfile.mkstemp(
-            dir=VALIDATION_DIR, suffix=".json")
-        try:
-            with os.fdopen(tmp_fd, "w") as f:
-                json.dump(output, f, indent=2)
-                f.write("\n")
-            os.replace(tmp_path, out_path)
-            written += 1
-        except Exception:
-            os.unlink(tmp_path)
-            raise
-
-    print(f"  Validation: wrote {written} per-date file(s)")
+        atomic_file.write_json(out_path, output, indent=2)
+        state[date_str] = digest
+        written_dates.append(date_str)
+        written += 1
+
+    if written:
+        atomic_file.write_json(VALIDATION_STATE_JSON, state, indent=2)
+        manifest_state.record(DATA_DIR, [("validation", d, None, None) for d in written_dates])
+    history_log.clear_pending(HISTORY_JSON, touched)
+    print(f"  Validation: wrote {written} per-date file(s), {len(by_date) - written} unchanged")
     return written
 
 
-def generate_manifest(output_dir):
-    """Generate data-index.json listing all available data categories."""
-    date_re = re.compile(r"^\d{4}-\d{2}-\d{2}$")
-    reading_re = re.compile(r"^(\d{4,6})\.json$")
-    pred_model_re = re.compile(r"^(\d{6})_([A-Za-z0-9]+)\.json$")
-    pred_legacy_re = re.compile(r"^(\d{4,6})\.json$")
+def generate_manifest(output_dir, frontend_db=None, repair=False):
+    """Generate data-index.json listing all available data categories.
+
+    The listing comes from the manifest state the writers keep up to date
+    (see manifest_state.py), so the cost follows the number of changes
+    rather than the number of files. The directories are walked again
+    (repair mode) when the state is missing, older than
+    manifest_state.REPAIR_HOURS or when repair is set.
+    """
+    state = manifest_state.load(DATA_DIR)
+    if repair or manifest_state.needs_repair(state):
+        state = manifest_state.scan(DATA_DIR)
+        if os.path.isdir(DATA_DIR):
+            manifest_state.save(DATA_DIR, state)
+        print(f"  Manifest: rescanned {DATA_DIR}")
+    elif manifest_state.prune_missing_dates(DATA_DIR, state):
+        manifest_state.save(DATA_DIR, state)
+
+    # Newest date first, hours in ascending order within a date
+    readings = {d: state["readings"][d] for d in sorted(state["readings"], reverse=True)
+                if state["readings"][d]}
 
-    # Readings — same as before
-    readings = {}
-    if os.path.isdir(DATA_DIR):
-        for date_dir in sorted(os.listdir(DATA_DIR), reverse=True):
-            full_path = os.path.join(DATA_DIR, date_dir)
-            if not os.path.isdir(full_path) or not date_re.match(date_dir):
-                continue
-            hours = []
-            for f in sorted(os.listdir(full_path)):
-                m = reading_re.match(f)
-                if m:
-                    hours.append(m.group(1))
-            if hours:
-                readings[date_dir] = hours
-
-    # Predictions with model discovery
     all_models = set()
     pred_dates = {}
-    if os.path.isdir(PREDICTIONS_DIR):
-        for date_dir in sorted(os.listdir(PREDICTIONS_DIR), reverse=True):
-            full_path = os.path.join(PREDICTIONS_DIR, date_dir)
-            if not os.path.isdir(full_path) or not date_re.match(date_dir):
-                continue
-            hours_map = {}  # hour -> [model_types]
-            for f in sorted(os.listdir(full_path)):
-                # Try model format first: HHMMSS_modeltype.json
-                m = pred_model_re.match(f)
-                if m:
-                    hour = m.group(1)
-                    model = m.group(2)
-                    hours_map.setdefault(hour, []).append(model)
-                    all_models.add(model)
-                    continue
-                # Legacy format: HHMMSS.json
-                m = pred_legacy_re.match(f)
-                if m:
-                    hour = m.group(1)
-                    # Read model_type from file, default to "simple"
-                    try:
-                        fpath = os.path.join(full_path, f)
-                        d = read_json(fpath)
-                        model = d.get("model_type", "simple") if d else "simple"
-                    except Exception:
-                        model = "simple"
-                    hours_map.setdefault(hour, []).append(model)
-                    all_models.add(model)
-            # Deduplicate models per hour
-            for h in hours_map:
-                hours_map[h] = sorted(set(hours_map[h]))
-            if hours_map:
-                pred_dates[date_dir] = hours_map
+    for date_dir in sorted(state["predictions"], reverse=True):
+        hours_map = {h: m for h, m in sorted(state["predictions"][date_dir].items()) if m}
+        for models in hours_map.values():
+            all_models.update(models)
+        if hours_map:
+            pred_dates[date_dir] = hours_map
 
     predictions = {
         "models": sorted(all_models),
         "dates": pred_dates,
     }
 
-    # Public stations
-    public_stations = {}
-    if os.path.isdir(PUBLIC_STATIONS_DIR):
-        station_hour_re = re.compile(r"^(\d{6})\.json$")
-        for date_dir in sorted(os.listdir(PUBLIC_STATIONS_DIR), reverse=True):
-            full_path = os.path.join(PUBLIC_STATIONS_DIR, date_dir)
-            if not os.path.isdir(full_path) or not date_re.match(date_dir):
-                continue
-            hours = []
-            for f in sorted(os.listdir(full_path)):
-                m = station_hour_re.match(f)
-                if m:
-                    hours.append(m.group(1))
-            if hours:
-                public_stations[date_dir] = hours
-
-    # Validation
-    validation = []
-    if os.path.isdir(VALIDATION_DIR):
-        val_re = re.compile(r"^(\d{4}-\d{2}-\d{2})\.json$")
-        for f in sorted(os.listdir(VALIDATION_DIR), reverse=True):
-            m = val_re.match(f)
-            if m:
-                validation.append(m.group(1))
+    public_stations = {d: state["public_stations"][d]
+                       for d in sorted(state["public_stations"], reverse=True)
+                       if state["public_stations"][d]}
+
+    validation = sorted(state["validation"], reverse=True)
 
     manifest = {
         "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
@@ -633,150 +1024,719 @@ def generate_manifest(output_dir):
         "public_stations": public_stations,
         "validation": validation,
     }
+    if frontend_db:
+        manifest["frontend_db"] = frontend_db
 
     manifest_path = os.path.join(output_dir, "data-index.json")
-    with open(manifest_path, "w") as f:
-        json.dump(manifest, f, indent=2)
-        f.write("\n")
+    if not _json_unchanged(manifest_path, manifest):
+        atomic_file.write_json(manifest_path, manifest, indent=2)
+
+    write_manifest_shards(output_dir, manifest)
 
     total_pred = sum(len(h) for d in pred_dates.values() for h in d.values())
     print(f"  Manifest: {manifest_path} ({sum(len(v) for v in readings.values())} readings, {total_pred} predictions, {sum(len(v) for v in public_stations.values())} station files, {len(validation)} validation dates)")
 
 
-def build_frontend_db(output_dir):
-    """Build a clean SQLite database for frontend consumption.
+def _category_summary(counts):
+    """Root-manifest entry for one category from {date: file count}."""
+    dates = {d: counts[d] for d in sorted(counts, reverse=True)}
+    return {
+        "files": sum(dates.values()),
+        "first": min(dates) if dates else None,
+        "last": max(dates) if dates else None,
+        "dates": dates,
+    }
+
+
+def write_manifest_shards(output_dir, manifest):
+    """Split a data-index.json manifest into a root index and monthly detail files.
+
+    data-index/index.json lists, per category, the file count of every date
+    plus the first and last date, and points at data-index/YYYY-MM.json for
+    each month. A month file holds the hours (and prediction models) of
+    that month's dates only, so the browse UI fetches the months in view
+    and the root grows by one entry per day instead of one per file. Month
+    files are rewritten only when their listing changed; each is named in
+    the root with the hash of its content, for cache busting. Returns the
+    root index.
+    """
+    shard_dir = os.path.join(output_dir, MANIFEST_SHARD_DIR)
+    os.makedirs(shard_dir, exist_ok=True)
+
+    pred_dates = manifest["predictions"]["dates"]
+    months = {}
+
+    def month_of(date_str):
+        month = date_str[:7]
+        return months.setdefault(month, {
+            "month": month, "readings": {}, "predictions": {}, "public_stations": {}, "validation": []})
+
+    for date_str, hours in manifest["readings"].items():
+        month_of(date_str)["readings"][date_str] = hours
+    for date_str, hours_map in pred_dates.items():
+        month_of(date_str)["predictions"][date_str] = hours_map
+    for date_str, hours in manifest["public_stations"].items():
+        month_of(date_str)["public_stations"][date_str] = hours
+    for date_str in manifest["validation"]:
+        month_of(date_str)["validation"].append(date_str)
+
+    shards = {}
+    for month in sorted(months, reverse=True):
+        shard = months[month]
+        name = f"{month}.json"
+        path = os.path.join(shard_dir, name)
+        if not _json_unchanged(path, shard):
+            atomic_file.write_json(path, shard, indent=2)
+        shards[month] = {"path": f"{MANIFEST_SHARD_DIR}/{name}", "sha256": _content_hash(shard)}
+
+    # Months that no longer have any data
+    for name in os.listdir(shard_dir):
+        if MANIFEST_SHARD_RE.match(name) and name[:-5] not in months:
+            os.remove(os.path.join(shard_dir, name))
+
+    root = {
+        "schema_version": MANIFEST_SCHEMA_VERSION,
+        "generated_at": manifest["generated_at"],
+        "db_generated_at": manifest["db_generated_at"],
+        "readings": _category_summary({d: len(h) for d, h in manifest["readings"].items()}),
+        "predictions": dict(
+            _category_summary({d: sum(len(m) for m in h.values()) for d, h in pred_dates.items()}),
+            models=manifest["predictions"]["models"]),
+        "public_stations": _category_summary({d: len(h) for d, h in manifest["public_stations"].items()}),
+        "validation": _category_summary({d: 1 for d in manifest["validation"]}),
+        "months": shards,
+    }
+    if "frontend_db" in manifest:
+        root["frontend_db"] = manifest["frontend_db"]
+
+    root_path = os.path.join(shard_dir, "index.json")
+    if not _json_unchanged(root_path, root):
+        atomic_file.write_json(root_path, root, indent=2)
+    return root
+
+
+def _source_select(conn, table, where=None):
+    """Shared column names and a SELECT over the attached source table.
+
+    Columns missing from an older source schema are left out. Shadow
+    (challenger) predictions are excluded. `where` filters the source rows,
+    aliased as s.
+    """
+    dest_cols = [row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")]
+    source_cols = {row[1] for row in conn.execute(f"PRAGMA source.table_info({table})")}
+    cols = [c for c in dest_cols if c in source_cols]
+    conditions = [where] if where else []
+    if "is_shadow" in source_cols:
+        conditions.append("s.is_shadow = 0")
+    where_sql = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return cols, f"SELECT {', '.join(cols)} FROM source.{table} s{where_sql}"
+
+
+def _copy_source_table(conn, table, where=None, params=()):
+    """Copy a table from the attached source DB, matching columns by name.
 
-    Creates a new database with only the tables needed for Browse Data,
-    adds indexes for common query patterns, and compresses with gzip.
+    Columns missing from an older source schema are left NULL. Returns the
+    number of rows copied.
+    """
+    cols, select = _source_select(conn, table, where)
+    cursor = conn.execute(f"INSERT INTO main.{table} ({', '.join(cols)}) {select}", params)
+    return cursor.rowcount
+
+
+def _gzip_file(src_path, dest_path):
+    """Gzip src_path to dest_path atomically.
+
+    mtime=0 keeps the bytes (and hash) a function of the content.
+    """
+    with open(src_path, "rb") as f_in, atomic_file.replace_on_close(dest_path, "wb") as raw_out:
+        with gzip.GzipFile(fileobj=raw_out, mode="wb", mtime=0,
+                           compresslevel=FRONTEND_DB_GZIP_LEVEL) as f_out:
+            shutil.copyfileobj(f_in, f_out)
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _frontend_metadata(db_path):
+    """_metadata of an existing frontend DB, or None if it is missing or incomplete."""
+    if not os.path.exists(db_path):
+        return None
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            if not tables >= set(FRONTEND_DB_INCREMENTAL) | {"_metadata"}:
+                return None
+            return dict(conn.execute("SELECT key, value FROM _metadata"))
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+
+
+def _store_high_water_marks(conn):
+    """Record the newest source row of each table in _metadata."""
+    for table, (column, _) in FRONTEND_DB_INCREMENTAL.items():
+        newest = conn.execute(f"SELECT MAX({column}) FROM source.{table}").fetchone()[0]
+        if newest is not None:
+            conn.execute(
+                """INSERT INTO _metadata VALUES (?, ?)
+                   ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)""",
+                (f"hwm_{table}", str(newest)))
+
+
+def _rebuild_frontend_db(tmp_db, work_db, generated_at, state):
+    """Build frontend.db from scratch (fresh tables, indexes, VACUUM)."""
+    if os.path.exists(tmp_db):
+        os.unlink(tmp_db)
+    conn = sqlite3.connect(tmp_db)
+    conn.execute("ATTACH DATABASE ? AS source", (DB_PATH,))
+    conn.executescript(FRONTEND_DB_SCHEMA_SQL)
+    for table in FRONTEND_DB_INCREMENTAL:
+        _copy_source_table(conn, table)
+    conn.execute("INSERT INTO _metadata VALUES ('schema_version', '1')")
+    conn.execute("INSERT INTO _metadata VALUES ('generated_at', ?)", (generated_at,))
+    conn.execute("INSERT INTO _metadata VALUES ('full_rebuild_at', ?)", (generated_at,))
+    if state is not None:
+        state["delta_version"] += 1
+        state["deltas"] = []
+        conn.execute("INSERT INTO _metadata VALUES ('delta_version', ?)", (str(state["delta_version"]),))
+    _store_high_water_marks(conn)
+    conn.executescript(FRONTEND_DB_INDEXES_SQL)
+    conn.commit()
+    conn.execute("DETACH DATABASE source")
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_db, work_db)
+    print("  Frontend DB: full rebuild")
+
+
+def _update_frontend_db(work_db, metadata, generated_at, state):
+    """Apply the source rows past the high-water marks to the kept frontend.db.
+
+    Rows are inserted without their source `id`: build_dataset.py recreates
+    public_stations (and its ids) from the CSVs, so ids are not stable
+    across source rebuilds. Public station rows older than the oldest one
+    left in the source (deleted by retention.py) are deleted here too.
+    Returns (delta, pruned_before); delta maps each table to its new rows.
+    Everything is rolled back if a statement fails.
+    """
+    conn = sqlite3.connect(work_db)
+    try:
+        conn.execute("ATTACH DATABASE ? AS source", (DB_PATH,))
+        delta = {}
+        with conn:
+            for table, (_, where) in FRONTEND_DB_INCREMENTAL.items():
+                hwm = metadata.get(f"hwm_{table}")
+                cols, select = _source_select(conn, table, where if hwm is not None else None)
+                cols = [c for c in cols if c != "id"]
+                select = f"SELECT {', '.join(cols)} FROM ({select})"
+                rows = conn.execute(select, (hwm,) if hwm is not None else ()).fetchall()
+                conn.executemany(
+                    f"INSERT INTO main.{table} ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})",
+                    rows)
+                delta[table] = [dict(zip(cols, row)) for row in rows]
+
+            pruned_before = conn.execute("SELECT MIN(fetched_at) FROM source.public_stations").fetchone()[0]
+            pruned = 0
+            if pruned_before is not None:
+                pruned = conn.execute("DELETE FROM main.public_stations WHERE fetched_at < ?",
+                                      (pruned_before,)).rowcount
+            if not pruned:
+                pruned_before = None
+
+            if any(delta.values()) or pruned_before:
+                conn.execute("UPDATE _metadata SET value = ? WHERE key = 'generated_at'", (generated_at,))
+                _store_high_water_marks(conn)
+                if state is not None:
+                    conn.execute("UPDATE _metadata SET value = ? WHERE key = 'delta_version'",
+                                 (str(state["delta_version"] + 1),))
+        conn.execute("DETACH DATABASE source")
+    finally:
+        conn.close()
+    print("  Frontend DB: incremental update ("
+          + ", ".join(f"{len(r)} {t}" for t, r in delta.items()) + " new rows"
+          + (f", {pruned} public_stations pruned" if pruned else "") + ")")
+    return delta, pruned_before
+
+
+def build_frontend_db(output_dir, full_rebuild=False, state=None):
+    """Build or update the SQLite database for frontend consumption.
+
+    The uncompressed database is kept as frontend.db next to frontend.db.gz.
+    Each run copies only source rows newer than the high-water marks stored
+    in its _metadata table (see _update_frontend_db). A full rebuild (fresh
+    tables, indexes, VACUUM) happens when the kept copy is missing or
+    incomplete, every FRONTEND_DB_FULL_REBUILD_DAYS days, when full_rebuild
+    is set, or when the incremental update fails. The result is gzipped to
+    frontend.db.gz; a run without changes leaves both files untouched.
+
+    With an export state (see load_export_state), every change bumps its
+    delta_version, which is also stored in _metadata. The rows an
+    incremental run added are written to deltas/delta-<version>.json, and
+    that path is returned. A full rebuild starts a new delta chain.
     """
     db_output = os.path.join(output_dir, "frontend.db.gz")
+    work_db = os.path.join(output_dir, "frontend.db")
     tmp_db = os.path.join(output_dir, "_frontend_tmp.db")
+    now = datetime.now(timezone.utc)
+    generated_at = now.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    metadata = None if full_rebuild else _frontend_metadata(work_db)
+    if metadata is not None:
+        rebuilt_at = metadata.get("full_rebuild_at", "")
+        cutoff = (now - timedelta(days=FRONTEND_DB_FULL_REBUILD_DAYS)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        if rebuilt_at < cutoff:
+            metadata = None
+        elif state is not None and metadata.get("delta_version") != str(state["delta_version"]):
+            # The kept copy is not the one the published deltas build on
+            metadata = None
+
+    delta_path = None
+    try:
+        if metadata is not None:
+            try:
+                delta, pruned_before = _update_frontend_db(work_db, metadata, generated_at, state)
+            except sqlite3.Error as e:
+                print(f"  Warning: incremental frontend DB update failed ({e}), rebuilding")
+                metadata = None
+        if metadata is None:
+            _rebuild_frontend_db(tmp_db, work_db, generated_at, state)
+        else:
+            changed = any(delta.values()) or pruned_before is not None
+            if not changed and os.path.exists(db_output):
+                return None
+            if changed and state is not None:
+                state["delta_version"] += 1
+                delta_path = _write_delta(output_dir, state, delta, generated_at, pruned_before)
+
+        _gzip_file(work_db, db_output)
+        print(f"Frontend database exported: {db_output} "
+              f"({os.path.getsize(db_output)} bytes compressed)")
+
+    finally:
+        if os.path.exists(tmp_db):
+            os.unlink(tmp_db)
+    return delta_path
+
+
+def _write_delta(output_dir, state, delta, generated_at, pruned_before=None):
+    """Write the rows of one incremental run as deltas/delta-<version>.json.
+
+    pruned_before, when set, means public_stations rows fetched before it
+    were deleted.
+    """
+    version = state["delta_version"]
+    deltas_dir = os.path.join(output_dir, "deltas")
+    os.makedirs(deltas_dir, exist_ok=True)
+    path = os.path.join(deltas_dir, f"delta-{version}.json")
+    document = {"version": version, "previous_version": version - 1,
+                "generated_at": generated_at, "tables": delta}
+    if pruned_before is not None:
+        document["pruned"] = {"public_stations": {"fetched_at_before": pruned_before}}
+    atomic_file.write_json(path, document, separators=(",", ":"))
+    state["deltas"].append({"version": version, "name": os.path.basename(path),
+                            "rows": {t: len(r) for t, r in delta.items()}})
+    state["deltas"] = state["deltas"][-FRONTEND_DELTA_KEEP:]
+    return path
+
+
+def load_export_state():
+    """Hashes of the last published artifacts and the delta chain (EXPORT_STATE_JSON)."""
+    state = read_json(EXPORT_STATE_JSON)
+    if not isinstance(state, dict):
+        state = {}
+    state.setdefault("artifacts", {})
+    state.setdefault("delta_version", 0)
+    state.setdefault("deltas", [])
+    state.setdefault("unpublished_deltas", [])
+    return state
+
+
+def save_export_state(state):
+    """Persist the export state (committed with the data directory)."""
+    atomic_file.write_json(EXPORT_STATE_JSON, state, indent=2, sort_keys=True)
+
+
+def upload_unpublished_deltas(output_dir, state):
+    """Upload the deltas in state["unpublished_deltas"], keeping the ones that failed.
+
+    Deltas that left the retained chain are dropped. Returns True when
+    every retained delta is on R2.
+    """
+    retained = {d["name"] for d in state["deltas"]}
+    remaining = []
+    for name in state.get("unpublished_deltas", []):
+        path = os.path.join(output_dir, "deltas", name)
+        if name not in retained or not os.path.exists(path):
+            continue
+        if not upload_to_r2(path, f"deltas/{name}"):
+            remaining.append(name)
+    state["unpublished_deltas"] = remaining
+    return not remaining
+
+
+def publish_delta_index(output_dir, state):
+    """Write deltas/index.json (current version plus the retained deltas) and upload it.
+
+    A client holding frontend.db at delta_version N applies every listed
+    delta with version > N in order; when N is older than the first listed
+    delta's previous_version it downloads frontend.db.gz again.
+
+    Deltas whose upload failed are retried first. The index only goes up
+    once every delta it lists is on R2, and whenever its hash differs from
+    the one recorded in state["artifacts"], so a failed index upload is
+    retried by the next run even if the local file did not change.
+    """
+    index = {"version": state["delta_version"], "deltas": state["deltas"]}
+    index_path = os.path.join(output_dir, "deltas", "index.json")
+    if not _json_unchanged(index_path, index):
+        atomic_file.write_json(index_path, index, separators=(",", ":"))
+    if not upload_unpublished_deltas(output_dir, state):
+        print(f"  {len(state['unpublished_deltas'])} delta(s) not uploaded, keeping the published index")
+        return
+    index_hash = _content_hash(index)
+    published = state["artifacts"]
+    if published.get("deltas/index.json") != index_hash and upload_to_r2(index_path, "deltas/index.json"):
+        published["deltas/index.json"] = index_hash
+
+
+def load_export_dictionary(output_dir, state):
+    """The zstd dictionary for small JSON artifacts, retrained when stale.
+
+    Trained on the newest EXPORT_DICTIONARY_SAMPLES delta and per-date
+    validation files and kept at EXPORT_DICTIONARY_PATH; the export state
+    records when, so it is retrained every EXPORT_DICTIONARY_MAX_AGE_DAYS.
+    Returns None when zstd is not installed and no dictionary could be
+    trained.
+    """
+    if not compression.available("zstd"):
+        return None
+    now = datetime.now(timezone.utc)
+    existing = None
+    if os.path.exists(EXPORT_DICTIONARY_PATH):
+        with open(EXPORT_DICTIONARY_PATH, "rb") as f:
+            existing = f.read()
+        cutoff = (now - timedelta(days=EXPORT_DICTIONARY_MAX_AGE_DAYS)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        if state.get("dictionary_trained_at", "") >= cutoff:
+            return existing
+
+    paths = glob.glob(os.path.join(output_dir, "deltas", "delta-*.json"))
+    paths += glob.glob(os.path.join(VALIDATION_DIR, "*.json"))
+    paths = sorted(paths, key=os.path.getmtime, reverse=True)[:EXPORT_DICTIONARY_SAMPLES]
+    samples = []
+    for path in paths:
+        with open(path, "rb") as f:
+            samples.append(f.read())
+    dictionary = compression.train_dictionary(samples)
+    if dictionary is None:
+        return existing
+    atomic_file.write_bytes(EXPORT_DICTIONARY_PATH, dictionary)
+    state["dictionary_trained_at"] = now.strftime("%Y-%m-%dT%H:%M:%SZ")
+    print(f"  Trained zstd dictionary on {len(samples)} exports ({len(dictionary)} bytes)")
+    return dictionary
+
+
+def _frontend_db_variants(output_dir, codecs):
+    """Describe frontend.db.gz and write the other codecs' variants of frontend.db.
+
+    A variant is recompressed only when it is older than frontend.db.
+    Returns one {codec, name, level, bytes, sha256} entry per codec, for
+    the data-index.json manifest.
+    """
+    work_db = os.path.join(output_dir, "frontend.db")
+    entries = []
+    for codec in codecs:
+        if codec == "gzip":
+            name, level = "frontend.db.gz", FRONTEND_DB_GZIP_LEVEL
+        else:
+            name, level = "frontend.db" + compression.CODECS[codec]["suffix"], compression.CODECS[codec]["level"]
+            path = os.path.join(output_dir, name)
+            if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(work_db):
+                compression.compress_file(codec, work_db, path, level)
+        path = os.path.join(output_dir, name)
+        entries.append({"codec": codec, "name": name, "level": level,
+                        "bytes": os.path.getsize(path), "sha256": _file_sha256(path)})
+    return entries
+
+
+def _compress_delta(delta_path, dictionary):
+    """Write delta-N.json.zst with the export dictionary.
+
+    Returns (compressed path, dictionary object key, encodings entry for the
+    delta's index entry).
+    """
+    dictionary_key = f"dicts/export-{compression.dictionary_id(dictionary)}.zdict"
+    zst_path = delta_path + compression.CODECS["zstd"]["suffix"]
+    compression.compress_file("zstd", delta_path, zst_path, dictionary=dictionary)
+    encodings = {"zstd": {"name": os.path.basename(zst_path), "dictionary": dictionary_key}}
+    return zst_path, dictionary_key, encodings
+
+
+def _content_hash(data):
+    """sha256 of a JSON artifact, ignoring the timestamps that change every run."""
+    if isinstance(data, dict):
+        data = {k: v for k, v in data.items() if k not in VOLATILE_EXPORT_KEYS}
+    return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def _json_unchanged(path, data):
+    """True when path already holds data, apart from its volatile timestamps."""
+    existing = read_json(path)
+    return existing is not None and _content_hash(existing) == _content_hash(data)
+
+
+def _month_start(month):
+    return datetime.strptime(month, "%Y-%m").replace(tzinfo=timezone.utc)
+
+
+def _next_month(month):
+    start = _month_start(month)
+    return (start + timedelta(days=32)).replace(day=1).strftime("%Y-%m")
+
+
+def _shard_coverage(conn):
+    """Oldest row of each table in its shard source, as "%Y-%m-%dT%H:%M:%SZ" (None if empty).
+
+    public_stations is read from the columnar archive (a year of history)
+    when it has any day, since weather.db keeps only 30 days of it. Readings
+    are rebuilt from the raw archive on every run; predictions and
+    prediction_history live only in weather.db.
+    """
+    coverage = {}
+    for table, column in FRONTEND_SHARD_COLUMNS.items():
+        if table == "public_stations" and station_archive.days(STATION_ARCHIVE_DIR):
+            coverage[table] = f"{station_archive.days(STATION_ARCHIVE_DIR)[0]}T00:00:00Z"
+            continue
+        try:
+            value = conn.execute(f"SELECT MIN({column}) FROM {table}").fetchone()[0]
+        except sqlite3.OperationalError:
+            value = None
+        if value is not None and table == "readings":
+            value = datetime.fromtimestamp(value, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        coverage[table] = value
+    return coverage
+
+
+def _month_complete(month, coverage, first_seen):
+    """True when no table's source has lost rows of month.
+
+    first_seen holds the oldest row each table ever had (kept in the shard
+    manifest); rows from there up to the source's current oldest row were
+    lost, e.g. when weather.db was not restored from the Actions cache.
+    """
+    start = f"{month}-01T00:00:00Z"
+    end = f"{_next_month(month)}-01T00:00:00Z"
+    for table, seen in first_seen.items():
+        oldest = coverage.get(table)
+        if seen is None or (oldest is not None and oldest <= seen):
+            continue
+        # Rows in [seen, oldest) are gone; an empty source lost everything from seen on
+        if end > seen and (oldest is None or start < oldest):
+            return False
+    return True
+
+
+def _source_months(coverage):
+    """Months ("YYYY-MM") from the oldest source row up to the current month."""
+    oldest = [value[:7] for value in coverage.values() if value is not None]
+    current = datetime.now(timezone.utc).strftime("%Y-%m")
+    month = min(oldest) if oldest else current
+    months = []
+    while month <= current:
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def _shard_filter(table, start, end):
+    """WHERE clause and params selecting a table's rows in [start, end) (end None = open)."""
+    column = FRONTEND_SHARD_COLUMNS[table]
+    bounds = [_month_start(m) for m in (start, end) if m]
+    if table == "readings":
+        params = [int(b.timestamp()) for b in bounds]
+    else:
+        params = [b.strftime("%Y-%m-%dT%H:%M:%SZ") for b in bounds]
+    where = f"s.{column} >= ?" + (f" AND s.{column} < ?" if end else "")
+    return where, params
 
+
+def _write_shard(shards_dir, name, start, end):
+    """Build one gzipped shard DB holding the rows from month start up to month end.
+
+    Returns its manifest entry (without the sealed flag).
+    """
+    tmp_db = os.path.join(shards_dir, f"_{name}.tmp.db")
+    out_path = os.path.join(shards_dir, name)
+    if os.path.exists(tmp_db):
+        os.unlink(tmp_db)
     try:
         conn = sqlite3.connect(tmp_db)
-        conn.execute("PRAGMA journal_mode=WAL")
-
-        # Attach the source database
-        conn.execute(f"ATTACH DATABASE ? AS source", (DB_PATH,))
-
-        # Create and populate tables
-        conn.executescript("""
-            CREATE TABLE readings (
-                timestamp INTEGER PRIMARY KEY,
-                date TEXT NOT NULL,
-                hour INTEGER NOT NULL,
-                temp_indoor REAL,
-                co2 INTEGER,
-                humidity_indoor INTEGER,
-                noise INTEGER,
-                pressure REAL,
-                pressure_absolute REAL,
-                temp_indoor_min REAL,
-                temp_indoor_max REAL,
-                date_min_temp_indoor INTEGER,
-                date_max_temp_indoor INTEGER,
-                temp_trend TEXT,
-                pressure_trend TEXT,
-                wifi_status INTEGER,
-                temp_outdoor REAL,
-                humidity_outdoor INTEGER,
-                temp_outdoor_min REAL,
-                temp_outdoor_max REAL,
-                date_min_temp_outdoor INTEGER,
-                date_max_temp_outdoor INTEGER,
-                temp_outdoor_trend TEXT,
-                battery_percent INTEGER,
-                rf_status INTEGER,
-                battery_vp INTEGER
-            );
-
-            CREATE TABLE predictions (
-                id INTEGER PRIMARY KEY,
-                generated_at TEXT NOT NULL,
-                model_type TEXT NOT NULL,
-                model_version INTEGER,
-                for_hour TEXT NOT NULL,
-                temp_indoor_predicted REAL,
-                temp_outdoor_predicted REAL,
-                last_reading_ts INTEGER,
-                last_reading_temp_indoor REAL,
-                last_reading_temp_outdoor REAL
-            );
-
-            CREATE TABLE prediction_history (
-                id INTEGER PRIMARY KEY,
-                predicted_at TEXT NOT NULL,
-                for_hour TEXT NOT NULL,
-                model_type TEXT NOT NULL,
-                model_version INTEGER,
-                predicted_indoor REAL,
-                predicted_outdoor REAL,
-                actual_indoor REAL,
-                actual_outdoor REAL,
-                error_indoor REAL,
-                error_outdoor REAL
-            );
-
-            CREATE TABLE public_stations (
-                id INTEGER PRIMARY KEY,
-                fetched_at TEXT NOT NULL,
-                station_id TEXT NOT NULL,
-                lat REAL,
-                lon REAL,
-                temperature REAL,
-                humidity INTEGER,
-                pressure REAL,
-                rain_60min REAL,
-                rain_24h REAL,
-                wind_strength INTEGER,
-                wind_angle INTEGER,
-                gust_strength INTEGER,
-                gust_angle INTEGER
-            );
-
-            CREATE TABLE _metadata (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL
-            );
-        """)
-
-        # Copy data from source database
-        conn.execute("INSERT INTO readings SELECT * FROM source.readings")
-        conn.execute("INSERT INTO predictions SELECT * FROM source.predictions")
-        conn.execute("INSERT INTO prediction_history SELECT * FROM source.prediction_history")
-        conn.execute("INSERT INTO public_stations SELECT * FROM source.public_stations")
-
-        # Add metadata
+        conn.execute("ATTACH DATABASE ? AS source", (DB_PATH,))
+        conn.executescript(FRONTEND_DB_SCHEMA_SQL)
+        rows = {}
+        for table in FRONTEND_SHARD_COLUMNS:
+            if table == "public_stations" and station_archive.days(STATION_ARCHIVE_DIR):
+                bounds = [int(_month_start(m).timestamp()) if m else None for m in (start, end)]
+                archived = station_archive.rows(STATION_ARCHIVE_DIR, *bounds)
+                conn.executemany(
+                    f"INSERT INTO public_stations ({', '.join(station_archive.ROW_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in station_archive.ROW_COLUMNS)})", archived)
+                rows[table] = len(archived)
+                continue
+            where, params = _shard_filter(table, start, end)
+            rows[table] = _copy_source_table(conn, table, where, params)
         generated_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-        conn.execute("INSERT INTO _metadata VALUES ('schema_version', '1')", )
-        conn.execute("INSERT INTO _metadata VALUES ('generated_at', ?)", (generated_at,))
-
-        # Add indexes for common query patterns
-        conn.executescript("""
-            CREATE INDEX idx_readings_timestamp ON readings(timestamp);
-            CREATE INDEX idx_readings_date ON readings(date);
-            CREATE INDEX idx_predictions_model_ts ON predictions(model_type, for_hour);
-            CREATE INDEX idx_pred_hist_hour_model ON prediction_history(for_hour, model_type);
-            CREATE INDEX idx_pub_stations_fetched ON public_stations(fetched_at, station_id);
-        """)
-
+        conn.executemany("INSERT INTO _metadata VALUES (?, ?)", [
+            ("schema_version", "1"), ("generated_at", generated_at),
+            ("shard_start", f"{start}-01"), ("shard_end", f"{end}-01" if end else "")])
+        conn.executescript(FRONTEND_DB_INDEXES_SQL)
+        conn.commit()
         conn.execute("DETACH DATABASE source")
         conn.execute("VACUUM")
-        conn.commit()
         conn.close()
 
-        # Gzip compress
-        with open(tmp_db, "rb") as f_in:
-            with gzip.open(db_output, "wb", compresslevel=9) as f_out:
-                shutil.copyfileobj(f_in, f_out)
-
-        print(f"Frontend database exported: {db_output} "
-              f"({os.path.getsize(db_output)} bytes compressed)")
-
+        _gzip_file(tmp_db, out_path)
     finally:
         if os.path.exists(tmp_db):
             os.unlink(tmp_db)
 
+    return {
+        "name": name,
+        "start": f"{start}-01",
+        "end": f"{end}-01" if end else None,
+        "rows": rows,
+        "bytes": os.path.getsize(out_path),
+        "sha256": _file_sha256(out_path),
+    }
+
+
+def build_frontend_shards(output_dir):
+    """Split the frontend DB into monthly shards plus a "current" shard.
+
+    Sealed months are built and uploaded once as shards/frontend-YYYY-MM.db.gz
+    with an immutable Cache-Control; the current shard holds the months from
+    FRONTEND_SHARD_SEAL_DAYS ago on and is rebuilt each run. A closed month
+    is sealed only while its source is complete (see _month_complete);
+    otherwise it is listed under "incomplete", published as an unsealed
+    monthly shard without the immutable Cache-Control and checked again on
+    later runs. A closed month whose upload failed is folded into the current
+    shard until a later run seals it, so every month with rows is in exactly
+    one shard. FRONTEND_SHARDS_JSON (committed) lists each
+    shard's range, row counts, size and sha256, plus the oldest row each
+    table ever had ("first_seen"), and is uploaded as frontend-shards.json.
+    Returns the manifest, or None without a database.
+    """
+    if not os.path.exists(DB_PATH):
+        print("  Frontend shards: no database, skipping")
+        return None
+
+    shards_dir = os.path.join(output_dir, "shards")
+    os.makedirs(shards_dir, exist_ok=True)
+    previous = read_json(FRONTEND_SHARDS_JSON) or {}
+    sealed = {s["start"][:7]: s for s in previous.get("shards", []) if s.get("sealed")}
+
+    now = datetime.now(timezone.utc)
+    seal_start = (now - timedelta(days=FRONTEND_SHARD_SEAL_DAYS)).strftime("%Y-%m")
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        coverage = _shard_coverage(conn)
+    finally:
+        conn.close()
+    first_seen = dict(previous.get("first_seen", {}))
+    for table, oldest in coverage.items():
+        if oldest is not None and (first_seen.get(table) is None or oldest < first_seen[table]):
+            first_seen[table] = oldest
+
+    new_shards = 0
+    incomplete = []
+    unsealed = {}
+    current_start = seal_start
+    for month in _source_months(coverage):
+        if month >= seal_start or month in sealed:
+            continue
+        complete = _month_complete(month, coverage, first_seen)
+        if not complete:
+            incomplete.append(month)
+        name = f"frontend-{month}.db.gz"
+        entry = _write_shard(shards_dir, name, month, _next_month(month))
+        if not any(entry["rows"].values()):
+            os.unlink(os.path.join(shards_dir, name))
+            continue
+        # A failed upload is retried next run; None means R2 is not configured
+        if upload_to_r2(os.path.join(shards_dir, name), f"shards/{name}",
+                        FRONTEND_SHARD_CACHE_CONTROL if complete else None) is False:
+            current_start = min(current_start, month)
+            continue
+        entry["sealed"] = complete
+        if complete:
+            sealed[month] = entry
+            new_shards += 1
+        else:
+            unsealed[month] = entry
+
+    current = _write_shard(shards_dir, "frontend-current.db.gz", current_start, None)
+    current["sealed"] = False
+    upload_to_r2(os.path.join(shards_dir, current["name"]), f"shards/{current['name']}")
+
+    manifest = {
+        "schema_version": 1,
+        "generated_at": now.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        # Months the current shard took over are left out, so no rows are listed twice
+        "shards": [s for m, s in sorted({**sealed, **unsealed}.items()) if m < current_start] + [current],
+        "first_seen": first_seen,
+        "incomplete": incomplete,
+    }
+    atomic_file.write_json(FRONTEND_SHARDS_JSON, manifest, indent=2)
+    upload_to_r2(FRONTEND_SHARDS_JSON, "frontend-shards.json")
+
+    print(f"  Frontend shards: {len(sealed)} sealed ({new_shards} new), "
+          f"{len(incomplete)} incomplete, current from {current['start']} ({current['bytes']} bytes)")
+    return manifest
+
+
+def load_model_accuracy(days=ACCURACY_WINDOW_DAYS):
+    """Per-model MAE/RMSE/bias over the last `days` days from the model_accuracy buckets.
+
+    Returns {model_type: {"sample_count", "temp_indoor", "temp_outdoor", "by_hour"}},
+    where by_hour holds the MAE per hour of day. Empty when there is no DB.
+    """
+    if not os.path.exists(DB_PATH):
+        return {}
+    since_day = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            totals = model_accuracy.summarize(conn, since_day, ("model_type",))
+            hourly = model_accuracy.summarize(conn, since_day, ("model_type", "hour_of_day"))
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return {}
+
+    def rounded(stats):
+        return {k: round(stats[k], 2) for k in ("mae", "rmse", "bias")}
+
+    accuracy = {}
+    for row in totals:
+        accuracy[row["model_type"]] = {
+            "sample_count": row["n"],
+            "temp_indoor": rounded(row["temp_indoor"]),
+            "temp_outdoor": rounded(row["temp_outdoor"]),
+            "by_hour": {},
+        }
+    for row in hourly:
+        accuracy[row["model_type"]]["by_hour"][str(row["hour_of_day"])] = {
+            "temp_indoor": round(row["temp_indoor"]["mae"], 2),
+            "temp_outdoor": round(row["temp_outdoor"]["mae"], 2),
+        }
+    return accuracy
+
 
 def load_feature_rankings():
     """Load feature rankings from all models that have Lasso output."""
@@ -789,7 +1749,8 @@ def load_feature_rankings():
     return rankings
 
 
-def export(output_path, hours, history_path=None):
+def export(output_path, hours, history_path=None, full_rebuild=False, codecs=EXPORT_CODECS,
+           repair_manifest=False):
     now = datetime.now(timezone.utc)
     result = {
         "generated_at": now.strftime("%Y-%m-%dT%H:%M:%SZ"),
@@ -800,20 +1761,25 @@ def export(output_path, hours, history_path=None):
         "history": [],
         "next_prediction": None,
         "feature_rankings": load_feature_rankings(),
+        "model_accuracy": load_model_accuracy(),
     }
 
-    # Scan backwards from current hour to find readings and build history
+    # Scan backwards from current hour to find readings and build history.
+    # weather.db answers the whole window in two queries; the raw JSON files
+    # are only walked hour by hour when it cannot.
+    window = _load_window_from_db(now, hours)
     current_found = False
     for i in range(hours):
         dt = now - timedelta(hours=i)
         date_str = dt.strftime("%Y-%m-%d")
         hour = dt.hour
-        weather_path = _find_latest_path_for_hour(os.path.join(DATA_DIR, date_str), hour)
-        if weather_path is None:
-            continue
-        weather = read_json(weather_path)
-
-        temps = extract_temps(weather)
+        if window is not None:
+            temps = window[0].get((date_str, hour))
+        else:
+            weather = _read_raw_for_hour(date_str, hour)
+            if weather is None:
+                continue
+            temps = extract_temps(weather)
         if temps is None:
             continue
 
@@ -851,11 +1817,16 @@ def export(output_path, hours, history_path=None):
                         "temp_outdoor": round(pred["temp_outdoor"], 1),
                     },
                 }
+                if pred.get("interval"):
+                    pred_entry["interval"] = pred["interval"]
                 result["predictions"].append(pred_entry)
 
-            # Backwards compat: next_prediction from first prediction (simple preferred)
+            # Backwards compat: next_prediction from the ensemble, else the first prediction
             if result["predictions"]:
-                first = result["predictions"][0]
+                first = next(
+                    (p for p in result["predictions"] if p["model_type"] == ENSEMBLE_MODEL_TYPE),
+                    result["predictions"][0],
+                )
                 result["next_prediction"] = {
                     "prediction_for": first["prediction_for"],
                     "temp_indoor": first["values"]["temp_indoor"],
@@ -866,7 +1837,12 @@ def export(output_path, hours, history_path=None):
 
         # Build history: find prediction FOR this hour (made at hour-1)
         if not history_path:
-            pred_data = get_prediction_for_hour(date_str, hour)
+            pred_data = None
+            if window is not None:
+                pred_data = window[1].get((dt - timedelta(hours=1)).strftime("%Y-%m-%dT%H"))
+            if pred_data is None:
+                # CI rebuilds weather.db each run, so older predictions may only be on disk
+                pred_data = get_prediction_for_hour(date_str, hour)
             if pred_data and "prediction" in pred_data:
                 pred = pred_data["prediction"]
                 entry = {
@@ -893,17 +1869,10 @@ def export(output_path, hours, history_path=None):
         if validated is not None:
             result["history"] = validated
 
-    # Write output atomically
+    # Write output atomically, unless only the timestamps changed
     os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
-    tmp_fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_path)), suffix='.json')
-    try:
-        with os.fdopen(tmp_fd, 'w') as f:
-            json.dump(result, f, indent=2)
-            f.write("\n")
-        os.replace(tmp_path, output_path)
-    except:
-        os.unlink(tmp_path)
-        raise
+    if not _json_unchanged(output_path, result):
+        atomic_file.write_json(output_path, result, indent=2)
 
     # Write public summary (no auth required)
     public_data = {
@@ -940,39 +1909,87 @@ def export(output_path, hours, history_path=None):
                 break
 
     public_path = os.path.join(os.path.dirname(output_path), 'weather-public.json')
-    fd, temp_path = tempfile.mkstemp(suffix='.json', dir=os.path.dirname(public_path))
-    try:
-        with os.fdopen(fd, 'w') as f:
-            json.dump(public_data, f)
-        os.replace(temp_path, public_path)
-    except:
-        os.unlink(temp_path)
-        raise
-
-    upload_to_r2(public_path, 'weather-public.json')
-    upload_to_r2(output_path, 'weather.json')
-
-    print(f"Exported weather dashboard data to {output_path}")
-    if result["current"]:
-        print(f"  Current: indoor {result['current']['readings']['temp_indoor']}°C, outdoor {result['current']['readings']['temp_outdoor']}°C")
-    print(f"  Predictions: {len(result['predictions'])} model(s)")
-    print(f"  History entries: {len(result['history'])}")
-
-    # Export supplementary data before generating manifest
-    export_public_stations()
-    export_validation_history()
-
-    manifest_dir = os.path.dirname(os.path.abspath(output_path))
-    generate_manifest(manifest_dir)
-    build_frontend_db(manifest_dir)
-
-    upload_to_r2(os.path.join(manifest_dir, 'frontend.db.gz'), 'frontend.db.gz')
-
+    if not _json_unchanged(public_path, public_data):
+        atomic_file.write_json(public_path, public_data)
+
+    # Upload only artifacts whose content differs from the last publish. The
+    # uploads run in the background while the remaining exports are built;
+    # a hash is recorded once its upload succeeded.
+    state = load_export_state()
+    published = state["artifacts"]
+    with ThreadPoolExecutor(max_workers=R2_UPLOAD_WORKERS) as uploads:
+        pending = []
+        public_hash = _content_hash(public_data)
+        if published.get('weather-public.json') != public_hash:
+            pending.append(('weather-public.json', public_hash,
+                            uploads.submit(lambda: upload_to_r2(public_path, 'weather-public.json'))))
+        weather_hash = _content_hash(result)
+        if published.get('weather.json') != weather_hash:
+            pending.append(('weather.json', weather_hash,
+                            uploads.submit(lambda: upload_to_r2(output_path, 'weather.json'))))
+
+        print(f"Exported weather dashboard data to {output_path}")
+        if result["current"]:
+            print(f"  Current: indoor {result['current']['readings']['temp_indoor']}°C, outdoor {result['current']['readings']['temp_outdoor']}°C")
+        print(f"  Predictions: {len(result['predictions'])} model(s)")
+        print(f"  History entries: {len(result['history'])}")
+
+        # Export supplementary data before generating manifest
+        export_public_stations()
+        export_validation_history()
+
+        manifest_dir = os.path.dirname(os.path.abspath(output_path))
+        codecs = ["gzip"] + [c for c in codecs if c != "gzip" and compression.available(c)]
+        delta_path = build_frontend_db(manifest_dir, full_rebuild, state)
+        frontend_db = _frontend_db_variants(manifest_dir, codecs)
+        generate_manifest(manifest_dir, frontend_db, repair_manifest)
+
+        db_gz = os.path.join(manifest_dir, 'frontend.db.gz')
+        db_hash = _file_sha256(db_gz)
+        if published.get('frontend.db.gz') != db_hash:
+            pending.append(('frontend.db.gz', db_hash,
+                            uploads.submit(lambda: upload_to_r2(db_gz, 'frontend.db.gz'))))
+        for variant in frontend_db[1:]:
+            if published.get(variant["name"]) != variant["sha256"]:
+                pending.append((variant["name"], variant["sha256"], uploads.submit(
+                    upload_to_r2, os.path.join(manifest_dir, variant["name"]), variant["name"])))
+        if delta_path:
+            # Uploaded with the index (publish_delta_index), retried until it is on R2
+            state["unpublished_deltas"].append(os.path.basename(delta_path))
+            dictionary = load_export_dictionary(manifest_dir, state) if "zstd" in codecs else None
+            if dictionary:
+                zst_path, dictionary_key, encodings = _compress_delta(delta_path, dictionary)
+                if published.get(dictionary_key) is None and upload_to_r2(
+                        EXPORT_DICTIONARY_PATH, dictionary_key, FRONTEND_SHARD_CACHE_CONTROL):
+                    published[dictionary_key] = compression.dictionary_id(dictionary)
+                # Listed only once both are up; clients fall back to the plain JSON
+                if published.get(dictionary_key) and upload_to_r2(
+                        zst_path, f"deltas/{os.path.basename(zst_path)}"):
+                    state["deltas"][-1]["encodings"] = encodings
+
+        for key, content_hash, upload in pending:
+            if upload.result():
+                published[key] = content_hash
+
+    # The index goes up after the delta it lists
+    publish_delta_index(manifest_dir, state)
+    save_export_state(state)
+    build_frontend_shards(manifest_dir)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Export weather dashboard data")
     parser.add_argument("--output", required=True, help="Output path for weather.json")
     parser.add_argument("--hours", type=int, default=24, help="Hours of history to scan (default: 24)")
     parser.add_argument("--history", help="Path to prediction-history.json for validated history")
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="Rebuild frontend.db from scratch instead of applying new rows")
+    parser.add_argument("--codecs", default=",".join(EXPORT_CODECS),
+                        help="Comma-separated codecs for frontend.db and deltas: gzip, zstd, br (default: gzip)")
+    parser.add_argument("--repair-manifest", action="store_true",
+                        help="Rebuild the manifest state by walking the data directories")
     args = parser.parse_args()
-    export(args.output, args.hours, args.history)
+    codecs = [c.strip() for c in args.codecs.split(",") if c.strip()]
+    for codec in codecs:
+        if not compression.available(codec):
+            print(f"WARNING: codec {codec} is not available, skipping it")
+    export(args.output, args.hours, args.history, args.full_rebuild, codecs, args.repair_manifest)
@@ -4,6 +4,13 @@
 Fetches recent workflow runs from the GitHub API and writes a summary
 JSON file for the frontend Workflow tab.
 
+Runs are cached in data/workflow-runs.json between invocations. The first
+page is requested with the cached ETag (If-None-Match); a 304 does not count
+against the API rate limit and leaves the cache as it is. Otherwise pages
+are followed only until they reach runs already cached, or runs older than
+what the cache has to cover, so --hours windows longer than one page of
+100 runs (about 33 hours at our cadence) are complete.
+
 Usage:
     GH_TOKEN=$(gh auth token) python export_workflow.py --output /tmp/workflow.json
     python export_workflow.py --output path/to/workflow.json --hours 72
@@ -12,20 +19,92 @@ Usage:
 import argparse
 import json
 import os
+import re
 import sys
 from datetime import datetime, timedelta, timezone
 from urllib.error import URLError
-from urllib.request import Request, urlopen
 
+import atomic_file
+import http_client
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.join(SCRIPT_DIR, "data", "workflow-runs.json")
+CACHE_VERSION = 1
+# The cache always covers at least this much history, whatever --hours asks for
+CACHE_KEEP_HOURS = 168
+MAX_PAGES = 20
+
+GITHUB_API = "https://api.github.com"
+RUN_FIELDS = ("id", "status", "conclusion", "event", "created_at", "updated_at", "html_url")
+NEXT_LINK_RE = re.compile(r'<([^>]+)>;\s*rel="next"')
+
+
+def load_cache(path, repo):
+    """The cached runs for repo, or an empty cache."""
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        cache = None
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION or cache.get("repo") != repo:
+        cache = {"version": CACHE_VERSION, "repo": repo, "etag": None, "covered_since": None, "runs": []}
+    return cache
+
+
+def save_cache(path, cache):
+    atomic_file.write_json(path, cache, indent=1)
+
+
+def fetch_runs(repo, token, hours=48, cache_path=CACHE_PATH):
+    """Workflow runs of the last `hours` (at least), through the local run cache.
+
+    Returns {"workflow_runs": [...]} like the API, newest first. Only the
+    RUN_FIELDS of each run are kept.
+    """
+    cache = load_cache(cache_path, repo)
+    now = datetime.now(timezone.utc)
+    need_since = (now - timedelta(hours=max(hours, CACHE_KEEP_HOURS))).strftime("%Y-%m-%dT%H:%M:%SZ")
+    headers = {"Authorization": f"Bearer {token}", "Accept": "application/vnd.github+json"}
+    covered = cache["covered_since"] is not None and cache["covered_since"] <= need_since
+
+    runs = {run["id"]: run for run in cache["runs"]}
+    url = f"{GITHUB_API}/repos/{repo}/actions/workflows/netatmo.yml/runs?per_page=100"
+    pages = 0
+    # Set once the pages walked back past need_since (or to the last page)
+    complete = False
+    while url and pages < MAX_PAGES:
+        page_headers = dict(headers)
+        if pages == 0 and covered and cache["etag"]:
+            page_headers["If-None-Match"] = cache["etag"]
+        status, resp_headers, body = http_client.request_full(
+            "GET", url, headers=page_headers, timeout=30, name="workflow runs", accept=(304,))
+        pages += 1
+        if status == 304:
+            print("Workflow runs: not modified since the last export (cached)")
+            break
+        if pages == 1:
+            cache["etag"] = resp_headers.get("ETag")
+
+        page = json.loads(body)["workflow_runs"]
+        # Runs already cached are still overwritten: their status may have changed
+        reached_cache = any(run["id"] in runs for run in page)
+        for run in page:
+            runs[run["id"]] = {field: run.get(field) for field in RUN_FIELDS}
+        match = NEXT_LINK_RE.search(resp_headers.get("Link") or "")
+        url = match.group(1) if match else None
+        if not page or url is None or min(run["created_at"] for run in page) < need_since:
+            complete = True
+            break
+        if reached_cache and covered:
+            break
 
-def fetch_runs(repo, token):
-    """Fetch workflow runs from GitHub API. Returns parsed JSON or None."""
-    url = f"https://api.github.com/repos/{repo}/actions/workflows/netatmo.yml/runs?per_page=100"
-    req = Request(url)
-    req.add_header("Authorization", f"Bearer {token}")
-    req.add_header("Accept", "application/vnd.github+json")
-    resp = urlopen(req, timeout=30)
-    return json.loads(resp.read().decode())
+    if complete:
+        cache["covered_since"] = need_since
+    cache["runs"] = sorted((r for r in runs.values() if r["created_at"] >= need_since),
+                           key=lambda r: r["created_at"], reverse=True)
+    save_cache(cache_path, cache)
+    print(f"Workflow runs: {len(cache['runs'])} cached, {pages} page(s) requested")
+    return {"workflow_runs": cache["runs"]}
 
 
 def parse_timestamp(ts):
@@ -39,7 +118,7 @@ def format_duration(seconds):
     return f"{m}m {s}s"
 
 
-def export(output_path, hours):
+def export(output_path, hours, cache_path=CACHE_PATH):
     now = datetime.now(timezone.utc)
     cutoff = now - timedelta(hours=hours)
     generated_at = now.strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -69,7 +148,7 @@ def export(output_path, hours):
         return
 
     try:
-        data = fetch_runs(repo, token)
+        data = fetch_runs(repo, token, hours, cache_path)
     except (URLError, OSError, json.JSONDecodeError, KeyError) as e:
         print(f"Warning: API call failed ({e}), writing minimal output")
         minimal = {
@@ -172,5 +251,6 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Export workflow run data")
     parser.add_argument("--output", required=True, help="Output path for workflow.json")
     parser.add_argument("--hours", type=int, default=48, help="Hours of history (default: 48)")
+    parser.add_argument("--cache", default=CACHE_PATH, help="Run cache path (default: data/workflow-runs.json)")
     args = parser.parse_args()
-    export(args.output, args.hours)
+    export(args.output, args.hours, args.cache)
@@ -8,14 +8,38 @@ import json
 import os
 import sqlite3
 import sys
-import urllib.request
-import urllib.error
+import threading
+import time
 import urllib.parse
-from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import http_client
+import manifest_state
+import raw_archive
+import retention
+import station_archive
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(SCRIPT_DIR, "data")
 DB_PATH = os.path.join(SCRIPT_DIR, "data", "weather.db")
+ARCHIVE_DIR = os.path.join(DATA_DIR, "public-stations-archive")
+RAW_DIR = os.path.join(DATA_DIR, "raw")
+
+# Concurrent API calls after the token refresh (station data + public data tiles)
+FETCH_WORKERS = 8
+
+# getpublicdata caps and thins the stations it returns for a large box, so
+# the box can be split into a ROWSxCOLS grid (NETATMO_PUBLIC_GRID, e.g.
+# "3x3") fetched tile by tile. PUBLIC_GRID_MAX keeps a run's calls (at most
+# 25 tiles) under Netatmo's 50 requests per 10 seconds; PUBLIC_TILE_RATE
+# spaces the tile requests so they do not all arrive at once.
+PUBLIC_GRID_ENV = "NETATMO_PUBLIC_GRID"
+PUBLIC_GRID_MAX = 5
+PUBLIC_TILE_RATE = 10.0
+
+_public_rate_lock = threading.Lock()
+_public_next_call = 0.0
 
 PUBLIC_STATIONS_TABLE_SQL = """CREATE TABLE IF NOT EXISTS public_stations (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -31,7 +55,8 @@ PUBLIC_STATIONS_TABLE_SQL = """CREATE TABLE IF NOT EXISTS public_stations (
     wind_strength INTEGER,
     wind_angle INTEGER,
     gust_strength INTEGER,
-    gust_angle INTEGER
+    gust_angle INTEGER,
+    fetched_epoch INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', fetched_at) AS INTEGER)) VIRTUAL
 )"""
 
 
@@ -82,30 +107,37 @@ def scrub_existing():
 
 def refresh_access_token(client_id, client_secret, refresh_token):
     """Exchange a refresh token for a new access + refresh token pair."""
-    data = urllib.parse.urlencode({
+    body = http_client.request_json("POST", "https://api.netatmo.com/oauth2/token", {
         "grant_type": "refresh_token",
         "client_id": client_id,
         "client_secret": client_secret,
         "refresh_token": refresh_token,
-    }).encode()
-
-    req = urllib.request.Request("https://api.netatmo.com/oauth2/token", data=data)
-    with urllib.request.urlopen(req) as resp:
-        body = json.loads(resp.read())
+    }, name="oauth2/token")
 
     return body["access_token"], body["refresh_token"]
 
 
 def get_stations_data(access_token):
     """Call getstationsdata and return the parsed JSON response."""
-    req = urllib.request.Request("https://api.netatmo.com/api/getstationsdata")
-    req.add_header("Authorization", f"Bearer {access_token}")
-    with urllib.request.urlopen(req) as resp:
-        return json.loads(resp.read())
+    return http_client.request_json("GET", "https://api.netatmo.com/api/getstationsdata",
+                                    headers={"Authorization": f"Bearer {access_token}"},
+                                    name="getstationsdata")
+
+
+def _throttle_public_calls():
+    """Block until this thread may start a getpublicdata call (PUBLIC_TILE_RATE per second)."""
+    global _public_next_call
+    with _public_rate_lock:
+        now = time.monotonic()
+        start = max(now, _public_next_call)
+        _public_next_call = start + 1.0 / PUBLIC_TILE_RATE
+    if start > now:
+        time.sleep(start - now)
 
 
 def get_public_data(access_token, lat_ne, lon_ne, lat_sw, lon_sw):
     """Fetch public station data within the bounding box from Netatmo API."""
+    _throttle_public_calls()
     params = urllib.parse.urlencode({
         "lat_ne": lat_ne,
         "lon_ne": lon_ne,
@@ -113,10 +145,60 @@ def get_public_data(access_token, lat_ne, lon_ne, lat_sw, lon_sw):
         "lon_sw": lon_sw,
     })
     url = f"https://api.netatmo.com/api/getpublicdata?{params}"
-    req = urllib.request.Request(url)
-    req.add_header("Authorization", f"Bearer {access_token}")
-    with urllib.request.urlopen(req) as resp:
-        return json.loads(resp.read())
+    return http_client.request_json("GET", url, headers={"Authorization": f"Bearer {access_token}"},
+                                    name="getpublicdata")
+
+
+def parse_grid(value):
+    """"ROWSxCOLS" (or a single N for NxN) as (rows, cols); (1, 1) when unset or invalid."""
+    if not value:
+        return 1, 1
+    try:
+        parts = [int(p) for p in value.lower().split("x")]
+    except ValueError:
+        parts = []
+    if len(parts) == 1:
+        parts *= 2
+    if len(parts) != 2 or not all(1 <= p <= PUBLIC_GRID_MAX for p in parts):
+        print(f"Warning: ignoring {PUBLIC_GRID_ENV}={value!r}, expected ROWSxCOLS up to "
+              f"{PUBLIC_GRID_MAX}x{PUBLIC_GRID_MAX}")
+        return 1, 1
+    return parts[0], parts[1]
+
+
+def public_tiles(lat_ne, lon_ne, lat_sw, lon_sw, rows=1, cols=1):
+    """Split the bounding box into rows x cols tiles of (lat_ne, lon_ne, lat_sw, lon_sw)."""
+    lat_ne, lon_ne, lat_sw, lon_sw = (float(v) for v in (lat_ne, lon_ne, lat_sw, lon_sw))
+    lat_step = (lat_ne - lat_sw) / rows
+    lon_step = (lon_ne - lon_sw) / cols
+    tiles = []
+    for r in range(rows):
+        for c in range(cols):
+            south, west = lat_sw + r * lat_step, lon_sw + c * lon_step
+            # The outer edges come from the box itself, not from accumulated steps
+            north = lat_ne if r == rows - 1 else south + lat_step
+            east = lon_ne if c == cols - 1 else west + lon_step
+            tiles.append((round(north, 6), round(east, 6), round(south, 6), round(west, 6)))
+    return tiles
+
+
+def merge_public_data(responses):
+    """Merge getpublicdata responses of several tiles, one entry per station _id.
+
+    A station on a shared tile edge is returned by both tiles; the first
+    copy is kept.
+    """
+    seen = set()
+    body = []
+    for response in responses:
+        for station in response.get("body", []):
+            station_id = station.get("_id")
+            if station_id is not None:
+                if station_id in seen:
+                    continue
+                seen.add(station_id)
+            body.append(station)
+    return {"status": "ok", "body": body}
 
 
 def store_public_stations(data, db_path, fetched_at):
@@ -124,6 +206,7 @@ def store_public_stations(data, db_path, fetched_at):
     conn = sqlite3.connect(db_path)
     conn.execute(PUBLIC_STATIONS_TABLE_SQL)
     conn.execute("CREATE INDEX IF NOT EXISTS idx_public_stations_time ON public_stations(fetched_at)")
+    retention.ensure_epoch_column(conn)
 
     count = 0
     rows_written = []
@@ -163,19 +246,17 @@ def store_public_stations(data, db_path, fetched_at):
                 gust_strength = module_data.get("gust_strength")
                 gust_angle = module_data.get("gust_angle")
 
-        conn.execute(
-            """INSERT INTO public_stations
-            (fetched_at, station_id, lat, lon, temperature, humidity, pressure,
-             rain_60min, rain_24h, wind_strength, wind_angle, gust_strength, gust_angle)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (fetched_at, station_id, lat, lon, temp, humidity, pressure,
-             rain_60min, rain_24h, wind_strength, wind_angle, gust_strength, gust_angle))
         rows_written.append((fetched_at, station_id, lat, lon, temp, humidity, pressure,
                              rain_60min, rain_24h, wind_strength, wind_angle, gust_strength, gust_angle))
         count += 1
 
-    # Clean up data older than 30 days
-    conn.execute("DELETE FROM public_stations WHERE fetched_at < datetime('now', '-30 days')")
+    # One statement for the whole (possibly multi-tile) fetch
+    conn.executemany(
+        """INSERT INTO public_stations
+        (fetched_at, station_id, lat, lon, temperature, humidity, pressure,
+         rain_60min, rain_24h, wind_strength, wind_angle, gust_strength, gust_angle)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        rows_written)
 
     # Also save as CSV for persistence across runs
     if count > 0:
@@ -195,16 +276,13 @@ def store_public_stations(data, db_path, fetched_at):
     conn.close()
     print(f"Stored {count} public station readings")
 
-    # Clean up CSV files older than 30 days
-    public_dir = os.path.join(DATA_DIR, "public-stations")
-    if os.path.isdir(public_dir):
-        cutoff = (datetime.now(timezone.utc) - timedelta(days=30)).strftime("%Y-%m-%d")
-        for dirname in os.listdir(public_dir):
-            if dirname < cutoff:
-                dir_path = os.path.join(public_dir, dirname)
-                if os.path.isdir(dir_path):
-                    import shutil
-                    shutil.rmtree(dir_path)
+    # Columnar archive, kept for ARCHIVE_KEEP_DAYS instead of 30 days
+    if rows_written:
+        station_archive.append(ARCHIVE_DIR, rows_written)
+
+    # Rows, CSV/JSON date directories and archive days past their retention;
+    # at most once an hour
+    retention.run(db_path, DATA_DIR)
 
 
 def main():
@@ -223,16 +301,35 @@ def main():
     with open("new_refresh_token.txt", "w") as f:
         f.write(new_refresh_token)
 
-    # --- Fetch weather data ---
-    print("Fetching station data...")
-    data = get_stations_data(access_token)
+    # --- Fetch station and public data concurrently ---
+    # Both only need the access token, so the fetch step takes as long as
+    # the slowest call rather than their sum; nothing is written until
+    # both have returned.
+    lat_ne = os.environ.get("NETATMO_PUBLIC_LAT_NE")
+    lon_ne = os.environ.get("NETATMO_PUBLIC_LON_NE")
+    lat_sw = os.environ.get("NETATMO_PUBLIC_LAT_SW")
+    lon_sw = os.environ.get("NETATMO_PUBLIC_LON_SW")
+    tiles = []
+    if all([lat_ne, lon_ne, lat_sw, lon_sw]):
+        tiles = public_tiles(lat_ne, lon_ne, lat_sw, lon_sw,
+                             *parse_grid(os.environ.get(PUBLIC_GRID_ENV)))
+
+    now = datetime.now(timezone.utc)
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        print("Fetching station data...")
+        stations_future = pool.submit(get_stations_data, access_token)
+        tile_futures = []
+        if tiles:
+            print(f"Fetching public station data ({len(tiles)} tile(s))...")
+            tile_futures = [pool.submit(get_public_data, access_token, *tile) for tile in tiles]
+    # Leaving the pool waited for both calls
+    data = stations_future.result()
     print("Station data received.")
 
     # --- Scrub PII before saving ---
     data = scrub_pii(data)
 
     # --- Save to the-snake-tank/data/{YYYY-MM-DD}/{HHMMSS}.json ---
-    now = datetime.now(timezone.utc)
     date_dir = now.strftime("%Y-%m-%d")
     filename = now.strftime("%H%M%S") + ".json"
 
@@ -244,18 +341,27 @@ def main():
         json.dump(data, f, indent=2)
         f.write("\n")
 
+    manifest_state.record(DATA_DIR, [("readings", date_dir, now.strftime("%H%M%S"), None)])
     print(f"Saved weather data to {out_path}")
 
-    # --- Fetch public station data (optional) ---
-    lat_ne = os.environ.get("NETATMO_PUBLIC_LAT_NE")
-    lon_ne = os.environ.get("NETATMO_PUBLIC_LON_NE")
-    lat_sw = os.environ.get("NETATMO_PUBLIC_LAT_SW")
-    lon_sw = os.environ.get("NETATMO_PUBLIC_LON_SW")
+    # The loose file is the browse copy, deleted after 7 days; the raw
+    # archive keeps the history weather.db is rebuilt from
+    raw_archive.append(RAW_DIR, date_dir, now.strftime("%H%M%S"), data)
 
-    if all([lat_ne, lon_ne, lat_sw, lon_sw]):
+    # --- Store public station data (optional) ---
+    if tile_futures:
         try:
-            print("Fetching public station data...")
-            public_data = get_public_data(access_token, lat_ne, lon_ne, lat_sw, lon_sw)
+            responses, errors = [], []
+            for tile, future in zip(tiles, tile_futures):
+                try:
+                    responses.append(future.result())
+                except Exception as e:
+                    errors.append(e)
+                    if len(tiles) > 1:
+                        print(f"Warning: public data tile {tile} failed: {e}")
+            if not responses:
+                raise errors[0]
+            public_data = merge_public_data(responses)
             fetched_at = now.strftime("%Y-%m-%dT%H:%M:%SZ")
             store_public_stations(public_data, DB_PATH, fetched_at)
         except Exception as e:
@@ -263,6 +369,9 @@ def main():
     else:
         print("Public station fetch skipped — bounding box not configured")
 
+    print("HTTP:")
+    print(http_client.format_metrics())
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Fetch Netatmo weather data")
@@ -0,0 +1,175 @@
+"""Append-only storage for the validated prediction history.
+
+The history lives in two places next to each other:
+
+    data/prediction-history.json          compacted snapshot (JSON list, as before)
+    data/prediction-history/YYYY-MM-DD.jsonl
+                                          append-only segments, one per for_hour date
+
+Validations append one compact JSON line per entry to the segment of their
+date, so a run writes O(new entries) bytes instead of rewriting the whole
+history. compact() folds finished segments into the snapshot and deletes
+them; readers merge the snapshot with the segments that are still open.
+The prediction_history table in weather.db stays the dedup index.
+
+The dates an append touched, and the dates whose entries compact() trimmed,
+are kept in prediction-history/.pending.json until the exporter has
+rewritten their per-date validation files (see pending()).
+"""
+
+import json
+import os
+from collections import defaultdict
+
+import atomic_file
+
+SEGMENT_SUFFIX = ".jsonl"
+PENDING_NAME = ".pending.json"
+
+
+def segment_dir(history_path):
+    """Directory holding the segments of a history snapshot path."""
+    return os.path.splitext(os.path.abspath(history_path))[0]
+
+
+def _entry_key(entry):
+    return (entry.get("model_type", "simple"), entry.get("for_hour", ""))
+
+
+def _read_snapshot(history_path):
+    try:
+        with open(history_path) as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except (OSError, json.JSONDecodeError, ValueError):
+        return []
+
+
+def _segment_files(history_path):
+    directory = segment_dir(history_path)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX))
+
+
+def _pending_path(history_path):
+    return os.path.join(segment_dir(history_path), PENDING_NAME)
+
+
+def pending(history_path):
+    """Dates changed since the last clear_pending(): (dates, trimmed), both sets.
+
+    trimmed is the subset whose entries compact() dropped; those dates can
+    only be rebuilt from the snapshot.
+    """
+    try:
+        with open(_pending_path(history_path)) as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError, ValueError):
+        return set(), set()
+    if not isinstance(data, dict):
+        return set(), set()
+    trimmed = set(data.get("trimmed", []))
+    return set(data.get("dates", [])) | trimmed, trimmed
+
+
+def _add_pending(history_path, dates, trimmed=()):
+    if not dates and not trimmed:
+        return
+    current, current_trimmed = pending(history_path)
+    atomic_file.write_json(_pending_path(history_path), {
+        "dates": sorted(current | set(dates)),
+        "trimmed": sorted(current_trimmed | set(trimmed)),
+    })
+
+
+def clear_pending(history_path, dates):
+    """Forget the given dates once their validation files are rewritten."""
+    current, trimmed = pending(history_path)
+    current -= set(dates)
+    if current:
+        atomic_file.write_json(_pending_path(history_path), {
+            "dates": sorted(current), "trimmed": sorted(trimmed & current)})
+    elif os.path.exists(_pending_path(history_path)):
+        os.unlink(_pending_path(history_path))
+
+
+def read_segments(history_path, dates=None):
+    """Entries from the open segments (optionally only the given dates)."""
+    entries = []
+    directory = segment_dir(history_path)
+    for name in _segment_files(history_path):
+        if dates is not None and name[:-len(SEGMENT_SUFFIX)] not in dates:
+            continue
+        with open(os.path.join(directory, name)) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn last line from an interrupted append
+                    continue
+    return entries
+
+
+def merge(snapshot, segment_entries):
+    """Combine snapshot and segment entries, one per (model_type, for_hour), newest first."""
+    by_key = {}
+    for entry in list(snapshot) + list(segment_entries):
+        by_key.setdefault(_entry_key(entry), entry)
+    return sorted(by_key.values(), key=lambda e: e.get("for_hour", ""), reverse=True)
+
+
+def read_history(history_path):
+    """Full history: snapshot plus open segments, newest first."""
+    return merge(_read_snapshot(history_path), read_segments(history_path))
+
+
+def append(history_path, entries):
+    """Append entries to their date segments. Returns the sorted list of dates touched."""
+    by_date = defaultdict(list)
+    for entry in entries:
+        for_hour = entry.get("for_hour", "")
+        if len(for_hour) >= 10:
+            by_date[for_hour[:10]].append(entry)
+
+    if not by_date:
+        return []
+    directory = segment_dir(history_path)
+    os.makedirs(directory, exist_ok=True)
+    for date_str, date_entries in by_date.items():
+        lines = "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in date_entries)
+        with open(os.path.join(directory, f"{date_str}{SEGMENT_SUFFIX}"), "a") as f:
+            f.write(lines)
+    _add_pending(history_path, by_date)
+    return sorted(by_date)
+
+
+def compact(history_path, trim, before_date=None):
+    """Fold segments into the snapshot and delete them.
+
+    trim(history) applies the retention policy to the merged list. Only
+    segments dated before before_date (YYYY-MM-DD) are folded, so the
+    snapshot is rewritten about once a day; with None every segment is folded.
+    Dates that lose entries to trim are recorded as pending.
+    Returns the number of segments folded.
+    """
+    names = [n for n in _segment_files(history_path)
+             if before_date is None or n[:-len(SEGMENT_SUFFIX)] < before_date]
+    if not names:
+        return 0
+
+    dates = {n[:-len(SEGMENT_SUFFIX)] for n in names}
+    merged = merge(_read_snapshot(history_path), read_segments(history_path, dates))
+    history = trim(merged)
+    kept = {_entry_key(e) for e in history}
+    trimmed = {e.get("for_hour", "")[:10] for e in merged if _entry_key(e) not in kept}
+
+    atomic_file.write_json(history_path, history, indent=2)
+    _add_pending(history_path, (), trimmed - {""})
+
+    for name in names:
+        os.unlink(os.path.join(segment_dir(history_path), name))
+    return len(names)
@@ -0,0 +1,236 @@
+"""Shared HTTP client for the Netatmo API calls.
+
+Stdlib only (http.client). What urllib.request.urlopen does not give us:
+
+- Keep-alive: idle connections are pooled per (scheme, host, port), up to
+  POOL_SIZE each, and reused by later requests from any thread. A pooled
+  connection the server has closed meanwhile is replaced transparently.
+- Timeouts: every request has one (DEFAULT_TIMEOUT seconds, per socket
+  operation), so a stalled response cannot hold up the 20-minute cycle.
+- Retries: connection errors, timeouts and RETRY_STATUSES are retried up
+  to `retries` times with full-jitter exponential backoff (BACKOFF_BASE *
+  2**attempt, capped at BACKOFF_MAX; a Retry-After header is honoured up to
+  the same cap). POST is not idempotent, so it is only retried when the
+  server cannot have acted on it: the connection failed, or the status is
+  429/502/503/504.
+- gzip: responses are requested with Accept-Encoding: gzip and decoded.
+- Metrics: latency, attempts and failures per request name (metrics()).
+
+Errors are raised as urllib.error.HTTPError (a status the caller has to
+handle) or OSError (the connection failed), like urlopen does.
+"""
+
+import gzip
+import http.client
+import io
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+
+DEFAULT_TIMEOUT = 20
+RETRIES = 3
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 20.0
+POOL_SIZE = 4
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Statuses that mean the server did not act on the request
+POST_RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+# Idle keep-alive connections per (scheme, host, port)
+_pools = {}
+_pools_lock = threading.Lock()
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _acquire(scheme, host, port, timeout):
+    """An idle pooled connection, or a new one. Returns (conn, reused)."""
+    with _pools_lock:
+        idle = _pools.get((scheme, host, port))
+        if idle:
+            conn = idle.pop()
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn, True
+    cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+    return cls(host, port, timeout=timeout), False
+
+
+def _release(scheme, host, port, conn):
+    """Return a connection to the pool (closed when the pool is full)."""
+    with _pools_lock:
+        idle = _pools.setdefault((scheme, host, port), [])
+        if len(idle) < POOL_SIZE:
+            idle.append(conn)
+            return
+    conn.close()
+
+
+def close_all():
+    """Close every pooled connection."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for idle in pools:
+        for conn in idle:
+            conn.close()
+
+
+def _record(name, elapsed, attempts, failed):
+    with _metrics_lock:
+        m = _metrics.setdefault(name, {"requests": 0, "attempts": 0, "failures": 0,
+                                       "total_ms": 0.0, "max_ms": 0.0})
+        m["requests"] += 1
+        m["attempts"] += attempts
+        m["failures"] += int(failed)
+        ms = elapsed * 1000
+        m["total_ms"] += ms
+        m["max_ms"] = max(m["max_ms"], ms)
+
+
+def metrics():
+    """Per request name: requests, attempts, failures, total_ms and max_ms (a copy)."""
+    with _metrics_lock:
+        return {name: dict(m) for name, m in _metrics.items()}
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def format_metrics():
+    """One line per request name, for the end-of-run log."""
+    lines = []
+    for name, m in sorted(metrics().items()):
+        avg = m["total_ms"] / m["requests"] if m["requests"] else 0.0
+        lines.append(f"  {name}: {m['requests']} request(s), {m['attempts']} attempt(s), "
+                     f"{m['failures']} failed, avg {avg:.0f} ms, max {m['max_ms']:.0f} ms")
+    return "\n".join(lines)
+
+
+def _backoff(attempt, retry_after=None):
+    """Seconds to wait before retry number attempt + 1."""
+    if retry_after is not None:
+        try:
+            return min(BACKOFF_MAX, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class _ConnectError(Exception):
+    """The connection could not be opened, so the request was never sent."""
+
+
+def _send(method, scheme, host, port, target, body, headers, timeout):
+    """One request/response exchange. Returns (status, reason, headers, body bytes).
+
+    A reused connection the server has closed meanwhile is dropped and the
+    request sent again on the next one; any other failure closes the
+    connection and propagates, wrapped in _ConnectError when it happened
+    while connecting.
+    """
+    while True:
+        conn, reused = _acquire(scheme, host, port, timeout)
+        if conn.sock is None:
+            try:
+                conn.connect()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                raise _ConnectError() from e
+        try:
+            conn.request(method, target, body=body, headers=headers)
+            resp = conn.getresponse()
+            data = resp.read()
+        except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+            conn.close()
+            if reused:
+                continue
+            raise
+        except BaseException:
+            conn.close()
+            raise
+        break
+
+    if resp.will_close:
+        conn.close()
+    else:
+        _release(scheme, host, port, conn)
+    if resp.getheader("Content-Encoding", "").lower() == "gzip":
+        data = gzip.decompress(data)
+    return resp.status, resp.reason, resp.headers, data
+
+
+def request(method, url, data=None, headers=None, timeout=DEFAULT_TIMEOUT,
+            retries=RETRIES, name=None):
+    """Send a request and return the response body (bytes, gzip decoded).
+
+    data is the request body (bytes). name keys the metrics (default: the
+    URL path). Raises urllib.error.HTTPError for a non-2xx status once the
+    retries are spent, OSError when no response came back.
+    """
+    return request_full(method, url, data, headers, timeout, retries, name)[2]
+
+
+def request_full(method, url, data=None, headers=None, timeout=DEFAULT_TIMEOUT,
+                 retries=RETRIES, name=None, accept=()):
+    """request(), returning (status, response headers, body).
+
+    Statuses in accept (e.g. 304 for a conditional request) are returned
+    like a 2xx instead of raised.
+    """
+    parts = urllib.parse.urlsplit(url)
+    target = parts.path or "/"
+    if parts.query:
+        target += "?" + parts.query
+    send_headers = {"Accept-Encoding": "gzip", "Connection": "keep-alive"}
+    send_headers.update(headers or {})
+    if data is not None and "Content-Type" not in send_headers:
+        send_headers["Content-Type"] = "application/x-www-form-urlencoded"
+    idempotent = method.upper() in IDEMPOTENT_METHODS
+    retry_statuses = RETRY_STATUSES if idempotent else POST_RETRY_STATUSES
+    name = name or parts.path
+
+    start = time.monotonic()
+    attempt = 0
+    while True:
+        retry_after = None
+        try:
+            status, reason, resp_headers, body = _send(
+                method, parts.scheme, parts.hostname, parts.port, target, data, send_headers, timeout)
+        except (_ConnectError, OSError, http.client.HTTPException) as e:
+            cause = e.__cause__ if isinstance(e, _ConnectError) else e
+            # A POST that may have reached the server is not sent again
+            if attempt >= retries or (not idempotent and not isinstance(e, _ConnectError)):
+                _record(name, time.monotonic() - start, attempt + 1, True)
+                raise cause
+            error = cause
+        else:
+            if 200 <= status < 300 or status in accept:
+                _record(name, time.monotonic() - start, attempt + 1, False)
+                return status, resp_headers, body
+            if attempt >= retries or status not in retry_statuses:
+                _record(name, time.monotonic() - start, attempt + 1, True)
+                raise urllib.error.HTTPError(url, status, reason, resp_headers, io.BytesIO(body))
+            error = f"HTTP {status}"
+            retry_after = resp_headers.get("Retry-After")
+
+        delay = _backoff(attempt, retry_after)
+        attempt += 1
+        print(f"  {name}: {error}; retry {attempt}/{retries} in {delay:.1f}s")
+        time.sleep(delay)
+
+
+def request_json(method, url, data=None, headers=None, **kwargs):
+    """request() and parse the body as JSON. data may be a dict (sent form-encoded)."""
+    if isinstance(data, dict):
+        data = urllib.parse.urlencode(data).encode()
+    return json.loads(request(method, url, data, headers, **kwargs))
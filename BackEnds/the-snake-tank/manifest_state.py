@@ -0,0 +1,205 @@
+"""Persisted index of the data files listed in data-index.json.
+
+The writers record each file as they create it:
+
+    fetch_weather.py    readings         data/YYYY-MM-DD/HHMMSS.json
+    predict.py          predictions      data/predictions/YYYY-MM-DD/HHMMSS_<model>.json
+    export_weather.py   public_stations  data/public-stations/YYYY-MM-DD/HHMMSS.json
+                        validation       data/validation/YYYY-MM-DD.json
+
+so generate_manifest() in export_weather.py builds data-index.json from
+data/manifest-state.json instead of listing every directory. scan() is the
+full directory walk; it rebuilds the state when the state is missing, older
+than REPAIR_HOURS, or on request (export_weather.py --repair-manifest). That
+also drops files the workflow's cleanup step deleted.
+
+State layout:
+
+    {"repaired_at": "...",
+     "readings": {date: [HHMMSS, ...]},
+     "predictions": {date: {HHMMSS: [model, ...]}},
+     "public_stations": {date: [HHMMSS, ...]},
+     "validation": [date, ...]}
+"""
+
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+import atomic_file
+
+STATE_FILE = "manifest-state.json"
+REPAIR_HOURS = 24
+
+DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+READING_RE = re.compile(r"^(\d{4,6})\.json$")
+PREDICTION_MODEL_RE = re.compile(r"^(\d{6})_([A-Za-z0-9]+)\.json$")
+PREDICTION_LEGACY_RE = re.compile(r"^(\d{4,6})\.json$")
+STATION_RE = re.compile(r"^(\d{6})\.json$")
+VALIDATION_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})\.json$")
+
+
+def state_path(data_dir):
+    return os.path.join(data_dir, STATE_FILE)
+
+
+def load(data_dir):
+    """The saved state, or None when there is none."""
+    try:
+        with open(state_path(data_dir)) as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return state if isinstance(state, dict) else None
+
+
+def save(data_dir, state):
+    """Write the state atomically."""
+    atomic_file.write_json(state_path(data_dir), state, indent=1, sort_keys=True)
+
+
+def needs_repair(state, now=None):
+    """True when the state is missing or its last full scan is older than REPAIR_HOURS."""
+    if not state or not state.get("repaired_at"):
+        return True
+    now = now or datetime.now(timezone.utc)
+    cutoff = (now - timedelta(hours=REPAIR_HOURS)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return state["repaired_at"] < cutoff
+
+
+def _add(state, category, date_str, hour=None, model=None):
+    if category == "validation":
+        if date_str not in state["validation"]:
+            state["validation"].append(date_str)
+    elif category == "predictions":
+        models = state["predictions"].setdefault(date_str, {}).setdefault(hour, [])
+        if model not in models:
+            models.append(model)
+            models.sort()
+    else:
+        hours = state[category].setdefault(date_str, [])
+        if hour not in hours:
+            hours.append(hour)
+            hours.sort()
+
+
+def record(data_dir, entries):
+    """Add files to the saved state.
+
+    entries are (category, date, hour, model) tuples; hour is the HHMMSS
+    file stem (None for validation), model only applies to predictions.
+    Without a saved state nothing is recorded: the next manifest run scans
+    the directories anyway.
+    """
+    entries = list(entries)
+    state = load(data_dir)
+    if state is None or not entries:
+        return
+    for category, date_str, hour, model in entries:
+        _add(state, category, date_str, hour, model)
+    save(data_dir, state)
+
+
+def forget(data_dir, category, dates):
+    """Drop whole dates of a category from the saved state (after deleting them)."""
+    state = load(data_dir)
+    if state is None:
+        return
+    for date_str in dates:
+        if category == "validation":
+            state["validation"] = [d for d in state["validation"] if d != date_str]
+        else:
+            state[category].pop(date_str, None)
+    save(data_dir, state)
+
+
+def _empty_state():
+    return {"readings": {}, "predictions": {}, "public_stations": {}, "validation": []}
+
+
+def _date_dirs(directory):
+    if not os.path.isdir(directory):
+        return []
+    return [d for d in os.listdir(directory)
+            if DATE_RE.match(d) and os.path.isdir(os.path.join(directory, d))]
+
+
+def _category_dirs(data_dir):
+    return {
+        "readings": data_dir,
+        "predictions": os.path.join(data_dir, "predictions"),
+        "public_stations": os.path.join(data_dir, "public-stations"),
+    }
+
+
+def _scan_date(state, category, directory, date_str):
+    """List one date directory of a category into state."""
+    full_path = os.path.join(directory, date_str)
+    for name in os.listdir(full_path):
+        if category == "predictions":
+            m = PREDICTION_MODEL_RE.match(name)
+            if m:
+                _add(state, category, date_str, m.group(1), m.group(2))
+                continue
+            m = PREDICTION_LEGACY_RE.match(name)
+            if m:
+                # Legacy files only name their model inside the JSON
+                try:
+                    with open(os.path.join(full_path, name)) as f:
+                        model = json.load(f).get("model_type", "simple")
+                except (OSError, json.JSONDecodeError, AttributeError):
+                    model = "simple"
+                _add(state, category, date_str, m.group(1), model)
+        else:
+            m = (READING_RE if category == "readings" else STATION_RE).match(name)
+            if m:
+                _add(state, category, date_str, m.group(1))
+
+
+def scan(data_dir, now=None):
+    """Rebuild the state by walking every data directory (repair mode)."""
+    now = now or datetime.now(timezone.utc)
+    state = _empty_state()
+
+    for category, directory in _category_dirs(data_dir).items():
+        for date_str in _date_dirs(directory):
+            _scan_date(state, category, directory, date_str)
+
+    validation_dir = os.path.join(data_dir, "validation")
+    if os.path.isdir(validation_dir):
+        for name in os.listdir(validation_dir):
+            m = VALIDATION_RE.match(name)
+            if m:
+                _add(state, "validation", m.group(1))
+
+    state["repaired_at"] = now.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return state
+
+
+def prune_missing_dates(data_dir, state):
+    """Drop what the age-based cleanup deleted since the files were recorded.
+
+    Dates whose directory is gone are dropped (one stat per date), and the
+    oldest remaining date of each category is listed again, since that is
+    the one the cleanup removes files from one by one. Returns True when
+    the state changed.
+    """
+    changed = False
+    for category, directory in _category_dirs(data_dir).items():
+        for date_str in list(state[category]):
+            if not os.path.isdir(os.path.join(directory, date_str)):
+                del state[category][date_str]
+                changed = True
+        if state[category]:
+            oldest = min(state[category])
+            before = state[category].pop(oldest)
+            _scan_date(state, category, directory, oldest)
+            if state[category].get(oldest) != before:
+                changed = True
+    validation_dir = os.path.join(data_dir, "validation")
+    kept = [d for d in state["validation"] if os.path.exists(os.path.join(validation_dir, f"{d}.json"))]
+    if len(kept) != len(state["validation"]):
+        state["validation"] = kept
+        changed = True
+    return changed
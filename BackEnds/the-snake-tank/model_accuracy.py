@@ -0,0 +1,122 @@
+"""Rolling accuracy aggregates for validated predictions.
+
+The model_accuracy table in weather.db keeps running sums per
+(model_type, model_version, hour_of_day, day) bucket:
+
+    n                         validated predictions in the bucket
+    sum_error_<target>        sum of (predicted - actual)     -> bias
+    sum_abs_error_<target>    sum of |predicted - actual|     -> MAE
+    sumsq_error_<target>      sum of (predicted - actual)^2   -> RMSE
+
+validate_prediction.py folds newly inserted prediction_history rows into
+the buckets, so consumers (ensemble weights, weather.json) read MAE, RMSE
+and bias in O(models x buckets) instead of rescanning the history. Every
+prediction targets the next hour, so the horizon is not a bucket key.
+"""
+
+import math
+
+TARGETS = {"temp_indoor": "indoor", "temp_outdoor": "outdoor"}
+GROUP_COLUMNS = ("model_type", "model_version", "hour_of_day", "day")
+
+MODEL_ACCURACY_TABLE_SQL = """CREATE TABLE IF NOT EXISTS model_accuracy (
+    model_type TEXT NOT NULL,
+    model_version INTEGER NOT NULL,
+    hour_of_day INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    sum_error_indoor REAL NOT NULL,
+    sum_abs_error_indoor REAL NOT NULL,
+    sumsq_error_indoor REAL NOT NULL,
+    sum_error_outdoor REAL NOT NULL,
+    sum_abs_error_outdoor REAL NOT NULL,
+    sumsq_error_outdoor REAL NOT NULL,
+    PRIMARY KEY (model_type, model_version, hour_of_day, day)
+)"""
+
+SUM_COLUMNS = [f"{kind}_{side}" for side in TARGETS.values()
+               for kind in ("sum_error", "sum_abs_error", "sumsq_error")]
+
+# Buckets for prediction_history rows with id > ?. Used both to maintain the
+# table and, as a derived table, when a DB has no model_accuracy table yet.
+BUCKETS_SQL = """SELECT model_type,
+       COALESCE(model_version, 0) AS model_version,
+       CAST(substr(for_hour, 12, 2) AS INTEGER) AS hour_of_day,
+       substr(for_hour, 1, 10) AS day,
+       COUNT(*) AS n,
+       SUM(predicted_indoor - actual_indoor) AS sum_error_indoor,
+       SUM(ABS(predicted_indoor - actual_indoor)) AS sum_abs_error_indoor,
+       SUM((predicted_indoor - actual_indoor) * (predicted_indoor - actual_indoor)) AS sumsq_error_indoor,
+       SUM(predicted_outdoor - actual_outdoor) AS sum_error_outdoor,
+       SUM(ABS(predicted_outdoor - actual_outdoor)) AS sum_abs_error_outdoor,
+       SUM((predicted_outdoor - actual_outdoor) * (predicted_outdoor - actual_outdoor)) AS sumsq_error_outdoor
+FROM prediction_history
+WHERE id > ?
+  AND predicted_indoor IS NOT NULL AND actual_indoor IS NOT NULL
+  AND predicted_outdoor IS NOT NULL AND actual_outdoor IS NOT NULL
+GROUP BY 1, 2, 3, 4"""
+
+
+def _table_exists(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'model_accuracy'").fetchone() is not None
+
+
+def accumulate(conn, after_id):
+    """Fold prediction_history rows with id > after_id into model_accuracy.
+
+    A DB that has no model_accuracy table yet is backfilled from its whole
+    history. The caller commits.
+    """
+    if not _table_exists(conn):
+        conn.execute(MODEL_ACCURACY_TABLE_SQL)
+        after_id = 0
+    updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in ["n"] + SUM_COLUMNS)
+    conn.execute(
+        f"""INSERT INTO model_accuracy ({", ".join(GROUP_COLUMNS)}, n, {", ".join(SUM_COLUMNS)})
+            {BUCKETS_SQL}
+            ON CONFLICT ({", ".join(GROUP_COLUMNS)}) DO UPDATE SET {updates}""",
+        (after_id,))
+
+
+def summarize(conn, since_day, group_by=("model_type",), model_types=None):
+    """MAE, RMSE and bias per group over the buckets from since_day (YYYY-MM-DD) on.
+
+    Returns a list of dicts holding the group_by columns, "n" and one
+    {"mae", "rmse", "bias", "mse"} dict per target. Falls back to bucketing
+    prediction_history on the fly when the DB has no model_accuracy table.
+    """
+    unknown = set(group_by) - set(GROUP_COLUMNS)
+    if unknown:
+        raise ValueError(f"cannot group model accuracy by {sorted(unknown)}")
+
+    source = "model_accuracy" if _table_exists(conn) else f"({BUCKETS_SQL})"
+    params = [] if source == "model_accuracy" else [0]
+    where = "day >= ?"
+    params.append(since_day)
+    if model_types:
+        where += f" AND model_type IN ({','.join('?' for _ in model_types)})"
+        params.extend(model_types)
+
+    keys = ", ".join(group_by)
+    sums = ", ".join(f"SUM({c})" for c in ["n"] + SUM_COLUMNS)
+    rows = conn.execute(
+        f"SELECT {keys}, {sums} FROM {source} WHERE {where} GROUP BY {keys} ORDER BY {keys}",
+        params).fetchall()
+
+    summary = []
+    for row in rows:
+        entry = dict(zip(group_by, row))
+        n = row[len(group_by)]
+        entry["n"] = n
+        sums_by_name = dict(zip(SUM_COLUMNS, row[len(group_by) + 1:]))
+        for target, side in TARGETS.items():
+            mse = sums_by_name[f"sumsq_error_{side}"] / n
+            entry[target] = {
+                "mae": sums_by_name[f"sum_abs_error_{side}"] / n,
+                "rmse": math.sqrt(mse),
+                "bias": sums_by_name[f"sum_error_{side}"] / n,
+                "mse": mse,
+            }
+        summary.append(entry)
+    return summary
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""Versioned model registry with content-addressed artifacts.
+
+Each model artifact (e.g. models/temp_predictor.joblib) gets a registry
+directory models/registry/<artifact name>/ holding:
+
+    objects/<sha256>.joblib   immutable, content-addressed model files
+    index.json                the "current" pointer, an optional "challenger"
+                              and the retained versions
+
+Publishing writes the object with a temp file + rename, then atomically
+swaps the fixed artifact path (a hard link to the object) and the index, so
+a concurrent predict.py never sees a half-written model. Promotion and
+rollback only rewrite the pointer. The last KEEP_VERSIONS versions are kept.
+
+A version published as a challenger is stored but not served: predict.py
+runs it in shadow next to the current (champion) version and
+validate_prediction.py promotes it once it has scored better, or rejects
+it. There is one challenger at a time; publish() refuses to replace one
+that is still being scored, so train_model.py skips retraining until it is
+promoted or rejected. Each version can carry the training metadata of its
+meta file, written out when the version is promoted.
+
+Usage:
+    python model_registry.py list temp_predictor      (* = current, c = challenger)
+    python model_registry.py rollback temp_predictor
+    python model_registry.py promote temp_predictor 12
+    python model_registry.py reject temp_predictor 13
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+import joblib
+
+import atomic_file
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(SCRIPT_DIR, "models")
+REGISTRY_DIRNAME = "registry"
+KEEP_VERSIONS = 5
+
+
+def registry_dir(artifact_path):
+    """Registry directory for an artifact, next to the artifact itself."""
+    name = os.path.splitext(os.path.basename(artifact_path))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(artifact_path)), REGISTRY_DIRNAME, name)
+
+
+def _index_path(artifact_path):
+    return os.path.join(registry_dir(artifact_path), "index.json")
+
+
+def _object_path(artifact_path, sha256):
+    return os.path.join(registry_dir(artifact_path), "objects", f"{sha256}.joblib")
+
+
+def read_index(artifact_path):
+    """Load the registry index.
+
+    Returns {"current": version or None, "challenger": version or None, "versions": [...]}.
+    """
+    try:
+        with open(_index_path(artifact_path)) as f:
+            index = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        index = {"current": None, "versions": []}
+    index.setdefault("challenger", None)
+    return index
+
+
+def _write_index(artifact_path, index):
+    atomic_file.write_json(_index_path(artifact_path), index, indent=2)
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _find_entry(index, version):
+    for entry in index["versions"]:
+        if entry["version"] == version:
+            return entry
+    return None
+
+
+def _link_artifact(artifact_path, object_path):
+    """Point the fixed artifact path at an object: hard link (or copy) + os.replace."""
+    directory = os.path.dirname(os.path.abspath(artifact_path))
+    tmp_path = os.path.join(directory, f".{os.path.basename(artifact_path)}.tmp")
+    if os.path.exists(tmp_path):
+        os.unlink(tmp_path)
+    try:
+        os.link(object_path, tmp_path)
+    except OSError:
+        shutil.copy2(object_path, tmp_path)
+    os.replace(tmp_path, artifact_path)
+
+
+def publish(model, artifact_path, version, keep=KEEP_VERSIONS, as_challenger=False, meta=None):
+    """Store a trained model as a new registry version and make it current.
+
+    Also refreshes the fixed artifact path so older readers keep working.
+    With as_challenger, the version becomes the challenger instead and the
+    current version keeps serving (unless there is no current version yet);
+    ValueError if another challenger is still under evaluation. meta is kept
+    with the version. Returns the sha256 of the stored artifact.
+    """
+    pending = challenger(artifact_path)
+    if as_challenger and pending not in (None, version):
+        raise ValueError(f"challenger v{pending} of {os.path.basename(artifact_path)} "
+                         "is still under evaluation")
+
+    objects_dir = os.path.join(registry_dir(artifact_path), "objects")
+    os.makedirs(objects_dir, exist_ok=True)
+
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=objects_dir, suffix=".tmp")
+    os.close(tmp_fd)
+    try:
+        joblib.dump(model, tmp_path)
+        sha256 = _file_sha256(tmp_path)
+        os.replace(tmp_path, _object_path(artifact_path, sha256))
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    index = read_index(artifact_path)
+    index["versions"] = [e for e in index["versions"] if e["version"] != version]
+    entry = {
+        "version": version,
+        "sha256": sha256,
+        "published_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+    if meta is not None:
+        entry["meta"] = meta
+    index["versions"].append(entry)
+    index["versions"].sort(key=lambda e: e["version"])
+
+    if as_challenger and index["current"] not in (None, version) \
+            and _find_entry(index, index["current"]) is not None:
+        index["challenger"] = version
+    else:
+        index["current"] = version
+        index["challenger"] = None
+        _link_artifact(artifact_path, _object_path(artifact_path, sha256))
+    _write_index(artifact_path, index)
+    _prune(artifact_path, index, keep)
+    return sha256
+
+
+def _prune(artifact_path, index, keep):
+    """Drop versions beyond the newest `keep` (never current or challenger) and their objects."""
+    retained = index["versions"][-keep:]
+    for pointer in ("current", "challenger"):
+        entry = _find_entry(index, index[pointer])
+        if entry is not None and entry not in retained:
+            retained.insert(0, entry)
+    retained.sort(key=lambda e: e["version"])
+    if len(retained) != len(index["versions"]):
+        index["versions"] = retained
+        _write_index(artifact_path, index)
+
+    referenced = {f"{e['sha256']}.joblib" for e in retained}
+    objects_dir = os.path.join(registry_dir(artifact_path), "objects")
+    for name in os.listdir(objects_dir):
+        if name not in referenced:
+            os.unlink(os.path.join(objects_dir, name))
+
+
+def resolve(artifact_path, version=None):
+    """Path and version to load for an artifact.
+
+    With a version, returns that retained version (ValueError if it is not in
+    the registry). Without one, follows the current pointer. Falls back to
+    (artifact_path, None) when the artifact has no registry yet.
+    """
+    index = read_index(artifact_path)
+    target = index["current"] if version is None else version
+    entry = _find_entry(index, target) if target is not None else None
+
+    if entry is None:
+        if version is not None:
+            raise ValueError(f"version {version} of {os.path.basename(artifact_path)} is not in the registry")
+        return artifact_path, None
+
+    object_path = _object_path(artifact_path, entry["sha256"])
+    if not os.path.exists(object_path):
+        if version is not None:
+            raise ValueError(f"artifact for version {version} is missing from the registry")
+        return artifact_path, None
+    return object_path, entry["version"]
+
+
+def promote(artifact_path, version):
+    """Make a retained version current. Only the pointer and the hard link change."""
+    index = read_index(artifact_path)
+    entry = _find_entry(index, version)
+    if entry is None:
+        raise ValueError(f"version {version} of {os.path.basename(artifact_path)} is not in the registry")
+    _link_artifact(artifact_path, _object_path(artifact_path, entry["sha256"]))
+    index["current"] = version
+    if index["challenger"] == version:
+        index["challenger"] = None
+    _write_index(artifact_path, index)
+    return entry
+
+
+def challenger(artifact_path):
+    """Version waiting in shadow for an artifact, or None."""
+    entry = challenger_entry(artifact_path)
+    return None if entry is None else entry["version"]
+
+
+def challenger_entry(artifact_path):
+    """Index entry (version, sha256, published_at, meta) of the challenger, or None."""
+    index = read_index(artifact_path)
+    if index["challenger"] is None:
+        return None
+    return _find_entry(index, index["challenger"])
+
+
+def reject(artifact_path, version):
+    """Drop the challenger pointer without promoting. The version is kept until pruned."""
+    index = read_index(artifact_path)
+    if index["challenger"] != version:
+        return False
+    index["challenger"] = None
+    _write_index(artifact_path, index)
+    return True
+
+
+def latest_version(artifact_path):
+    """Highest version in the registry (0 when there is none).
+
+    New versions are numbered after it, so a rejected challenger's number,
+    and the scores recorded for it, are never reused.
+    """
+    return max((e["version"] for e in read_index(artifact_path)["versions"]), default=0)
+
+
+def rollback(artifact_path):
+    """Move the current pointer to the previous retained version.
+
+    Returns the version now current, or None if there is nothing older.
+    """
+    index = read_index(artifact_path)
+    older = [e["version"] for e in index["versions"]
+             if index["current"] is not None and e["version"] < index["current"]]
+    if not older:
+        return None
+    promote(artifact_path, older[-1])
+    return older[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and move model registry pointers")
+    parser.add_argument("command", choices=["list", "rollback", "promote", "reject"])
+    parser.add_argument("artifact", help="Artifact name, e.g. temp_predictor or temp_predictor_gb")
+    parser.add_argument("version", nargs="?", type=int, help="Version for promote/reject")
+    args = parser.parse_args()
+
+    artifact_path = os.path.join(MODEL_DIR, f"{args.artifact}.joblib")
+
+    if args.command == "list":
+        index = read_index(artifact_path)
+        for entry in index["versions"]:
+            marker = "*" if entry["version"] == index["current"] else " "
+            if entry["version"] == index["challenger"]:
+                marker = "c"
+            print(f"{marker} v{entry['version']}  {entry['sha256'][:12]}  {entry['published_at']}")
+    elif args.command == "rollback":
+        version = rollback(artifact_path)
+        if version is None:
+            print("Nothing to roll back to")
+            sys.exit(1)
+        print(f"{args.artifact} rolled back to v{version}")
+    elif args.command == "reject":
+        if args.version is None:
+            parser.error("reject needs a version")
+        if not reject(artifact_path, args.version):
+            print(f"v{args.version} is not the challenger of {args.artifact}")
+            sys.exit(1)
+        print(f"{args.artifact} challenger v{args.version} rejected")
+    else:
+        if args.version is None:
+            parser.error("promote needs a version")
+        promote(artifact_path, args.version)
+        print(f"{args.artifact} v{args.version} is now current")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ Usage:
     python predict.py
     python predict.py --model-type simple --predictions-dir data/predictions
     python predict.py --model-type all --predictions-dir data/predictions
+    python predict.py --pin 24hrRaw=12 --predictions-dir data/predictions
+    python predict.py --rollback 24hr_pubRA_RC3_GB --predictions-dir data/predictions
 """
 
 import argparse
@@ -22,6 +24,11 @@ import joblib
 import numpy as np
 import pandas as pd
 
+import atomic_file
+import history_log
+import manifest_state
+import model_registry
+from ensemble import ENSEMBLE_MODEL_TYPE, blend
 from public_features import SPATIAL_COLS_FULL, SPATIAL_COLS_SIMPLE, SPATIAL_COLS_ENRICHED, add_spatial_columns
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -42,6 +49,21 @@ HISTORY_PATH = os.path.join(SCRIPT_DIR, "data", "prediction-history.json")
 GB_LOOKBACK = 24
 GB_MODEL_PATH = os.path.join(SCRIPT_DIR, "models", "temp_predictor_gb.joblib")
 GB_META_PATH = os.path.join(SCRIPT_DIR, "models", "gb_meta.json")
+GB_QUANTILE_MODEL_PATH = os.path.join(SCRIPT_DIR, "models", "temp_predictor_gb_quantiles.joblib")
+
+INTERVAL_QUANTILES = (0.1, 0.9)  # 80% prediction interval
+
+ENSEMBLE_WEIGHTS_PATH = os.path.join(SCRIPT_DIR, "models", "ensemble_weights.json")
+ENSEMBLE_META_PATH = os.path.join(SCRIPT_DIR, "models", "ensemble_meta.json")
+
+# Registry versions to load instead of the current one, model_type -> version (--pin)
+MODEL_PINS = {}
+# Challenger outputs of the current run, model_type -> (prediction, version, last_row, interval)
+SHADOW_OUTPUTS = {}
+# Quantile bundles loaded in the current run, resolved path -> {quantile: booster}
+QUANTILE_MODELS = {}
+# Flattened node arrays of the forests used in the current run, id(forest) -> (forest, nodes)
+FOREST_NODES = {}
 
 PREDICTIONS_TABLE_SQL = """CREATE TABLE IF NOT EXISTS predictions (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -53,9 +75,38 @@ PREDICTIONS_TABLE_SQL = """CREATE TABLE IF NOT EXISTS predictions (
     temp_outdoor_predicted REAL,
     last_reading_ts INTEGER,
     last_reading_temp_indoor REAL,
-    last_reading_temp_outdoor REAL
+    last_reading_temp_outdoor REAL,
+    temp_indoor_low REAL,
+    temp_indoor_high REAL,
+    temp_outdoor_low REAL,
+    temp_outdoor_high REAL,
+    is_shadow INTEGER NOT NULL DEFAULT 0,
+    generated_hour TEXT GENERATED ALWAYS AS (substr(generated_at, 1, 13)) VIRTUAL
 )"""
 
+# One row per model version and input: a re-run on the same last reading
+# conflicts instead of adding a row with a later generated_at. Shadow
+# (challenger) rows share the key with the champion apart from is_shadow.
+PREDICTIONS_UNIQUE_KEY = "model_type, model_version, for_hour, last_reading_ts, is_shadow"
+PREDICTIONS_UNIQUE_INDEX_SQL = f"""CREATE UNIQUE INDEX IF NOT EXISTS idx_predictions_run
+    ON predictions({PREDICTIONS_UNIQUE_KEY})"""
+
+# Covers the per-hour lookup in export_weather.py: seek to one generated hour,
+# skip shadow rows and rank each model's rows by generated_at from the index
+PREDICTIONS_HOUR_INDEX_SQL = """CREATE INDEX IF NOT EXISTS idx_predictions_generated_hour
+    ON predictions(generated_hour, is_shadow, model_type, generated_at DESC)"""
+
+# Columns added after the original predictions schema (migrated with ALTER TABLE)
+PREDICTIONS_ADDED_COLUMNS = [
+    ("temp_indoor_low", "REAL"),
+    ("temp_indoor_high", "REAL"),
+    ("temp_outdoor_low", "REAL"),
+    ("temp_outdoor_high", "REAL"),
+    ("is_shadow", "INTEGER NOT NULL DEFAULT 0"),
+    # "YYYY-MM-DDTHH" of generated_at, computed by SQLite
+    ("generated_hour", "TEXT GENERATED ALWAYS AS (substr(generated_at, 1, 13)) VIRTUAL"),
+]
+
 SIMPLE_FEATURE_COLS = [
     "temp_indoor", "temp_outdoor", "co2", "humidity_indoor",
     "humidity_outdoor", "noise", "pressure",
@@ -122,15 +173,165 @@ def read_gb_meta():
         return {"version": 0}
 
 
+def read_ensemble_meta():
+    """Read ensemble metadata, returning defaults if not found."""
+    try:
+        with open(ENSEMBLE_META_PATH) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"version": 0}
+
+
+def _model_artifacts(model_type):
+    """Registry artifacts that make up a model type."""
+    return {
+        "24hrRaw": [MODEL_PATH],
+        "3hrRaw": [SIMPLE_MODEL_PATH],
+        "6hrRC": [RC_MODEL_PATH],
+        "24hr_pubRA_RC3_GB": [GB_MODEL_PATH, GB_QUANTILE_MODEL_PATH],
+    }.get(model_type, [])
+
+
+def _resolve_artifact(artifact_path, model_type, meta_version):
+    """Path and version to load for a model artifact.
+
+    Follows the registry's current pointer, or the version pinned for the
+    model type. Models trained before the registry load from the fixed path
+    with the version from their meta file.
+    """
+    path, version = model_registry.resolve(artifact_path, MODEL_PINS.get(model_type))
+    return path, meta_version if version is None else version
+
+
+def rollback_model(model_type):
+    """Point every artifact of a model type at its previous registry version.
+
+    Returns the version now current, or None if there is nothing to roll back to.
+    """
+    artifacts = _model_artifacts(model_type)
+    if not artifacts:
+        return None
+    version = model_registry.rollback(artifacts[0])
+    if version is not None:
+        # Companion artifacts (GB quantile boosters) follow the main model
+        for artifact_path in artifacts[1:]:
+            try:
+                model_registry.promote(artifact_path, version)
+            except ValueError as e:
+                print(f"  {model_type}: {e}")
+    return version
+
+
+def _run_challenger(artifact_path, model_type, feature_vector, last_row, quantile_model_path=None):
+    """Run the registry challenger of a model in shadow on the champion's feature vector.
+
+    Stores (prediction, model_version, last_row, interval) in SHADOW_OUTPUTS.
+    The feature vector is the one already built for the champion, so this only
+    costs a model load and one predict call.
+    """
+    if model_type in MODEL_PINS:
+        return
+    version = model_registry.challenger(artifact_path)
+    if version is None:
+        return
+    try:
+        path, version = model_registry.resolve(artifact_path, version)
+        model = joblib.load(path)
+        prediction = model.predict(feature_vector)[0]
+        if quantile_model_path is None:
+            interval = _tree_interval(model, feature_vector)
+        else:
+            interval = _quantile_interval(quantile_model_path, feature_vector, version)
+        SHADOW_OUTPUTS[model_type] = (prediction, version, last_row, interval)
+        print(f"  Shadow {model_type} challenger v{version}")
+    except Exception as e:
+        print(f"  {model_type} challenger failed: {e}")
+
+
+def _tree_interval(model, feature_vector):
+    """Prediction interval from the spread of the individual trees of each forest.
+
+    All trees of a forest are walked together, one vectorized step per
+    tree level, over node arrays flattened once per forest and run
+    (FOREST_NODES); under 1 ms for two 100-tree forests, less than half the
+    cost of calling each tree's predict. Takes INTERVAL_QUANTILES of the per-tree
+    distribution.
+    Returns ((indoor_low, indoor_high), (outdoor_low, outdoor_high)) or None.
+    """
+    try:
+        # Trees compare float32 features against float64 thresholds
+        x = np.ascontiguousarray(feature_vector, dtype=np.float32)[0].astype(np.float64)
+        bounds = []
+        for forest in model.estimators_:
+            roots, left, right, feature, threshold, value = _forest_nodes(forest)
+            node = roots
+            inner = left[node] >= 0
+            while inner.any():
+                go_left = x[feature[node]] <= threshold[node]
+                node = np.where(inner, np.where(go_left, left[node], right[node]), node)
+                inner = left[node] >= 0
+            low, high = np.quantile(value[node], INTERVAL_QUANTILES)
+            bounds.append((float(low), float(high)))
+        return tuple(bounds)
+    except Exception as e:
+        print(f"  Tree interval unavailable: {e}")
+        return None
+
+
+def _forest_nodes(forest):
+    """Node arrays of all trees of a forest, concatenated.
+
+    Returns (roots, left, right, feature, threshold, value); child indexes
+    point into the concatenated arrays, and are -1 at leaves.
+    """
+    cached = FOREST_NODES.get(id(forest))
+    if cached is None or cached[0] is not forest:
+        trees = [tree.tree_ for tree in forest.estimators_]
+        offsets = np.cumsum([0] + [t.node_count for t in trees[:-1]])
+        left = np.concatenate([np.where(t.children_left >= 0, t.children_left + o, -1)
+                               for t, o in zip(trees, offsets)])
+        right = np.concatenate([np.where(t.children_right >= 0, t.children_right + o, -1)
+                                for t, o in zip(trees, offsets)])
+        # Leaves have feature -2; they are never compared, any index will do
+        feature = np.concatenate([np.maximum(t.feature, 0) for t in trees])
+        threshold = np.concatenate([t.threshold for t in trees])
+        value = np.concatenate([t.value[:, 0, 0] for t in trees])
+        cached = FOREST_NODES[id(forest)] = (forest, (offsets, left, right, feature, threshold, value))
+    return cached[1]
+
+
+def _quantile_interval(quantile_model_path, feature_vector, version=None):
+    """Prediction interval from the quantile boosters trained alongside the GB model.
+
+    Uses the registry version given (the challenger's, in shadow runs) or
+    else the one the GB model resolves to. Each bundle is loaded once per run.
+    Returns ((indoor_low, indoor_high), (outdoor_low, outdoor_high)) or None.
+    """
+    if not os.path.exists(quantile_model_path):
+        return None
+    try:
+        if version is None:
+            path, _ = _resolve_artifact(quantile_model_path, "24hr_pubRA_RC3_GB", None)
+        else:
+            path, _ = model_registry.resolve(quantile_model_path, version)
+        if path not in QUANTILE_MODELS:
+            QUANTILE_MODELS[path] = joblib.load(path)
+        quantile_models = QUANTILE_MODELS[path]
+        low = quantile_models[INTERVAL_QUANTILES[0]].predict(feature_vector)[0]
+        high = quantile_models[INTERVAL_QUANTILES[1]].predict(feature_vector)[0]
+        # Independently trained quantiles can cross; order them per target
+        return tuple((float(min(lo, hi)), float(max(lo, hi))) for lo, hi in zip(low, high))
+    except Exception as e:
+        print(f"  GB quantile interval unavailable: {e}")
+        return None
+
+
 def _load_recent_errors(history_path):
     """Load prediction errors from history for 3hrRaw/simple model.
     Returns dict: hour_str -> (error_indoor, error_outdoor)"""
-    if not os.path.exists(history_path):
-        return {}
     try:
-        with open(history_path) as f:
-            history = json.load(f)
-    except (OSError, json.JSONDecodeError):
+        history = history_log.read_history(history_path)
+    except OSError:
         return {}
 
     errors = {}
@@ -146,7 +347,7 @@ def _load_recent_errors(history_path):
 
 
 def _run_full_model():
-    """Run the full 24h model. Returns (prediction, model_version, last_row) or None."""
+    """Run the full 24h model. Returns (prediction, model_version, last_row, interval) or None."""
     if not os.path.exists(MODEL_PATH):
         return None
     try:
@@ -183,17 +384,20 @@ def _run_full_model():
         feature_vector = df[FULL_ALL_COLS].values.flatten().reshape(1, -1)
 
         meta = read_meta()
-        model = joblib.load(MODEL_PATH)
+        model_path, model_version = _resolve_artifact(MODEL_PATH, "24hrRaw", meta.get("version", 0))
+        model = joblib.load(model_path)
         prediction = model.predict(feature_vector)[0]
+        interval = _tree_interval(model, feature_vector)
         print("Using 24hrRaw model")
-        return (prediction, meta.get("version", 0), df.iloc[-1])
+        _run_challenger(MODEL_PATH, "24hrRaw", feature_vector, df.iloc[-1])
+        return (prediction, model_version, df.iloc[-1], interval)
     except Exception as e:
         print(f"Full model failed: {e}")
         return None
 
 
 def _run_simple_model():
-    """Run the simple 3h model. Returns (prediction, model_version, last_row) or None."""
+    """Run the simple 3h model. Returns (prediction, model_version, last_row, interval) or None."""
     if not os.path.exists(SIMPLE_MODEL_PATH):
         return None
     try:
@@ -218,17 +422,20 @@ def _run_simple_model():
         feature_vector = df[SIMPLE_ALL_COLS].values.flatten().reshape(1, -1)
 
         meta = read_simple_meta()
-        model = joblib.load(SIMPLE_MODEL_PATH)
+        model_path, model_version = _resolve_artifact(SIMPLE_MODEL_PATH, "3hrRaw", meta.get("version", 0))
+        model = joblib.load(model_path)
         prediction = model.predict(feature_vector)[0]
+        interval = _tree_interval(model, feature_vector)
         print("Using 3hrRaw model")
-        return (prediction, meta.get("version", 0), df.iloc[-1])
+        _run_challenger(SIMPLE_MODEL_PATH, "3hrRaw", feature_vector, df.iloc[-1])
+        return (prediction, model_version, df.iloc[-1], interval)
     except Exception as e:
         print(f"Simple model failed: {e}")
         return None
 
 
 def _run_6hr_rc_model():
-    """Run the 6hrRC residual correction model. Returns (prediction, model_version, last_row) or None."""
+    """Run the 6hrRC residual correction model. Returns (prediction, model_version, last_row, interval) or None."""
     if not os.path.exists(RC_MODEL_PATH):
         return None
     try:
@@ -276,10 +483,13 @@ def _run_6hr_rc_model():
         feature_vector = np.concatenate([base_features, error_features]).reshape(1, -1)
 
         meta = read_6hr_rc_meta()
-        model = joblib.load(RC_MODEL_PATH)
+        model_path, model_version = _resolve_artifact(RC_MODEL_PATH, "6hrRC", meta.get("version", 0))
+        model = joblib.load(model_path)
         prediction = model.predict(feature_vector)[0]
+        interval = _tree_interval(model, feature_vector)
         print("Using 6hrRC model")
-        return (prediction, meta.get("version", 0), df.iloc[-1])
+        _run_challenger(RC_MODEL_PATH, "6hrRC", feature_vector, df.iloc[-1])
+        return (prediction, model_version, df.iloc[-1], interval)
     except Exception as e:
         print(f"6hrRC model failed: {e}")
         return None
@@ -364,20 +574,64 @@ def _run_gb_model():
         feature_vector = np.concatenate([base_features, error_features]).reshape(1, -1)
 
         meta = read_gb_meta()
-        model = joblib.load(GB_MODEL_PATH)
+        model_path, model_version = _resolve_artifact(GB_MODEL_PATH, "24hr_pubRA_RC3_GB", meta.get("version", 0))
+        model = joblib.load(model_path)
         prediction = model.predict(feature_vector)[0]
+        interval = _quantile_interval(GB_QUANTILE_MODEL_PATH, feature_vector)
         print("  Using 24hr_pubRA_RC3_GB model")
-        return (prediction, meta.get("version", 0), df.iloc[-1])
+        _run_challenger(GB_MODEL_PATH, "24hr_pubRA_RC3_GB", feature_vector, df.iloc[-1],
+                        quantile_model_path=GB_QUANTILE_MODEL_PATH)
+        return (prediction, model_version, df.iloc[-1], interval)
     except Exception as e:
         print(f"  GB model failed: {e}")
         return None
 
 
-def _build_result(prediction, model_version, model_type, last_row):
+def _run_ensemble_model(base_outputs):
+    """Blend the base model outputs of this run with the learned ensemble weights.
+
+    Uses only the predictions already produced in this run, no extra feature building.
+    Returns (prediction, model_version, last_row, interval) or None.
+    """
+    if not base_outputs or not os.path.exists(ENSEMBLE_WEIGHTS_PATH):
+        return None
+    try:
+        with open(ENSEMBLE_WEIGHTS_PATH) as f:
+            weights = json.load(f)
+
+        predictions = {m: (float(out[0][0]), float(out[0][1])) for m, out in base_outputs.items()}
+        last_row = next(iter(base_outputs.values()))[2]
+        for_hour = datetime.fromtimestamp(int(last_row["timestamp"]), tz=timezone.utc) + timedelta(hours=1)
+
+        prediction = blend(predictions, weights, for_hour.hour)
+        if prediction is None:
+            print("Ensemble: no weighted model produced a prediction")
+            return None
+
+        # Blend the base interval bounds with the same weights, only when every
+        # model in the point blend has one: a blend over fewer models could
+        # leave the point estimate outside the interval
+        interval = None
+        if all(out[3] for out in base_outputs.values()):
+            lows = {m: (out[3][0][0], out[3][1][0]) for m, out in base_outputs.items()}
+            highs = {m: (out[3][0][1], out[3][1][1]) for m, out in base_outputs.items()}
+            low = blend(lows, weights, for_hour.hour)
+            high = blend(highs, weights, for_hour.hour)
+            interval = ((low[0], high[0]), (low[1], high[1]))
+
+        meta = read_ensemble_meta()
+        print(f"Using ensemble of {len(predictions)} model(s)")
+        return (prediction, meta.get("version", 0), last_row, interval)
+    except Exception as e:
+        print(f"Ensemble failed: {e}")
+        return None
+
+
+def _build_result(prediction, model_version, model_type, last_row, interval=None):
     """Build a prediction result dict."""
     last_ts = int(last_row["timestamp"])
     last_dt = datetime.fromtimestamp(last_ts, tz=timezone.utc)
-    return {
+    result = {
         "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
         "model_version": model_version,
         "model_type": model_type,
@@ -394,61 +648,155 @@ def _build_result(prediction, model_version, model_type, last_row):
             "temp_outdoor": round(float(prediction[1]), 1),
         },
     }
+    if interval:
+        result["prediction"]["interval"] = {
+            "temp_indoor": [round(interval[0][0], 1), round(interval[0][1], 1)],
+            "temp_outdoor": [round(interval[1][0], 1), round(interval[1][1], 1)],
+        }
+    return result
+
+
+def _migrate_predictions_table(conn):
+    """Add columns and indexes introduced after the table was first created."""
+    # table_xinfo also lists generated columns
+    existing = {row[1] for row in conn.execute("PRAGMA table_xinfo(predictions)")}
+    for name, col_type in PREDICTIONS_ADDED_COLUMNS:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE predictions ADD COLUMN {name} {col_type}")
+
+    index_cols = [row[2] for row in conn.execute("PRAGMA index_info(idx_predictions_run)")]
+    if "last_reading_ts" not in index_cols:
+        # Older index keyed on generated_at; rebuild it on the input
+        conn.execute("DROP INDEX IF EXISTS idx_predictions_run")
+        # Keep the first row of each re-run so the unique index can be built.
+        # NULLs never conflict in a unique index, so rows without a version or
+        # last reading are left alone.
+        conn.execute(
+            f"""DELETE FROM predictions
+                WHERE model_version IS NOT NULL AND last_reading_ts IS NOT NULL
+                  AND id NOT IN (SELECT MIN(id) FROM predictions
+                                 GROUP BY {PREDICTIONS_UNIQUE_KEY})""")
+        conn.execute(PREDICTIONS_UNIQUE_INDEX_SQL)
+    conn.execute(PREDICTIONS_HOUR_INDEX_SQL)
 
 
-def _write_prediction(result, predictions_dir, model_type):
-    """Write a prediction to the predictions directory with model-typed filename."""
-    now = datetime.now(timezone.utc)
-    date_dir = os.path.join(predictions_dir, now.strftime("%Y-%m-%d"))
-    os.makedirs(date_dir, exist_ok=True)
-    timestamp = now.strftime("%H%M%S")
+def _stage_json(path, data):
+    """Write JSON to a temp file beside path. Returns (tmp_path, path) for os.replace."""
+    return (atomic_file.stage_json(path, data, indent=2), path)
 
-    # Write model-typed file: HHMMSS_modeltype.json
-    typed_filename = f"{timestamp}_{model_type}.json"
-    typed_path = os.path.join(date_dir, typed_filename)
-    with open(typed_path, "w") as f:
-        json.dump(result, f, indent=2)
-        f.write("\n")
-    print(f"Prediction written to {typed_path}")
-
-    # Backwards compat: also write old HHMMSS.json for simple model
-    if model_type == "3hrRaw":
-        compat_filename = f"{timestamp}.json"
-        compat_path = os.path.join(date_dir, compat_filename)
-        with open(compat_path, "w") as f:
-            json.dump(result, f, indent=2)
-            f.write("\n")
-        print(f"Compat prediction written to {compat_path}")
-
-    # Write to predictions table in weather.db
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.execute(PREDICTIONS_TABLE_SQL)
-        conn.execute(
-            """INSERT INTO predictions
-            (generated_at, model_type, model_version, for_hour,
-             temp_indoor_predicted, temp_outdoor_predicted,
-             last_reading_ts, last_reading_temp_indoor, last_reading_temp_outdoor)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (result["generated_at"], model_type, result["model_version"],
-             result["prediction"]["prediction_for"],
-             result["prediction"]["temp_indoor"], result["prediction"]["temp_outdoor"],
-             result["last_reading"]["timestamp"],
-             result["last_reading"]["temp_indoor"], result["last_reading"]["temp_outdoor"]))
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        print(f"Warning: failed to write prediction to DB: {e}")
 
+def _new_prediction_batch():
+    """Start a prediction sink that collects every model result of one run."""
+    return {"files": [], "rows": [], "manifest": [], "run_at": datetime.now(timezone.utc)}
+
+
+def _write_prediction(result, predictions_dir, model_type, batch=None, shadow=False):
+    """Write a prediction to the predictions directory with model-typed filename.
+
+    With a batch, the JSON files are staged as temp files and the DB row is
+    queued; nothing is visible until _flush_predictions(batch). Without one,
+    the prediction is flushed immediately. Shadow (challenger) predictions
+    only get a DB row with is_shadow = 1, never a JSON file.
+    """
+    flush_now = batch is None
+    if flush_now:
+        batch = _new_prediction_batch()
 
-def predict(output_path=None, predictions_dir=None, model_type_filter="all"):
+    now = batch["run_at"]
+    date_dir = os.path.join(predictions_dir, now.strftime("%Y-%m-%d"))
+    timestamp = now.strftime("%H%M%S")
+
+    if not shadow:
+        # Write model-typed file: HHMMSS_modeltype.json
+        typed_path = os.path.join(date_dir, f"{timestamp}_{model_type}.json")
+        batch["files"].append(_stage_json(typed_path, result))
+
+        # Backwards compat: also write old HHMMSS.json for simple model
+        if model_type == "3hrRaw":
+            compat_path = os.path.join(date_dir, f"{timestamp}.json")
+            batch["files"].append(_stage_json(compat_path, result))
+
+        # The data dir whose manifest state lists this prediction
+        data_dir = os.path.dirname(os.path.abspath(predictions_dir))
+        batch["manifest"].append(
+            (data_dir, ("predictions", now.strftime("%Y-%m-%d"), timestamp, model_type)))
+
+    interval = result["prediction"].get("interval", {})
+    indoor_bounds = interval.get("temp_indoor", [None, None])
+    outdoor_bounds = interval.get("temp_outdoor", [None, None])
+    batch["rows"].append(
+        (result["generated_at"], model_type, result["model_version"],
+         result["prediction"]["prediction_for"],
+         result["prediction"]["temp_indoor"], result["prediction"]["temp_outdoor"],
+         result["last_reading"]["timestamp"],
+         result["last_reading"]["temp_indoor"], result["last_reading"]["temp_outdoor"],
+         indoor_bounds[0], indoor_bounds[1], outdoor_bounds[0], outdoor_bounds[1],
+         int(shadow)))
+
+    if flush_now:
+        _flush_predictions(batch)
+
+
+def _flush_predictions(batch):
+    """Commit a prediction batch: all DB rows in one transaction, then publish the files.
+
+    Rows are keyed by model type, model version, for_hour and the last reading
+    timestamp (PREDICTIONS_UNIQUE_KEY), so flushing the same batch twice, or
+    re-running predict() on the same data, adds no rows; the first run's row
+    and generated_at are kept. Files are moved into place with os.replace
+    only after the DB commit, so readers never see a half-written JSON file.
+    """
+    if batch["rows"]:
+        conn = None
+        try:
+            conn = sqlite3.connect(DB_PATH)
+            with conn:
+                conn.execute(PREDICTIONS_TABLE_SQL)
+                _migrate_predictions_table(conn)
+                conn.executemany(
+                    """INSERT INTO predictions
+                    (generated_at, model_type, model_version, for_hour,
+                     temp_indoor_predicted, temp_outdoor_predicted,
+                     last_reading_ts, last_reading_temp_indoor, last_reading_temp_outdoor,
+                     temp_indoor_low, temp_indoor_high, temp_outdoor_low, temp_outdoor_high,
+                     is_shadow)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(model_type, model_version, for_hour, last_reading_ts, is_shadow)
+                    DO NOTHING""",
+                    batch["rows"])
+            print(f"Wrote {len(batch['rows'])} prediction(s) to DB in one transaction")
+        except Exception as e:
+            print(f"Warning: failed to write predictions to DB: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
+
+    for tmp_path, path in batch["files"]:
+        os.replace(tmp_path, path)
+        print(f"Prediction written to {path}")
+
+    by_data_dir = {}
+    for data_dir, entry in batch["manifest"]:
+        by_data_dir.setdefault(data_dir, []).append(entry)
+    for data_dir, entries in by_data_dir.items():
+        manifest_state.record(data_dir, entries)
+
+    batch["files"] = []
+    batch["rows"] = []
+    batch["manifest"] = []
+
+
+def predict(output_path=None, predictions_dir=None, model_type_filter="all", pins=None):
     if not os.path.exists(DB_PATH):
         print(f"Error: database not found at {DB_PATH}")
         sys.exit(1)
 
+    MODEL_PINS.clear()
+    MODEL_PINS.update(pins or {})
+
     models_to_run = []
     if model_type_filter == "all":
-        models_to_run = ["3hrRaw", "24hrRaw", "6hrRC", "24hr_pubRA_RC3_GB"]
+        models_to_run = ["3hrRaw", "24hrRaw", "6hrRC", "24hr_pubRA_RC3_GB", ENSEMBLE_MODEL_TYPE]
     elif model_type_filter == "3hrRaw":
         models_to_run = ["3hrRaw"]
     elif model_type_filter == "24hrRaw":
@@ -457,6 +805,11 @@ def predict(output_path=None, predictions_dir=None, model_type_filter="all"):
         models_to_run = ["24hr_pubRA_RC3_GB"]
 
     results = []
+    base_outputs = {}
+    SHADOW_OUTPUTS.clear()
+    QUANTILE_MODELS.clear()
+    FOREST_NODES.clear()
+    batch = _new_prediction_batch()
 
     for model_name in models_to_run:
         if model_name == "24hrRaw":
@@ -467,6 +820,8 @@ def predict(output_path=None, predictions_dir=None, model_type_filter="all"):
             out = _run_6hr_rc_model()
         elif model_name == "24hr_pubRA_RC3_GB":
             out = _run_gb_model()
+        elif model_name == ENSEMBLE_MODEL_TYPE:
+            out = _run_ensemble_model(base_outputs)
         else:
             continue
 
@@ -474,8 +829,11 @@ def predict(output_path=None, predictions_dir=None, model_type_filter="all"):
             print(f"  {model_name} model: no prediction produced")
             continue
 
-        prediction, model_version, last_row = out
-        result = _build_result(prediction, model_version, model_name, last_row)
+        if model_name != ENSEMBLE_MODEL_TYPE:
+            base_outputs[model_name] = out
+
+        prediction, model_version, last_row, interval = out
+        result = _build_result(prediction, model_version, model_name, last_row, interval)
 
         last_ts = int(last_row["timestamp"])
         last_dt = datetime.fromtimestamp(last_ts, tz=timezone.utc)
@@ -485,17 +843,21 @@ def predict(output_path=None, predictions_dir=None, model_type_filter="all"):
         print(f"    Outdoor: {prediction[1]:.1f}\u00b0C")
 
         if output_path:
-            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
-            with open(output_path, "w") as f:
-                json.dump(result, f, indent=2)
-                f.write("\n")
+            tmp_path, _ = _stage_json(output_path, result)
+            os.replace(tmp_path, output_path)
             print(f"Prediction written to {output_path}")
 
         if predictions_dir:
-            _write_prediction(result, predictions_dir, model_name)
+            _write_prediction(result, predictions_dir, model_name, batch)
 
         results.append(result)
 
+    if predictions_dir:
+        for model_name, (prediction, model_version, last_row, interval) in SHADOW_OUTPUTS.items():
+            result = _build_result(prediction, model_version, model_name, last_row, interval)
+            _write_prediction(result, predictions_dir, model_name, batch, shadow=True)
+        _flush_predictions(batch)
+
     if not results:
         print("Error: no model could produce a prediction")
         sys.exit(1)
@@ -507,6 +869,25 @@ if __name__ == "__main__":
     parser.add_argument("--predictions-dir", help="Directory to store timestamped prediction files")
     parser.add_argument("--model-type", choices=["3hrRaw", "24hrRaw", "6hrRC", "24hr_pubRA_RC3_GB", "all"], default="all",
                         help="Which model to run predictions for")
+    parser.add_argument("--pin", action="append", default=[], metavar="MODEL=VERSION",
+                        help="Load a retained registry version of a model for this run")
+    parser.add_argument("--rollback", action="append", default=[], metavar="MODEL",
+                        help="Move a model's current registry pointer back one version before predicting")
     args = parser.parse_args()
+
+    pins = {}
+    for pin in args.pin:
+        model_name, _, version = pin.partition("=")
+        if not version.isdigit():
+            parser.error(f"--pin expects MODEL=VERSION, got {pin!r}")
+        pins[model_name] = int(version)
+
+    for model_name in args.rollback:
+        version = rollback_model(model_name)
+        if version is None:
+            print(f"{model_name}: no older registry version to roll back to")
+        else:
+            print(f"{model_name}: rolled back to v{version}")
+
     predict(output_path=args.output, predictions_dir=args.predictions_dir,
-            model_type_filter=args.model_type)
+            model_type_filter=args.model_type, pins=pins)
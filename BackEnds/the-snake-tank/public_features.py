@@ -1,12 +1,20 @@
 """Spatial features from nearby public Netatmo weather stations.
 
-Queries the public_stations table in weather.db and computes regional
-statistics for each reading timestamp in a lookback window. Used by
-both predict.py and train_model.py to ensure feature consistency.
+Computes regional statistics of the public station readings around each
+reading timestamp. The readings come from the columnar archive next to
+weather.db (station_archive.py), which holds more history than the
+public_stations table; the table is queried when the archive has no day
+files for the window. Used by both predict.py and train_model.py to
+ensure feature consistency.
 """
 
+import os
 import sqlite3
 
+import numpy as np
+
+import station_archive
+
 # Full spatial features (used by 24hrRaw model)
 SPATIAL_COLS_FULL = [
     "regional_avg_temp",
@@ -33,6 +41,14 @@ SPATIAL_COLS_ENRICHED = SPATIAL_COLS_FULL + [
 ]
 
 
+# Readings within this many seconds of a timestamp count towards its features
+WINDOW_SECONDS = 1800
+
+# Archive columns the features need (station ids and positions are not read)
+ARCHIVE_FEATURE_COLUMNS = ("fetched_at", "temperature", "humidity", "pressure",
+                           "rain_60min", "rain_24h", "wind_strength", "gust_strength")
+
+
 def _has_public_stations(conn):
     """Check if the public_stations table exists and has data."""
     tables = conn.execute(
@@ -54,7 +70,7 @@ def _get_features_for_timestamp(conn, timestamp, temp_outdoor):
         SELECT temperature, humidity, pressure,
                rain_60min, rain_24h, wind_strength, gust_strength
         FROM public_stations
-        WHERE abs(cast(strftime('%%s', fetched_at) as integer) - ?) < 1800
+        WHERE abs(cast(strftime('%s', fetched_at) as integer) - ?) < 1800
           AND temperature IS NOT NULL
     """, (int(timestamp),)).fetchall()
 
@@ -85,14 +101,65 @@ def _get_features_for_timestamp(conn, timestamp, temp_outdoor):
     }
 
 
+def _add_archive_features(df, data):
+    """Fill the spatial columns of df from an archive scan, all rows at once.
+
+    Same statistics as _get_features_for_timestamp. The readings are sorted
+    by fetched_at, so each row's window is a slice found by binary search,
+    and the averages come from prefix sums over the slices.
+    """
+    fetched = data["fetched_at"]
+    ts = df["timestamp"].to_numpy(dtype=np.int64)
+    lo = np.searchsorted(fetched, ts - WINDOW_SECONDS, side="right")
+    hi = np.searchsorted(fetched, ts + WINDOW_SECONDS, side="left")
+    counts = hi - lo
+
+    def window_mean(values):
+        present = ~np.isnan(values)
+        total = np.concatenate(([0.0], np.cumsum(np.where(present, values, 0.0))))
+        n = np.concatenate(([0], np.cumsum(present)))
+        sums, ns = total[hi] - total[lo], n[hi] - n[lo]
+        return np.where(ns > 0, sums / np.maximum(ns, 1), 0.0)
+
+    temps = data["temperature"]
+    avg_temp = window_mean(temps)
+    spread = np.zeros(len(ts))
+    for i in np.nonzero(counts > 1)[0]:
+        window = temps[lo[i]:hi[i]]
+        spread[i] = window.max() - window.min()
+
+    outdoor = df["temp_outdoor"].to_numpy(dtype=float) if "temp_outdoor" in df.columns else np.zeros(len(ts))
+    # Matches `(temp_outdoor - avg_temp) if temp_outdoor else 0.0` (NaN is truthy)
+    delta = np.where(outdoor != 0, outdoor - avg_temp, 0.0)
+
+    features = {
+        "regional_avg_temp": avg_temp,
+        "regional_temp_delta": delta,
+        "regional_temp_spread": spread,
+        "regional_avg_humidity": window_mean(data["humidity"]),
+        "regional_avg_pressure": window_mean(data["pressure"]),
+        "regional_station_count": counts.astype(float),
+        "regional_avg_rain_60min": window_mean(data["rain_60min"]),
+        "regional_avg_rain_24h": window_mean(data["rain_24h"]),
+        "regional_avg_wind_strength": window_mean(data["wind_strength"]),
+        "regional_avg_gust_strength": window_mean(data["gust_strength"]),
+    }
+    empty = counts == 0
+    for col, values in features.items():
+        df[col] = np.where(empty, 0.0, values)
+    return df
+
+
 def add_spatial_columns(db_path, df):
     """Add spatial feature columns to a readings DataFrame.
 
-    For each row, queries public_stations for readings within +/-30 minutes
-    of the row's timestamp and computes regional statistics.
+    For each row, takes the public station readings within +/-30 minutes
+    of the row's timestamp and computes regional statistics. The readings
+    are scanned from the station archive beside db_path when it has day
+    files for the window, otherwise queried from public_stations.
 
-    If public_stations table doesn't exist or has no data, all spatial
-    columns are filled with 0.0 (models learn to ignore zero features).
+    If neither has data, all spatial columns are filled with 0.0 (models
+    learn to ignore zero features).
 
     Args:
         db_path: Path to weather.db
@@ -106,6 +173,16 @@ def add_spatial_columns(db_path, df):
         if col not in df.columns:
             df[col] = 0.0
 
+    if len(df):
+        archive_dir = os.path.join(os.path.dirname(os.path.abspath(db_path)), "public-stations-archive")
+        data = station_archive.scan(
+            archive_dir, ARCHIVE_FEATURE_COLUMNS,
+            start=int(df["timestamp"].min()) - WINDOW_SECONDS,
+            end=int(df["timestamp"].max()) + WINDOW_SECONDS,
+            not_null=("temperature",))
+        if data is not None:
+            return _add_archive_features(df, data)
+
     conn = sqlite3.connect(db_path)
 
     if not _has_public_stations(conn):
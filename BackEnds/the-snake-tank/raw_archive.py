@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""Append-only, compressed archive of the raw Netatmo station responses.
+
+One container per UTC day in data/raw/, plus an index of its records:
+
+    YYYY-MM-DD.jsonl.zst    (or .jsonl.gz, see CODEC_PREFERENCE)
+    YYYY-MM-DD.idx.json     {"codec": "zstd", "dictionary": "<id>" or null,
+                             "records": [[HHMMSS, offset, length], ...]}
+    <id>.dict               zstd dictionary shared by the days that name it
+
+Each fetch is appended as its own compressed frame holding one compact JSON
+line, so the container is an ordinary multi-frame stream (zstdcat -D <id>.dict
+/ zcat print it as JSON Lines) and a single record is read by seeking to its
+offset and decompressing `length` bytes. The index is the source of truth:
+bytes after the last indexed frame (an append interrupted before its index
+was written) are cut off by the next append.
+
+A single response is too small for zstd to learn its structure (about 2:1),
+so the first zstd day trains a DICTIONARY_SIZE dictionary on its records and
+later days reuse it, which brings a fetch down to about 130 bytes.
+
+fetch_weather.py appends every fetch; build_dataset.py archives loose
+data/YYYY-MM-DD/HHMMSS.json files the archive does not have yet
+(sync_from_files) and then streams the archive into weather.db, so the
+readings table keeps its full history after the workflow's cleanup step has
+deleted the loose files. export_weather.py reads from it when weather.db is
+missing.
+
+Usage:
+    python raw_archive.py --sync    # archive the loose JSON files not archived yet
+"""
+
+import argparse
+import json
+import os
+import re
+
+import atomic_file
+import compression
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, "data")
+RAW_DIR = os.path.join(DATA_DIR, "raw")
+
+# Preferred codec for new days; a day keeps the codec it was started with.
+# zstandard is in requirements.txt and the workflow install, so the pipeline
+# always writes and reads zstd; gzip only covers checkouts without it.
+CODEC_PREFERENCE = ("zstd", "gzip")
+CODEC_LEVEL = {"zstd": 9, "gzip": 6}
+DICTIONARY_SIZE = 4 * 1024
+
+DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+INDEX_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})\.idx\.json$")
+READING_RE = re.compile(r"^(\d{4,6})\.json$")
+
+_dictionaries = {}
+
+
+def _default_codec():
+    return next(c for c in CODEC_PREFERENCE if compression.available(c))
+
+
+def _container_path(raw_dir, day, codec):
+    return os.path.join(raw_dir, f"{day}.jsonl{compression.CODECS[codec]['suffix']}")
+
+
+def _index_path(raw_dir, day):
+    return os.path.join(raw_dir, f"{day}.idx.json")
+
+
+def _dictionary_path(raw_dir, dict_id):
+    return os.path.join(raw_dir, f"{dict_id}.dict")
+
+
+def _dictionary(raw_dir, idx):
+    """The zstd dictionary bytes an index names, or None."""
+    dict_id = idx.get("dictionary")
+    if not dict_id:
+        return None
+    path = _dictionary_path(raw_dir, dict_id)
+    if path not in _dictionaries:
+        with open(path, "rb") as f:
+            _dictionaries[path] = f.read()
+    return _dictionaries[path]
+
+
+def _line(data):
+    return json.dumps(data, separators=(",", ":")).encode() + b"\n"
+
+
+def _new_index(raw_dir, day, records):
+    """Index for a day not archived yet.
+
+    zstd days take the dictionary of the closest earlier day. Without one,
+    a dictionary is trained on that day's records and the new ones; too few
+    samples leave the day without a dictionary.
+    """
+    codec = _default_codec()
+    idx = {"codec": codec, "dictionary": None, "records": []}
+    if codec != "zstd":
+        return idx
+    earlier = [d for d in days(raw_dir) if d < day]
+    previous = index(raw_dir, earlier[-1]) if earlier else None
+    if previous and previous.get("dictionary"):
+        idx["dictionary"] = previous["dictionary"]
+        return idx
+    samples = [_line(data) for _, data in iter_day(raw_dir, earlier[-1])] if earlier else []
+    samples += [_line(data) for _, data in records]
+    dictionary = compression.train_dictionary(samples, DICTIONARY_SIZE)
+    if dictionary:
+        idx["dictionary"] = compression.dictionary_id(dictionary)
+        path = _dictionary_path(raw_dir, idx["dictionary"])
+        if not os.path.exists(path):
+            atomic_file.write_bytes(path, dictionary)
+    return idx
+
+
+def days(raw_dir):
+    """Archived days, oldest first."""
+    if not os.path.isdir(raw_dir):
+        return []
+    return sorted(m.group(1) for m in map(INDEX_RE.match, os.listdir(raw_dir)) if m)
+
+
+def index(raw_dir, day):
+    """The day's index, or None when the day is not archived."""
+    try:
+        with open(_index_path(raw_dir, day)) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def times(raw_dir, day):
+    """HHMMSS of the day's archived fetches, oldest first."""
+    idx = index(raw_dir, day)
+    return sorted(rec[0] for rec in idx["records"]) if idx else []
+
+
+def _save_index(raw_dir, day, idx):
+    atomic_file.write_json(_index_path(raw_dir, day), idx, separators=(",", ":"))
+
+
+def append(raw_dir, day, hhmmss, data):
+    """Append one fetch (the parsed API response) to its day's container.
+
+    A fetch already archived under the same HHMMSS is left alone. Returns
+    True when the record was added.
+    """
+    return _append_many(raw_dir, day, [(hhmmss, data)]) == 1
+
+
+def _append_many(raw_dir, day, records):
+    """Append (HHMMSS, data) records to one day; one index write for all of them."""
+    os.makedirs(raw_dir, exist_ok=True)
+    idx = index(raw_dir, day) or _new_index(raw_dir, day, records)
+    codec = idx["codec"]
+    dictionary = _dictionary(raw_dir, idx)
+    archived = {rec[0] for rec in idx["records"]}
+    end = max((offset + length for _, offset, length in idx["records"]), default=0)
+
+    added = 0
+    path = _container_path(raw_dir, day, codec)
+    with open(path, "ab") as f:
+        # Drop the tail of an append that never reached the index
+        f.truncate(end)
+        for hhmmss, data in records:
+            if hhmmss in archived:
+                continue
+            frame = compression.compress(codec, _line(data), CODEC_LEVEL[codec], dictionary)
+            f.write(frame)
+            idx["records"].append([hhmmss, end, len(frame)])
+            archived.add(hhmmss)
+            end += len(frame)
+            added += 1
+        f.flush()
+        os.fsync(f.fileno())
+    if added:
+        _save_index(raw_dir, day, idx)
+    return added
+
+
+def iter_day(raw_dir, day, hours=None):
+    """Yield (HHMMSS, data) for the day's fetches in time order.
+
+    hours, when given, is a set of hours (ints); only fetches made in those
+    hours are decompressed.
+    """
+    idx = index(raw_dir, day)
+    if not idx:
+        return
+    codec = idx["codec"]
+    dictionary = _dictionary(raw_dir, idx)
+    with open(_container_path(raw_dir, day, codec), "rb") as f:
+        for hhmmss, offset, length in sorted(idx["records"]):
+            if hours is not None and int(hhmmss[:2]) not in hours:
+                continue
+            f.seek(offset)
+            yield hhmmss, json.loads(compression.decompress(codec, f.read(length), dictionary))
+
+
+def iter_records(raw_dir):
+    """Yield (day, HHMMSS, data) for every archived fetch, oldest first."""
+    for day in days(raw_dir):
+        for hhmmss, data in iter_day(raw_dir, day):
+            yield day, hhmmss, data
+
+
+def latest_for_hour(raw_dir, day, hour):
+    """The last fetch archived in the given hour of day, or None."""
+    prefix = f"{hour:02d}"
+    candidates = [t for t in times(raw_dir, day) if t.startswith(prefix)]
+    if not candidates:
+        return None
+    latest = candidates[-1]
+    for hhmmss, data in iter_day(raw_dir, day, hours={hour}):
+        if hhmmss == latest:
+            return data
+    return None
+
+
+def sync_from_files(raw_dir, data_dir, paths=None):
+    """Archive loose data_dir/YYYY-MM-DD/HHMMSS.json files not archived yet.
+
+    A file is named after its fetch time, so archived files are recognised
+    from the index without being opened. Unreadable files are skipped (and
+    stay unarchived). paths limits the sync to those files. Returns the
+    number of fetches added.
+    """
+    if paths is None:
+        paths = []
+        for day in sorted(os.listdir(data_dir)) if os.path.isdir(data_dir) else []:
+            day_dir = os.path.join(data_dir, day)
+            if DATE_RE.match(day) and os.path.isdir(day_dir):
+                paths.extend(os.path.join(day_dir, name) for name in os.listdir(day_dir))
+
+    pending = {}
+    for path in sorted(paths):
+        day = os.path.basename(os.path.dirname(path))
+        m = READING_RE.match(os.path.basename(path))
+        if not m or not DATE_RE.match(day):
+            continue
+        pending.setdefault(day, []).append((m.group(1), path))
+
+    added = 0
+    for day, files in pending.items():
+        archived = set(times(raw_dir, day))
+        records = []
+        for hhmmss, path in files:
+            if hhmmss in archived:
+                continue
+            try:
+                with open(path) as f:
+                    records.append((hhmmss, json.load(f)))
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"  SKIP (unreadable): {path} — {e}")
+        if records:
+            added += _append_many(raw_dir, day, records)
+    return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compressed archive of the raw station responses")
+    parser.add_argument("--sync", action="store_true", help="Archive the loose JSON files not archived yet")
+    args = parser.parse_args()
+    if args.sync:
+        print(f"Archived {sync_from_files(RAW_DIR, DATA_DIR)} fetch(es)")
+    for day in days(RAW_DIR):
+        idx = index(RAW_DIR, day)
+        size = os.path.getsize(_container_path(RAW_DIR, day, idx["codec"]))
+        print(f"  {day}: {len(idx['records'])} fetch(es), {size} bytes ({idx['codec']})")
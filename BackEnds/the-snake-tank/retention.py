@@ -0,0 +1,123 @@
+"""Retention for the public station data fetch_weather.py keeps.
+
+What is pruned, and how long it is kept:
+
+    public_stations rows in weather.db        KEEP_DAYS (30)
+    data/public-stations/YYYY-MM-DD/ (CSV + JSON)  KEEP_DAYS (30)
+    data/public-stations-archive/             station_archive.ARCHIVE_KEEP_DAYS
+
+run() does all of it at most once per INTERVAL_SECONDS; the time of the last
+pass is kept in data/retention-state.json, so the other fetches of the hour
+skip it with one small file read.
+
+Rows are deleted by epoch range through fetched_epoch, a virtual generated
+column (fetched_at as epoch seconds) with its own index, in chunks of
+DELETE_CHUNK rows committed one by one, so a large backlog never holds the
+write lock for long. The date directories are pruned from one listing of
+data/public-stations/.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import atomic_file
+import manifest_state
+import station_archive
+
+STATE_FILE = "retention-state.json"
+INTERVAL_SECONDS = 3600
+KEEP_DAYS = 30
+DELETE_CHUNK = 5000
+
+# fetched_at ("YYYY-MM-DDTHH:MM:SSZ") as epoch seconds, computed by SQLite
+EPOCH_COLUMN = ("fetched_epoch",
+                "INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', fetched_at) AS INTEGER)) VIRTUAL")
+EPOCH_INDEX_SQL = """CREATE INDEX IF NOT EXISTS idx_public_stations_epoch
+    ON public_stations(fetched_epoch)"""
+
+
+def _state_path(data_dir):
+    return os.path.join(data_dir, STATE_FILE)
+
+
+def due(data_dir, now=None):
+    """True when the last pass is INTERVAL_SECONDS old or there is none."""
+    now = now or datetime.now(timezone.utc)
+    try:
+        with open(_state_path(data_dir)) as f:
+            last = datetime.strptime(json.load(f)["last_run"], "%Y-%m-%dT%H:%M:%SZ")
+    except (OSError, ValueError, KeyError, TypeError):
+        return True
+    return (now - last.replace(tzinfo=timezone.utc)).total_seconds() >= INTERVAL_SECONDS
+
+
+def _mark_run(data_dir, now):
+    atomic_file.write_json(_state_path(data_dir), {"last_run": now.strftime("%Y-%m-%dT%H:%M:%SZ")})
+
+
+def ensure_epoch_column(conn):
+    """Add fetched_epoch and its index to a public_stations table created without them."""
+    existing = {row[1] for row in conn.execute("PRAGMA table_xinfo(public_stations)")}
+    name, col_type = EPOCH_COLUMN
+    if name not in existing:
+        conn.execute(f"ALTER TABLE public_stations ADD COLUMN {name} {col_type}")
+    conn.execute(EPOCH_INDEX_SQL)
+
+
+def prune_public_stations(conn, cutoff_epoch, chunk=DELETE_CHUNK):
+    """Delete rows fetched before cutoff_epoch, chunk rows per transaction. Returns the rows deleted."""
+    ensure_epoch_column(conn)
+    conn.commit()
+    deleted = 0
+    while True:
+        cur = conn.execute(
+            """DELETE FROM public_stations WHERE id IN (
+                   SELECT id FROM public_stations WHERE fetched_epoch < ? LIMIT ?)""",
+            (cutoff_epoch, chunk))
+        conn.commit()
+        deleted += cur.rowcount
+        if cur.rowcount < chunk:
+            return deleted
+
+
+def prune_directories(public_dir, cutoff_day):
+    """Remove date directories (CSV and JSON alike) older than cutoff_day. Returns the dates removed."""
+    if not os.path.isdir(public_dir):
+        return []
+    removed = []
+    for entry in os.scandir(public_dir):
+        if entry.is_dir() and manifest_state.DATE_RE.match(entry.name) and entry.name < cutoff_day:
+            shutil.rmtree(entry.path)
+            removed.append(entry.name)
+    return sorted(removed)
+
+
+def run(db_path, data_dir, now=None, force=False):
+    """One retention pass, unless the last one is less than INTERVAL_SECONDS old.
+
+    Returns a summary dict, or None when the pass was skipped.
+    """
+    now = now or datetime.now(timezone.utc)
+    if not force and not due(data_dir, now):
+        return None
+
+    cutoff = now - timedelta(days=KEEP_DAYS)
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = prune_public_stations(conn, int(cutoff.timestamp()))
+    finally:
+        conn.close()
+
+    dates = prune_directories(os.path.join(data_dir, "public-stations"), cutoff.strftime("%Y-%m-%d"))
+    if dates:
+        manifest_state.forget(data_dir, "public_stations", dates)
+    archive_days = station_archive.prune(os.path.join(data_dir, "public-stations-archive"), now=now)
+
+    _mark_run(data_dir, now)
+    summary = {"rows": rows, "dates": dates, "archive_days": archive_days}
+    print(f"Retention: {rows} public station row(s), {len(dates)} date dir(s), "
+          f"{len(archive_days)} archive day(s) removed")
+    return summary
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""Columnar archive of public Netatmo station readings.
+
+One compressed NumPy file per UTC day, data/public-stations-archive/YYYY-MM-DD.npz,
+holding one array per column:
+
+    fetched_at    int64    epoch seconds
+    station       int32    code into station_ids
+    station_ids   str      the day's distinct station ids (dictionary)
+    lat, lon      float64
+    temperature, humidity, pressure, rain_60min, rain_24h,
+    wind_strength, wind_angle, gust_strength, gust_angle
+                  float32  NaN for a missing value
+
+fetch_weather.py appends each fetch and keeps ARCHIVE_KEEP_DAYS of history,
+far longer than the 30 days of CSVs and SQLite rows. build_dataset.py fills
+in days the archive is missing from the CSVs (sync_from_csv) and rebuilds
+the public_stations table from it; public_features.py computes the spatial
+features from it.
+
+scan() reads only the day files that overlap the requested time range and,
+within them, only the requested columns (NpzFile decompresses an array on
+first access). Measures come back as float64 rounded to MEASURE_DECIMALS,
+the precision the API reports, so float32 storage does not leak into the
+values.
+
+Usage:
+    python station_archive.py --sync    # archive the CSVs not archived yet
+"""
+
+import argparse
+import csv
+import glob
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import atomic_file
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE_DIR = os.path.join(SCRIPT_DIR, "data", "public-stations-archive")
+CSV_DIR = os.path.join(SCRIPT_DIR, "data", "public-stations")
+
+ARCHIVE_KEEP_DAYS = 365
+MEASURE_DECIMALS = 3
+
+MEASURES = ("temperature", "humidity", "pressure", "rain_60min", "rain_24h",
+            "wind_strength", "wind_angle", "gust_strength", "gust_angle")
+# Row layout shared with fetch_weather.store_public_stations and the CSVs
+ROW_COLUMNS = ("fetched_at", "station_id", "lat", "lon") + MEASURES
+
+DAY_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})\.npz$")
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def _epoch(fetched_at):
+    return int(datetime.strptime(fetched_at, TIME_FORMAT).replace(tzinfo=timezone.utc).timestamp())
+
+
+def _iso(epoch):
+    return datetime.fromtimestamp(int(epoch), timezone.utc).strftime(TIME_FORMAT)
+
+
+def _float(val):
+    return np.nan if val is None or val == "" else float(val)
+
+
+def _day_path(archive_dir, day):
+    return os.path.join(archive_dir, f"{day}.npz")
+
+
+def days(archive_dir):
+    """Archived days, oldest first."""
+    if not os.path.isdir(archive_dir):
+        return []
+    return sorted(m.group(1) for m in map(DAY_RE.match, os.listdir(archive_dir)) if m)
+
+
+def _read_day(archive_dir, day, columns):
+    """Columns of one day file as a dict of arrays (station_id decoded)."""
+    with np.load(_day_path(archive_dir, day)) as npz:
+        out = {}
+        for col in columns:
+            if col == "station_id":
+                out[col] = npz["station_ids"][npz["station"]]
+            else:
+                out[col] = npz[col]
+        return out
+
+
+def _write_day(archive_dir, day, rows):
+    """Write a day file from row dicts, sorted by fetched_at."""
+    rows = sorted(rows, key=lambda r: r["fetched_at"])
+    station_ids, station = np.unique(np.array([r["station_id"] for r in rows], dtype=str),
+                                     return_inverse=True)
+    arrays = {
+        "fetched_at": np.array([r["fetched_at"] for r in rows], dtype=np.int64),
+        "station": station.astype(np.int32),
+        "station_ids": station_ids,
+        "lat": np.array([_float(r["lat"]) for r in rows], dtype=np.float64),
+        "lon": np.array([_float(r["lon"]) for r in rows], dtype=np.float64),
+    }
+    for col in MEASURES:
+        arrays[col] = np.array([_float(r[col]) for r in rows], dtype=np.float32)
+
+    with atomic_file.replace_on_close(_day_path(archive_dir, day), "wb") as f:
+        np.savez_compressed(f, **arrays)
+
+
+def _day_rows(archive_dir, day):
+    """Every row of a day file as row dicts (fetched_at as epoch seconds)."""
+    if not os.path.exists(_day_path(archive_dir, day)):
+        return []
+    data = _read_day(archive_dir, day, ("fetched_at", "station_id", "lat", "lon") + MEASURES)
+    return [{col: data[col][i] for col in data} for i in range(len(data["fetched_at"]))]
+
+
+def append(archive_dir, rows):
+    """Add rows (tuples in ROW_COLUMNS order, fetched_at as ISO text) to their day files.
+
+    Rows of a fetch already in the archive (same fetched_at) are skipped,
+    so appending the same fetch twice is a no-op. Returns the rows added.
+    """
+    by_day = {}
+    for row in rows:
+        by_day.setdefault(row[0][:10], []).append(dict(zip(ROW_COLUMNS, row)))
+
+    added = 0
+    for day, new_rows in by_day.items():
+        existing = _day_rows(archive_dir, day)
+        archived = {int(r["fetched_at"]) for r in existing}
+        fresh = []
+        for r in new_rows:
+            r["fetched_at"] = _epoch(r["fetched_at"])
+            if r["fetched_at"] not in archived:
+                fresh.append(r)
+        if fresh:
+            _write_day(archive_dir, day, existing + fresh)
+            added += len(fresh)
+    return added
+
+
+def prune(archive_dir, keep_days=ARCHIVE_KEEP_DAYS, now=None):
+    """Delete day files older than keep_days. Returns the days removed."""
+    now = now or datetime.now(timezone.utc)
+    cutoff = (now - timedelta(days=keep_days)).strftime("%Y-%m-%d")
+    removed = [day for day in days(archive_dir) if day < cutoff]
+    for day in removed:
+        os.remove(_day_path(archive_dir, day))
+    return removed
+
+
+def sync_from_csv(archive_dir, csv_dir):
+    """Archive every CSV fetch (csv_dir/YYYY-MM-DD/HHMMSS.csv) not archived yet.
+
+    A CSV is named after its fetch time, so only the fetched_at column of
+    existing day files is read to find what is missing, and archived CSVs
+    are not opened. Returns the rows added.
+    """
+    rows = []
+    for day_dir in sorted(glob.glob(os.path.join(csv_dir, "[0-9]" * 4 + "-*"))):
+        day = os.path.basename(day_dir)
+        archived = set()
+        if os.path.exists(_day_path(archive_dir, day)):
+            archived = {_iso(t) for t in _read_day(archive_dir, day, ("fetched_at",))["fetched_at"]}
+        for csv_path in sorted(glob.glob(os.path.join(day_dir, "*.csv"))):
+            hhmmss = os.path.basename(csv_path)[:6]
+            if f"{day}T{hhmmss[:2]}:{hhmmss[2:4]}:{hhmmss[4:]}Z" in archived:
+                continue
+            with open(csv_path, newline="") as f:
+                for row in csv.DictReader(f):
+                    if row.get("fetched_at") and row["fetched_at"] not in archived:
+                        rows.append(tuple(row.get(col, "") for col in ROW_COLUMNS))
+    return append(archive_dir, rows) if rows else 0
+
+
+def scan(archive_dir, columns, start=None, end=None, not_null=()):
+    """Rows with start <= fetched_at < end (epoch seconds), as a dict of arrays.
+
+    Only day files overlapping [start, end) are opened, and only `columns`
+    (plus those in not_null) are decompressed from them. Rows with NaN in
+    any not_null column are dropped. "fetched_at" comes back as epoch
+    seconds, "station_id" as strings, measures as rounded float64. Returns
+    None when no day file overlaps the range.
+    """
+    first = datetime.fromtimestamp(start, timezone.utc).strftime("%Y-%m-%d") if start is not None else None
+    last = datetime.fromtimestamp(end, timezone.utc).strftime("%Y-%m-%d") if end is not None else None
+    selected = [d for d in days(archive_dir)
+                if (first is None or d >= first) and (last is None or d <= last)]
+    if not selected:
+        return None
+
+    needed = list(dict.fromkeys(list(columns) + list(not_null) + ["fetched_at"]))
+    parts = {col: [] for col in needed}
+    for day in selected:
+        data = _read_day(archive_dir, day, needed)
+        mask = np.ones(len(data["fetched_at"]), dtype=bool)
+        if start is not None:
+            mask &= data["fetched_at"] >= start
+        if end is not None:
+            mask &= data["fetched_at"] < end
+        for col in not_null:
+            mask &= ~np.isnan(data[col])
+        for col in needed:
+            parts[col].append(data[col][mask])
+
+    out = {}
+    for col in columns:
+        values = np.concatenate(parts[col])
+        if col in MEASURES:
+            values = np.round(values.astype(np.float64), MEASURE_DECIMALS)
+        out[col] = values
+    return out
+
+
+def rows(archive_dir, start=None, end=None):
+    """Rows in ROW_COLUMNS order as tuples ready for SQLite (None for NaN)."""
+    data = scan(archive_dir, ROW_COLUMNS, start, end)
+    if data is None:
+        return []
+    columns = []
+    for col in ROW_COLUMNS:
+        values = data[col]
+        if col == "fetched_at":
+            columns.append([_iso(v) for v in values])
+        elif col == "station_id":
+            columns.append(values.tolist())
+        else:
+            columns.append([None if np.isnan(v) else v for v in values.tolist()])
+    return list(zip(*columns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar archive of public station readings")
+    parser.add_argument("--sync", action="store_true", help="Archive the CSV fetches not archived yet")
+    args = parser.parse_args()
+    if args.sync:
+        print(f"Archived {sync_from_csv(ARCHIVE_DIR, CSV_DIR)} public station row(s)")
+    for day in days(ARCHIVE_DIR):
+        print(f"  {day}: {os.path.getsize(_day_path(ARCHIVE_DIR, day))} bytes")
@@ -15,7 +15,6 @@ import sqlite3
 import sys
 from datetime import datetime, timezone
 
-import joblib
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
@@ -23,6 +22,9 @@ from sklearn.metrics import mean_absolute_error
 from sklearn.model_selection import LeaveOneOut, cross_val_predict, train_test_split
 from sklearn.multioutput import MultiOutputRegressor
 
+import history_log
+from ensemble import fit_weights, score_weights
+from model_registry import challenger, latest_version, publish, read_index
 from public_features import SPATIAL_COLS_FULL, SPATIAL_COLS_SIMPLE, SPATIAL_COLS_ENRICHED, add_spatial_columns
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -45,8 +47,14 @@ GB_LOOKBACK = 24
 GB_MIN_READINGS = 336
 GB_MODEL_PATH = os.path.join(MODEL_DIR, "temp_predictor_gb.joblib")
 GB_META_PATH = os.path.join(MODEL_DIR, "gb_meta.json")
+GB_QUANTILE_MODEL_PATH = os.path.join(MODEL_DIR, "temp_predictor_gb_quantiles.joblib")
+
+INTERVAL_QUANTILES = (0.1, 0.9)  # 80% prediction interval
 GB_LASSO_PATH = os.path.join(MODEL_DIR, "lasso_rankings_24hr_pubRA_RC3_GB.json")
 
+ENSEMBLE_WEIGHTS_PATH = os.path.join(MODEL_DIR, "ensemble_weights.json")
+ENSEMBLE_META_PATH = os.path.join(MODEL_DIR, "ensemble_meta.json")
+
 PREDICTION_HISTORY_TABLE_SQL = """CREATE TABLE IF NOT EXISTS prediction_history (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     predicted_at TEXT NOT NULL,
@@ -193,6 +201,44 @@ def read_simple_meta():
         return {"version": 0}
 
 
+def _challenger_pending(artifact_path, label):
+    """True (and says so) while the artifact's registry challenger is still being scored.
+
+    Retraining then is skipped: a new challenger would replace the one being
+    scored before it could collect validate_prediction.PROMOTION_HOURS.
+    """
+    version = challenger(artifact_path)
+    if version is None:
+        return False
+    print(f"{label}: challenger v{version} is still under evaluation, skipping retrain")
+    return True
+
+
+def _next_version(meta, artifact_path):
+    """Version number for a newly trained model: after the meta file and the registry."""
+    return max(meta.get("version", 0), latest_version(artifact_path)) + 1
+
+
+def _publish_challenger(model, artifact_path, meta_path, meta, companions=()):
+    """Publish a trained model (and companion artifacts) as the registry challenger.
+
+    The meta goes into the registry entry. The meta file itself is only
+    rewritten when the version serves right away (no champion yet); a
+    challenger's is written by validate_prediction.py when it is promoted.
+    Returns True when the new version is serving.
+    """
+    version = meta["version"]
+    publish(model, artifact_path, version, as_challenger=True, meta=meta)
+    for companion, companion_path in companions:
+        publish(companion, companion_path, version, as_challenger=True)
+    serving = read_index(artifact_path)["current"] == version
+    if serving:
+        with open(meta_path, "w") as f:
+            json.dump(meta, f, indent=2)
+            f.write("\n")
+    return serving
+
+
 def _load_prediction_errors_from_db():
     """Try to load prediction errors from the DB prediction_history table.
     Returns dict: hour_str -> (error_indoor, error_outdoor), or None if unavailable."""
@@ -227,12 +273,9 @@ def load_prediction_errors(history_path):
         return db_errors
 
     # Fall back to JSON file
-    if not os.path.exists(history_path):
-        return {}
     try:
-        with open(history_path) as f:
-            history = json.load(f)
-    except (OSError, json.JSONDecodeError):
+        history = history_log.read_history(history_path)
+    except OSError:
         return {}
 
     errors = {}
@@ -384,6 +427,9 @@ def train():
         print("Run build_dataset.py first.")
         sys.exit(1)
 
+    if _challenger_pending(MODEL_PATH, "24hrRaw"):
+        return
+
     df = load_readings()
     print(f"Loaded {len(df)} readings from database")
 
@@ -449,13 +495,7 @@ def train():
         shutil.copy2(MODEL_PATH, PREV_MODEL_PATH)
         print(f"Previous model backed up to {PREV_MODEL_PATH}")
 
-    # Save new model
-    joblib.dump(model, MODEL_PATH)
-    print(f"Model saved to {MODEL_PATH}")
-
-    # Write model metadata with incremented version
-    meta = read_meta()
-    new_version = meta.get("version", 0) + 1
+    new_version = _next_version(read_meta(), MODEL_PATH)
     new_meta = {
         "version": new_version,
         "trained_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
@@ -463,10 +503,12 @@ def train():
         "mae_indoor": round(mae_indoor, 4),
         "mae_outdoor": round(mae_outdoor, 4),
     }
-    with open(META_PATH, "w") as f:
-        json.dump(new_meta, f, indent=2)
-        f.write("\n")
-    print(f"Model metadata written (version {new_version})")
+
+    # Save new model as the registry challenger (serves right away if there is no champion)
+    if _publish_challenger(model, MODEL_PATH, META_PATH, new_meta):
+        print(f"Model saved to {MODEL_PATH} (version {new_version})")
+    else:
+        print(f"Model v{new_version} published as challenger")
 
 
 def train_simple():
@@ -476,6 +518,8 @@ def train_simple():
     if not os.path.exists(DB_PATH):
         print("Skipping simple model: no database")
         return
+    if _challenger_pending(SIMPLE_MODEL_PATH, "3hrRaw"):
+        return
 
     df = load_readings()
     df = encode_trends(df)
@@ -514,11 +558,7 @@ def train_simple():
     model.fit(X, y)
 
     os.makedirs(MODEL_DIR, exist_ok=True)
-    joblib.dump(model, SIMPLE_MODEL_PATH)
-    print(f"Simple model saved to {SIMPLE_MODEL_PATH}")
-
-    meta = read_simple_meta()
-    new_version = meta.get("version", 0) + 1
+    new_version = _next_version(read_simple_meta(), SIMPLE_MODEL_PATH)
     new_meta = {
         "version": new_version,
         "trained_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
@@ -526,10 +566,10 @@ def train_simple():
         "mae_indoor": round(mae_indoor, 4),
         "mae_outdoor": round(mae_outdoor, 4),
     }
-    with open(SIMPLE_META_PATH, "w") as f:
-        json.dump(new_meta, f, indent=2)
-        f.write("\n")
-    print(f"Simple model metadata written (version {new_version})")
+    if _publish_challenger(model, SIMPLE_MODEL_PATH, SIMPLE_META_PATH, new_meta):
+        print(f"Simple model saved to {SIMPLE_MODEL_PATH} (version {new_version})")
+    else:
+        print(f"Simple model v{new_version} published as challenger")
 
 
 def train_6hr_rc():
@@ -539,6 +579,8 @@ def train_6hr_rc():
     if not os.path.exists(DB_PATH):
         print("Skipping 6hrRC model: no database")
         return
+    if _challenger_pending(RC_MODEL_PATH, "6hrRC"):
+        return
 
     df = load_readings()
     df = encode_trends(df)
@@ -580,11 +622,7 @@ def train_6hr_rc():
     model.fit(X, y)
 
     os.makedirs(MODEL_DIR, exist_ok=True)
-    joblib.dump(model, RC_MODEL_PATH)
-    print(f"6hrRC model saved to {RC_MODEL_PATH}")
-
-    meta = read_6hr_rc_meta()
-    new_version = meta.get("version", 0) + 1
+    new_version = _next_version(read_6hr_rc_meta(), RC_MODEL_PATH)
     new_meta = {
         "version": new_version,
         "trained_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
@@ -592,10 +630,10 @@ def train_6hr_rc():
         "mae_indoor": round(mae_indoor, 4),
         "mae_outdoor": round(mae_outdoor, 4),
     }
-    with open(RC_META_PATH, "w") as f:
-        json.dump(new_meta, f, indent=2)
-        f.write("\n")
-    print(f"6hrRC model metadata written (version {new_version})")
+    if _publish_challenger(model, RC_MODEL_PATH, RC_META_PATH, new_meta):
+        print(f"6hrRC model saved to {RC_MODEL_PATH} (version {new_version})")
+    else:
+        print(f"6hrRC model v{new_version} published as challenger")
 
 
 def read_gb_meta():
@@ -614,6 +652,8 @@ def train_gb():
     if not os.path.exists(DB_PATH):
         print("Database not found, skipping GB model")
         return
+    if _challenger_pending(GB_MODEL_PATH, "24hr_pubRA_RC3_GB"):
+        return
 
     df = load_readings()
     if len(df) < GB_MIN_READINGS:
@@ -670,10 +710,9 @@ def train_gb():
     print(f"  MAE outdoor: {mae_outdoor:.4f}\u00b0C")
 
     os.makedirs(MODEL_DIR, exist_ok=True)
-    joblib.dump(model, GB_MODEL_PATH)
+    quantile_models = _train_gb_quantiles(X, y)
 
-    meta = read_gb_meta()
-    new_version = meta.get("version", 0) + 1
+    new_version = _next_version(read_gb_meta(), GB_MODEL_PATH)
     new_meta = {
         "version": new_version,
         "trained_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
@@ -682,13 +721,36 @@ def train_gb():
         "mae_indoor": round(mae_indoor, 4),
         "mae_outdoor": round(mae_outdoor, 4),
     }
-    with open(GB_META_PATH, "w") as f:
-        json.dump(new_meta, f, indent=2)
-    print(f"  Saved GB model v{new_version}")
+    # The quantile boosters share the GB model's version and challenger status
+    if _publish_challenger(model, GB_MODEL_PATH, GB_META_PATH, new_meta,
+                           companions=[(quantile_models, GB_QUANTILE_MODEL_PATH)]):
+        print(f"  Saved GB model v{new_version} and quantile boosters {INTERVAL_QUANTILES}")
+    else:
+        print(f"  GB model v{new_version} and quantile boosters published as challenger")
 
     _run_lasso_diagnostic(X, y)
 
 
+def _train_gb_quantiles(X, y):
+    """Train one quantile booster per INTERVAL_QUANTILES entry for the GB prediction interval.
+
+    Returns dict: quantile -> fitted MultiOutputRegressor.
+    """
+    from lightgbm import LGBMRegressor
+
+    quantile_models = {}
+    for alpha in INTERVAL_QUANTILES:
+        base = LGBMRegressor(
+            objective="quantile", alpha=alpha,
+            n_estimators=200, max_depth=8, learning_rate=0.05,
+            num_leaves=31, min_child_samples=5 if len(X) < 50 else 10, verbosity=-1,
+        )
+        model = MultiOutputRegressor(base)
+        model.fit(X, y)
+        quantile_models[alpha] = model
+    return quantile_models
+
+
 def _run_lasso_diagnostic(X, y):
     """Run Lasso regression and export feature rankings."""
     from sklearn.linear_model import Lasso
@@ -742,8 +804,63 @@ def _build_gb_feature_names():
     return names
 
 
+def read_ensemble_meta():
+    """Read ensemble metadata, returning defaults if not found."""
+    try:
+        with open(ENSEMBLE_META_PATH) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"version": 0}
+
+
+def train_ensemble():
+    """Learn ensemble blending weights from the validated prediction history."""
+    print("\n--- Ensemble (inverse-MSE blend of base models) ---")
+
+    if not os.path.exists(DB_PATH):
+        print("Skipping ensemble: no database")
+        return
+
+    weights = fit_weights(DB_PATH)
+    if weights is None:
+        print("Not enough data for ensemble: no validated predictions yet.")
+        return
+
+    score = score_weights(DB_PATH, weights)
+    if score is None:
+        print("Not enough data for ensemble: no validated hours could be blended.")
+        return
+    mae_indoor, mae_outdoor, hour_count = score
+
+    print(f"  Weights indoor:  {weights['global']['temp_indoor']}")
+    print(f"  Weights outdoor: {weights['global']['temp_outdoor']}")
+    print(f"  Hour-of-day buckets: {len(weights['by_hour'])}")
+    print(f"  MAE indoor:  {mae_indoor:.2f}\u00b0C")
+    print(f"  MAE outdoor: {mae_outdoor:.2f}\u00b0C")
+
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    with open(ENSEMBLE_WEIGHTS_PATH, "w") as f:
+        json.dump(weights, f, indent=2)
+        f.write("\n")
+
+    meta = read_ensemble_meta()
+    new_version = meta.get("version", 0) + 1
+    new_meta = {
+        "version": new_version,
+        "trained_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "sample_count": hour_count,
+        "mae_indoor": round(mae_indoor, 4),
+        "mae_outdoor": round(mae_outdoor, 4),
+    }
+    with open(ENSEMBLE_META_PATH, "w") as f:
+        json.dump(new_meta, f, indent=2)
+        f.write("\n")
+    print(f"Ensemble metadata written (version {new_version})")
+
+
 if __name__ == "__main__":
     train()
     train_simple()
     train_6hr_rc()
+    train_ensemble()
     train_gb()
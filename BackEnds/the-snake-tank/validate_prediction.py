@@ -1,13 +1,28 @@
 #!/usr/bin/env python3
-"""Validate the previous prediction against the actual reading that arrived.
-
-Compares predictions from the predictions directory with the most recent reading
-in weather.db, and appends the results to prediction-history.json.
-Handles multiple model types, validating each independently.
+"""Validate predictions against the actual readings that arrived.
+
+With --predictions-dir, every prediction still in the predictions table or
+directory is joined to the reading nearest its target hour in one SQL
+statement, so missed cycles are caught up on the next run. Results go to the
+prediction_history table (deduplicated by its UNIQUE(model_type, for_hour)
+constraint) and are appended to the day segments of the history log (see
+history_log.py); segments from before today are compacted into
+prediction-history.json. With --prediction, a single file is checked against
+the most recent reading.
+
+Each new prediction_history row is also folded into the model_accuracy
+buckets (see model_accuracy.py).
+
+Shadow predictions from registry challengers are scored next to their
+champion in the challenger_scores table; a challenger is promoted once it
+beats the champion over PROMOTION_HOURS validated hours, and rejected when
+it does not, or when it has not collected them within CHALLENGER_MAX_HOURS.
+Promotion writes the challenger's training metadata to the model's meta file.
 
 Usage:
     python validate_prediction.py --prediction <path> --history <path>
     python validate_prediction.py --predictions-dir <path> --history <path>
+    python validate_prediction.py --predictions-dir <path> --history <path> --promotion-hours 48
 """
 
 import argparse
@@ -15,13 +30,35 @@ import json
 import os
 import re
 import sqlite3
-import sys
 from collections import defaultdict
 from datetime import datetime, timezone, timedelta
 
+import history_log
+import model_accuracy
+import model_registry
+
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(SCRIPT_DIR, "data", "weather.db")
+MODEL_DIR = os.path.join(SCRIPT_DIR, "models")
 MAX_HISTORY_PER_MODEL = 168  # 1 week of hourly predictions per model
+PROMOTION_HOURS = 24  # validated shadow hours before a challenger can be promoted
+CHALLENGER_MAX_HOURS = 72  # a challenger still short of PROMOTION_HOURS after this is rejected
+VALIDATION_TARGET_MINUTES = 60  # predictions are for the reading one hour later
+VALIDATION_TOLERANCE_MINUTES = 30  # accept readings 30-90 min after the prediction
+
+# Registry artifacts per model type; the first one carries the challenger pointer
+MODEL_ARTIFACTS = {
+    "24hrRaw": ["temp_predictor.joblib"],
+    "3hrRaw": ["temp_predictor_simple.joblib"],
+    "6hrRC": ["temp_predictor_6hr_rc.joblib"],
+    "24hr_pubRA_RC3_GB": ["temp_predictor_gb.joblib", "temp_predictor_gb_quantiles.joblib"],
+}
+MODEL_META = {
+    "24hrRaw": "model_meta.json",
+    "3hrRaw": "simple_meta.json",
+    "6hrRC": "6hr_rc_meta.json",
+    "24hr_pubRA_RC3_GB": "gb_meta.json",
+}
 
 PREDICTION_HISTORY_TABLE_SQL = """CREATE TABLE IF NOT EXISTS prediction_history (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -48,126 +85,27 @@ PREDICTIONS_TABLE_SQL = """CREATE TABLE IF NOT EXISTS predictions (
     temp_outdoor_predicted REAL,
     last_reading_ts INTEGER,
     last_reading_temp_indoor REAL,
-    last_reading_temp_outdoor REAL
+    last_reading_temp_outdoor REAL,
+    temp_indoor_low REAL,
+    temp_indoor_high REAL,
+    temp_outdoor_low REAL,
+    temp_outdoor_high REAL,
+    is_shadow INTEGER NOT NULL DEFAULT 0,
+    generated_hour TEXT GENERATED ALWAYS AS (substr(generated_at, 1, 13)) VIRTUAL
 )"""
 
-
-def _find_best_predictions_from_db():
-    """Try to find best predictions from the DB predictions table.
-    Returns list of prediction dicts, or None if table doesn't exist or is empty."""
-    if not os.path.exists(DB_PATH):
-        return None
-    try:
-        now = datetime.now(timezone.utc)
-        min_time = (now - timedelta(minutes=90)).strftime("%Y-%m-%dT%H:%M:%SZ")
-        max_time = (now - timedelta(minutes=30)).strftime("%Y-%m-%dT%H:%M:%SZ")
-
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        rows = conn.execute(
-            """SELECT generated_at, model_type, model_version, for_hour,
-                      temp_indoor_predicted, temp_outdoor_predicted,
-                      last_reading_ts, last_reading_temp_indoor, last_reading_temp_outdoor
-               FROM predictions
-               WHERE generated_at > ? AND generated_at < ?""",
-            (min_time, max_time)).fetchall()
-        conn.close()
-
-        if not rows:
-            return None
-
-        # Group by model_type, keep closest to 60 minutes old
-        best_by_model = {}
-        for row in rows:
-            row = dict(row)
-            generated_at = datetime.strptime(row["generated_at"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
-            age_minutes = (now - generated_at).total_seconds() / 60
-            diff = abs(age_minutes - 60)
-            mt = row["model_type"]
-            if mt not in best_by_model or diff < best_by_model[mt][1]:
-                best_by_model[mt] = (row, diff)
-
-        # Convert DB rows to prediction data format matching JSON files
-        results = []
-        for row, _ in best_by_model.values():
-            pred_data = {
-                "generated_at": row["generated_at"],
-                "model_type": row["model_type"],
-                "model_version": row["model_version"],
-                "last_reading": {
-                    "timestamp": row["last_reading_ts"],
-                    "temp_indoor": row["last_reading_temp_indoor"],
-                    "temp_outdoor": row["last_reading_temp_outdoor"],
-                },
-                "prediction": {
-                    "prediction_for": row["for_hour"],
-                    "temp_indoor": row["temp_indoor_predicted"],
-                    "temp_outdoor": row["temp_outdoor_predicted"],
-                },
-            }
-            results.append(pred_data)
-        return results
-    except Exception:
-        return None
-
-
-def find_best_predictions(predictions_dir):
-    """Find predictions that best match the current reading, one per model type.
-
-    Looks for predictions whose 'generated_at' time is 30-90 minutes before now,
-    grouped by model type, keeping the one closest to 60 minutes old per model.
-    """
-    # Try DB first
-    db_results = _find_best_predictions_from_db()
-    if db_results:
-        print(f"Found {len(db_results)} prediction(s) from DB")
-        return db_results
-
-    # Fall back to file scanning
-    if not os.path.isdir(predictions_dir):
-        return []
-
-    now = datetime.now(timezone.utc)
-    best_by_model = {}  # model_type -> (path, diff)
-
-    date_dirs = sorted(
-        [d for d in os.listdir(predictions_dir)
-         if os.path.isdir(os.path.join(predictions_dir, d))],
-        reverse=True,
-    )
-
-    for date_dir in date_dirs[:2]:
-        full_dir = os.path.join(predictions_dir, date_dir)
-        files = sorted(
-            [f for f in os.listdir(full_dir) if f.endswith(".json")],
-            reverse=True,
-        )
-        for fname in files:
-            fpath = os.path.join(full_dir, fname)
-            try:
-                with open(fpath) as f:
-                    data = json.load(f)
-                generated_at = datetime.strptime(
-                    data["generated_at"], "%Y-%m-%dT%H:%M:%SZ"
-                ).replace(tzinfo=timezone.utc)
-
-                age_minutes = (now - generated_at).total_seconds() / 60
-                if age_minutes < 30 or age_minutes > 90:
-                    continue
-
-                # Determine model type from data or filename
-                model_type = data.get("model_type")
-                if not model_type:
-                    match = re.match(r'^\d{4,6}_(\w+)\.json$', fname)
-                    model_type = match.group(1) if match else "simple"
-
-                diff = abs(age_minutes - 60)
-                if model_type not in best_by_model or diff < best_by_model[model_type][1]:
-                    best_by_model[model_type] = (fpath, diff)
-            except (json.JSONDecodeError, KeyError, ValueError):
-                continue
-
-    return [load_prediction(path) for path, _ in best_by_model.values()]
+CHALLENGER_SCORES_TABLE_SQL = """CREATE TABLE IF NOT EXISTS challenger_scores (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    for_hour TEXT NOT NULL,
+    model_type TEXT NOT NULL,
+    challenger_version INTEGER NOT NULL,
+    champion_version INTEGER,
+    challenger_error_indoor REAL,
+    challenger_error_outdoor REAL,
+    champion_error_indoor REAL,
+    champion_error_outdoor REAL,
+    UNIQUE(model_type, for_hour, challenger_version)
+)"""
 
 
 def load_prediction(path):
@@ -178,14 +116,8 @@ def load_prediction(path):
 
 
 def load_history(path):
-    if not os.path.exists(path):
-        return []
-    try:
-        with open(path) as f:
-            data = json.load(f)
-        return data if isinstance(data, list) else []
-    except (json.JSONDecodeError, ValueError):
-        return []
+    """Snapshot plus the open day segments of the history log."""
+    return history_log.read_history(path)
 
 
 def get_latest_reading():
@@ -288,7 +220,321 @@ def validate_single(prediction_data, actual, history):
     return comparison
 
 
-def validate(prediction_paths, history_path):
+def _store_challenger_scores(conn, shadow_entries):
+    """Pair validated shadow predictions with their champion's prediction_history row."""
+    conn.execute(CHALLENGER_SCORES_TABLE_SQL)
+    for entry in shadow_entries:
+        conn.execute(
+            """INSERT OR IGNORE INTO challenger_scores
+            (for_hour, model_type, challenger_version, champion_version,
+             challenger_error_indoor, challenger_error_outdoor,
+             champion_error_indoor, champion_error_outdoor)
+            SELECT ?, ?, ?, model_version, ?, ?, error_indoor, error_outdoor
+            FROM prediction_history
+            WHERE model_type = ? AND for_hour = ?""",
+            (entry["for_hour"], entry["model_type"], entry.get("model_version"),
+             entry["error"]["temp_indoor"], entry["error"]["temp_outdoor"],
+             entry["model_type"], entry["for_hour"]))
+
+
+def _reject_challenger(artifact_paths, version):
+    for artifact_path in artifact_paths:
+        model_registry.reject(artifact_path, version)
+
+
+def promote_challengers(conn, promotion_hours=PROMOTION_HOURS, now=None):
+    """Promote each challenger that beat its champion over the last promotion_hours scores.
+
+    Compares the mean of indoor + outdoor absolute error. A challenger that
+    does not beat the champion, or is still short of promotion_hours scores
+    CHALLENGER_MAX_HOURS after it was published, is rejected so the next
+    training run can publish a new one. Returns the list of (model_type,
+    version) promoted.
+    """
+    now = now or datetime.now(timezone.utc)
+    conn.execute(CHALLENGER_SCORES_TABLE_SQL)
+    promoted = []
+    for model_type, artifacts in MODEL_ARTIFACTS.items():
+        artifact_paths = [os.path.join(MODEL_DIR, name) for name in artifacts]
+        entry = model_registry.challenger_entry(artifact_paths[0])
+        if entry is None:
+            continue
+        version = entry["version"]
+
+        scores = conn.execute(
+            """SELECT challenger_error_indoor + challenger_error_outdoor,
+                      champion_error_indoor + champion_error_outdoor
+               FROM challenger_scores
+               WHERE model_type = ? AND challenger_version = ?
+                 AND champion_error_indoor IS NOT NULL AND champion_error_outdoor IS NOT NULL
+               ORDER BY for_hour DESC LIMIT ?""",
+            (model_type, version, promotion_hours)).fetchall()
+        if len(scores) < promotion_hours:
+            published = datetime.strptime(entry["published_at"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+            if now - published >= timedelta(hours=CHALLENGER_MAX_HOURS):
+                _reject_challenger(artifact_paths, version)
+                print(f"{model_type} challenger v{version} rejected: only {len(scores)}/{promotion_hours} "
+                      f"hours scored in {CHALLENGER_MAX_HOURS}h")
+            else:
+                print(f"{model_type} challenger v{version}: {len(scores)}/{promotion_hours} hours scored")
+            continue
+
+        challenger_mae = sum(s[0] for s in scores) / len(scores)
+        champion_mae = sum(s[1] for s in scores) / len(scores)
+        if challenger_mae >= champion_mae:
+            _reject_challenger(artifact_paths, version)
+            print(f"{model_type} challenger v{version} rejected, not better "
+                  f"({challenger_mae:.3f} vs {champion_mae:.3f}), keeping champion")
+            continue
+
+        for artifact_path in artifact_paths:
+            try:
+                model_registry.promote(artifact_path, version)
+            except ValueError as e:
+                print(f"Warning: {e}")
+        if entry.get("meta"):
+            with open(os.path.join(MODEL_DIR, MODEL_META[model_type]), "w") as f:
+                json.dump(entry["meta"], f, indent=2)
+                f.write("\n")
+        print(f"{model_type} challenger v{version} promoted "
+              f"({challenger_mae:.3f} vs {champion_mae:.3f} over {len(scores)} hours)")
+        promoted.append((model_type, version))
+    return promoted
+
+
+PENDING_PREDICTIONS_SQL = """CREATE TEMP TABLE IF NOT EXISTS pending_predictions (
+    generated_at TEXT NOT NULL,
+    model_type TEXT NOT NULL,
+    model_version INTEGER,
+    temp_indoor_predicted REAL,
+    temp_outdoor_predicted REAL,
+    is_shadow INTEGER NOT NULL DEFAULT 0
+)"""
+
+# Candidates get their for_hour and the reading nearest generated_at + 60 min
+# (within the tolerance), found with one MIN/MAX index seek on each side of the
+# target. Already validated (model_type, for_hour) pairs are skipped through
+# the UNIQUE index, so cost does not grow with history length.
+MATCHED_PREDICTIONS_CTE = """WITH candidates AS (
+    SELECT p.*,
+           strftime('%Y-%m-%dT%H:%M:%SZ', p.generated_at, '+1 hour') AS for_hour,
+           CAST(strftime('%s', p.generated_at) AS INTEGER) + :target AS target_ts
+    FROM pending_predictions p
+), bracketed AS (
+    SELECT c.*,
+           (SELECT MAX(r.timestamp) FROM readings r
+            WHERE r.timestamp BETWEEN c.target_ts - :tolerance AND c.target_ts
+              AND r.temp_indoor IS NOT NULL AND r.temp_outdoor IS NOT NULL) AS before_ts,
+           (SELECT MIN(r.timestamp) FROM readings r
+            WHERE r.timestamp BETWEEN c.target_ts AND c.target_ts + :tolerance
+              AND r.temp_indoor IS NOT NULL AND r.temp_outdoor IS NOT NULL) AS after_ts
+    FROM candidates c
+), matched AS (
+    SELECT b.*,
+           CASE WHEN b.before_ts IS NULL THEN b.after_ts
+                WHEN b.after_ts IS NULL THEN b.before_ts
+                WHEN b.after_ts - b.target_ts < b.target_ts - b.before_ts THEN b.after_ts
+                ELSE b.before_ts END AS reading_ts
+    FROM bracketed b
+)"""
+
+
+def _history_row(entry):
+    return (entry["predicted_at"], entry["for_hour"],
+            entry.get("model_type", "simple"), entry.get("model_version"),
+            entry["predicted"]["temp_indoor"], entry["predicted"]["temp_outdoor"],
+            entry["actual"]["temp_indoor"], entry["actual"]["temp_outdoor"],
+            entry["error"]["temp_indoor"], entry["error"]["temp_outdoor"])
+
+
+def _history_entry(row):
+    """prediction_history row -> prediction-history.json entry."""
+    entry = {
+        "predicted_at": row["predicted_at"],
+        "for_hour": row["for_hour"],
+        "model_type": row["model_type"],
+        "predicted": {
+            "temp_indoor": row["predicted_indoor"],
+            "temp_outdoor": row["predicted_outdoor"],
+        },
+        "actual": {
+            "temp_indoor": row["actual_indoor"],
+            "temp_outdoor": row["actual_outdoor"],
+        },
+        "error": {
+            "temp_indoor": row["error_indoor"],
+            "temp_outdoor": row["error_outdoor"],
+        },
+    }
+    if row["model_version"] is not None:
+        entry["model_version"] = row["model_version"]
+    return entry
+
+
+def _seed_history(conn, history):
+    """Make sure every JSON history entry is in prediction_history (the dedup index)."""
+    conn.execute(PREDICTION_HISTORY_TABLE_SQL)
+    conn.executemany(
+        """INSERT OR IGNORE INTO prediction_history
+        (predicted_at, for_hour, model_type, model_version,
+         predicted_indoor, predicted_outdoor,
+         actual_indoor, actual_outdoor,
+         error_indoor, error_outdoor)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        [_history_row(e) for e in history
+         if e.get("predicted_at") and e.get("for_hour") and e.get("error")])
+
+
+def _load_pending_predictions(conn, predictions_dir):
+    """Gather the recent predictions from the predictions table and directory.
+
+    Only the last MAX_HISTORY_PER_MODEL hours are considered; older results
+    would be trimmed from the history anyway. Returns the number of candidates.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=MAX_HISTORY_PER_MODEL)
+    cutoff_str = cutoff.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    conn.execute(PENDING_PREDICTIONS_SQL)
+    conn.execute("DELETE FROM pending_predictions")
+
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(predictions)")}
+    if columns:
+        shadow_col = "is_shadow" if "is_shadow" in columns else "0"
+        conn.execute(
+            f"""INSERT INTO pending_predictions
+                SELECT generated_at, model_type, model_version,
+                       temp_indoor_predicted, temp_outdoor_predicted, {shadow_col}
+                FROM predictions WHERE generated_at > ?""",
+            (cutoff_str,))
+
+    rows = []
+    if predictions_dir and os.path.isdir(predictions_dir):
+        cutoff_date = cutoff.strftime("%Y-%m-%d")
+        for date_dir in sorted(os.listdir(predictions_dir)):
+            full_dir = os.path.join(predictions_dir, date_dir)
+            if date_dir < cutoff_date or not os.path.isdir(full_dir):
+                continue
+            for fname in sorted(os.listdir(full_dir)):
+                if not fname.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(full_dir, fname)) as f:
+                        data = json.load(f)
+                    model_type = data.get("model_type")
+                    if not model_type:
+                        match = re.match(r'^\d{4,6}_(\w+)\.json$', fname)
+                        model_type = match.group(1) if match else "simple"
+                    rows.append((data["generated_at"], model_type, data.get("model_version"),
+                                 data["prediction"]["temp_indoor"],
+                                 data["prediction"]["temp_outdoor"], 0))
+                except (OSError, json.JSONDecodeError, KeyError, TypeError):
+                    continue
+    conn.executemany("INSERT INTO pending_predictions VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    return conn.execute("SELECT COUNT(*) FROM pending_predictions").fetchone()[0]
+
+
+def validate_pending(conn):
+    """Validate every pending prediction that has a matching reading, set-based.
+
+    Champion rows go to prediction_history; shadow rows go to challenger_scores
+    next to their champion's error. Returns the new history entries.
+    """
+    params = {"target": VALIDATION_TARGET_MINUTES * 60,
+              "tolerance": VALIDATION_TOLERANCE_MINUTES * 60}
+    last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM prediction_history").fetchone()[0]
+
+    conn.execute(
+        MATCHED_PREDICTIONS_CTE + """
+        INSERT OR IGNORE INTO prediction_history
+        (predicted_at, for_hour, model_type, model_version,
+         predicted_indoor, predicted_outdoor,
+         actual_indoor, actual_outdoor,
+         error_indoor, error_outdoor)
+        SELECT m.generated_at, m.for_hour, m.model_type, m.model_version,
+               m.temp_indoor_predicted, m.temp_outdoor_predicted,
+               ROUND(r.temp_indoor, 1), ROUND(r.temp_outdoor, 1),
+               ROUND(ABS(r.temp_indoor - m.temp_indoor_predicted), 1),
+               ROUND(ABS(r.temp_outdoor - m.temp_outdoor_predicted), 1)
+        FROM matched m JOIN readings r ON r.timestamp = m.reading_ts
+        WHERE m.is_shadow = 0
+          AND NOT EXISTS (SELECT 1 FROM prediction_history h
+                          WHERE h.model_type = m.model_type AND h.for_hour = m.for_hour)
+        ORDER BY m.generated_at""",
+        params)
+
+    conn.execute(CHALLENGER_SCORES_TABLE_SQL)
+    conn.execute(
+        MATCHED_PREDICTIONS_CTE + """
+        INSERT OR IGNORE INTO challenger_scores
+        (for_hour, model_type, challenger_version, champion_version,
+         challenger_error_indoor, challenger_error_outdoor,
+         champion_error_indoor, champion_error_outdoor)
+        SELECT m.for_hour, m.model_type, m.model_version, h.model_version,
+               ROUND(ABS(r.temp_indoor - m.temp_indoor_predicted), 1),
+               ROUND(ABS(r.temp_outdoor - m.temp_outdoor_predicted), 1),
+               h.error_indoor, h.error_outdoor
+        FROM matched m
+        JOIN readings r ON r.timestamp = m.reading_ts
+        JOIN prediction_history h ON h.model_type = m.model_type AND h.for_hour = m.for_hour
+        WHERE m.is_shadow = 1""",
+        params)
+
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute(
+        "SELECT * FROM prediction_history WHERE id > ? ORDER BY id", (last_id,)).fetchall()
+    conn.row_factory = None
+    return [_history_entry(row) for row in rows]
+
+
+def validate_all(predictions_dir, history_path, promotion_hours=PROMOTION_HOURS):
+    """Validate every unvalidated prediction in the DB and predictions directory."""
+    if not os.path.exists(DB_PATH):
+        print("No suitable predictions found (no readings database yet), skipping.")
+        return
+
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        conn.execute(PREDICTION_HISTORY_TABLE_SQL)
+        accumulated_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM prediction_history").fetchone()[0]
+        if not accumulated_id:
+            # weather.db was not restored from the cache; refill the dedup index
+            _seed_history(conn, load_history(history_path))
+        pending = _load_pending_predictions(conn, predictions_dir)
+        if not pending:
+            print("No suitable predictions found, skipping.")
+            return
+        print(f"Found {pending} prediction(s) to validate")
+
+        new_entries = validate_pending(conn)
+        # Seeded and newly validated rows both land in the accuracy buckets
+        model_accuracy.accumulate(conn, accumulated_id)
+        conn.commit()
+        promote_challengers(conn, promotion_hours)
+    except sqlite3.Error as e:
+        print(f"Warning: DB validation failed: {e}")
+        return
+    finally:
+        conn.close()
+
+    if not new_entries:
+        print("No new validations to record.")
+        return
+
+    for entry in new_entries:
+        print(f"Validated {entry['model_type']} for {entry['for_hour']}: "
+              f"error indoor {entry['error']['temp_indoor']:.1f}, "
+              f"outdoor {entry['error']['temp_outdoor']:.1f}")
+
+    dates = history_log.append(history_path, new_entries)
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    folded = history_log.compact(history_path, trim_history, before_date=today)
+
+    print(f"History appended for {', '.join(dates)} ({len(new_entries)} new entries, "
+          f"{folded} segment(s) compacted into {history_path})")
+
+
+def validate(prediction_paths, history_path, promotion_hours=PROMOTION_HOURS):
     actual = get_latest_reading()
     if actual is None:
         print("No readings in database, skipping validation.")
@@ -296,6 +542,7 @@ def validate(prediction_paths, history_path):
 
     history = load_history(history_path)
     new_entries = []
+    shadow_entries = []
 
     for prediction_data in prediction_paths:
         if prediction_data is None:
@@ -310,28 +557,33 @@ def validate(prediction_paths, history_path):
         else:
             print(f"Validating: {prediction_data.get('model_type', 'unknown')} from DB")
 
-        comparison = validate_single(prediction_data, actual, history)
+        if prediction_data.get("shadow"):
+            # Challengers never enter the published history; duplicates are ignored by the table
+            comparison = validate_single(prediction_data, actual, [])
+            if comparison:
+                shadow_entries.append(comparison)
+            continue
+
+        comparison = validate_single(prediction_data, actual, history + new_entries)
         if comparison:
             new_entries.append(comparison)
-            history.insert(0, comparison)
 
-    if not new_entries:
+    if not new_entries and not shadow_entries:
         print("No new validations to record.")
         return
 
-    history = trim_history(history)
-
-    os.makedirs(os.path.dirname(os.path.abspath(history_path)), exist_ok=True)
-    with open(history_path, "w") as f:
-        json.dump(history, f, indent=2)
-        f.write("\n")
+    if new_entries:
+        # Single-file runs are rare, so fold everything and leave a complete snapshot
+        history_log.append(history_path, new_entries)
+        history_log.compact(history_path, trim_history)
 
-    print(f"History written to {history_path} ({len(new_entries)} new entries, {len(history)} total)")
+        print(f"History written to {history_path} ({len(new_entries)} new entries)")
 
     # Write new entries to prediction_history table
     try:
         conn = sqlite3.connect(DB_PATH)
         conn.execute(PREDICTION_HISTORY_TABLE_SQL)
+        accumulated_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM prediction_history").fetchone()[0]
         for entry in new_entries:
             conn.execute(
                 """INSERT OR IGNORE INTO prediction_history
@@ -345,7 +597,11 @@ def validate(prediction_paths, history_path):
                  entry["predicted"]["temp_indoor"], entry["predicted"]["temp_outdoor"],
                  entry["actual"]["temp_indoor"], entry["actual"]["temp_outdoor"],
                  entry["error"]["temp_indoor"], entry["error"]["temp_outdoor"]))
+        model_accuracy.accumulate(conn, accumulated_id)
+        if shadow_entries:
+            _store_challenger_scores(conn, shadow_entries)
         conn.commit()
+        promote_challengers(conn, promotion_hours)
         conn.close()
     except Exception as e:
         print(f"Warning: failed to write history to DB: {e}")
@@ -361,15 +617,13 @@ if __name__ == "__main__":
     parser.add_argument(
         "--history", required=True, help="Path to prediction-history.json"
     )
+    parser.add_argument(
+        "--promotion-hours", type=int, default=PROMOTION_HOURS,
+        help="Validated shadow hours a challenger must win before it is promoted"
+    )
     args = parser.parse_args()
 
     if args.predictions_dir:
-        prediction_paths = find_best_predictions(args.predictions_dir)
-        if not prediction_paths:
-            print("No suitable predictions found (need ones 30-90 min old), skipping.")
-            sys.exit(0)
-        print(f"Found {len(prediction_paths)} prediction(s) to validate")
+        validate_all(args.predictions_dir, args.history, args.promotion_hours)
     else:
-        prediction_paths = [args.prediction]
-
-    validate(prediction_paths, args.history)
+        validate([args.prediction], args.history, args.promotion_hours)
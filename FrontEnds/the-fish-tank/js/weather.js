@@ -251,6 +251,8 @@ window.WeatherApp = (() => {
   }
 
   var MANIFEST_URL = 'https://raw.githubusercontent.com/GuppitusMaximus/fish-tank/main/FrontEnds/the-fish-tank/data/data-index.json';
+  var MANIFEST_BASE_URL = 'https://raw.githubusercontent.com/GuppitusMaximus/fish-tank/main/FrontEnds/the-fish-tank/data/';
+  var MANIFEST_ROOT_PATH = 'data-index/index.json';
   var DATA_BASE_URL = 'https://raw.githubusercontent.com/GuppitusMaximus/fish-tank/main/BackEnds/the-snake-tank/data';
 
   function cacheBust(url) {
@@ -259,6 +261,11 @@ window.WeatherApp = (() => {
   }
 
   var manifest = null;
+  // Root of the sharded manifest: per-category date summaries and the month
+  // files that hold the hours. Months are fetched when a date in them is shown.
+  var manifestRoot = null;
+  var manifestMonthsLoaded = {};
+  var manifestMonthRequests = {};
   var browseState = {
     category: 'readings',
     viewMode: 'formatted',
@@ -815,7 +822,62 @@ window.WeatherApp = (() => {
     });
   }
 
+  function fetchManifestFile(path, version) {
+    var remote = MANIFEST_BASE_URL + path;
+    remote = version ? remote + '?v=' + version : cacheBust(remote);
+    return fetch(remote)
+      .then(function(res) {
+        if (!res.ok) throw new Error(res.status);
+        return res.json();
+      })
+      .catch(function() {
+        return fetch('data/' + path)
+          .then(function(res) {
+            if (!res.ok) throw new Error(res.status);
+            return res.json();
+          });
+      });
+  }
+
   function loadManifest() {
+    return fetchManifestFile(MANIFEST_ROOT_PATH)
+      .then(function(root) {
+        manifestRoot = root;
+        manifestMonthsLoaded = {};
+        manifestMonthRequests = {};
+        manifest = {
+          readings: {},
+          predictions: { models: (root.predictions && root.predictions.models) || [], dates: {} },
+          public_stations: {},
+          validation: root.validation ? Object.keys(root.validation.dates).sort().reverse() : []
+        };
+        renderBrowse();
+      })
+      .catch(loadFullManifest);
+  }
+
+  function loadManifestMonth(month) {
+    if (manifestMonthRequests[month]) return manifestMonthRequests[month];
+    var shard = manifestRoot && manifestRoot.months ? manifestRoot.months[month] : null;
+    var request = shard ? fetchManifestFile(shard.path, shard.sha256) : Promise.resolve(null);
+    manifestMonthRequests[month] = request
+      .then(function(data) {
+        if (data) {
+          Object.keys(data.readings || {}).forEach(function(d) { manifest.readings[d] = data.readings[d]; });
+          Object.keys(data.predictions || {}).forEach(function(d) { manifest.predictions.dates[d] = data.predictions[d]; });
+          Object.keys(data.public_stations || {}).forEach(function(d) { manifest.public_stations[d] = data.public_stations[d]; });
+        }
+      })
+      .catch(function() {})
+      .then(function() {
+        // Marked loaded even on failure, so the date shows as empty instead of retrying forever
+        manifestMonthsLoaded[month] = true;
+      });
+    return manifestMonthRequests[month];
+  }
+
+  function loadFullManifest() {
+    manifestRoot = null;
     return fetch(cacheBust(MANIFEST_URL))
       .then(function(res) {
         if (!res.ok) throw new Error(res.status);
@@ -1165,6 +1227,10 @@ window.WeatherApp = (() => {
   function getDatesForCategory() {
     if (!manifest) return [];
     var cat = browseState.category;
+    if (manifestRoot) {
+      var summary = manifestRoot[cat === 'public-stations' ? 'public_stations' : cat];
+      return summary && summary.dates ? Object.keys(summary.dates).sort().reverse() : [];
+    }
     if (cat === 'readings') {
       return manifest.readings ? Object.keys(manifest.readings).sort().reverse() : [];
     } else if (cat === 'predictions') {
@@ -1282,7 +1348,11 @@ window.WeatherApp = (() => {
       html += '</div>';
     }
 
-    if (cat !== 'validation') {
+    var month = browseState.selectedDate ? browseState.selectedDate.substring(0, 7) : null;
+    if (cat !== 'validation' && manifestRoot && month && !manifestMonthsLoaded[month]) {
+      html += '<div class="hour-grid"><span class="browse-loading">Loading\u2026</span></div>';
+      loadManifestMonth(month).then(renderBrowse);
+    } else if (cat !== 'validation') {
       var hours = browseState.selectedDate ? getHoursForDate(browseState.selectedDate) : [];
       var hourBtns = hours.map(function(h) {
         var label = formatHourLabel(h);
@@ -2309,6 +2379,7 @@ window.WeatherApp = (() => {
 
   function stop() {
     manifestLoaded = false;
+    manifestRoot = null;
     browseState.selectedHour = null;
     browseState.currentData = null;
     workflowLoaded = false;